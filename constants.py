@@ -3,6 +3,7 @@
 # or fall back to dev defaults for local development
 
 import os
+import json
 
 # Stack name for CDK deployment
 # Set STACK_NAME environment variable in GitHub Actions:
@@ -17,6 +18,67 @@ STACK_NAME = os.environ.get("STACK_NAME", "OneL-DV2")
 COGNITO_DOMAIN_NAME = os.environ.get("COGNITO_DOMAIN_NAME", "one-l-auth-dv2")
 
 # Document Chunking Configuration
-# Character-based chunking configuration
-CHUNK_SIZE_CHARACTERS = int(os.environ.get("CHUNK_SIZE_CHARACTERS", "30000"))  # Chunk size in characters
-CHUNK_OVERLAP_CHARACTERS = int(os.environ.get("CHUNK_OVERLAP_CHARACTERS", "2000"))  # Overlap between chunks
+# Structure-aware chunking: whole paragraphs/table rows are packed up to an input-token budget
+CHUNK_TARGET_INPUT_TOKENS = int(os.environ.get("CHUNK_TARGET_INPUT_TOKENS", "12000"))  # Input-token budget per chunk
+CHUNK_MIN_INPUT_TOKENS = int(os.environ.get("CHUNK_MIN_INPUT_TOKENS", "3000"))  # Smallest budget used when spreading over CHUNK_TARGET_COUNT
+CHUNK_TARGET_COUNT = int(os.environ.get("CHUNK_TARGET_COUNT", "0"))  # Spread large documents over this many chunks (0 = budget only)
+CHUNK_MAX_OVERLAP_TOKENS = int(os.environ.get("CHUNK_MAX_OVERLAP_TOKENS", "500"))  # Overlap cap, used only when a section straddles a boundary
+CHUNK_PAYLOAD_FORMAT = os.environ.get("CHUNK_PAYLOAD_FORMAT", "text")  # "text" (UTF-8 chunk text block) or "docx" (rendered DOCX document block, fallback)
+
+# Bedrock Prompt Caching
+# Static stage instructions are sent as system prompt layers followed by Converse cache points
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+
+# Model Response Cache
+# Validated structure-analysis / conflict-detection outputs keyed by chunk content, prompt, profile, model and KB version
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL_DAYS = int(os.environ.get("RESPONSE_CACHE_TTL_DAYS", "30"))  # Also the S3 lifecycle expiration for response_cache/
+
+# Knowledge Base Retrieval Cache
+# Relevance-filtered retrieve results keyed by KB, terms profile, query, result count and KB ingestion version:
+# an in-process LRU per Lambda container in front of a shared S3 tier (agent/retrieval_cache.py)
+RETRIEVAL_CACHE_ENABLED = os.environ.get("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_TTL_DAYS = int(os.environ.get("RETRIEVAL_CACHE_TTL_DAYS", "7"))  # Also the S3 lifecycle expiration for retrieval_cache/
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.environ.get("RETRIEVAL_CACHE_MAX_ENTRIES", "512"))  # In-process LRU size
+
+# Bedrock Rate Limiting
+# Shared token buckets per model ID (DynamoDB); set to the account's Bedrock quotas. 0 disables a dimension.
+BEDROCK_REQUESTS_PER_MINUTE = int(os.environ.get("BEDROCK_REQUESTS_PER_MINUTE", "100"))
+BEDROCK_TOKENS_PER_MINUTE = int(os.environ.get("BEDROCK_TOKENS_PER_MINUTE", "400000"))  # Input + output tokens
+RATE_LIMITER_MAX_WAIT_SECONDS = int(os.environ.get("RATE_LIMITER_MAX_WAIT_SECONDS", "300"))  # After this a call is sent anyway
+# Same model through another inference profile, used when the primary profile keeps failing (see agent/bedrock_client.py)
+BEDROCK_ALTERNATE_MODEL_ID = os.environ.get("BEDROCK_ALTERNATE_MODEL_ID", "global.anthropic.claude-sonnet-4-20250514-v1:0")
+
+# Streaming Conflict Detection
+# identify_conflicts uses ConverseStream and checkpoints parsed conflicts every few conflicts or seconds
+CONFLICT_STREAMING_ENABLED = os.environ.get("CONFLICT_STREAMING_ENABLED", "true").lower() == "true"
+
+# Job-Level KB Retrieval (deploy-time workflow shape, see stepfunctions.py)
+# false: structure -> retrieve -> conflicts per chunk inside one Map
+# true: structure analysis for all chunks, one job-wide retrieval of the unique queries, then conflicts per chunk
+JOB_LEVEL_KB_RETRIEVAL = os.environ.get("JOB_LEVEL_KB_RETRIEVAL", "false").lower() == "true"
+
+# Model Call Sizing
+# Thinking budget and output cap are picked per call from stage, input size and observed answer sizes (agent/model.py)
+ADAPTIVE_CALL_SIZING_ENABLED = os.environ.get("ADAPTIVE_CALL_SIZING_ENABLED", "true").lower() == "true"
+# Per-stage overrides, e.g. {"identify_conflicts": {"thinking_budget": 16000, "max_tokens": 32000}}
+CALL_SIZING_OVERRIDES = json.loads(os.environ.get("CALL_SIZING_OVERRIDES", "{}"))
+
+# Hedged Bedrock Requests
+# A non-streaming call running past the latency percentile of similar calls gets a second request; first response wins
+BEDROCK_HEDGING_ENABLED = os.environ.get("BEDROCK_HEDGING_ENABLED", "false").lower() == "true"
+BEDROCK_HEDGE_PERCENTILE = float(os.environ.get("BEDROCK_HEDGE_PERCENTILE", "0.9"))  # Observed latency percentile that triggers a hedge
+BEDROCK_HEDGE_DEFAULT_AFTER_SECONDS = int(os.environ.get("BEDROCK_HEDGE_DEFAULT_AFTER_SECONDS", "150"))  # Until enough latencies are observed
+BEDROCK_HEDGE_USE_1M_CONTEXT = os.environ.get("BEDROCK_HEDGE_USE_1M_CONTEXT", "false").lower() == "true"  # Hedge on the 1M-context profile
+
+# Per-Stage Model Routing
+# Overrides of agent/model.py STAGE_MODEL_ROUTES, e.g. {"analyze_structure": {"model_id": "...", "thinking": false, "max_output_tokens": 8192}}
+# Routed model IDs are added to the Lambda Bedrock permissions at deploy time
+STAGE_MODEL_ROUTES = json.loads(os.environ.get("STAGE_MODEL_ROUTES", "{}"))
+# Store each fresh chunk's model inputs and validated output under eval_captures/ for scripts/eval_stage_routes.py
+EVAL_CAPTURE_ENABLED = os.environ.get("EVAL_CAPTURE_ENABLED", "false").lower() == "true"
+EVAL_CAPTURE_TTL_DAYS = int(os.environ.get("EVAL_CAPTURE_TTL_DAYS", "30"))  # S3 lifecycle expiration for eval_captures/
+
+# Per-job Usage Accounting
+# Individual stage usage records under usage_records/<job_id>/ (job totals stay on the job record)
+USAGE_RECORDS_TTL_DAYS = int(os.environ.get("USAGE_RECORDS_TTL_DAYS", "90"))  # S3 lifecycle expiration for usage_records/
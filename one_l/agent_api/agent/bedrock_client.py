@@ -0,0 +1,392 @@
+"""
+Bedrock model invocation with retries, circuit breaking and fallback.
+Every Converse / ConverseStream call made by the agent goes through BedrockClient.invoke():
+retryable errors are retried iteratively with decorrelated jitter (honouring retry-after hints),
+a per-model circuit breaker fails fast during sustained errors, and FALLBACK_POLICY decides
+which model tier is tried next when a tier gives up. Every attempt is logged with its latency
+and outcome and counted in get_invocation_statistics().
+
+send_hedged() races a second request against a call that runs past a latency threshold;
+LatencyTracker supplies the threshold from recently observed call latencies.
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Hashable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError, HTTPClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BASE_DELAY_SECONDS = 1.0  # Lower bound of every retry delay
+MAX_DELAY_SECONDS = 20.0  # Upper bound of a retry delay, including retry-after hints
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive retryable failures that open a model's circuit
+CIRCUIT_RESET_SECONDS = 30.0  # How long an open circuit fails fast before letting one probe call through
+HEDGE_MIN_SAMPLES = 5  # Observed latencies needed before a percentile is trusted
+HEDGE_LATENCY_HISTORY_SIZE = 100  # Latencies kept per key
+HEDGE_MAX_WORKERS = 8  # Threads for in-flight hedged calls (a losing call finishes in the background)
+
+# Fallback policy: each tier is retried up to max_attempts times for throttling/transient errors.
+# The reason a tier ends selects the next tier (None = give up):
+#   exhausted      - retries used up on throttling/transient errors
+#   circuit_open   - the tier's model circuit is open
+#   context_length - the request is too long for the tier's context window
+# Validation and other client errors are never retried.
+FALLBACK_POLICY = {
+    'primary': {'max_attempts': 4, 'exhausted': 'alternate', 'circuit_open': 'alternate', 'context_length': 'primary_1m'},
+    'primary_1m': {'max_attempts': 2, 'exhausted': 'alternate', 'circuit_open': 'alternate', 'context_length': None},
+    'alternate': {'max_attempts': 2, 'exhausted': None, 'circuit_open': None, 'context_length': None},
+}
+
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+TRANSIENT_ERROR_CODES = {
+    'ServiceUnavailableException', 'InternalServerException', 'InternalFailure',
+    'ModelTimeoutException', 'ModelNotReadyException', 'ModelStreamErrorException'
+}
+CONTEXT_LENGTH_PATTERN = re.compile(r'(input|prompt) is too long|too many input tokens|exceeds? (the )?(maximum )?context', re.IGNORECASE)
+
+# Per-container counters across all invocations
+_invocation_stats = {
+    'invocations': 0,
+    'attempts': 0,
+    'successes': 0,
+    'throttled': 0,
+    'transient': 0,
+    'context_length': 0,
+    'non_retryable': 0,
+    'circuit_open': 0,
+    'fallbacks': 0,
+    'total_latency_ms': 0
+}
+
+
+class BedrockInvocationError(Exception):
+    """Raised when every tier allowed by the fallback policy has failed or was skipped."""
+
+    def __init__(self, message: str, attempts: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classify a Bedrock error by its error code, not its message text.
+
+    Args:
+        error: Exception raised by the Bedrock runtime client (or while reading a stream)
+
+    Returns:
+        'throttled', 'transient', 'context_length' or 'non_retryable'
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        if code in THROTTLING_ERROR_CODES or status == 429:
+            return 'throttled'
+        if code in TRANSIENT_ERROR_CODES or status >= 500:
+            return 'transient'
+        if code == 'ValidationException' and CONTEXT_LENGTH_PATTERN.search(str(error)):
+            return 'context_length'
+        return 'non_retryable'
+    if isinstance(error, HTTPClientError):
+        # Read/connect timeouts and dropped connections
+        return 'transient'
+    return 'non_retryable'
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-after hint (seconds) from the error's HTTP headers, if present."""
+    if not isinstance(error, ClientError):
+        return None
+    headers = error.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    value = headers.get('retry-after') or headers.get('x-amzn-retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    Opens after CIRCUIT_FAILURE_THRESHOLD consecutive retryable failures and
+    fails fast for CIRCUIT_RESET_SECONDS. After that a single probe call is
+    allowed; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at >= self.reset_seconds and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a retryable failure.
+
+        Returns:
+            True if this failure opened (or re-opened) the circuit
+        """
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+                return True
+            return False
+
+    def release_probe(self):
+        """Give back a probe slot without a verdict (e.g. the probe failed with a client error)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class BedrockClient:
+    """
+    Single entry point for Bedrock model invocations.
+
+    Callers supply how to build the request for a model tier and how to send
+    it; the client owns retries, backoff, circuit breaking and fallback.
+    """
+
+    def __init__(self, tiers: Dict[str, Dict[str, Any]], policy: Dict[str, Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            tiers: Tier name -> {'model_id': str, 'use_1m_context': bool}; must contain 'primary'
+            policy: Fallback policy table (defaults to FALLBACK_POLICY)
+            clock: Time source in seconds
+            sleep: Sleep function
+        """
+        self.tiers = tiers
+        self.policy = policy or FALLBACK_POLICY
+        self._clock = clock
+        self._sleep = sleep
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def circuit_breaker(self, model_id: str) -> CircuitBreaker:
+        """Get the circuit breaker shared by every tier using model_id."""
+        with self._breakers_lock:
+            if model_id not in self._breakers:
+                self._breakers[model_id] = CircuitBreaker(clock=self._clock)
+            return self._breakers[model_id]
+
+    def invoke(self, build_request: Callable[[Dict[str, Any]], Dict[str, Any]], send: Callable[[Dict[str, Any]], Dict[str, Any]],
+               context: str = "", start_tier: str = 'primary', max_attempts: Optional[int] = None,
+               tiers: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Send a request, retrying and falling back according to the policy.
+
+        Args:
+            build_request: Builds the API parameters for a tier ({'model_id', 'use_1m_context'})
+            send: Sends the parameters and returns the response; raises on failure
+            context: Label for log lines and metrics (e.g. "with_tools")
+            start_tier: First tier to try
+            max_attempts: Cap on attempts across all tiers (e.g. 1 for a single streaming try)
+            tiers: Tiers for this call, e.g. from a per-stage model route (defaults to the client's tiers)
+
+        Returns:
+            Response returned by send
+        """
+        _invocation_stats['invocations'] += 1
+        attempts = []
+        tier_name = start_tier
+        delay = BASE_DELAY_SECONDS
+        last_error = None
+
+        tiers = tiers or self.tiers
+        while tier_name:
+            tier = tiers[tier_name]
+            tier_policy = self.policy[tier_name]
+            breaker = self.circuit_breaker(tier['model_id'])
+            end_reason = 'exhausted'
+
+            for tier_attempt in range(1, tier_policy['max_attempts'] + 1):
+                sent = sum(1 for attempt in attempts if attempt['outcome'] != 'circuit_open')
+                if max_attempts is not None and sent >= max_attempts:
+                    raise BedrockInvocationError(f"Bedrock call ({context}) stopped after {sent} attempts: {last_error}", attempts) from last_error
+
+                if not breaker.allow():
+                    self._record_attempt(attempts, context, tier_name, tier, tier_attempt, 'circuit_open', 0.0)
+                    end_reason = 'circuit_open'
+                    break
+
+                started = self._clock()
+                try:
+                    response = send(build_request(tier))
+                except Exception as e:
+                    latency = self._clock() - started
+                    outcome = classify_error(e)
+                    last_error = e
+                    self._record_attempt(attempts, context, tier_name, tier, tier_attempt, outcome, latency, e)
+
+                    if outcome in ('throttled', 'transient'):
+                        if breaker.record_failure():
+                            logger.warning(f"BEDROCK_CIRCUIT: Opened for {tier['model_id']} after repeated {outcome} errors; failing fast for {CIRCUIT_RESET_SECONDS:.0f}s")
+                        if tier_attempt < tier_policy['max_attempts']:
+                            # Decorrelated jitter, raised to any retry-after hint
+                            delay = min(MAX_DELAY_SECONDS, random.uniform(BASE_DELAY_SECONDS, delay * 3))
+                            retry_after = _retry_after_seconds(e)
+                            if retry_after:
+                                delay = min(MAX_DELAY_SECONDS, max(delay, retry_after))
+                            logger.warning(f"BEDROCK_RETRY: {context} {outcome} on {tier_name} ({type(e).__name__}), retrying in {delay:.2f}s (attempt {tier_attempt + 1}/{tier_policy['max_attempts']})")
+                            self._sleep(delay)
+                        continue
+
+                    breaker.release_probe()
+                    if outcome == 'context_length':
+                        end_reason = 'context_length'
+                        break
+
+                    # Validation and other client errors: retrying or switching tiers will not help
+                    logger.error(f"BEDROCK_ERROR: {context} non-retryable {type(e).__name__} on {tier_name}: {e}")
+                    raise
+
+                breaker.record_success()
+                self._record_attempt(attempts, context, tier_name, tier, tier_attempt, 'success', self._clock() - started)
+                return response
+
+            next_tier = tier_policy.get(end_reason)
+            if next_tier:
+                _invocation_stats['fallbacks'] += 1
+                logger.warning(f"BEDROCK_FALLBACK: {context} {tier_name} ended ({end_reason}), falling back to {next_tier}")
+            tier_name = next_tier
+
+        logger.error(f"BEDROCK_ERROR: {context} failed after {len(attempts)} attempts: {[a['outcome'] for a in attempts]}")
+        message = f"Bedrock call ({context}) failed after {len(attempts)} attempts"
+        if last_error is not None:
+            raise BedrockInvocationError(f"{message}: {last_error}", attempts) from last_error
+        raise BedrockInvocationError(f"{message}: all model circuits open", attempts)
+
+    def _record_attempt(self, attempts: List[Dict[str, Any]], context: str, tier_name: str, tier: Dict[str, Any],
+                        tier_attempt: int, outcome: str, latency: float, error: Exception = None):
+        """Log one attempt and add it to the per-container counters."""
+        latency_ms = int(latency * 1000)
+        attempts.append({'tier': tier_name, 'model_id': tier['model_id'], 'outcome': outcome, 'latency_ms': latency_ms})
+        _invocation_stats['attempts'] += 1
+        _invocation_stats['successes' if outcome == 'success' else outcome] += 1
+        _invocation_stats['total_latency_ms'] += latency_ms
+        error_name = f", error={type(error).__name__}" if error is not None else ""
+        logger.info(f"BEDROCK_ATTEMPT: context={context}, tier={tier_name}, model={tier['model_id']}, attempt={tier_attempt}, outcome={outcome}, latency_ms={latency_ms}{error_name}")
+
+
+class LatencyTracker:
+    """
+    Recent successful call latencies per key (e.g. stage and input size bucket).
+
+    Each Lambda container keeps its own history, so a cold container has no
+    percentile until HEDGE_MIN_SAMPLES calls have completed for a key.
+    """
+
+    def __init__(self, history_size: int = HEDGE_LATENCY_HISTORY_SIZE):
+        self._history_size = history_size
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self._history_size)).append(seconds)
+
+    def percentile(self, key: Hashable, fraction: float) -> Optional[float]:
+        """
+        Latency below which the given fraction of recent calls for key completed.
+
+        Args:
+            key: Latency key
+            fraction: Percentile as a fraction (e.g. 0.9)
+
+        Returns:
+            Seconds, or None if fewer than HEDGE_MIN_SAMPLES latencies were recorded
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='bedrock-hedge')
+
+
+def send_hedged(send: Callable[[], Dict[str, Any]], send_hedge: Callable[[], Dict[str, Any]], hedge_after: float,
+                may_hedge: Callable[[], bool], context: str = "",
+                on_loser: Optional[Callable[[Future], None]] = None) -> Tuple[Dict[str, Any], str]:
+    """
+    Send a request and, if it has not finished after hedge_after seconds, race a second request against it.
+
+    The first successful response wins. The losing request is not cancelled (Bedrock has no
+    cancellation); it completes in the background, and on_loser is given its future so the caller
+    can account for its usage. If both fail, the first request's error is raised so the caller's
+    retry policy sees it.
+
+    Args:
+        send: Sends the request
+        send_hedge: Sends the hedge request
+        hedge_after: Seconds to wait before hedging
+        may_hedge: Called once when the threshold passes; False skips the hedge (e.g. no rate-limit capacity)
+        context: Label for log lines
+        on_loser: Called with the losing request's future when the other request wins
+
+    Returns:
+        (response, outcome) with outcome 'not_hedged', 'hedge_skipped', 'primary_won' or 'hedge_won'
+    """
+    primary = _hedge_executor.submit(send)
+    try:
+        return primary.result(timeout=hedge_after), 'not_hedged'
+    except FutureTimeoutError:
+        pass
+
+    if not may_hedge():
+        logger.info(f"BEDROCK_HEDGE: {context} still running after {hedge_after:.1f}s, hedge skipped (no rate-limit capacity)")
+        return primary.result(), 'hedge_skipped'
+
+    logger.info(f"BEDROCK_HEDGE: {context} still running after {hedge_after:.1f}s, sending hedge request")
+    hedge = _hedge_executor.submit(send_hedge)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                outcome = 'primary_won' if future is primary else 'hedge_won'
+                logger.info(f"BEDROCK_HEDGE: {context} {outcome}")
+                loser = hedge if future is primary else primary
+                if on_loser and loser in pending:
+                    on_loser(loser)
+                return future.result(), outcome
+            logger.warning(f"BEDROCK_HEDGE: {context} {'primary' if future is primary else 'hedge'} request failed: {type(future.exception()).__name__}")
+    raise primary.exception()
+
+
+def get_invocation_statistics() -> Dict[str, Any]:
+    """Get attempt, outcome and latency counters for Bedrock invocations made by this Lambda container."""
+    stats = dict(_invocation_stats)
+    stats['avg_attempt_latency_ms'] = (stats['total_latency_ms'] / stats['attempts']) if stats['attempts'] else 0.0
+    return stats
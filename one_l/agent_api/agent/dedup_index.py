@@ -0,0 +1,132 @@
+"""
+Near-duplicate detection for retrieved knowledge base passages.
+A DedupIndex holds the passages already accepted in one scope (a single retrieval, or a
+query batch that shares an index) and answers "is this passage a duplicate?" in near-constant
+time: exact duplicates by a hash of the normalized text, near duplicates by 64-bit SimHash
+signatures bucketed with locality-sensitive hashing (LSH) bands. Only signatures that share a
+band with the new passage are compared, instead of every signature seen so far.
+
+Indexes are created per scope and discarded with it, so passages of one job never suppress
+passages of another job on the same warm container. All methods are thread-safe.
+"""
+
+import re
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+SIMHASH_BITS = 64
+LSH_BANDS = 8  # Bands of SIMHASH_BITS // LSH_BANDS bits; signatures within LSH_BANDS - 1 bits always share a band
+SHINGLE_WORDS = 3  # Words per SimHash feature
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+_BAND_BITS = SIMHASH_BITS // LSH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_LANE_BITS = 20  # Per-bit counter width in the bit-sliced sum (up to ~1M features per passage)
+
+# _SPREAD[i][b]: byte value b at byte position i with each of its bits moved into its own counter lane,
+# so summing the spread features counts how many features set each signature bit in one big-int addition
+_SPREAD = [
+    [sum(1 << ((i * 8 + bit) * _LANE_BITS) for bit in range(8) if value >> bit & 1) for value in range(256)]
+    for i in range(SIMHASH_BITS // 8)
+]
+
+
+def normalize_passage(text: str) -> str:
+    """Lowercase, punctuation-free, single-spaced form of a passage."""
+    return _WHITESPACE.sub(' ', _NON_WORD.sub('', text.lower())).strip()
+
+
+def simhash(normalized: str) -> int:
+    """
+    SimHash signature of a normalized passage over overlapping word shingles.
+
+    Args:
+        normalized: Output of normalize_passage
+
+    Returns:
+        SIMHASH_BITS-bit signature; passages sharing most shingles differ in few bits
+    """
+    words = normalized.split()
+    if len(words) > SHINGLE_WORDS:
+        features = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    else:
+        features = {normalized}
+
+    lanes = 0
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=SIMHASH_BITS // 8).digest()
+        lanes += sum(_SPREAD[i][value] for i, value in enumerate(digest))
+
+    signature = 0
+    half = len(features) / 2
+    lane_mask = (1 << _LANE_BITS) - 1
+    for bit in range(SIMHASH_BITS):
+        if (lanes >> (bit * _LANE_BITS)) & lane_mask > half:
+            signature |= 1 << bit
+    return signature
+
+
+class DedupIndex:
+    """
+    Exact and near-duplicate index for one deduplication scope.
+
+    A passage is a near duplicate when its SimHash differs from an accepted passage's in at
+    most max_distance bits, i.e. when the bitwise similarity is at least the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.90):
+        """
+        Args:
+            threshold: Minimum bitwise SimHash similarity (0-1) for a near duplicate
+        """
+        # Bands guarantee a shared bucket only up to LSH_BANDS - 1 differing bits
+        self.max_distance = min(LSH_BANDS - 1, int(round((1 - threshold) * SIMHASH_BITS)))
+        self._exact = {}
+        self._bands = {}
+        self._lock = threading.Lock()
+        self._stats = {'checked': 0, 'unique': 0, 'exact_duplicates': 0, 'near_duplicates': 0}
+
+    def check_and_add(self, text: str, owner: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        Check a passage against the index and add it if it is new.
+
+        Args:
+            text: Passage text
+            owner: Label stored with an accepted passage (e.g. the query_id), returned for its duplicates
+
+        Returns:
+            None if the passage is new, else {'kind': 'exact' or 'near', 'owner': owner of the matching passage}
+        """
+        normalized = normalize_passage(text)
+        exact_key = hashlib.sha256(normalized.encode('utf-8')).digest()
+        signature = simhash(normalized)
+        band_keys = [(band, (signature >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(LSH_BANDS)]
+
+        with self._lock:
+            self._stats['checked'] += 1
+            if exact_key in self._exact:
+                self._stats['exact_duplicates'] += 1
+                return {'kind': 'exact', 'owner': self._exact[exact_key]}
+
+            seen = set()
+            for band_key in band_keys:
+                for candidate, candidate_owner in self._bands.get(band_key, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if bin(candidate ^ signature).count('1') <= self.max_distance:
+                        self._stats['near_duplicates'] += 1
+                        return {'kind': 'near', 'owner': candidate_owner}
+
+            self._exact[exact_key] = owner
+            for band_key in band_keys:
+                self._bands.setdefault(band_key, []).append((signature, owner))
+            self._stats['unique'] += 1
+            return None
+
+    def statistics(self) -> Dict[str, int]:
+        """Counts of checked, unique, exact-duplicate and near-duplicate passages."""
+        with self._lock:
+            return dict(self._stats)
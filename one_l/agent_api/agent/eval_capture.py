@@ -0,0 +1,139 @@
+"""
+Capture of step function model calls for offline route evaluation.
+When EVAL_CAPTURE_ENABLED is set, analyze_structure and identify_conflicts store each fresh
+(non-cached) chunk's model inputs together with the validated output, route and usage under
+eval_captures/ in the agent processing bucket. scripts/eval_stage_routes.py replays these cases
+through candidate model routes and compares the answers with the recorded baseline.
+"""
+
+import json
+import base64
+import logging
+import os
+import sys
+import boto3
+from typing import Dict, Any, List, Optional
+
+# Import constants - add parent directories to path
+_parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+try:
+    import constants
+except ImportError:
+    # Fallback if constants not available
+    class Constants:
+        EVAL_CAPTURE_ENABLED = False
+    constants = Constants()
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+s3_client = boto3.client('s3')
+
+EVAL_CAPTURE_PREFIX = "eval_captures"  # Must match the lifecycle rule on the agent processing bucket
+EVAL_CAPTURE_VERSION = 1
+
+
+def _encode_bytes(value: Any) -> Any:
+    """Make message content JSON-safe: bytes (document blocks) become {"__bytes_b64__": ...}."""
+    if isinstance(value, bytes):
+        return {"__bytes_b64__": base64.b64encode(value).decode('ascii')}
+    if isinstance(value, dict):
+        return {key: _encode_bytes(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_encode_bytes(item) for item in value]
+    return value
+
+
+def _decode_bytes(value: Any) -> Any:
+    """Reverse of _encode_bytes."""
+    if isinstance(value, dict):
+        if set(value) == {"__bytes_b64__"}:
+            return base64.b64decode(value["__bytes_b64__"])
+        return {key: _decode_bytes(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_bytes(item) for item in value]
+    return value
+
+
+def eval_capture_bucket() -> Optional[str]:
+    """Bucket holding evaluation captures, or None when capturing is disabled."""
+    if not constants.EVAL_CAPTURE_ENABLED:
+        return None
+    return os.environ.get('AGENT_PROCESSING_BUCKET')
+
+
+def capture_stage_call(
+    bucket: str,
+    stage: str,
+    case_id: str,
+    messages: List[Dict[str, Any]],
+    system_prompt: List[str],
+    output: Dict[str, Any],
+    route: Dict[str, Any],
+    usage: Dict[str, Any],
+    latency_ms: int,
+    expected_items: Optional[int] = None
+) -> bool:
+    """
+    Store one model call of a stage as an evaluation case.
+
+    Args:
+        bucket: S3 bucket name
+        stage: Workflow stage ('analyze_structure' or 'identify_conflicts')
+        case_id: Unique case name (e.g. job ID and chunk number)
+        messages: Converse messages sent for the chunk
+        system_prompt: Static prompt layers sent as system blocks
+        output: Validated output model as a dict (the baseline answer)
+        route: Stage route that produced the output
+        usage: Model usage of the call (from model.usage_since)
+        latency_ms: Wall time of the model call
+        expected_items: Expected queries/conflicts passed for call sizing
+
+    Returns:
+        True if stored, False otherwise
+    """
+    key = f"{EVAL_CAPTURE_PREFIX}/{stage}/{case_id}.json"
+    try:
+        case = {
+            'capture_version': EVAL_CAPTURE_VERSION,
+            'stage': stage,
+            'case_id': case_id,
+            'messages': _encode_bytes(messages),
+            'system_prompt': system_prompt,
+            'expected_items': expected_items,
+            'baseline': {
+                'route': route,
+                'output': output,
+                'usage': usage,
+                'latency_ms': latency_ms
+            }
+        }
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(case, default=str).encode('utf-8'),
+            ContentType='application/json'
+        )
+        logger.info(f"EVAL_CAPTURE: Stored {key}")
+        return True
+    except Exception as e:
+        # A failed capture never fails the chunk
+        logger.warning(f"EVAL_CAPTURE: Could not store {key}: {e}")
+        return False
+
+
+def load_eval_case(case_json: str) -> Dict[str, Any]:
+    """
+    Parse a stored evaluation case, restoring document bytes in its messages.
+
+    Args:
+        case_json: Contents of an eval_captures/ object
+
+    Returns:
+        Case dict with messages ready to send with Converse
+    """
+    case = json.loads(case_json)
+    case['messages'] = _decode_bytes(case['messages'])
+    return case
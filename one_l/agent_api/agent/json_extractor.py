@@ -0,0 +1,196 @@
+"""
+Extraction of JSON values embedded in model response text.
+Model responses may wrap the JSON answer in explanatory prose, code fences or stray
+brackets. extract_json() finds the outermost valid JSON object or array in a single
+string-aware scan and returns it parsed, so callers never re-search or re-parse the text.
+
+The scan visits only structural characters (brackets, quotes, backslashes, newlines)
+and records balanced bracket spans; each outermost span is then decoded once with
+json.JSONDecoder.raw_decode. Work is linear in the response length; only spans that
+fail to decode are searched again for valid values nested inside them, to a bounded depth.
+
+A truncated response leaves its outer brackets unclosed. Values closed inside them are
+fragments of the answer, so with prefer_key they are only returned if they hold the key;
+otherwise the complete elements of a truncated prefer_key array are recovered.
+"""
+
+import re
+import json
+import logging
+from typing import Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MAX_FALLBACK_DEPTH = 4  # How many levels into an invalid span to look for valid nested values
+
+_STRUCTURAL_CHARS = re.compile(r'[{}\[\]"\\\n]')
+_CLOSERS = {'}': '{', ']': '['}
+_decoder = json.JSONDecoder()
+
+# (start, end, children): a balanced bracket span text[start:end] and the spans closed directly inside it
+Span = Tuple[int, int, List['Span']]
+# [open_char, start, children]: a bracket that never closed and the spans closed directly inside it
+Frame = List[Any]
+
+
+def _scan_spans(text: str) -> Tuple[List[Span], List[Frame]]:
+    """
+    Find the outermost balanced bracket spans in text, ignoring brackets inside JSON strings.
+
+    Quotes only open strings inside a bracket span, so apostrophes and quotes in
+    surrounding prose do not hide the JSON. A raw newline ends a string (JSON strings
+    cannot contain one), so an unbalanced quote cannot swallow the rest of the text.
+    Brackets left unclosed (e.g. a stray "{" in prose, or a truncated response) are
+    returned with the spans closed inside them, so those values are not lost.
+
+    Args:
+        text: Response text
+
+    Returns:
+        (outermost closed spans in text order, unclosed brackets outermost first)
+    """
+    top_level = []
+    stack = []  # [open_char, start, children]
+    in_string = False
+    skip_until = -1
+
+    for match in _STRUCTURAL_CHARS.finditer(text):
+        pos = match.start()
+        if pos < skip_until:
+            continue
+        char = match.group()
+
+        if in_string:
+            if char == '\\':
+                skip_until = pos + 2
+            elif char == '"' or char == '\n':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = bool(stack)
+        elif char == '{' or char == '[':
+            stack.append([char, pos, []])
+        elif char in _CLOSERS:
+            if stack and stack[-1][0] == _CLOSERS[char]:
+                _, start, children = stack.pop()
+                (stack[-1][2] if stack else top_level).append((start, pos + 1, children))
+            # A closer that does not match the open bracket is prose; ignore it
+
+    return top_level, stack
+
+
+def _decode_spans(text: str, spans: List[Span], depth: int = 0) -> Iterator[Any]:
+    """Decode spans in order, searching inside spans that are not valid JSON."""
+    for start, end, children in spans:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            yield value
+        except (json.JSONDecodeError, RecursionError):
+            # RecursionError: nesting deeper than the decoder's recursion limit
+            if depth < MAX_FALLBACK_DEPTH and children:
+                yield from _decode_spans(text, children, depth + 1)
+
+
+def _recover_truncated_array(text: str, unclosed: List[Frame], key: str) -> Optional[dict]:
+    """
+    Recover the object of a response truncated inside its key array.
+
+    For '{"explanation": "...", "conflicts": [{...}, {...}, {"clarification_id": "2", "vendor_q'
+    this returns the object with the complete elements: {"explanation": "...", "conflicts": [{...}, {...}]}.
+
+    Args:
+        text: Response text
+        unclosed: Unclosed brackets from _scan_spans, outermost first
+        key: Key of the array to recover
+
+    Returns:
+        Parsed object with the complete elements of its key array, or None if there is no such array
+    """
+    key_pattern = re.compile(r'"%s"\s*:\s*$' % re.escape(key))
+    for index in range(1, len(unclosed)):
+        open_char, start, children = unclosed[index]
+        parent_char, parent_start, _ = unclosed[index - 1]
+        if open_char != '[' or parent_char != '{':
+            continue
+        if not key_pattern.search(text, max(parent_start, start - len(key) - 64), start):
+            continue
+        # Close the array after its last complete element, then the object that holds it
+        end = children[-1][1] if children else start + 1
+        try:
+            value, _ = _decoder.raw_decode(text[parent_start:end] + ']}')
+        except (json.JSONDecodeError, RecursionError):
+            return None
+        if isinstance(value, dict) and key in value:
+            logger.warning(f"JSON_EXTRACT: Response truncated inside '{key}'; recovered {len(value[key])} complete elements")
+            return value
+        return None
+    return None
+
+
+def iter_json_values(text: str) -> Iterator[Any]:
+    """
+    Iterate over the outermost valid JSON objects and arrays in text.
+
+    Values closed inside brackets that never closed follow the closed ones.
+
+    Args:
+        text: Response text that may contain JSON plus explanatory text
+
+    Yields:
+        Parsed values (dict or list)
+    """
+    if not text:
+        return
+    spans, unclosed = _scan_spans(text)
+    yield from _decode_spans(text, spans)
+    for frame in unclosed:
+        yield from _decode_spans(text, frame[2])
+
+
+def extract_json(text: str, prefer_key: Optional[str] = None) -> Optional[Any]:
+    """
+    Find the outermost valid JSON object or array in text.
+
+    Args:
+        text: Response text that may contain JSON plus explanatory text
+        prefer_key: Return the first object containing this key if there is one
+
+    Returns:
+        Parsed value: the first object with prefer_key, else the first object,
+        else the first array; None if the text contains no valid JSON.
+        With prefer_key, values nested in an unclosed (truncated) object are only
+        returned if they hold prefer_key, and an object truncated inside its
+        prefer_key array is returned with the array's complete elements.
+    """
+    if not text:
+        return None
+    spans, unclosed = _scan_spans(text)
+    first_object = None
+    first_array = None
+    for value in _decode_spans(text, spans):
+        if isinstance(value, dict):
+            if prefer_key is None or prefer_key in value:
+                return value
+            if first_object is None:
+                first_object = value
+        elif first_array is None:
+            first_array = value
+    
+    # Values closed inside brackets that never closed: a stray bracket in prose, or parts of a truncated answer
+    for frame in unclosed:
+        for value in _decode_spans(text, frame[2]):
+            if prefer_key is not None:
+                if isinstance(value, dict) and prefer_key in value:
+                    return value
+            elif isinstance(value, dict):
+                if first_object is None:
+                    first_object = value
+            elif first_array is None:
+                first_array = value
+    if prefer_key is not None:
+        recovered = _recover_truncated_array(text, unclosed, prefer_key)
+        if recovered is not None:
+            return recovered
+    return first_object if first_object is not None else first_array
@@ -20,9 +20,14 @@ from botocore.config import Config
 import logging
 import time
 import sys
+import threading
+from concurrent.futures import Future, wait
 import os
-from typing import Dict, Any, List
-from .tools import retrieve_from_knowledge_base, redline_document, get_tool_definitions, save_analysis_to_dynamodb, parse_conflicts_for_redlining
+from typing import Dict, Any, List, Optional, Callable
+from .rate_limiter import get_rate_limiter
+from .bedrock_client import BedrockClient, LatencyTracker, get_invocation_statistics, send_hedged
+from .json_extractor import extract_json
+from .tools import retrieve_from_knowledge_base, redline_document, get_tool_definitions, save_analysis_to_dynamodb, parse_conflicts_for_redlining, TableGridCache
 
 # Import constants - add parent directories to path
 _parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -33,8 +38,21 @@ try:
 except ImportError:
     # Fallback if constants not available
     class Constants:
-        CHUNK_SIZE_CHARACTERS = 30000
-        CHUNK_OVERLAP_CHARACTERS = 2000
+        CHUNK_TARGET_INPUT_TOKENS = 12000
+        CHUNK_MIN_INPUT_TOKENS = 3000
+        CHUNK_TARGET_COUNT = 0
+        CHUNK_MAX_OVERLAP_TOKENS = 500
+        CHUNK_PAYLOAD_FORMAT = 'text'
+        PROMPT_CACHE_ENABLED = True
+        CONFLICT_STREAMING_ENABLED = True
+        BEDROCK_ALTERNATE_MODEL_ID = "global.anthropic.claude-sonnet-4-20250514-v1:0"
+        ADAPTIVE_CALL_SIZING_ENABLED = True
+        CALL_SIZING_OVERRIDES = {}
+        BEDROCK_HEDGING_ENABLED = False
+        BEDROCK_HEDGE_PERCENTILE = 0.9
+        BEDROCK_HEDGE_DEFAULT_AFTER_SECONDS = 150
+        BEDROCK_HEDGE_USE_1M_CONTEXT = False
+        STAGE_MODEL_ROUTES = {}
     constants = Constants()
 
 
@@ -46,32 +64,667 @@ logger.setLevel(logging.INFO)
 # Reference: https://repost.aws/knowledge-center/bedrock-large-model-read-timeouts
 bedrock_config = Config(
     read_timeout=300,  # 5 minutes - target completion within 5 minutes
+    retries={'mode': 'standard', 'total_max_attempts': 1}  # Retries are owned by bedrock_invoker
 )
 bedrock_client = boto3.client('bedrock-runtime', config=bedrock_config)
 
 # Model configuration - Using inference profile for Claude Sonnet 4
 CLAUDE_MODEL_ID = "us.anthropic.claude-sonnet-4-20250514-v1:0"
 # Fallback: Claude Sonnet 4 with 1M context (same model ID, requires anthropic_beta parameter)
-# After 1M fails, we retry the original Sonnet 4
 ANTHROPIC_BETA_1M = "context-1m-2025-08-07"  # Beta parameter to enable 1M context window
+# Fallback: same model through an alternate inference profile (separate capacity pool)
+ALTERNATE_MODEL_ID = getattr(constants, 'BEDROCK_ALTERNATE_MODEL_ID', "global.anthropic.claude-sonnet-4-20250514-v1:0")
 TEMPERATURE = 1.0  # Must be 1.0 when thinking is enabled
 THINKING_BUDGET_TOKENS = 32000  # Increased to 32k for more complex reasoning in document review
 MAX_TOKENS = 64000  # Maximum output tokens - must be greater than THINKING_BUDGET_TOKENS per AWS Bedrock requirements
 
-# Graceful queuing configuration for token rate limiting prevention
-MAX_RETRIES = 5
-BASE_DELAY = 1.0  # Base delay between calls to prevent rate limiting
-MAX_DELAY = 6.0  # Max delay for exponential backoff
-BACKOFF_MULTIPLIER = 2.0
-CALL_SPACING_DELAY = 1.0  # Minimum delay between consecutive calls to prevent token rate limiting
+# Chunking configuration - token counts are estimated from characters
+CHUNK_PAYLOAD_FORMATS = ('text', 'docx')  # text: UTF-8 chunk text in a text block; docx: rendered DOCX document block
+CHARS_PER_TOKEN = 4
+CHUNK_MIN_FILL_RATIO = 0.5  # Only cut early at a section start if the chunk is at least this full
+SECTION_HEADING_MAX_CHARS = 200
+SECTION_HEADING_PATTERN = re.compile(
+    r'^\s*(?:(?:ARTICLE|Article|SECTION|Section|EXHIBIT|Exhibit|SCHEDULE|Schedule|APPENDIX|Appendix|ATTACHMENT|Attachment)\b'
+    r'|\d+(?:\.\d+)*\.?\s+[A-Z]'
+    r'|[IVXLC]+\.\s+[A-Z])'
+)
+
+# Prompt caching - static prompt layers are sent as system blocks followed by a cache point
+PROMPT_CACHE_POINT = {"cachePoint": {"type": "default"}}
+PROMPT_CACHE_MIN_TOKENS = 1024  # Shorter prefixes are not cached by Claude Sonnet 4 on Bedrock
+PROMPT_CACHE_MAX_POINTS = 4  # Converse limit on cache points per request
+
+# Shared rate limiting (see rate_limiter.py)
+RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE = 8000  # Output tokens reserved per call until actual usage is settled
+STREAM_CONFLICT_DETECTION = getattr(constants, 'CONFLICT_STREAMING_ENABLED', True)  # identify_conflicts uses ConverseStream
+
+# Model tiers used by the fallback policy in bedrock_client.FALLBACK_POLICY
+MODEL_TIERS = {
+    'primary': {'model_id': CLAUDE_MODEL_ID, 'use_1m_context': False},
+    'primary_1m': {'model_id': CLAUDE_MODEL_ID, 'use_1m_context': True},
+    'alternate': {'model_id': ALTERNATE_MODEL_ID, 'use_1m_context': False}
+}
+bedrock_invoker = BedrockClient(MODEL_TIERS)
+
+# Per-stage model routing: the model / inference profile, fallback profile and thinking mode of each stage.
+# Calls without a stage, and stages not listed, use DEFAULT_STAGE_ROUTE. STAGE_MODEL_ROUTES in constants
+# overrides fields per stage, e.g. {"analyze_structure": {"model_id": "...", "thinking": false, "max_output_tokens": 8192}}.
+# Compare candidate routes with scripts/eval_stage_routes.py before changing a stage.
+DEFAULT_STAGE_ROUTE = {
+    'model_id': CLAUDE_MODEL_ID,
+    'alternate_model_id': ALTERNATE_MODEL_ID,
+    'thinking': True,
+    'max_output_tokens': MAX_TOKENS  # The model's output limit
+}
+STAGE_MODEL_ROUTES = {
+    'analyze_structure': {'model_id': CLAUDE_MODEL_ID, 'thinking': True},
+    'identify_conflicts': {'model_id': CLAUDE_MODEL_ID, 'thinking': True}
+}
+
+# Hedged requests: a non-streaming call still running past the latency percentile observed for its stage and
+# input size gets a second request (same model, or the 1M-context profile), if the rate limiter has capacity now.
+# The first response wins. Until HEDGE_MIN_SAMPLES latencies are observed, HEDGE_DEFAULT_AFTER_SECONDS applies.
+HEDGING_ENABLED = getattr(constants, 'BEDROCK_HEDGING_ENABLED', False)
+HEDGE_PERCENTILE = getattr(constants, 'BEDROCK_HEDGE_PERCENTILE', 0.9)
+HEDGE_DEFAULT_AFTER_SECONDS = getattr(constants, 'BEDROCK_HEDGE_DEFAULT_AFTER_SECONDS', 150)
+HEDGE_USE_1M_CONTEXT = getattr(constants, 'BEDROCK_HEDGE_USE_1M_CONTEXT', False)
+HEDGE_MIN_AFTER_SECONDS = 10.0  # Never hedge calls that have run for less than this
+HEDGE_INPUT_TOKEN_BUCKETS = (8000, 16000, 32000, 64000)  # Input size buckets for latency percentiles
+HEDGE_LOSER_WAIT_SECONDS = 30.0  # How long usage_since() waits for losing hedged requests to finish
+call_latency = LatencyTracker()
+
+# Per-stage call sizing: thinking budget and output cap are picked per call from the estimated input
+# tokens, the expected number of output items and the largest answers observed for the stage.
+# Calls without a stage keep THINKING_BUDGET_TOKENS / MAX_TOKENS. CALL_SIZING_OVERRIDES pins values per stage.
+CALL_SIZING_POLICY = {
+    'analyze_structure': {
+        'min_thinking_tokens': 4096,
+        'max_thinking_tokens': 16000,
+        'thinking_tokens_per_1k_input': 600,
+        'answer_base_tokens': 1500,
+        'answer_tokens_per_item': 200,  # One KB query
+        'expected_items': 15  # Prompt asks for 6-15 queries per chunk
+    },
+    'identify_conflicts': {
+        'min_thinking_tokens': 8192,
+        'max_thinking_tokens': THINKING_BUDGET_TOKENS,
+        'thinking_tokens_per_1k_input': 1000,
+        'answer_base_tokens': 1500,
+        'answer_tokens_per_item': 350,  # One conflict
+        'expected_items': 20
+    }
+}
+ANSWER_TOKEN_HEADROOM = 1.5  # Output cap above the expected answer size
+MIN_THINKING_BUDGET_TOKENS = 1024  # Bedrock minimum for budget_tokens
+SIZING_HISTORY_SIZE = 50  # Answers remembered per stage in a warm container
+ADAPTIVE_CALL_SIZING = getattr(constants, 'ADAPTIVE_CALL_SIZING_ENABLED', True)
+
+# stage -> recent answer token counts (estimated from answer text)
+_sizing_history = {}
 
 # Global tracking for logging and throttling management
 _call_tracker = {
     'total_tool_calls': 0,
     'total_model_calls': 0,
     'total_conflicts_detected': 0,
-    'last_call_time': 0
+    'input_tokens': 0,
+    'output_tokens': 0,
+    'cache_read_input_tokens': 0,
+    'cache_write_input_tokens': 0,
+    'thinking_tokens_estimate': 0,  # Reasoning text / CHARS_PER_TOKEN (Converse reports thinking inside outputTokens)
+    'hedges_sent': 0,
+    'hedges_won': 0,
+    'hedges_skipped': 0,
+    'hedges_unaccounted': 0  # Losing hedged requests still running when usage was taken; their tokens are not counted
 }
+_call_tracker_lock = threading.Lock()  # Hedged calls record usage from worker threads
+
+# A losing hedged request finishes in the background. Its usage counts toward the invocation that sent it
+# only if it finishes before that invocation takes its usage; one that finishes later (e.g. after the
+# container was frozen and thawed for the next job) is logged and never counted in another job's usage.
+_usage_scope = {'id': 0}  # Bumped by snapshot_usage() at the start of each invocation
+_hedge_losers = {}  # Future of a losing hedged request -> its accounting state, until it finishes
+_hedge_lock = threading.Lock()
+
+# Token fields of a call's usage, also tracked per answering model so job usage records can price each model
+USAGE_TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_write_input_tokens')
+LONG_CONTEXT_THRESHOLD_TOKENS = 200000  # Prompts above this are billed at long-context rates (1M-context tier)
+# model_id -> token counts of the calls it answered; long_context_<field> counts the part billed at long-context rates
+_model_usage_tracker = {}
+
+
+def _build_system_blocks(prompt_layers: List[str]) -> List[Dict[str, Any]]:
+    """
+    Build Converse system blocks from static prompt layers.
+    
+    A cache point follows each layer once the cumulative prefix is long
+    enough to be cached, so the most static layer (the stage instructions)
+    is shared across all jobs and later layers (e.g. terms profile context)
+    across the chunks of a job.
+    
+    Args:
+        prompt_layers: Prompt texts, most stable first; empty layers are skipped
+        
+    Returns:
+        List of system content blocks
+    """
+    blocks = []
+    prefix_chars = 0
+    cache_points = 0
+    for layer in prompt_layers:
+        if not layer:
+            continue
+        blocks.append({"text": layer})
+        prefix_chars += len(layer)
+        if (constants.PROMPT_CACHE_ENABLED and cache_points < PROMPT_CACHE_MAX_POINTS
+                and prefix_chars // CHARS_PER_TOKEN >= PROMPT_CACHE_MIN_TOKENS):
+            blocks.append(dict(PROMPT_CACHE_POINT))
+            cache_points += 1
+    return blocks
+
+
+def _response_usage(response: Dict[str, Any]) -> Dict[str, int]:
+    """Input, output, cache read and cache write token counts of a Converse response."""
+    usage = response.get("usage") or {}
+    return {
+        'input_tokens': usage.get('inputTokens', 0),
+        'output_tokens': usage.get('outputTokens', 0),
+        'cache_read_input_tokens': usage.get('cacheReadInputTokens', 0),
+        'cache_write_input_tokens': usage.get('cacheWriteInputTokens', 0)
+    }
+
+
+def _record_usage(response: Dict[str, Any], context: str = "", model_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Record token usage, including prompt cache reads and writes, from a Converse response.
+    
+    Args:
+        response: Converse API response
+        context: Label for the log line
+        model_id: Model that answered, to track its tokens separately for pricing
+        
+    Returns:
+        Dict with input, output, cache read and cache write token counts for this call
+    """
+    call_usage = _response_usage(response)
+    reasoning_chars = 0
+    for block in response.get("output", {}).get("message", {}).get("content", []):
+        reasoning_text = (block.get("reasoningContent") or {}).get("reasoningText")
+        if isinstance(reasoning_text, dict):
+            reasoning_chars += len(reasoning_text.get("text") or "")
+    
+    with _call_tracker_lock:
+        for key, value in call_usage.items():
+            _call_tracker[key] += value
+        _call_tracker['thinking_tokens_estimate'] += reasoning_chars // CHARS_PER_TOKEN
+    
+    prompt_tokens = call_usage['input_tokens'] + call_usage['cache_read_input_tokens'] + call_usage['cache_write_input_tokens']
+    if model_id:
+        with _call_tracker_lock:
+            model_usage = _model_usage_tracker.setdefault(model_id, {})
+            for key, value in call_usage.items():
+                model_usage[key] = model_usage.get(key, 0) + value
+                if prompt_tokens > LONG_CONTEXT_THRESHOLD_TOKENS:
+                    model_usage[f'long_context_{key}'] = model_usage.get(f'long_context_{key}', 0) + value
+    hit_rate = (call_usage['cache_read_input_tokens'] / prompt_tokens * 100) if prompt_tokens else 0.0
+    logger.info(f"PROMPT_CACHE: {context} input={call_usage['input_tokens']}, cache_read={call_usage['cache_read_input_tokens']}, cache_write={call_usage['cache_write_input_tokens']}, output={call_usage['output_tokens']}, hit_rate={hit_rate:.1f}%")
+    return call_usage
+
+
+def _estimate_input_tokens(api_params: Dict[str, Any]) -> int:
+    """
+    Estimate the input tokens of a Converse request from its characters.
+    
+    Args:
+        api_params: Converse API parameters
+        
+    Returns:
+        Estimated input token count
+    """
+    chars = sum(len(block.get('text', '')) for block in api_params.get('system', []))
+    for message in api_params.get('messages', []):
+        for block in message.get('content', []):
+            if 'text' in block:
+                chars += len(block['text'])
+            elif 'document' in block:
+                chars += len(block['document'].get('source', {}).get('bytes', b''))
+            else:
+                chars += len(json.dumps(block, default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def _estimate_request_tokens(api_params: Dict[str, Any]) -> int:
+    """
+    Estimate the input + output tokens of a Converse request for rate limiting.
+    
+    Args:
+        api_params: Converse API parameters
+        
+    Returns:
+        Estimated token count (input estimate plus the reserved output, at most the call's output cap)
+    """
+    max_tokens = api_params.get('inferenceConfig', {}).get('maxTokens', MAX_TOKENS)
+    return _estimate_input_tokens(api_params) + min(RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE, max_tokens)
+
+
+def get_stage_route(stage: Optional[str]) -> Dict[str, Any]:
+    """
+    Get the model route of a stage.
+    
+    Args:
+        stage: Workflow stage, or None for the default route
+        
+    Returns:
+        Dict with model_id, alternate_model_id, thinking and max_output_tokens
+    """
+    route = dict(DEFAULT_STAGE_ROUTE)
+    route.update(STAGE_MODEL_ROUTES.get(stage or '', {}))
+    route.update((getattr(constants, 'STAGE_MODEL_ROUTES', None) or {}).get(stage or '', {}))
+    return route
+
+
+def route_tiers(route: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Model tiers for bedrock_invoker from a stage route (the 1M-context tier always uses CLAUDE_MODEL_ID)."""
+    return {
+        'primary': {'model_id': route['model_id'], 'use_1m_context': False},
+        'primary_1m': {'model_id': CLAUDE_MODEL_ID, 'use_1m_context': True},
+        'alternate': {'model_id': route['alternate_model_id'], 'use_1m_context': False}
+    }
+
+
+def route_cache_model_id(route: Dict[str, Any]) -> str:
+    """Model identity of a route for response cache keys: the model ID, marked when thinking is off."""
+    return route['model_id'] if route['thinking'] else f"{route['model_id']}:no-thinking"
+
+
+def _size_call(stage: Optional[str], input_tokens: int, expected_items: Optional[int] = None, full_budget: bool = False) -> Dict[str, Any]:
+    """
+    Pick the thinking budget and output cap for a call.
+    
+    Args:
+        stage: Workflow stage (key of CALL_SIZING_POLICY and STAGE_MODEL_ROUTES), or None for the fixed defaults
+        input_tokens: Estimated input tokens of the call
+        expected_items: Expected queries/conflicts in the answer (defaults to the stage's policy value)
+        full_budget: Skip the policy and overrides and use the largest budget and cap the stage's route allows
+            (retry of a truncated answer)
+        
+    Returns:
+        Dict with stage, model_id, thinking_budget (0 = thinking off), max_tokens, max_output_tokens (the
+        route's cap) and source ('default', 'policy', 'history', 'override' or 'full_budget')
+    """
+    route = get_stage_route(stage)
+    policy = CALL_SIZING_POLICY.get(stage) if ADAPTIVE_CALL_SIZING and not full_budget else None
+    max_output_tokens = min(MAX_TOKENS, route['max_output_tokens'])
+    sizing = {'stage': stage, 'model_id': route['model_id'], 'thinking_budget': THINKING_BUDGET_TOKENS, 'max_tokens': MAX_TOKENS,
+              'max_output_tokens': max_output_tokens, 'source': 'full_budget' if full_budget else 'default'}
+    
+    if policy:
+        thinking_budget = policy['min_thinking_tokens'] + input_tokens * policy['thinking_tokens_per_1k_input'] // 1000
+        thinking_budget = max(policy['min_thinking_tokens'], min(policy['max_thinking_tokens'], thinking_budget))
+        
+        items = expected_items if expected_items is not None else policy['expected_items']
+        answer_tokens = policy['answer_base_tokens'] + items * policy['answer_tokens_per_item']
+        sizing['source'] = 'policy'
+        history = _sizing_history.get(stage)
+        if history and max(history) > answer_tokens:
+            answer_tokens = max(history)
+            sizing['source'] = 'history'
+        
+        sizing['thinking_budget'] = thinking_budget
+        sizing['max_tokens'] = min(MAX_TOKENS, thinking_budget + int(answer_tokens * ANSWER_TOKEN_HEADROOM))
+    
+    override = (getattr(constants, 'CALL_SIZING_OVERRIDES', None) or {}).get(stage or '')
+    if override and not full_budget:
+        sizing['thinking_budget'] = int(override.get('thinking_budget', sizing['thinking_budget']))
+        sizing['max_tokens'] = int(override.get('max_tokens', sizing['max_tokens']))
+        sizing['source'] = 'override'
+    
+    if not route['thinking']:
+        # Without thinking the output cap only has to hold the answer
+        if full_budget:
+            sizing['max_tokens'] = max_output_tokens
+        else:
+            sizing['max_tokens'] = min(max_output_tokens, max(MIN_THINKING_BUDGET_TOKENS, sizing['max_tokens'] - sizing['thinking_budget']))
+        sizing['thinking_budget'] = 0
+        return sizing
+    
+    # Bedrock requires budget_tokens >= 1024 and maxTokens > budget_tokens
+    sizing['thinking_budget'] = max(MIN_THINKING_BUDGET_TOKENS, min(sizing['thinking_budget'], max_output_tokens - MIN_THINKING_BUDGET_TOKENS))
+    sizing['max_tokens'] = max(sizing['thinking_budget'] + MIN_THINKING_BUDGET_TOKENS, min(sizing['max_tokens'], max_output_tokens))
+    return sizing
+
+
+def _record_sizing(sizing: Dict[str, Any], input_tokens: int, response: Dict[str, Any]):
+    """
+    Log the chosen budget next to the call's actual usage and remember the answer size for the stage.
+    
+    Args:
+        sizing: Result of _size_call
+        input_tokens: Estimated input tokens the sizing was based on
+        response: Converse response (or reassembled stream response)
+    """
+    answer_chars = sum(len(block.get('text', '')) for block in response.get('output', {}).get('message', {}).get('content', []))
+    answer_tokens = answer_chars // CHARS_PER_TOKEN
+    output_tokens = (response.get('usage') or {}).get('outputTokens', 0)
+    response['callSizing'] = dict(sizing, input_tokens_estimate=input_tokens, output_tokens=output_tokens, answer_tokens_estimate=answer_tokens)
+    logger.info(f"CALL_SIZING: stage={sizing['stage']}, model={sizing['model_id']}, source={sizing['source']}, input_tokens_est={input_tokens}, thinking_budget={sizing['thinking_budget']}, max_tokens={sizing['max_tokens']}, output_tokens={output_tokens}, answer_tokens_est={answer_tokens}, stop_reason={response.get('stopReason')}")
+    
+    if sizing['stage'] and response.get('stopReason') != 'max_tokens':
+        history = _sizing_history.setdefault(sizing['stage'], [])
+        history.append(answer_tokens)
+        del history[:-SIZING_HISTORY_SIZE]
+
+
+def _truncated_below_budget(response: Dict[str, Any]) -> bool:
+    """Whether a sized call stopped at its output cap while the stage's route allows a larger one."""
+    sizing = response["callSizing"]
+    return (response.get("stopReason") == "max_tokens" and sizing['source'] != 'full_budget'
+            and sizing['max_tokens'] < sizing['max_output_tokens'])
+
+
+def _acquire_rate_limit(api_params: Dict[str, Any]) -> int:
+    """
+    Acquire one request and the estimated tokens of a call from the shared rate limiter.
+    
+    Args:
+        api_params: Converse API parameters
+        
+    Returns:
+        Tokens reserved, to be settled against actual usage
+    """
+    estimated_tokens = _estimate_request_tokens(api_params)
+    waited = get_rate_limiter().acquire(api_params["modelId"], estimated_tokens)
+    if waited > 0:
+        logger.info(f"RATE_LIMITER: Waited {waited:.2f}s for capacity ({estimated_tokens} estimated tokens)")
+    return estimated_tokens
+
+
+def _rate_limited_tokens(call_usage: Dict[str, int]) -> int:
+    """Tokens of a completed call that count against the tokens-per-minute quota (cache reads excluded)."""
+    return call_usage['input_tokens'] + call_usage['cache_write_input_tokens'] + call_usage['output_tokens']
+
+
+def _send_converse(api_params: Dict[str, Any], context: str, reserved_tokens: Optional[int] = None,
+                   accounting: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Send one Converse request inside the shared rate limit and record its usage.
+    
+    Args:
+        api_params: Converse API parameters
+        context: Label for the usage log line
+        reserved_tokens: Tokens already taken from the rate limiter for this call (skips acquiring)
+        accounting: Accounting state of a hedged call; usage is only recorded while it still belongs to the sending invocation
+        
+    Returns:
+        Converse API response
+    """
+    model_id = api_params["modelId"]
+    estimated_tokens = reserved_tokens if reserved_tokens is not None else _acquire_rate_limit(api_params)
+    try:
+        response = bedrock_client.converse(**api_params)
+    except Exception:
+        # A failed call gives back the tokens it reserved
+        get_rate_limiter().settle(model_id, estimated_tokens, 0)
+        raise
+    with _hedge_lock:
+        counted = accounting is None or (not accounting['abandoned'] and accounting['scope'] == _usage_scope['id'])
+        if counted:
+            call_usage = _record_usage(response, context, model_id)
+    if not counted:
+        call_usage = _response_usage(response)
+        logger.warning(f"BEDROCK_HEDGE: {context} losing request finished after its invocation took its usage; not counted: {call_usage}")
+    get_rate_limiter().settle(model_id, estimated_tokens, _rate_limited_tokens(call_usage))
+    return response
+
+
+def _track_hedge_loser(future: Future, accounting: Dict[str, Any]) -> None:
+    """Keep a losing hedged request's future until it finishes, so usage_since() can wait for it."""
+    def forget(done):
+        with _hedge_lock:
+            _hedge_losers.pop(done, None)
+    
+    with _hedge_lock:
+        _hedge_losers[future] = accounting
+    future.add_done_callback(forget)
+
+
+def _wait_for_hedge_losers() -> int:
+    """
+    Wait up to HEDGE_LOSER_WAIT_SECONDS for losing hedged requests, so their usage is recorded in this invocation.
+    
+    Returns:
+        Number of losers abandoned by this call: still running, so their usage will not be counted
+    """
+    with _hedge_lock:
+        pending = list(_hedge_losers)
+    if not pending:
+        return 0
+    wait(pending, timeout=HEDGE_LOSER_WAIT_SECONDS)
+    abandoned = 0
+    with _hedge_lock:
+        for future, accounting in list(_hedge_losers.items()):
+            if not future.done() and not accounting['abandoned']:
+                accounting['abandoned'] = True
+                abandoned += 1
+    if abandoned:
+        logger.warning(f"BEDROCK_HEDGE: {abandoned} losing requests still running after {HEDGE_LOSER_WAIT_SECONDS:.0f}s; their usage is not counted")
+        with _call_tracker_lock:
+            _call_tracker['hedges_unaccounted'] += abandoned
+    return abandoned
+
+
+def _hedge_request(api_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Converse parameters for the hedge of a call: the same request, on the 1M-context profile if configured."""
+    if not HEDGE_USE_1M_CONTEXT or api_params["modelId"] != CLAUDE_MODEL_ID:
+        return api_params
+    hedge_params = dict(api_params)
+    hedge_params["additionalModelRequestFields"] = dict(api_params.get("additionalModelRequestFields", {}), anthropic_beta=[ANTHROPIC_BETA_1M])
+    return hedge_params
+
+
+def _send_converse_hedged(api_params: Dict[str, Any], context: str, stage: Optional[str]) -> Dict[str, Any]:
+    """
+    Send one Converse request, hedging it if it runs past the latency percentile of similar calls.
+    
+    The hedge is sent only if the shared rate limiter can cover it without waiting,
+    so hedging never pushes the account past its quota.
+    
+    Args:
+        api_params: Converse API parameters
+        context: Label for log lines
+        stage: Workflow stage, part of the latency key
+        
+    Returns:
+        Converse API response from whichever request finished first
+    """
+    input_tokens = _estimate_input_tokens(api_params)
+    latency_key = (stage or context, sum(1 for limit in HEDGE_INPUT_TOKEN_BUCKETS if input_tokens >= limit))
+    hedge_after = max(HEDGE_MIN_AFTER_SECONDS, call_latency.percentile(latency_key, HEDGE_PERCENTILE) or HEDGE_DEFAULT_AFTER_SECONDS)
+    hedge_params = _hedge_request(api_params)
+    reserved = {}
+    accounting = {'scope': _usage_scope['id'], 'abandoned': False}
+    
+    def may_hedge():
+        estimated_tokens = _estimate_request_tokens(hedge_params)
+        if not get_rate_limiter().try_acquire(hedge_params["modelId"], estimated_tokens):
+            return False
+        reserved['tokens'] = estimated_tokens
+        return True
+    
+    def send_primary():
+        # Only the primary request's own latency is recorded: the time to the first of two responses
+        # would pull the percentile down and hedge more calls. A primary that lost to its hedge still
+        # records its latency when it completes in the background.
+        started_at = time.time()
+        primary_response = _send_converse(api_params, context, accounting=accounting)
+        call_latency.record(latency_key, time.time() - started_at)
+        return primary_response
+    
+    response, outcome = send_hedged(
+        send_primary,
+        lambda: _send_converse(hedge_params, f"{context}_hedge", reserved_tokens=reserved['tokens'], accounting=accounting),
+        hedge_after,
+        may_hedge,
+        context=context,
+        on_loser=lambda loser: _track_hedge_loser(loser, accounting)
+    )
+    if outcome != 'not_hedged':
+        with _call_tracker_lock:
+            _call_tracker['hedges_skipped' if outcome == 'hedge_skipped' else 'hedges_sent'] += 1
+            if outcome == 'hedge_won':
+                _call_tracker['hedges_won'] += 1
+    return response
+
+
+def _converse_sender(context: str, stage: Optional[str]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Sender for bedrock_invoker: hedged when HEDGING_ENABLED, a single request otherwise."""
+    if HEDGING_ENABLED:
+        return lambda api_params: _send_converse_hedged(api_params, context, stage)
+    return lambda api_params: _send_converse(api_params, context)
+
+
+def _send_converse_stream(api_params: Dict[str, Any], context: str, on_text: Callable[[str], None]) -> Dict[str, Any]:
+    """
+    Send one ConverseStream request inside the shared rate limit, passing text deltas to on_text.
+    
+    Args:
+        api_params: Converse API parameters
+        context: Label for the usage log line
+        on_text: Called with every answer text delta as it arrives
+        
+    Returns:
+        Response reassembled in the converse() shape (output.message.content, stopReason, usage)
+    """
+    model_id = api_params["modelId"]
+    estimated_tokens = _acquire_rate_limit(api_params)
+    try:
+        stream_response = bedrock_client.converse_stream(**api_params)
+        
+        blocks = {}  # contentBlockIndex -> {'text': [...], 'reasoning': [...], 'signature': str}
+        stop_reason = None
+        usage = {}
+        for event in stream_response['stream']:
+            if 'contentBlockDelta' in event:
+                block_delta = event['contentBlockDelta']
+                block = blocks.setdefault(block_delta.get('contentBlockIndex', 0), {'text': [], 'reasoning': [], 'signature': None})
+                delta = block_delta.get('delta', {})
+                if 'text' in delta:
+                    block['text'].append(delta['text'])
+                    on_text(delta['text'])
+                elif 'reasoningContent' in delta:
+                    reasoning = delta['reasoningContent']
+                    if 'text' in reasoning:
+                        block['reasoning'].append(reasoning['text'])
+                    if 'signature' in reasoning:
+                        block['signature'] = reasoning['signature']
+            elif 'messageStop' in event:
+                stop_reason = event['messageStop'].get('stopReason')
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage', {})
+    except Exception:
+        get_rate_limiter().settle(model_id, estimated_tokens, 0)
+        raise
+    
+    # Reassemble the content blocks in the non-streaming response shape
+    content = []
+    for index in sorted(blocks):
+        block = blocks[index]
+        if block['reasoning'] or block['signature']:
+            reasoning_text = {'text': ''.join(block['reasoning'])}
+            if block['signature']:
+                reasoning_text['signature'] = block['signature']
+            content.append({'reasoningContent': {'reasoningText': reasoning_text}})
+        if block['text']:
+            content.append({'text': ''.join(block['text'])})
+    response = {
+        'output': {'message': {'role': 'assistant', 'content': content}},
+        'stopReason': stop_reason,
+        'usage': usage
+    }
+    
+    call_usage = _record_usage(response, context, model_id)
+    get_rate_limiter().settle(model_id, estimated_tokens, _rate_limited_tokens(call_usage))
+    return response
+
+
+def get_prompt_cache_statistics() -> Dict[str, Any]:
+    """Get token and prompt cache totals for the model calls made by this Lambda container."""
+    prompt_tokens = _call_tracker['input_tokens'] + _call_tracker['cache_read_input_tokens'] + _call_tracker['cache_write_input_tokens']
+    return {
+        'total_model_calls': _call_tracker['total_model_calls'],
+        'input_tokens': _call_tracker['input_tokens'],
+        'output_tokens': _call_tracker['output_tokens'],
+        'cache_read_input_tokens': _call_tracker['cache_read_input_tokens'],
+        'cache_write_input_tokens': _call_tracker['cache_write_input_tokens'],
+        'cache_hit_rate': (_call_tracker['cache_read_input_tokens'] / prompt_tokens) if prompt_tokens else 0.0
+    }
+
+def snapshot_usage() -> Dict[str, int]:
+    """
+    Snapshot this container's model usage counters.
+    Warm Lambda containers accumulate counters across invocations; pass the snapshot
+    taken at the start of an invocation to usage_since() to get that invocation's usage.
+    Starts a new usage scope: hedged requests of earlier invocations that finish from now on are not counted.
+    
+    Returns:
+        Copy of the counters
+    """
+    with _hedge_lock:
+        _usage_scope['id'] += 1
+    return _usage_counters()
+
+
+def _usage_counters() -> Dict[str, int]:
+    """Copy of this container's model usage counters."""
+    with _call_tracker_lock:
+        snapshot = dict(_call_tracker)
+        snapshot['by_model'] = {model_id: dict(model_usage) for model_id, model_usage in _model_usage_tracker.items()}
+    invocation_stats = get_invocation_statistics()
+    snapshot['bedrock_invocations'] = invocation_stats['invocations']
+    snapshot['bedrock_attempts'] = invocation_stats['attempts']
+    snapshot['bedrock_latency_ms'] = invocation_stats['total_latency_ms']
+    return snapshot
+
+
+def usage_since(snapshot: Dict[str, int]) -> Dict[str, int]:
+    """
+    Model usage since a snapshot_usage() call, in the shape of a per-job usage record.
+    Waits up to HEDGE_LOSER_WAIT_SECONDS for losing hedged requests still running, so their tokens are included;
+    losers still running after that are counted in bedrock_hedges_unaccounted instead.
+    
+    Args:
+        snapshot: Result of snapshot_usage() taken at the start of the invocation
+        
+    Returns:
+        Dict with model_calls, token counts, bedrock_attempts, bedrock_retries, bedrock_latency_ms, hedge counts,
+        kb_retrievals and usage_by_model (token counts per answering model)
+    """
+    _wait_for_hedge_losers()
+    current = _usage_counters()
+    delta = {key: current[key] - snapshot.get(key, 0) for key in current if key != 'by_model'}
+    usage_by_model = {}
+    for model_id, model_usage in current['by_model'].items():
+        previous = snapshot.get('by_model', {}).get(model_id, {})
+        model_delta = {key: value - previous.get(key, 0) for key, value in model_usage.items() if value - previous.get(key, 0)}
+        if model_delta:
+            usage_by_model[model_id] = model_delta
+    return {
+        'model_calls': delta['total_model_calls'],
+        'input_tokens': delta['input_tokens'],
+        'output_tokens': delta['output_tokens'],
+        'cache_read_input_tokens': delta['cache_read_input_tokens'],
+        'cache_write_input_tokens': delta['cache_write_input_tokens'],
+        'thinking_tokens_estimate': delta['thinking_tokens_estimate'],
+        'bedrock_attempts': delta['bedrock_attempts'],
+        'bedrock_retries': max(0, delta['bedrock_attempts'] - delta['bedrock_invocations']),
+        'bedrock_latency_ms': delta['bedrock_latency_ms'],
+        'bedrock_hedges': delta['hedges_sent'],
+        'bedrock_hedge_wins': delta['hedges_won'],
+        'bedrock_hedges_skipped': delta['hedges_skipped'],
+        'bedrock_hedges_unaccounted': delta['hedges_unaccounted'],
+        'kb_retrievals': delta['total_tool_calls'],  # Only tool exposed to the model is retrieve_from_knowledge_base
+        'usage_by_model': usage_by_model
+    }
 
 def _extract_and_log_thinking(response: Dict[str, Any], context: str = "") -> str:
     """
@@ -238,207 +891,383 @@ def _extract_and_log_thinking(response: Dict[str, Any], context: str = "") -> st
     
     return thinking_content if thinking_content else ""
 
-def _extract_json_only(content: str) -> str:
+def _extract_json_only(content: str) -> Dict[str, Any]:
     """
-    Extract only JSON object or array from response content, stripping any explanatory text.
-    This ensures we only return valid JSON even if the agent adds explanatory text.
+    Extract only the JSON object or array from response content, stripping any explanatory text.
     Prioritizes new format (object with explanation and conflicts) over old format (array).
     
     Args:
         content: Raw response content that may contain JSON plus explanatory text
         
     Returns:
-        Clean JSON string (object or array) or empty object/array if no valid JSON found
+        Parsed JSON object; a bare array is wrapped as {"explanation": "", "conflicts": [...]},
+        and an empty result is returned if no valid JSON is found
+    """
+    value = extract_json(content, prefer_key="conflicts")
+    if isinstance(value, dict):
+        logger.info(f"Extracted JSON object from response ({len(value)} keys, response length: {len(content)} chars)")
+        return value
+    if isinstance(value, list):
+        logger.info(f"Extracted JSON array from response (backwards compatibility, {len(value)} items)")
+        # Convert array to new format for consistency
+        return {"explanation": "", "conflicts": value}
+    
+    # If all else fails, log warning and return empty object
+    logger.warning(f"Could not extract valid JSON from response. Response preview: {(content or '')[:200]}...")
+    return {"explanation": "", "conflicts": []}
+
+class ConflictStreamParser:
+    """
+    Incremental parser for a streamed conflict detection response.
+    Feed text deltas as they arrive; every element of the top-level "conflicts" array is returned
+    as soon as its closing brace is seen. Each character is scanned once, tracking only string/escape
+    state and nesting depth, so parsing cost is linear in the response length.
+    The final response text is still parsed by _extract_json_only; streamed elements are for early
+    persistence and progress only.
     """
-    if not content:
-        return '{"explanation": "", "conflicts": []}'
     
-    content_trimmed = content.strip()
+    def __init__(self):
+        self.conflicts_seen = 0
+        self._state = 'seek_key'  # seek_key -> seek_colon -> seek_array -> in_array -> done
+        self._depth = 0
+        self._array_depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None  # Characters of a top-level key being read
+        self._element = None  # Characters of the conflict element being read
     
-    # First, try to find JSON object pattern (new format with explanation and conflicts)
-    json_object_match = re.search(r'\{[\s\S]*?"conflicts"[\s\S]*?\}', content)
-    if json_object_match:
-        json_str = json_object_match.group(0)
-        # Validate it's actually valid JSON
-        try:
-            parsed = json.loads(json_str)
-            if isinstance(parsed, dict) and "conflicts" in parsed:
-                logger.info(f"Extracted valid JSON object from response (length: {len(json_str)} chars)")
-                return json_str
-        except json.JSONDecodeError:
-            logger.warning("Found object-like pattern but not valid JSON, trying bracket matching...")
-    
-    # Try to find JSON object by bracket matching (for new format)
-    start_idx = content_trimmed.find('{')
-    if start_idx != -1:
-        # Try to parse from { to end, or find matching }
-        brace_count = 0
-        end_idx = start_idx
-        for i in range(start_idx, len(content_trimmed)):
-            if content_trimmed[i] == '{':
-                brace_count += 1
-            elif content_trimmed[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_idx = i + 1
-                    break
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next text delta.
         
-        if brace_count == 0 and end_idx > start_idx:
-            json_str = content_trimmed[start_idx:end_idx]
-            try:
-                parsed = json.loads(json_str)
-                if isinstance(parsed, dict):
-                    logger.info(f"Extracted JSON object by bracket matching (length: {len(json_str)} chars)")
-                    return json_str
-            except json.JSONDecodeError:
-                pass
-    
-    # Fallback: try to find JSON array pattern (backwards compatibility)
-    json_array_match = re.search(r'\[[\s\S]*?\]', content)
-    if json_array_match:
-        json_str = json_array_match.group(0)
-        # Validate it's actually valid JSON
-        try:
-            parsed = json.loads(json_str)
-            if isinstance(parsed, list):
-                logger.info(f"Extracted valid JSON array from response (backwards compatibility, length: {len(json_str)} chars)")
-                # Convert array to new format for consistency
-                return json.dumps({"explanation": "", "conflicts": parsed})
-        except json.JSONDecodeError:
-            logger.warning("Found array-like pattern but not valid JSON, trying bracket matching...")
-    
-    # Try to find JSON array by bracket matching (backwards compatibility)
-    start_idx = content_trimmed.find('[')
-    if start_idx != -1:
-        # Try to parse from [ to end, or find matching ]
-        bracket_count = 0
-        end_idx = start_idx
-        for i in range(start_idx, len(content_trimmed)):
-            if content_trimmed[i] == '[':
-                bracket_count += 1
-            elif content_trimmed[i] == ']':
-                bracket_count -= 1
-                if bracket_count == 0:
-                    end_idx = i + 1
-                    break
+        Args:
+            text: Text delta from the stream
+            
+        Returns:
+            Conflict dictionaries completed by this delta (may be empty)
+        """
+        completed = []
+        if self._state == 'done':
+            return completed
         
-        if bracket_count == 0 and end_idx > start_idx:
-            json_str = content_trimmed[start_idx:end_idx]
-            try:
-                parsed = json.loads(json_str)
-                if isinstance(parsed, list):
-                    logger.info(f"Extracted JSON array by bracket matching (backwards compatibility, length: {len(json_str)} chars)")
-                    # Convert array to new format for consistency
-                    return json.dumps({"explanation": "", "conflicts": parsed})
-            except json.JSONDecodeError:
-                pass
+        for char in text:
+            if self._element is not None:
+                self._element.append(char)
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        if ''.join(self._key) == 'conflicts':
+                            self._state = 'seek_colon'
+                        self._key = None
+                elif self._key is not None:
+                    self._key.append(char)
+                continue
+            
+            if char.isspace():
+                continue
+            
+            # "conflicts" turned out to be a value, or its value is not an array
+            if (self._state == 'seek_colon' and char != ':') or (self._state == 'seek_array' and char != '['):
+                self._state = 'seek_key'
+            
+            if char == '"':
+                self._in_string = True
+                if self._state == 'seek_key' and self._depth == 1:
+                    self._key = []
+            elif char == ':':
+                if self._state == 'seek_colon':
+                    self._state = 'seek_array'
+            elif char in '{[':
+                self._depth += 1
+                if self._state == 'seek_array':
+                    self._state = 'in_array'
+                    self._array_depth = self._depth
+                elif self._state == 'in_array' and char == '{' and self._depth == self._array_depth + 1:
+                    self._element = ['{']
+            elif char in '}]':
+                if self._state == 'in_array':
+                    if self._element is not None and self._depth == self._array_depth + 1:
+                        element_text = ''.join(self._element)
+                        self._element = None
+                        try:
+                            completed.append(json.loads(element_text))
+                            self.conflicts_seen += 1
+                        except json.JSONDecodeError:
+                            logger.warning(f"CONFLICT_STREAM: Skipping malformed streamed conflict: {element_text[:200]}...")
+                    elif self._depth == self._array_depth:
+                        self._state = 'done'
+                        self._depth -= 1
+                        break
+                self._depth = max(0, self._depth - 1)
+        
+        return completed
+
+def _is_section_heading(paragraph, text: str) -> bool:
+    """
+    Check whether a paragraph starts a new section (heading style or numbered/titled section line).
     
-    # If all else fails, log warning and return empty object
-    logger.warning(f"Could not extract valid JSON from response. Response preview: {content[:200]}...")
-    return '{"explanation": "", "conflicts": []}'
+    Args:
+        paragraph: python-docx Paragraph object
+        text: Paragraph text
+        
+    Returns:
+        True if the paragraph is a heading or section start
+    """
+    style_id = paragraph._p.style or ''
+    if style_id.startswith(('Heading', 'Title')):
+        return True
+    return len(text) <= SECTION_HEADING_MAX_CHARS and bool(SECTION_HEADING_PATTERN.match(text))
+
+
+def _split_oversized_block(start: int, end: int, is_boundary: bool, full_text: str, max_chars: int) -> List[tuple]:
+    """
+    Split a block longer than the chunk budget at sentence or word boundaries.
+    
+    Args:
+        start: Block start offset in full_text
+        end: Block end offset in full_text
+        is_boundary: Whether the block starts a section
+        full_text: Complete chunked document text
+        max_chars: Maximum characters per piece
+        
+    Returns:
+        List of (start, end, is_boundary) pieces covering the block
+    """
+    pieces = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for separator in ('. ', '\n', ' '):
+            cut = full_text.rfind(separator, start + max_chars // 2, limit)
+            if cut != -1:
+                cut += len(separator)
+                break
+        if cut == -1:
+            cut = limit
+        pieces.append((start, cut, is_boundary))
+        start, is_boundary = cut, False
+    pieces.append((start, end, is_boundary))
+    return pieces
+
 
-def _split_document_into_chunks(doc, chunk_size_characters=30000, chunk_overlap_characters=2000):
+def _split_document_into_chunks(doc, target_input_tokens=None, target_chunk_count=None, max_overlap_tokens=None, payload_format=None):
     """
-    Split a document into chunks using character-based chunking.
+    Split a document into structure-aware, token-budgeted chunks.
+    
+    The document text is packed from whole paragraphs and table rows until the
+    input-token budget is reached. Cuts prefer the start of a heading, section or
+    table when one falls in the back half of the chunk. Consecutive chunks only
+    overlap when the cut lands inside a section, and then only by that section's
+    trailing blocks (capped at max_overlap_tokens).
     
     Args:
         doc: python-docx Document object
-        chunk_size_characters: Number of characters per chunk
-        chunk_overlap_characters: Number of characters to overlap between chunks
+        target_input_tokens: Input-token budget per chunk (defaults to CHUNK_TARGET_INPUT_TOKENS)
+        target_chunk_count: Spread large documents over about this many chunks, so the
+            AnalyzeChunksParallel Map concurrency is used (defaults to CHUNK_TARGET_COUNT, 0 = budget only)
+        max_overlap_tokens: Overlap cap when a section straddles a boundary (defaults to CHUNK_MAX_OVERLAP_TOKENS)
+        payload_format: 'text' to send chunk text as-is, or 'docx' to also render each chunk as a
+            DOCX document (defaults to CHUNK_PAYLOAD_FORMAT)
         
     Returns:
-        List of chunk dictionaries with bytes, chunk_num, start_char, end_char
+        List of chunk dictionaries with format, bytes (DOCX only, None for text), chunk_num, start_char,
+        end_char, text and segments (paragraph/cell coordinates with their absolute character range in the chunked text)
     """
     from docx import Document
     import io
     
-    # Import constants
-    try:
-        import constants
-        chunk_size = getattr(constants, 'CHUNK_SIZE_CHARACTERS', chunk_size_characters)
-        overlap = getattr(constants, 'CHUNK_OVERLAP_CHARACTERS', chunk_overlap_characters)
-    except (ImportError, AttributeError):
-        # Fallback to function parameters
-        chunk_size = chunk_size_characters
-        overlap = chunk_overlap_characters
+    # Defaults come from constants (module-level import with fallback values)
+    if target_input_tokens is None:
+        target_input_tokens = getattr(constants, 'CHUNK_TARGET_INPUT_TOKENS', 12000)
+    if target_chunk_count is None:
+        target_chunk_count = getattr(constants, 'CHUNK_TARGET_COUNT', 0)
+    if max_overlap_tokens is None:
+        max_overlap_tokens = getattr(constants, 'CHUNK_MAX_OVERLAP_TOKENS', 500)
+    min_input_tokens = getattr(constants, 'CHUNK_MIN_INPUT_TOKENS', 3000)
+    if payload_format is None:
+        payload_format = getattr(constants, 'CHUNK_PAYLOAD_FORMAT', 'text')
+    if payload_format not in CHUNK_PAYLOAD_FORMATS:
+        logger.warning(f"Unknown chunk payload format '{payload_format}', defaulting to docx")
+        payload_format = 'docx'
     
     chunks = []
     
-    # For DOCX: Extract full text and chunk by characters
     # Extract all text from document (paragraphs AND tables)
     full_text_parts = []
+    # Where each paragraph and table cell sits in the full text, so conflicts can be anchored back to it
+    segments = []
+    # Packing units: (start, end, is_boundary) for every paragraph and table row
+    blocks = []
+    text_length = 0
+    
+    def add_part(part, part_segments):
+        nonlocal text_length
+        if full_text_parts:
+            text_length += 2  # '\n\n' separator
+        part_start = text_length
+        for segment in part_segments:
+            segment['start'] += part_start
+            segment['end'] += part_start
+            segments.append(segment)
+        full_text_parts.append(part)
+        text_length += len(part)
+        return part_start
     
     # Extract text from paragraphs
-    for para in doc.paragraphs:
-        if para.text.strip():
-            full_text_parts.append(para.text)
+    for para_idx, para in enumerate(doc.paragraphs):
+        para_text = para.text
+        if para_text.strip():
+            part_start = add_part(para_text, [{'start': 0, 'end': len(para_text), 'para_idx': para_idx}])
+            blocks.append((part_start, text_length, _is_section_heading(para, para_text)))
     
     # Extract text from tables (for table-formatted exception documents)
-    for table in doc.tables:
+    # The grid is read once; table.rows[...].cells rebuilds it on every access
+    table_grid = TableGridCache(doc, normalize=False)
+    for table_idx, rows in enumerate(table_grid.tables):
         table_rows = []
-        for row in table.rows:
-            row_cells = []
-            for cell in row.cells:
-                cell_text = cell.text.strip()
-                if cell_text:
-                    row_cells.append(cell_text)
-            if row_cells:
-                # Join cells with " | " separator to preserve table structure
-                table_rows.append(" | ".join(row_cells))
+        row_bounds = []
+        cell_segments = []
+        offset = len("\n[TABLE START]\n")
+        for row in rows:
+            row_cells = [entry for entry in row if not entry['is_empty']]
+            if not row_cells:
+                continue
+            if table_rows:
+                offset += 1  # '\n' between rows
+            row_start = offset
+            for cell_pos, entry in enumerate(row_cells):
+                if cell_pos:
+                    offset += 3  # ' | ' between cells
+                cell_segments.append({
+                    'start': offset,
+                    'end': offset + len(entry['text']),
+                    'table_idx': table_idx,
+                    'row_idx': entry['row_idx'],
+                    'cell_idx': entry['cell_idx']
+                })
+                offset += len(entry['text'])
+            row_bounds.append((row_start, offset))
+            # Join cells with " | " separator to preserve table structure
+            table_rows.append(" | ".join(entry['text'] for entry in row_cells))
         if table_rows:
             # Add table content with clear markers
-            full_text_parts.append("\n[TABLE START]\n" + "\n".join(table_rows) + "\n[TABLE END]\n")
+            part = "\n[TABLE START]\n" + "\n".join(table_rows) + "\n[TABLE END]\n"
+            part_start = add_part(part, cell_segments)
+            # One block per row; the markers stay with the first and last rows, and a table starts a section
+            for row_pos, (row_start, row_end) in enumerate(row_bounds):
+                block_start = part_start if row_pos == 0 else part_start + row_start
+                block_end = part_start + len(part) if row_pos == len(row_bounds) - 1 else part_start + row_end
+                blocks.append((block_start, block_end, row_pos == 0))
     
     full_text = '\n\n'.join(full_text_parts)
     total_chars = len(full_text)
     
     if total_chars == 0:
         # Empty document - return single empty chunk
-        buffer = io.BytesIO()
-        doc.save(buffer)
+        chunk_bytes = None
+        if payload_format == 'docx':
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            chunk_bytes = buffer.getvalue()
         chunks.append({
-            'bytes': buffer.getvalue(),
+            'format': payload_format,
+            'bytes': chunk_bytes,
             'chunk_num': 0,
             'start_char': 0,
-            'end_char': 0
+            'end_char': 0,
+            'text': '',
+            'segments': []
         })
         return chunks
     
-    start_char = 0
-    chunk_num = 0
+    overlap_chars = max_overlap_tokens * CHARS_PER_TOKEN
     
-    while start_char < total_chars:
-        end_char = min(start_char + chunk_size, total_chars)
+    def pack(budget_chars):
+        """Greedily pack blocks into (start_char, end_char) spans of at most budget_chars."""
+        packed = []
+        for block in blocks:
+            packed.extend(_split_oversized_block(*block, full_text, budget_chars))
         
+        spans = []
+        first = 0
+        while first < len(packed):
+            chunk_start = packed[first][0]
+            last = first + 1
+            while last < len(packed) and packed[last][1] - chunk_start <= budget_chars:
+                last += 1
+            
+            if last < len(packed):
+                # Prefer to cut right before a section start, as long as the chunk stays at least half full
+                for candidate in range(last - 1, first, -1):
+                    if packed[candidate][0] - chunk_start < budget_chars * CHUNK_MIN_FILL_RATIO:
+                        break
+                    if packed[candidate][2]:
+                        last = candidate
+                        break
+            
+            spans.append((chunk_start, packed[last - 1][1]))
+            if last >= len(packed):
+                break
+            
+            # Overlap only when the cut lands inside a section: repeat its trailing blocks up to the cap
+            next_first = last
+            if not packed[last][2]:
+                while next_first - 1 > first and packed[last][0] - packed[next_first - 1][0] <= overlap_chars:
+                    next_first -= 1
+                    if packed[next_first][2]:
+                        break
+            first = next_first
+        return spans
+    
+    max_budget_chars = target_input_tokens * CHARS_PER_TOKEN
+    budget_chars = max_budget_chars
+    if target_chunk_count and target_chunk_count > 0:
+        # Spread over the target count (never below the floor), growing the budget back
+        # towards the maximum while section-aligned cuts leave more chunks than targeted
+        budget_chars = min(max_budget_chars, max(min_input_tokens * CHARS_PER_TOKEN, -(-total_chars // target_chunk_count)))
+    chunk_spans = pack(budget_chars)
+    while target_chunk_count and len(chunk_spans) > target_chunk_count and budget_chars < max_budget_chars:
+        budget_chars = min(max_budget_chars, int(budget_chars * 1.1) + 1)
+        chunk_spans = pack(budget_chars)
+    
+    for chunk_num, (start_char, end_char) in enumerate(chunk_spans):
         # Extract chunk text
         chunk_text = full_text[start_char:end_char]
         
-        # Create a new document for this chunk
-        chunk_doc = Document()
-        
-        # Split chunk text into paragraphs and add to document
-        for para_text in chunk_text.split('\n\n'):
-            if para_text.strip():
-                chunk_doc.add_paragraph(para_text.strip())
-        
-        # Save to bytes
-        buffer = io.BytesIO()
-        chunk_doc.save(buffer)
-        chunk_bytes = buffer.getvalue()
+        # Text chunks are sent as-is; DOCX mode re-renders the chunk as a document (fallback)
+        chunk_bytes = None
+        if payload_format == 'docx':
+            # Create a new document for this chunk
+            chunk_doc = Document()
+            
+            # Split chunk text into paragraphs and add to document
+            for para_text in chunk_text.split('\n\n'):
+                if para_text.strip():
+                    chunk_doc.add_paragraph(para_text.strip())
+            
+            # Save to bytes
+            buffer = io.BytesIO()
+            chunk_doc.save(buffer)
+            chunk_bytes = buffer.getvalue()
         
         chunks.append({
+            'format': payload_format,
             'bytes': chunk_bytes,
             'chunk_num': chunk_num,
             'start_char': start_char,
-            'end_char': end_char
+            'end_char': end_char,
+            'text': chunk_text,
+            'segments': [segment for segment in segments if segment['end'] > start_char and segment['start'] < end_char]
         })
-        
-        chunk_num += 1
-        # Move start position with overlap
-        start_char = end_char - overlap
-        # Break when we've processed all content (end_char reached total_chars)
-        if end_char >= total_chars:
-            break
+    
+    overlap_total = sum(max(0, chunk_spans[i][1] - chunk_spans[i + 1][0]) for i in range(len(chunk_spans) - 1))
+    logger.info(f"CHUNKING: {total_chars} chars (~{total_chars // CHARS_PER_TOKEN} tokens) in {len(blocks)} blocks -> {len(chunks)} chunks, budget ~{budget_chars // CHARS_PER_TOKEN} tokens, {overlap_total} overlap chars")
     
     return chunks
 
@@ -478,6 +1307,11 @@ class Model:
                 logger.warning(f"Failed to resolve KB ID from name: {os.environ.get('KNOWLEDGE_BASE_NAME')}")
         
         self.tools = get_tool_definitions()
+        self.answered_model_ids = []  # Model of every answered call, in order (tier fallback can leave the route's model)
+    
+    def answered_only_by(self, model_id: str) -> bool:
+        """Whether every call this instance made was answered by model_id (e.g. the stage route's model)."""
+        return all(answered == model_id for answered in self.answered_model_ids)
     
 
     
@@ -541,296 +1375,252 @@ class Model:
         logger.info(f"Sanitized filename from '{filename}' to '{sanitized}'")
         return sanitized
     
-    def _call_claude_without_tools(self, messages: List[Dict[str, Any]], retry_count: int = 0, use_1m_context: bool = False, tried_1m: bool = False) -> Dict[str, Any]:
+    def _build_chunk_content_block(self, payload: bytes, s3_key: str, payload_format: str = 'docx') -> Dict[str, Any]:
+        """
+        Build the Converse content block for a chunk or document payload.
+        
+        Text chunks (the layout JSON written by split_document) are sent as a
+        text block, which skips server-side document conversion; DOCX payloads
+        are sent as a document block.
+        
+        Args:
+            payload: Raw bytes loaded from S3
+            s3_key: S3 key the payload was loaded from
+            payload_format: 'text' or 'docx'
+            
+        Returns:
+            Converse content block dict
+        """
+        sanitized_filename = self._sanitize_filename_for_converse(os.path.basename(s3_key))
+        if payload_format == 'text':
+            chunk_text = json.loads(payload.decode('utf-8')).get('text', '')
+            return {
+                "text": f"<vendor_document name=\"{sanitized_filename}\">\n{chunk_text}\n</vendor_document>"
+            }
+        return {
+            "document": {
+                "format": 'docx',
+                "name": sanitized_filename,
+                "source": {
+                    "bytes": payload
+                }
+            }
+        }
+    
+    def _build_converse_request(self, messages: List[Dict[str, Any]], use_1m_context: bool = False, with_tools: bool = False, system_prompt: Optional[List[str]] = None, model_id: str = CLAUDE_MODEL_ID, sizing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the Converse API parameters for a Claude call.
+        
+        Static instructions go in the system prompt ahead of the per-chunk
+        messages so the prefix (tools, then system) is identical across chunks
+        and jobs and can be served from Bedrock's prompt cache.
+        
+        Args:
+            messages: List of message dictionaries
+            use_1m_context: Whether to enable the 1M context beta
+            with_tools: Whether to include the tool configuration
+            system_prompt: Static prompt layers, most stable first
+            model_id: Model or inference profile ID (from the stage route's tiers)
+            sizing: Thinking budget and output cap from _size_call (defaults to the fixed maximums)
+            
+        Returns:
+            Keyword arguments for bedrock_client.converse
+        """
+        api_params = {
+            "modelId": model_id,
+            "messages": messages,
+            "inferenceConfig": {
+                "temperature": TEMPERATURE,
+                "maxTokens": sizing['max_tokens'] if sizing else MAX_TOKENS
+            },
+            "additionalModelRequestFields": {}
+        }
+        
+        # A sizing with no thinking budget comes from a stage routed with thinking off
+        thinking_budget = sizing['thinking_budget'] if sizing else THINKING_BUDGET_TOKENS
+        if thinking_budget:
+            api_params["additionalModelRequestFields"]["thinking"] = {
+                "type": "enabled",
+                "budget_tokens": thinking_budget
+            }
+        
+        if with_tools:
+            api_params["toolConfig"] = {"tools": self.tools}
+        
+        if system_prompt:
+            api_params["system"] = _build_system_blocks(system_prompt)
+        
+        # Add 1M context beta parameter if using 1M fallback
+        # AWS Bedrock expects anthropic_beta to be a list of strings
+        if use_1m_context:
+            api_params["additionalModelRequestFields"]["anthropic_beta"] = [ANTHROPIC_BETA_1M]
+        
+        if not api_params["additionalModelRequestFields"]:
+            del api_params["additionalModelRequestFields"]
+        
+        return api_params
+    
+    def _invoke_sized(self, messages: List[Dict[str, Any]], with_tools: bool, system_prompt: Optional[List[str]], stage: Optional[str],
+                      expected_items: Optional[int], send: Callable[[Dict[str, Any]], Dict[str, Any]], context: str,
+                      full_budget: bool = False, **invoke_kwargs) -> Dict[str, Any]:
+        """
+        Size a call for its stage, send it through bedrock_invoker and record the sizing next to the usage.
+        
+        Args:
+            messages: List of message dictionaries
+            with_tools: Whether to include the tool configuration
+            system_prompt: Static prompt layers, most stable first
+            stage: Workflow stage for STAGE_MODEL_ROUTES and CALL_SIZING_POLICY (None = default route, fixed maximums)
+            expected_items: Expected queries/conflicts in the answer
+            send: Sends the API parameters (_converse_sender or a streaming sender)
+            context: Label for log lines and metrics
+            full_budget: Size the call with the largest budget and cap of the stage's route
+            **invoke_kwargs: Passed to BedrockClient.invoke
+            
+        Returns:
+            Response with callSizing added
+        """
+        input_tokens = _estimate_input_tokens(self._build_converse_request(messages, with_tools=with_tools, system_prompt=system_prompt))
+        sizing = _size_call(stage, input_tokens, expected_items, full_budget)
+        attempted_tier = {}
+        
+        def build_request(tier):
+            attempted_tier.update(tier)  # The last tier built is the one whose response is returned
+            return self._build_converse_request(messages, use_1m_context=tier['use_1m_context'], with_tools=with_tools, system_prompt=system_prompt, model_id=tier['model_id'], sizing=sizing)
+        
+        response = bedrock_invoker.invoke(
+            build_request,
+            send,
+            context=context,
+            tiers=route_tiers(get_stage_route(stage)),
+            **invoke_kwargs
+        )
+        self.answered_model_ids.append(attempted_tier['model_id'])
+        _record_sizing(sizing, input_tokens, response)
+        return response
+    
+    def _call_claude_without_tools(self, messages: List[Dict[str, Any]], system_prompt: Optional[List[str]] = None, stage: Optional[str] = None, expected_items: Optional[int] = None, full_budget: bool = False) -> Dict[str, Any]:
         """
         Call Claude without tool support using Converse API.
         Use this when KB results are already pre-loaded in the prompt.
-        Implements graceful queuing with call spacing to prevent token rate limiting.
-        Supports fallback: Primary Sonnet 4 (once) -> Sonnet 4 1M -> Retry Sonnet 4 with backoff
+        Retries, circuit breaking and model fallback are handled by bedrock_invoker.
         
         Args:
             messages: List of message dictionaries
-            retry_count: Current retry attempt number
-            use_1m_context: Whether to use 1M context version (fallback)
-            tried_1m: Whether we've already attempted 1M context (prevents loops)
+            system_prompt: Static prompt layers, most stable first, sent as cached system blocks
+            stage: Workflow stage, selects the thinking budget and output cap (None = fixed maximums)
+            expected_items: Expected conflicts in the answer, for sizing
+            full_budget: Use the largest thinking budget and output cap of the stage's route
         """
         
-        # Implement graceful call spacing to prevent token rate limiting
-        current_time = time.time()
-        time_since_last_call = current_time - _call_tracker['last_call_time']
+        logger.info(f"Calling Claude ({get_stage_route(stage)['model_id']}) with {len(messages)} messages without tools - Total successful calls so far: {_call_tracker['total_model_calls']}")
         
-        if time_since_last_call < CALL_SPACING_DELAY:
-            wait_time = CALL_SPACING_DELAY - time_since_last_call
-            logger.info(f"Graceful queuing: waiting {wait_time:.2f}s to prevent token rate limiting")
-            time.sleep(wait_time)
+        response = self._invoke_sized(messages, False, system_prompt, stage, expected_items, _converse_sender("without_tools", stage), "without_tools", full_budget=full_budget)
+        if _truncated_below_budget(response):
+            logger.warning(f"CALL_SIZING: Answer truncated at {response['callSizing']['max_tokens']} tokens for stage {stage}, retrying with the route's full budget")
+            return self._call_claude_without_tools(messages, system_prompt=system_prompt, stage=stage, expected_items=expected_items, full_budget=True)
         
-        # Always use Claude Sonnet 4 - just toggle 1M context via beta parameter
-        current_model_id = CLAUDE_MODEL_ID
+        # SUCCESS: Only now increment the counter for successful calls
+        _call_tracker['total_model_calls'] += 1
         
-        # Log attempt (but don't increment counter until successful)
-        model_name = "Sonnet 4 1M" if use_1m_context else "Sonnet 4"
-        logger.info(f"Calling Claude ({model_name}: {current_model_id}) with {len(messages)} messages without tools (attempt {retry_count + 1}, use_1m_context={use_1m_context}) - Total successful calls so far: {_call_tracker['total_model_calls']}")
+        logger.info(f"Claude API call successful! Total successful model calls: {_call_tracker['total_model_calls']}")
         
-        try:
-            # Prepare inference config
-            inference_config = {
-                "temperature": TEMPERATURE,
-                "maxTokens": MAX_TOKENS
-            }
-            
-            # Prepare API call parameters - NO tools
-            # Step functions use their own specialized prompts in user messages, so no system prompt needed
-            api_params = {
-                "modelId": current_model_id,
-                "messages": messages,
-                "inferenceConfig": inference_config,
-                # NO toolConfig - tools disabled
-                "additionalModelRequestFields": {
-                    "thinking": {
-                        "type": "enabled",
-                        "budget_tokens": THINKING_BUDGET_TOKENS
-                    }
-                }
-            }
-            
-            # Add 1M context beta parameter if using 1M fallback
-            # AWS Bedrock expects anthropic_beta to be a list of strings
-            if use_1m_context:
-                api_params["additionalModelRequestFields"]["anthropic_beta"] = [ANTHROPIC_BETA_1M]
-            
-            # Call Bedrock using Converse API (supports document attachments)
-            response = bedrock_client.converse(**api_params)
-            
-            # SUCCESS: Only now increment the counter for successful calls
-            _call_tracker['total_model_calls'] += 1
-            _call_tracker['last_call_time'] = time.time()
-            
-            logger.info(f"Claude API call successful! Total successful model calls: {_call_tracker['total_model_calls']}")
-            
-            # Extract and log thinking content
-            thinking_context = f"inference_call_{_call_tracker['total_model_calls']}"
-            _extract_and_log_thinking(response, thinking_context)
-            
-            # No tool calls possible - return response directly
-            return response
+        # Extract and log thinking content
+        thinking_context = f"inference_call_{_call_tracker['total_model_calls']}"
+        _extract_and_log_thinking(response, thinking_context)
+        
+        # No tool calls possible - return response directly
+        return response
+    
+    def _call_claude_streaming(self, messages: List[Dict[str, Any]], on_conflict: Optional[Callable[[Dict[str, Any]], None]] = None, system_prompt: Optional[List[str]] = None, stage: Optional[str] = None, expected_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Call Claude without tools using ConverseStream, reporting each conflict as soon as it is complete.
+        Text deltas go through ConflictStreamParser; on_conflict receives every completed element of the
+        "conflicts" array while the rest of the response is still being generated. The read timeout
+        applies between stream events rather than to the whole response.
+        The stream is tried once (a retried stream would report conflicts again); if it fails, the call is
+        repeated with _call_claude_without_tools and conflicts already reported stay with the caller.
+        
+        Args:
+            messages: List of message dictionaries
+            on_conflict: Callback for each streamed conflict dictionary (unvalidated)
+            system_prompt: Static prompt layers, most stable first, sent as cached system blocks
+            stage: Workflow stage, selects the thinking budget and output cap (None = fixed maximums)
+            expected_items: Expected conflicts in the answer, for sizing
             
+        Returns:
+            Response in the same shape as converse() (output.message.content, stopReason, usage)
+        """
+        logger.info(f"Calling Claude ({get_stage_route(stage)['model_id']}) with {len(messages)} messages via ConverseStream - Total successful calls so far: {_call_tracker['total_model_calls']}")
+        
+        parser = ConflictStreamParser()
+        started_at = time.time()
+        
+        def on_text(text):
+            for conflict in parser.feed(text):
+                if parser.conflicts_seen == 1:
+                    logger.info(f"CONFLICT_STREAM: First conflict after {time.time() - started_at:.1f}s")
+                if on_conflict:
+                    on_conflict(conflict)
+        
+        try:
+            response = self._invoke_sized(messages, False, system_prompt, stage, expected_items, lambda api_params: _send_converse_stream(api_params, "streaming", on_text), "streaming", max_attempts=1)
         except Exception as e:
-            error_msg = str(e)
-            error_type = type(e).__name__
-            
-            # Check for throttling errors and implement exponential backoff
-            is_throttling = ("ThrottlingException" in error_msg or "Too many tokens" in error_msg or 
-                            "rate" in error_msg.lower() or "throttl" in error_msg.lower() or
-                            "limit" in error_msg.lower())
-            
-            # Check for transient errors that should be retried
-            is_transient = (
-                "ServiceUnavailableException" in error_type or
-                "InternalServerError" in error_type or
-                "InternalFailure" in error_msg or
-                "ServiceUnavailable" in error_msg or
-                "timeout" in error_msg.lower() or
-                "Timeout" in error_type or
-                "Connection" in error_type or
-                "ReadTimeout" in error_type or
-                "502" in error_msg or  # Bad Gateway
-                "503" in error_msg or  # Service Unavailable
-                "504" in error_msg     # Gateway Timeout
-            )
-            
-            # Handle throttling with exponential backoff
-            if is_throttling and retry_count < MAX_RETRIES:
-                wait_time = min(2 ** retry_count, MAX_BACKOFF_SECONDS)
-                logger.warning(f"Claude API throttling error detected ({error_type}), retrying in {wait_time} seconds (attempt {retry_count + 1}/{MAX_RETRIES})")
-                time.sleep(wait_time)
-                return self._call_claude_without_tools(messages, retry_count + 1, use_1m_context, tried_1m)
-            
-            # Handle transient errors
-            if is_transient and retry_count < MAX_RETRIES:
-                wait_time = min(2 ** retry_count, MAX_BACKOFF_SECONDS)
-                logger.warning(f"Claude API transient error detected ({error_type}), retrying in {wait_time} seconds (attempt {retry_count + 1}/{MAX_RETRIES})")
-                time.sleep(wait_time)
-                return self._call_claude_without_tools(messages, retry_count + 1, use_1m_context, tried_1m)
-            
-            # Try 1M context fallback if primary model fails and we haven't tried it yet
-            if not tried_1m and not use_1m_context:
-                logger.warning(f"Sonnet 4 failed on first attempt. Attempting fallback to Sonnet 4 1M")
-                return self._call_claude_without_tools(messages, retry_count, use_1m_context=True, tried_1m=True)
-            
-            # If 1M context also failed, retry with exponential backoff
-            if use_1m_context and retry_count < MAX_RETRIES:
-                wait_time = min(2 ** retry_count, MAX_BACKOFF_SECONDS)
-                logger.warning(f"Sonnet 4 1M also failed. Retrying Sonnet 4 with exponential backoff")
-                logger.warning(f"Retrying Sonnet 4 in {wait_time} seconds (attempt {retry_count + 1})")
-                time.sleep(wait_time)
-                return self._call_claude_without_tools(messages, retry_count + 1, use_1m_context=False, tried_1m=True)
-            
-            # Max retries exceeded
-            if retry_count >= MAX_RETRIES:
-                logger.error(f"Max retries exceeded for Claude API error after {MAX_RETRIES} attempts")
-            
-            # Re-raise the exception if we can't handle it
-            raise
+            logger.warning(f"CONFLICT_STREAM: Stream failed after {parser.conflicts_seen} conflicts ({type(e).__name__}: {e}), retrying without streaming")
+            return self._call_claude_without_tools(messages, system_prompt=system_prompt, stage=stage, expected_items=expected_items)
+        if _truncated_below_budget(response):
+            logger.warning(f"CALL_SIZING: Streamed answer truncated at {response['callSizing']['max_tokens']} tokens for stage {stage}, retrying without streaming with the route's full budget")
+            return self._call_claude_without_tools(messages, system_prompt=system_prompt, stage=stage, expected_items=expected_items, full_budget=True)
+        
+        _call_tracker['total_model_calls'] += 1
+        logger.info(f"Claude streaming call successful in {time.time() - started_at:.1f}s with {parser.conflicts_seen} streamed conflicts! Total successful model calls: {_call_tracker['total_model_calls']}")
+        
+        thinking_context = f"inference_call_{_call_tracker['total_model_calls']}"
+        _extract_and_log_thinking(response, thinking_context)
+        
+        return response
     
-    def _call_claude_with_tools(self, messages: List[Dict[str, Any]], retry_count: int = 0, use_1m_context: bool = False, tried_1m: bool = False) -> Dict[str, Any]:
+    def _call_claude_with_tools(self, messages: List[Dict[str, Any]], system_prompt: Optional[List[str]] = None, stage: Optional[str] = None, expected_items: Optional[int] = None, full_budget: bool = False) -> Dict[str, Any]:
         """
         Call Claude with tool support using Converse API.
-        Implements graceful queuing with call spacing to prevent token rate limiting.
-        Supports fallback: Primary Sonnet 4 (once) -> Sonnet 4 1M -> Retry Sonnet 4 with backoff
+        Retries, circuit breaking and model fallback are handled by bedrock_invoker.
         
         Args:
             messages: List of message dictionaries
-            retry_count: Current retry attempt number
-            use_1m_context: Whether to use 1M context version (fallback)
-            tried_1m: Whether we've already attempted 1M context (prevents loops)
+            system_prompt: Static prompt layers, most stable first, sent as cached system blocks
+            stage: Workflow stage, selects the thinking budget and output cap (None = fixed maximums)
+            expected_items: Expected queries in the answer, for sizing
+            full_budget: Use the largest thinking budget and output cap of the stage's route
         """
         
-        # Implement graceful call spacing to prevent token rate limiting
-        current_time = time.time()
-        time_since_last_call = current_time - _call_tracker['last_call_time']
+        logger.info(f"Calling Claude ({get_stage_route(stage)['model_id']}) with {len(messages)} messages and {len(self.tools)} tools - Total successful calls so far: {_call_tracker['total_model_calls']}")
         
-        if time_since_last_call < CALL_SPACING_DELAY:
-            wait_time = CALL_SPACING_DELAY - time_since_last_call
-            logger.info(f"Graceful queuing: waiting {wait_time:.2f}s to prevent token rate limiting")
-            time.sleep(wait_time)
+        response = self._invoke_sized(messages, True, system_prompt, stage, expected_items, _converse_sender("with_tools", stage), "with_tools", full_budget=full_budget)
+        if _truncated_below_budget(response):
+            logger.warning(f"CALL_SIZING: Answer truncated at {response['callSizing']['max_tokens']} tokens for stage {stage}, retrying with the route's full budget")
+            return self._call_claude_with_tools(messages, system_prompt=system_prompt, stage=stage, expected_items=expected_items, full_budget=True)
         
-        # Always use Claude Sonnet 4 - just toggle 1M context via beta parameter
-        current_model_id = CLAUDE_MODEL_ID
+        # SUCCESS: Only now increment the counter for successful calls
+        _call_tracker['total_model_calls'] += 1
         
-        # Log attempt (but don't increment counter until successful)
-        model_name = "Sonnet 4 1M" if use_1m_context else "Sonnet 4"
-        logger.info(f"Calling Claude ({model_name}: {current_model_id}) with {len(messages)} messages and {len(self.tools)} tools (attempt {retry_count + 1}, use_1m_context={use_1m_context}) - Total successful calls so far: {_call_tracker['total_model_calls']}")
+        logger.info(f"Claude API call successful! Total successful model calls: {_call_tracker['total_model_calls']}")
         
-        try:
-            # Prepare inference config
-            inference_config = {
-                "temperature": TEMPERATURE,
-                "maxTokens": MAX_TOKENS
-            }
-            
-            # Prepare API call parameters
-            # Step functions use their own specialized prompts in user messages, so no system prompt needed
-            api_params = {
-                "modelId": current_model_id,
-                "messages": messages,
-                "inferenceConfig": inference_config,
-                "toolConfig": {"tools": self.tools},
-                "additionalModelRequestFields": {
-                    "thinking": {
-                        "type": "enabled",
-                        "budget_tokens": THINKING_BUDGET_TOKENS
-                    }
-                }
-            }
-            
-            # Add 1M context beta parameter if using 1M fallback
-            # AWS Bedrock expects anthropic_beta to be a list of strings
-            if use_1m_context:
-                api_params["additionalModelRequestFields"]["anthropic_beta"] = [ANTHROPIC_BETA_1M]
-            
-            # Call Bedrock using Converse API (supports document attachments)
-            response = bedrock_client.converse(**api_params)
-            
-            # SUCCESS: Only now increment the counter for successful calls
-            _call_tracker['total_model_calls'] += 1
-            _call_tracker['last_call_time'] = time.time()
-            
-            logger.info(f"Claude API call successful! Total successful model calls: {_call_tracker['total_model_calls']}")
-            
-            # Extract and log thinking content (only the reasoning text will be logged)
-            thinking_context = f"inference_call_{_call_tracker['total_model_calls']}"
-            if response.get("stopReason") == "tool_use":
-                thinking_context += "_before_tool_use"
-            _extract_and_log_thinking(response, thinking_context)
-            
-            # Handle tool calls if present
-            if response.get("stopReason") == "tool_use":
-                return self._handle_tool_calls(messages, response)
-            
-            return response
-            
-        except Exception as e:
-            error_msg = str(e)
-            error_type = type(e).__name__
-            
-            # Check for throttling errors and implement exponential backoff
-            is_throttling = ("ThrottlingException" in error_msg or "Too many tokens" in error_msg or 
-                            "rate" in error_msg.lower() or "throttl" in error_msg.lower() or
-                            "limit" in error_msg.lower())
-            
-            # Check for transient errors that should be retried
-            is_transient = (
-                "ServiceUnavailableException" in error_type or
-                "InternalServerError" in error_type or
-                "InternalFailure" in error_msg or
-                "ServiceUnavailable" in error_msg or
-                "timeout" in error_msg.lower() or
-                "Timeout" in error_type or
-                "Connection" in error_type or
-                "ReadTimeout" in error_type or
-                "502" in error_msg or  # Bad Gateway
-                "503" in error_msg or  # Service Unavailable
-                "504" in error_msg     # Gateway Timeout
-            )
-            
-            # Check for validation errors that should NOT be retried (configuration issues)
-            is_validation_error = (
-                "ValidationException" in error_type or
-                "ValidationError" in error_type or
-                "InvalidParameter" in error_type or
-                "InvalidRequest" in error_msg
-            )
-            
-            # Retry logic for throttling and transient errors
-            if (is_throttling or is_transient) and not is_validation_error:
-                # On first failure (retry_count=0), try Sonnet 4 1M if not already tried
-                if retry_count == 0 and not use_1m_context and not tried_1m:
-                    logger.warning(f"Sonnet 4 failed on first attempt. Attempting fallback to Sonnet 4 1M")
-                    try:
-                        return self._call_claude_with_tools(messages, retry_count=0, use_1m_context=True, tried_1m=True)
-                    except Exception as fallback_1m_error:
-                        # If 1M fails, go back to Sonnet 4 and continue retrying with backoff
-                        logger.warning(f"Sonnet 4 1M also failed. Retrying Sonnet 4 with exponential backoff")
-                        delay = min(BASE_DELAY * (BACKOFF_MULTIPLIER ** retry_count), MAX_DELAY)
-                        error_category = "throttling" if is_throttling else "transient"
-                        logger.warning(f"Retrying Sonnet 4 in {delay} seconds (attempt {retry_count + 2})")
-                        time.sleep(delay)
-                        return self._call_claude_with_tools(messages, retry_count + 1, use_1m_context=False, tried_1m=True)
-                
-                # Continue retrying Sonnet 4 with exponential backoff
-                if retry_count < MAX_RETRIES:
-                    delay = min(BASE_DELAY * (BACKOFF_MULTIPLIER ** retry_count), MAX_DELAY)
-                    error_category = "throttling" if is_throttling else "transient"
-                    logger.warning(f"Claude API {error_category} error detected ({error_type}), retrying in {delay} seconds (attempt {retry_count + 1}/{MAX_RETRIES + 1})")
-                    time.sleep(delay)
-                    return self._call_claude_with_tools(messages, retry_count + 1, use_1m_context=False, tried_1m=tried_1m)
-                else:
-                    # Max retries exceeded
-                    error_category = "throttling" if is_throttling else "transient"
-                    logger.error(f"Max retries exceeded for Claude API {error_category} error after {MAX_RETRIES + 1} attempts")
-                    raise Exception(f"Claude API {error_category} error limit exceeded after {MAX_RETRIES + 1} retries: {str(e)}")
-            else:
-                # For validation errors, try Sonnet 4 1M if not already tried, then retry Sonnet 4
-                if not use_1m_context and is_validation_error and not tried_1m:
-                    logger.warning(f"Validation error on Sonnet 4. Attempting fallback to Sonnet 4 1M")
-                    try:
-                        return self._call_claude_with_tools(messages, retry_count=0, use_1m_context=True, tried_1m=True)
-                    except Exception as fallback_1m_error:
-                        # If 1M also fails, retry original Sonnet 4
-                        logger.warning(f"Sonnet 4 1M also failed with validation error. Retrying original Sonnet 4")
-                        try:
-                            return self._call_claude_with_tools(messages, retry_count=0, use_1m_context=False, tried_1m=True)
-                        except Exception as final_error:
-                            logger.error(f"All attempts failed with validation errors. Sonnet 4: {str(e)}, Sonnet 4 1M: {str(fallback_1m_error)}, Sonnet 4 retry: {str(final_error)}")
-                            raise Exception(f"Claude API validation error on all attempts. Sonnet 4: {str(e)}, Sonnet 4 1M: {str(fallback_1m_error)}, Sonnet 4 retry: {str(final_error)}")
-                
-                # Non-retryable error - don't retry
-                logger.error(f"Error calling Claude (non-retryable {error_type}): {str(e)}")
-                raise
+        # Extract and log thinking content (only the reasoning text will be logged)
+        thinking_context = f"inference_call_{_call_tracker['total_model_calls']}"
+        if response.get("stopReason") == "tool_use":
+            thinking_context += "_before_tool_use"
+        _extract_and_log_thinking(response, thinking_context)
+        
+        # Handle tool calls if present
+        if response.get("stopReason") == "tool_use":
+            return self._handle_tool_calls(messages, response, system_prompt=system_prompt, stage=stage)
+        
+        return response
     
-    def _handle_tool_calls(self, messages: List[Dict[str, Any]], claude_response: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_tool_calls(self, messages: List[Dict[str, Any]], claude_response: Dict[str, Any], system_prompt: Optional[List[str]] = None, stage: Optional[str] = None) -> Dict[str, Any]:
         """
         Handle tool calls from Claude and continue the conversation.
+        The same cached system prompt layers are sent with the follow-up call.
         """
         
         # Log thinking from the initial tool use response
@@ -915,7 +1705,7 @@ class Model:
         
         # Continue the conversation with tool results
         logger.info("=== CONTINUING CONVERSATION AFTER TOOL EXECUTION ===")
-        final_response = self._call_claude_with_tools(messages)
+        final_response = self._call_claude_with_tools(messages, system_prompt=system_prompt, stage=stage)
         
         # Log thinking from the final response after tool execution
         logger.info("=== LOGGING THINKING AFTER TOOL EXECUTION ===")
@@ -60,6 +60,20 @@ class KBQueryResult(BaseModel):
     )
 
 
+class QuoteAnchorModel(BaseModel):
+    """Model for where a conflict's vendor_quote sits in the chunked document text."""
+    found: bool = Field(..., description="Whether vendor_quote was located in its chunk text")
+    match_type: Optional[str] = Field(None, description="Local matching tier that located the quote")
+    start_char: Optional[int] = Field(None, ge=0, description="Absolute start offset in the chunked document text")
+    end_char: Optional[int] = Field(None, ge=0, description="Absolute end offset in the chunked document text")
+    locations: List[Dict[str, int]] = Field(default_factory=list, description="Paragraph (para_idx) or table cell (table_idx/row_idx/cell_idx) coordinates with start/end offsets within each")
+    
+    model_config = ConfigDict(
+        extra='forbid',
+        str_strip_whitespace=True
+    )
+
+
 class ConflictModel(BaseModel):
     """Model for conflict detection - matches existing tools.py ConflictModel structure."""
     clarification_id: str = Field(..., description="Vendor's ID or Additional-[#] for other findings")
@@ -69,6 +83,7 @@ class ConflictModel(BaseModel):
     clause_ref: str = Field(default="N/A", description="Specific section or 'N/A' if not applicable")
     conflict_type: str = Field(..., description="adds/deletes/modifies/contradicts/omits required/reverses obligation")
     rationale: str = Field(..., description="≤50 words on legal impact")
+    anchor: Optional[QuoteAnchorModel] = Field(None, description="Set by identify_conflicts after validation, never by the model")
     
     @field_validator('source_doc')
     @classmethod
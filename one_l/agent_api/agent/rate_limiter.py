@@ -0,0 +1,303 @@
+"""
+Token-bucket rate limiting for Bedrock calls.
+Every Converse call acquires one request and its estimated tokens from a per-model bucket
+before it is sent, so all chunk Lambdas of all running jobs share the account quota instead
+of each spacing its own calls and backing off after ThrottlingException.
+
+DynamoDBRateLimiter coordinates across Lambda containers with optimistic conditional writes.
+InMemoryRateLimiter implements the same buckets for a single process (local runs and tests).
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Dict, Callable, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+# Import constants - add parent directories to path
+_parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+try:
+    import constants
+except ImportError:
+    # Fallback if constants not available
+    class Constants:
+        BEDROCK_REQUESTS_PER_MINUTE = 100
+        BEDROCK_TOKENS_PER_MINUTE = 400000
+        RATE_LIMITER_MAX_WAIT_SECONDS = 300
+    constants = Constants()
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CONTENTION_BACKOFF_SECONDS = 0.05  # Max jitter after losing a conditional write to another caller
+MAX_SLEEP_SECONDS = 5.0  # Re-check the shared bucket at least this often while waiting
+TRY_ACQUIRE_ATTEMPTS = 3  # Conditional-write races try_acquire() retries before giving up
+
+
+class RateLimiter(ABC):
+    """
+    Per-model token buckets for requests/minute and tokens/minute.
+
+    Each bucket holds at most one minute of quota and refills continuously.
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_wait_seconds: float,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            requests_per_minute: Requests per minute allowed per model ID
+            tokens_per_minute: Input + output tokens per minute allowed per model ID
+            max_wait_seconds: Longest acquire() waits before letting the call through anyway
+            clock: Time source in seconds
+            sleep: Sleep function
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._sleep = sleep
+
+    def _refill(self, requests: float, tokens: float, updated_at: float, now: float) -> Tuple[float, float]:
+        """Refill both buckets for the time elapsed since updated_at, capped at one minute of quota."""
+        elapsed = max(0.0, now - updated_at)
+        requests = min(self.requests_per_minute, requests + elapsed * self.requests_per_minute / 60.0)
+        tokens = min(self.tokens_per_minute, tokens + elapsed * self.tokens_per_minute / 60.0)
+        return requests, tokens
+
+    def _shortfall_seconds(self, requests: float, tokens: float, needed_tokens: float) -> float:
+        """
+        Seconds until both buckets can cover the request, 0 if they already can.
+
+        Requests larger than the whole token bucket only wait for a full bucket.
+        """
+        wait = 0.0
+        if self.requests_per_minute and requests < 1:
+            wait = max(wait, (1 - requests) * 60.0 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            needed_tokens = min(needed_tokens, self.tokens_per_minute)
+            if tokens < needed_tokens:
+                wait = max(wait, (needed_tokens - tokens) * 60.0 / self.tokens_per_minute)
+        return wait
+
+    def _initial_state(self, now: float) -> Dict[str, float]:
+        """State of a bucket that has never been used: full."""
+        return {'requests': float(self.requests_per_minute), 'tokens': float(self.tokens_per_minute), 'updated_at': now}
+
+    @abstractmethod
+    def acquire(self, model_id: str, estimated_tokens: int) -> float:
+        """
+        Take one request and estimated_tokens from the model's buckets, waiting for refill if needed.
+
+        Args:
+            model_id: Bedrock model ID the call goes to
+            estimated_tokens: Estimated input + output tokens of the call
+
+        Returns:
+            Seconds spent waiting
+        """
+
+    @abstractmethod
+    def try_acquire(self, model_id: str, estimated_tokens: int) -> bool:
+        """
+        Take one request and estimated_tokens only if both buckets can cover them now, without waiting.
+        Used for optional calls such as hedged requests.
+
+        Args:
+            model_id: Bedrock model ID the call goes to
+            estimated_tokens: Estimated input + output tokens of the call
+
+        Returns:
+            True if the capacity was taken
+        """
+
+    @abstractmethod
+    def settle(self, model_id: str, estimated_tokens: int, actual_tokens: int):
+        """
+        Correct the token bucket once the call's real usage is known.
+
+        Args:
+            model_id: Bedrock model ID the call went to
+            estimated_tokens: Tokens taken by acquire()
+            actual_tokens: Tokens reported by Bedrock (0 if the call failed without consuming quota)
+        """
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """Process-local token buckets; thread-safe. Used when no shared table is configured and in tests."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_wait_seconds: float = 300,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        super().__init__(requests_per_minute, tokens_per_minute, max_wait_seconds, clock, sleep)
+        self._buckets = {}  # model_id -> {'requests', 'tokens', 'updated_at'}
+        self._lock = threading.Lock()
+
+    def acquire(self, model_id: str, estimated_tokens: int) -> float:
+        start = self._clock()
+        while True:
+            with self._lock:
+                now = self._clock()
+                state = self._buckets.get(model_id) or self._initial_state(now)
+                requests, tokens = self._refill(state['requests'], state['tokens'], state['updated_at'], now)
+                wait = self._shortfall_seconds(requests, tokens, estimated_tokens)
+                if wait <= 0 or now - start + wait > self.max_wait_seconds:
+                    if wait > 0:
+                        logger.warning(f"RATE_LIMITER: Gave up waiting after {now - start:.1f}s for {model_id}, sending anyway")
+                    self._buckets[model_id] = {'requests': requests - 1, 'tokens': tokens - estimated_tokens, 'updated_at': now}
+                    return now - start
+                self._buckets[model_id] = {'requests': requests, 'tokens': tokens, 'updated_at': now}
+            self._sleep(min(wait, MAX_SLEEP_SECONDS))
+
+    def try_acquire(self, model_id: str, estimated_tokens: int) -> bool:
+        with self._lock:
+            now = self._clock()
+            state = self._buckets.get(model_id) or self._initial_state(now)
+            requests, tokens = self._refill(state['requests'], state['tokens'], state['updated_at'], now)
+            if self._shortfall_seconds(requests, tokens, estimated_tokens) > 0:
+                return False
+            self._buckets[model_id] = {'requests': requests - 1, 'tokens': tokens - estimated_tokens, 'updated_at': now}
+            return True
+
+    def settle(self, model_id: str, estimated_tokens: int, actual_tokens: int):
+        with self._lock:
+            state = self._buckets.get(model_id)
+            if state:
+                state['tokens'] -= actual_tokens - estimated_tokens
+
+
+class DynamoDBRateLimiter(RateLimiter):
+    """
+    Token buckets shared through a DynamoDB table (partition key limiter_key = model ID).
+
+    acquire() reads the bucket, refills it and writes the debited state back
+    with a condition on the version it read; a caller that loses the race
+    re-reads and tries again. try_acquire() does the same but never waits for
+    refill. settle() adjusts tokens atomically with ADD.
+    """
+
+    def __init__(self, table_name: str, requests_per_minute: int, tokens_per_minute: int, max_wait_seconds: float = 300,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        super().__init__(requests_per_minute, tokens_per_minute, max_wait_seconds, clock, sleep)
+        self.table = boto3.resource('dynamodb').Table(table_name)
+
+    def acquire(self, model_id: str, estimated_tokens: int) -> float:
+        start = self._clock()
+        while True:
+            now = self._clock()
+            requests, tokens, version = self._read_bucket(model_id, now)
+            wait = self._shortfall_seconds(requests, tokens, estimated_tokens)
+            if wait > 0 and now - start + wait <= self.max_wait_seconds:
+                self._sleep(min(wait, MAX_SLEEP_SECONDS) + random.uniform(0, CONTENTION_BACKOFF_SECONDS))
+                continue
+            if wait > 0:
+                logger.warning(f"RATE_LIMITER: Gave up waiting after {now - start:.1f}s for {model_id}, sending anyway")
+
+            if self._write_debited(model_id, requests, tokens, estimated_tokens, now, version):
+                return now - start
+            # Another caller updated the bucket first; re-read and retry
+            self._sleep(random.uniform(0, CONTENTION_BACKOFF_SECONDS))
+
+    def try_acquire(self, model_id: str, estimated_tokens: int) -> bool:
+        for _ in range(TRY_ACQUIRE_ATTEMPTS):
+            now = self._clock()
+            requests, tokens, version = self._read_bucket(model_id, now)
+            if self._shortfall_seconds(requests, tokens, estimated_tokens) > 0:
+                return False
+            if self._write_debited(model_id, requests, tokens, estimated_tokens, now, version):
+                return True
+            self._sleep(random.uniform(0, CONTENTION_BACKOFF_SECONDS))
+        return False
+
+    def _read_bucket(self, model_id: str, now: float) -> Tuple[float, float, Optional[int]]:
+        """Read and refill the model's bucket; version is None if the bucket does not exist yet."""
+        item = self.table.get_item(Key={'limiter_key': model_id}, ConsistentRead=True).get('Item')
+        if item:
+            state = {key: float(item[key]) for key in ('requests', 'tokens', 'updated_at')}
+            version = int(item.get('version', 0))
+        else:
+            state = self._initial_state(now)
+            version = None
+        requests, tokens = self._refill(state['requests'], state['tokens'], state['updated_at'], now)
+        return requests, tokens, version
+
+    def _write_debited(self, model_id: str, requests: float, tokens: float, estimated_tokens: int, now: float, version: Optional[int]) -> bool:
+        """Write the debited bucket if nobody changed it since it was read; False if another caller won the race."""
+        try:
+            self.table.put_item(
+                Item={
+                    'limiter_key': model_id,
+                    'requests': Decimal(str(round(requests - 1, 6))),
+                    'tokens': Decimal(str(round(tokens - estimated_tokens, 3))),
+                    'updated_at': Decimal(str(round(now, 6))),
+                    'version': (version or 0) + 1
+                },
+                ConditionExpression='attribute_not_exists(limiter_key)' if version is None else 'version = :version',
+                **({} if version is None else {'ExpressionAttributeValues': {':version': version}})
+            )
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            return False
+
+    def settle(self, model_id: str, estimated_tokens: int, actual_tokens: int):
+        delta = estimated_tokens - actual_tokens
+        if not delta:
+            return
+        try:
+            self.table.update_item(
+                Key={'limiter_key': model_id},
+                UpdateExpression='ADD tokens :delta, version :one',
+                ConditionExpression='attribute_exists(limiter_key)',
+                ExpressionAttributeValues={':delta': Decimal(delta), ':one': 1}
+            )
+        except ClientError as e:
+            logger.warning(f"RATE_LIMITER: Could not settle token usage for {model_id}: {e}")
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide limiter: DynamoDB-backed when RATE_LIMITER_TABLE_NAME is set, in-memory otherwise.
+
+    Returns:
+        RateLimiter instance
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            table_name = os.environ.get('RATE_LIMITER_TABLE_NAME')
+            if table_name:
+                _rate_limiter = DynamoDBRateLimiter(
+                    table_name,
+                    constants.BEDROCK_REQUESTS_PER_MINUTE,
+                    constants.BEDROCK_TOKENS_PER_MINUTE,
+                    constants.RATE_LIMITER_MAX_WAIT_SECONDS
+                )
+            else:
+                logger.info("RATE_LIMITER: RATE_LIMITER_TABLE_NAME not set, using in-memory limiter (no cross-Lambda coordination)")
+                _rate_limiter = InMemoryRateLimiter(
+                    constants.BEDROCK_REQUESTS_PER_MINUTE,
+                    constants.BEDROCK_TOKENS_PER_MINUTE,
+                    constants.RATE_LIMITER_MAX_WAIT_SECONDS
+                )
+        return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Replace the process-wide limiter (e.g. with an InMemoryRateLimiter in offline scripts)."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
@@ -0,0 +1,195 @@
+"""
+Content-addressed cache for step function model responses.
+Stores the validated StructureAnalysisOutput / ConflictDetectionOutput JSON of a chunk in S3
+so resubmitting the same vendor document skips Bedrock for every chunk already analyzed.
+
+Cache keys combine the chunk content hash, the prompt version (hash of the static prompt
+layers and output schema), the terms profile, the model ID and the knowledge base ingestion
+version, so any change to what the model would see produces a new key. Entries expire through
+the agent processing bucket's lifecycle rule and are also checked against their expiry on read.
+"""
+
+import json
+import hashlib
+import logging
+import os
+import sys
+import time
+import boto3
+from typing import Dict, Any, List, Optional
+
+# Import constants - add parent directories to path
+_parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+try:
+    import constants
+except ImportError:
+    # Fallback if constants not available
+    class Constants:
+        RESPONSE_CACHE_ENABLED = True
+        RESPONSE_CACHE_TTL_DAYS = 30
+    constants = Constants()
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+s3_client = boto3.client('s3')
+
+RESPONSE_CACHE_PREFIX = "response_cache"  # Must match the lifecycle rule on the agent processing bucket
+RESPONSE_CACHE_VERSION = 1  # Bump to invalidate every entry (e.g. when post-processing of outputs changes)
+KB_VERSION_REFRESH_SECONDS = 300  # How long a warm container trusts its last ingestion-version lookup
+
+# knowledge_base_id -> (ingestion version, fetched_at)
+_kb_version_cache = {}
+
+
+def get_kb_ingestion_version(knowledge_base_id: str) -> Optional[str]:
+    """
+    Identify the knowledge base content by its latest completed ingestion job per data source.
+
+    Args:
+        knowledge_base_id: Bedrock knowledge base ID
+
+    Returns:
+        Short version hash, or None if it cannot be determined (callers should bypass caching)
+    """
+    if not knowledge_base_id:
+        return None
+
+    cached = _kb_version_cache.get(knowledge_base_id)
+    if cached and time.time() - cached[1] < KB_VERSION_REFRESH_SECONDS:
+        return cached[0]
+
+    try:
+        client = boto3.client('bedrock-agent')
+        ingestions = []
+        paginator = client.get_paginator('list_data_sources')
+        for page in paginator.paginate(knowledgeBaseId=knowledge_base_id):
+            for data_source in page.get('dataSourceSummaries', []):
+                data_source_id = data_source['dataSourceId']
+                jobs = client.list_ingestion_jobs(
+                    knowledgeBaseId=knowledge_base_id,
+                    dataSourceId=data_source_id,
+                    filters=[{'attribute': 'STATUS', 'operator': 'EQ', 'values': ['COMPLETE']}],
+                    sortBy={'attribute': 'STARTED_AT', 'order': 'DESCENDING'},
+                    maxResults=1
+                ).get('ingestionJobSummaries', [])
+                latest = jobs[0] if jobs else {}
+                ingestions.append(f"{data_source_id}:{latest.get('ingestionJobId', 'none')}:{latest.get('updatedAt', '')}")
+
+        version = hashlib.sha256('|'.join(sorted(ingestions)).encode('utf-8')).hexdigest()[:16]
+        _kb_version_cache[knowledge_base_id] = (version, time.time())
+        logger.info(f"RESPONSE_CACHE: Knowledge base {knowledge_base_id} ingestion version {version} ({len(ingestions)} data sources)")
+        return version
+
+    except Exception as e:
+        logger.warning(f"RESPONSE_CACHE: Could not determine ingestion version for knowledge base {knowledge_base_id}: {e}")
+        return None
+
+
+def build_response_cache_key(
+    stage: str,
+    content: List[bytes],
+    prompt_layers: List[str],
+    output_schema: Dict[str, Any],
+    terms_profile: Optional[str],
+    model_id: str,
+    kb_version: str
+) -> str:
+    """
+    Build the S3 key for a cached model response.
+
+    Args:
+        stage: Workflow stage ('analyze_structure' or 'identify_conflicts')
+        content: Per-chunk inputs sent to the model (chunk payload, chunk/KB context text)
+        prompt_layers: Static system prompt layers
+        output_schema: JSON schema of the pydantic output model
+        terms_profile: Selected terms profile
+        model_id: Bedrock model ID
+        kb_version: Knowledge base ingestion version
+
+    Returns:
+        S3 key under RESPONSE_CACHE_PREFIX
+    """
+    content_hash = hashlib.sha256()
+    for part in content:
+        content_hash.update(hashlib.sha256(part).digest())
+
+    prompt_hash = hashlib.sha256()
+    for layer in prompt_layers:
+        prompt_hash.update(hashlib.sha256(layer.encode('utf-8')).digest())
+    prompt_hash.update(json.dumps(output_schema, sort_keys=True).encode('utf-8'))
+
+    key_material = json.dumps({
+        'cache_version': RESPONSE_CACHE_VERSION,
+        'content': content_hash.hexdigest(),
+        'prompt_version': prompt_hash.hexdigest(),
+        'terms_profile': terms_profile or '',
+        'model_id': model_id,
+        'kb_version': kb_version
+    }, sort_keys=True)
+    return f"{RESPONSE_CACHE_PREFIX}/{stage}/{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}.json"
+
+
+def get_cached_response(bucket: str, cache_key: str) -> Optional[str]:
+    """
+    Load a cached response if present and not expired.
+
+    Args:
+        bucket: S3 bucket name
+        cache_key: Key from build_response_cache_key
+
+    Returns:
+        Cached output JSON, or None on a miss
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=cache_key)
+        expires_at = float(response.get('Metadata', {}).get('expires-at', 0))
+        if expires_at and expires_at < time.time():
+            logger.info(f"RESPONSE_CACHE: Expired entry {cache_key}")
+            return None
+        return response['Body'].read().decode('utf-8')
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    except Exception as e:
+        logger.warning(f"RESPONSE_CACHE: Lookup failed for {cache_key}, calling the model: {e}")
+        return None
+
+
+def put_cached_response(bucket: str, cache_key: str, output_json: str, job_id: Optional[str] = None) -> bool:
+    """
+    Store a validated response.
+
+    Args:
+        bucket: S3 bucket name
+        cache_key: Key from build_response_cache_key
+        output_json: Validated output model JSON
+        job_id: Job that produced the response (for tracing)
+
+    Returns:
+        True if stored, False otherwise
+    """
+    try:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=cache_key,
+            Body=output_json.encode('utf-8'),
+            ContentType='application/json',
+            Metadata={
+                'expires-at': str(int(time.time() + constants.RESPONSE_CACHE_TTL_DAYS * 86400)),
+                'job-id': job_id or ''
+            }
+        )
+        return True
+    except Exception as e:
+        # A failed cache write never fails the chunk
+        logger.warning(f"RESPONSE_CACHE: Could not store {cache_key}: {e}")
+        return False
+
+
+def response_cache_bucket() -> Optional[str]:
+    """Bucket holding cached responses, or None when response caching is disabled."""
+    if not constants.RESPONSE_CACHE_ENABLED:
+        return None
+    return os.environ.get('AGENT_PROCESSING_BUCKET')
@@ -0,0 +1,214 @@
+"""
+Two-tier cache for knowledge base retrievals.
+A bounded in-process LRU serves repeated queries within a warm Lambda container; a shared
+S3 tier under retrieval_cache/ in the agent processing bucket serves them across containers
+and jobs, so the many jobs asking near-identical questions skip bedrock-agent-runtime retrieve.
+
+Keys combine the knowledge base ID, terms profile, normalized query text, number of results
+and the knowledge base ingestion version (response_cache.get_kb_ingestion_version), so a
+completed ingestion job after sync_knowledge_base produces new keys and stale entries are
+never read again. Shared entries expire through the bucket's lifecycle rule and are also
+checked against their expiry on read.
+"""
+
+import re
+import json
+import hashlib
+import logging
+import os
+import sys
+import time
+import threading
+import boto3
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from .response_cache import get_kb_ingestion_version
+
+# Import constants - add parent directories to path
+_parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+try:
+    import constants
+except ImportError:
+    # Fallback if constants not available
+    class Constants:
+        RETRIEVAL_CACHE_ENABLED = True
+        RETRIEVAL_CACHE_TTL_DAYS = 7
+        RETRIEVAL_CACHE_MAX_ENTRIES = 512
+    constants = Constants()
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+s3_client = boto3.client('s3')
+
+RETRIEVAL_CACHE_PREFIX = "retrieval_cache"  # Must match the lifecycle rule on the agent processing bucket
+RETRIEVAL_CACHE_VERSION = 1  # Bump to invalidate every entry (e.g. when relevance filtering changes)
+
+_QUERY_WHITESPACE = re.compile(r'\s+')
+_QUERY_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and punctuation-insensitive form of a query for cache keys."""
+    return _QUERY_PUNCTUATION.sub('', _QUERY_WHITESPACE.sub(' ', query.lower().strip()))
+
+
+class RetrievalCache:
+    """
+    In-process LRU in front of the shared S3 tier.
+
+    Entries hold the relevance-filtered results of a retrieval (before per-job deduplication
+    and chunking) and the number of raw results retrieve returned. All methods are
+    thread-safe; retrieve_all_kb_queries runs queries from a thread pool.
+    """
+
+    def __init__(self, max_entries: int = 512, bucket: Optional[str] = None):
+        """
+        Args:
+            max_entries: Entries kept in the in-process LRU
+            bucket: S3 bucket for the shared tier (None = in-process only)
+        """
+        self.max_entries = max_entries
+        self.bucket = bucket
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0}
+
+    def build_key(self, knowledge_base_id: str, terms_profile: Optional[str], query: str, number_of_results: int) -> Optional[str]:
+        """
+        Build the cache key of a retrieval.
+
+        Args:
+            knowledge_base_id: Bedrock knowledge base ID
+            terms_profile: Terms profile used for relevance filtering
+            query: Query text
+            number_of_results: numberOfResults sent to retrieve
+
+        Returns:
+            Key (S3 object key of the shared tier), or None if the ingestion version is unknown (bypass caching)
+        """
+        kb_version = get_kb_ingestion_version(knowledge_base_id)
+        if not kb_version:
+            self._count('bypassed')
+            return None
+        key_material = json.dumps({
+            'cache_version': RETRIEVAL_CACHE_VERSION,
+            'knowledge_base_id': knowledge_base_id,
+            'terms_profile': terms_profile or '',
+            'query': normalize_query(query),
+            'number_of_results': number_of_results,
+            'kb_version': kb_version
+        }, sort_keys=True)
+        return f"{RETRIEVAL_CACHE_PREFIX}/{knowledge_base_id}/{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached retrieval, first in process, then in the shared tier.
+
+        Args:
+            key: Key from build_key
+
+        Returns:
+            Copy of the entry ({'raw_results_retrieved', 'results'}), or None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['local_hits'] += 1
+                return _copy_entry(self._entries[key])
+
+        entry = self._get_shared(key)
+        if entry is None:
+            self._count('misses')
+            return None
+        self._put_local(key, entry)
+        self._count('shared_hits')
+        return _copy_entry(entry)
+
+    def put(self, key: str, raw_results_retrieved: int, results: List[Dict[str, Any]]):
+        """
+        Store a retrieval in both tiers.
+
+        Args:
+            key: Key from build_key
+            raw_results_retrieved: Results returned by retrieve before filtering
+            results: Relevance-filtered retrieval results
+        """
+        entry = {'raw_results_retrieved': raw_results_retrieved, 'results': results}
+        self._put_local(key, _copy_entry(entry))
+        self._count('stores')
+        if not self.bucket:
+            return
+        try:
+            s3_client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=json.dumps(entry, default=str).encode('utf-8'),
+                ContentType='application/json',
+                Metadata={'expires-at': str(int(time.time() + constants.RETRIEVAL_CACHE_TTL_DAYS * 86400))}
+            )
+        except Exception as e:
+            # A failed cache write never fails the retrieval
+            logger.warning(f"RETRIEVAL_CACHE: Could not store {key}: {e}")
+
+    def clear(self):
+        """Drop the in-process tier (the shared tier is invalidated by ingestion version and lifecycle rule)."""
+        with self._lock:
+            self._entries.clear()
+
+    def statistics(self) -> Dict[str, Any]:
+        """Hit, miss and size counters for this container."""
+        with self._lock:
+            stats = dict(self._stats, local_entries=len(self._entries))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _get_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.bucket:
+            return None
+        try:
+            response = s3_client.get_object(Bucket=self.bucket, Key=key)
+            expires_at = float(response.get('Metadata', {}).get('expires-at', 0))
+            if expires_at and expires_at < time.time():
+                return None
+            return json.loads(response['Body'].read().decode('utf-8'))
+        except s3_client.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            logger.warning(f"RETRIEVAL_CACHE: Lookup failed for {key}, calling retrieve: {e}")
+            return None
+
+    def _put_local(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+
+def _copy_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy an entry so callers can modify its results without touching the cached ones."""
+    return dict(entry, results=[dict(result) for result in entry['results']])
+
+
+_retrieval_cache = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Get this container's retrieval cache, or None when retrieval caching is disabled."""
+    global _retrieval_cache
+    if not constants.RETRIEVAL_CACHE_ENABLED:
+        return None
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache(constants.RETRIEVAL_CACHE_MAX_ENTRIES, os.environ.get('AGENT_PROCESSING_BUCKET'))
+        return _retrieval_cache
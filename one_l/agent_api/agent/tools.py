@@ -11,12 +11,23 @@ import logging
 import re
 import time
 import hashlib
+import difflib
+import itertools
 import unicodedata
-from typing import Dict, Any, List, Optional
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
 from collections import defaultdict
+from functools import lru_cache
 from docx import Document
 from docx.shared import RGBColor, Pt, Inches
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 import io
+import copy
+from array import array
+from .json_extractor import extract_json
+from .retrieval_cache import get_retrieval_cache
+from .dedup_index import DedupIndex
 
 # Pydantic models for output validation
 try:
@@ -44,6 +55,7 @@ if PYDANTIC_AVAILABLE:
         clause_ref: str = Field(default="N/A", description="Specific section or 'N/A' if not applicable")
         conflict_type: str = Field(..., description="adds/deletes/modifies/contradicts/omits required/reverses obligation")
         rationale: str = Field(..., description="≤50 words on legal impact")
+        anchor: Optional[Dict[str, Any]] = Field(default=None, description="Location of vendor_quote in the chunked document text, set by identify_conflicts")
         
         @field_validator('source_doc')
         @classmethod
@@ -100,36 +112,28 @@ BASE_DELAY = 1.0
 MAX_DELAY = 32.0
 BACKOFF_MULTIPLIER = 2.0
 
-# Global cache for session-based deduplication
-_content_cache = {}
-_query_cache = {}
+# Fuzzy quote index (hash-sampled character n-grams) for partial and cross-paragraph matching
+FUZZY_SHINGLE_SIZE = 5  # Characters per shingle
+FUZZY_SAMPLE_MODULUS = 4  # Keep shingles whose hash % modulus == 0 (consistent sample for doc and quote)
+FUZZY_MIN_QUOTE_SAMPLES = 3  # Shorter quotes fall back to scanning every paragraph
+FUZZY_MAX_WINDOW = 10  # Max consecutive non-empty paragraphs in a candidate span
+FUZZY_STOP_SHINGLE_RATIO = 0.2  # Shingles in more than this share of paragraphs are not indexed
+FUZZY_CANDIDATE_MIN_SIMILARITY = 0.5  # Floor for candidate spans checked by the partial/cross-paragraph tiers
+FUZZY_MATCH_MIN_SIMILARITY = 0.9  # Floor for accepting a fuzzy-only match when every exact tier fails
+FUZZY_MATCH_MAX_SPANS = 5  # Candidate spans aligned against the document text for a fuzzy-only match
+FUZZY_ALIGN_MAX_GAP = 20  # Document characters not in the quote that split an alignment into separate runs
+FUZZY_EDGE_MIN_COVERAGE = 0.8  # Share of each paragraph a fuzzy cross-paragraph alignment must cover (they are redlined whole)
+
+# Parsed-document sidecar written by split_document and reused by the redline stage
+PARSED_DOCUMENT_VERSION = 1  # Bump when the serialized layout or normalization tiers change
 
 def _calculate_content_signature(text: str) -> str:
-    """Calculate semantic signature for deduplication."""
+    """Calculate a short signature of normalized text (used as the query hash in retrieval metrics)."""
     # Normalize text for consistent comparison
     normalized = re.sub(r'\s+', ' ', text.lower().strip())
     normalized = re.sub(r'[^\w\s]', '', normalized)
     return hashlib.sha256(normalized.encode()).hexdigest()[:16]
 
-def _is_duplicate_content(text: str, threshold: float = DEDUPLICATION_THRESHOLD) -> bool:
-    """Check if content is duplicate using semantic similarity."""
-    signature = _calculate_content_signature(text)
-    
-    if signature in _content_cache:
-        return True
-    
-    # Simple similarity check with existing content signatures
-    # Create a list of keys to iterate over to avoid "dictionary changed size during iteration" error
-    # when multiple threads access the cache concurrently
-    existing_signatures = list(_content_cache.keys())
-    for existing_sig in existing_signatures:
-        matches = sum(c1 == c2 for c1, c2 in zip(signature, existing_sig) if len(signature) == len(existing_sig))
-        if len(existing_sig) > 0 and matches / len(existing_sig) > threshold:
-            return True
-    
-    _content_cache[signature] = text
-    return False
-
 def _chunk_content_intelligently(text: str, max_size: int = MAX_CHUNK_SIZE) -> List[str]:
     """Intelligently chunk content preserving semantic boundaries."""
     if len(text) <= max_size * 4:  # Approximate token conversion (4 chars = 1 token)
@@ -153,387 +157,187 @@ def _chunk_content_intelligently(text: str, max_size: int = MAX_CHUNK_SIZE) -> L
     
     return chunks
 
+# Terms profile classification of retrieved reference documents: documents from the selected
+# terms bucket are boosted, documents from the other terms buckets are excluded
+TERMS_BUCKET_PATTERNS = {
+    'general_terms': [
+        'general-terms',  # Bucket name segment
+        'general_terms',  # Alternative format
+        'onel-prod-general-terms',  # Full bucket name (stack prefix)
+        'form_commonwealth-terms-and-conditions'  # Document filename pattern
+    ],
+    'it_terms_updated': [
+        'it-terms-updated',  # Bucket name segment
+        'it_terms_updated',  # Alternative format
+        'onel-prod-it-terms-updated',  # Full bucket name (stack prefix)
+        'Updated IT Terms'  # Document filename pattern
+    ],
+    'it_terms_old': [
+        'it-terms-old',  # Bucket name segment
+        'it_terms_old',  # Alternative format
+        'onel-prod-it-terms-old'  # Full bucket name (stack prefix)
+    ]
+}
+TERMS_FULL_BUCKET_PREFIX = 'onel-prod-'  # Patterns with this prefix must equal the bucket name; others match a substring of it
+TERMS_FILENAME_PATTERNS = ('form_commonwealth-terms-and-conditions', 'updated it terms')  # Only these patterns are matched against filenames
+TERMS_BOOST = 0.1  # Score boost for documents of the selected terms profile
+TERMS_CLASSIFICATION_CACHE_SIZE = 4096  # Memoized (profile, source) classifications per container
+TERMS_DIAGNOSTICS_SAMPLE_EVERY = 200  # Log per-document diagnostics for every Nth filtered retrieval (0 = only at DEBUG)
+
+_terms_diagnostics_counter = itertools.count(1)
+
+def _compile_terms_patterns(patterns: List[str]) -> Dict[str, Any]:
+    """Compile terms bucket patterns into bucket, key and filename matchers (None = nothing to match)."""
+    lowered = [pattern.lower() for pattern in patterns]
+    substrings = [pattern for pattern in lowered if not pattern.startswith(TERMS_FULL_BUCKET_PREFIX)]
+    filenames = [pattern for pattern in lowered if pattern in TERMS_FILENAME_PATTERNS]
+    
+    def alternation(values):
+        return re.compile('|'.join(re.escape(value) for value in values)) if values else None
+    
+    return {
+        'full_buckets': frozenset(pattern for pattern in lowered if pattern.startswith(TERMS_FULL_BUCKET_PREFIX)),
+        'bucket': alternation(substrings),
+        'key': alternation(lowered),
+        'filename': alternation(filenames)
+    }
+
+@lru_cache(maxsize=None)
+def _compiled_terms_profile(terms_profile: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Compiled (allowed, excluded) matchers of a terms profile; excluded are the other profiles' patterns."""
+    allowed_patterns = TERMS_BUCKET_PATTERNS.get(terms_profile, [])
+    excluded_patterns = [pattern for profile, patterns in TERMS_BUCKET_PATTERNS.items() if profile != terms_profile for pattern in patterns]
+    return _compile_terms_patterns(allowed_patterns), _compile_terms_patterns(excluded_patterns)
+
+def _matches_terms_patterns(matchers: Dict[str, Any], bucket: str, s3_key: str, filename: str) -> bool:
+    """Match a document by priority: S3 bucket name (most reliable), then S3 key path, then specific filenames."""
+    if bucket and (bucket in matchers['full_buckets'] or (matchers['bucket'] and matchers['bucket'].search(bucket))):
+        return True
+    if s3_key and matchers['key'] and matchers['key'].search(s3_key):
+        return True
+    return bool(filename and matchers['filename'] and matchers['filename'].search(filename))
+
+@lru_cache(maxsize=TERMS_CLASSIFICATION_CACHE_SIZE)
+def _classify_terms_source(terms_profile: Optional[str], s3_uri: str, s3_key: str, source: str) -> Tuple[str, str]:
+    """
+    Classify a retrieved document's source against a terms profile.
+    
+    Args:
+        terms_profile: Selected terms profile, or None
+        s3_uri: Lowercased S3 URI of the document (s3://bucket-name/path/to/file.pdf)
+        s3_key: Lowercased S3 key of the document
+        source: Lowercased source name of the document
+        
+    Returns:
+        Tuple of (decision, bucket label); decision is 'selected' (boosted), 'excluded' (another
+        profile's terms document) or 'other' (kept without boost)
+    """
+    bucket = s3_uri.split('/')[2] if s3_uri.startswith('s3://') and len(s3_uri.split('/')) > 2 else ''
+    if 'general-terms' in bucket or 'general_terms' in bucket:
+        bucket_label = 'general-terms'
+    elif 'it-terms-updated' in bucket or 'it_terms_updated' in bucket:
+        bucket_label = 'it-terms-updated'
+    elif 'it-terms-old' in bucket or 'it_terms_old' in bucket:
+        bucket_label = 'it-terms-old'
+    else:
+        bucket_label = bucket or 'unknown'
+    
+    if not terms_profile:
+        return 'other', bucket_label
+    
+    # A document of the selected terms bucket is never excluded, even if it also matches another profile's patterns
+    allowed, excluded = _compiled_terms_profile(terms_profile)
+    filename = os.path.basename(source) if source else ''
+    if _matches_terms_patterns(allowed, bucket, s3_key, filename):
+        return 'selected', bucket_label
+    if _matches_terms_patterns(excluded, bucket, s3_key, filename):
+        return 'excluded', bucket_label
+    return 'other', bucket_label
+
 def _filter_and_prioritize_results(results: List[Dict], max_results: int, terms_profile: str = None) -> List[Dict]:
     """Filter results by relevance and prioritize for optimal context usage.
     
+    Each result is classified once against the terms profile (compiled patterns, memoized per
+    source): documents of other terms profiles are dropped and documents of the selected profile
+    get a TERMS_BOOST score boost. Per-document diagnostics are logged at DEBUG or for every
+    TERMS_DIAGNOSTICS_SAMPLE_EVERY-th call; otherwise only a summary is logged.
+    
     Args:
         results: List of retrieval results
         max_results: Maximum number of results to return
         terms_profile: Optional terms profile ('general_terms', 'it_terms_updated', 'it_terms_old') for filtering
     """
-    import os
-    
-    # Filter by minimum relevance score
-    filtered_results = [
-        r for r in results 
-        if r.get('score', 0) >= MIN_RELEVANCE_SCORE
-    ]
-    
-    # Map terms_profile to bucket name patterns (defined early for use in sorting)
-    terms_bucket_patterns = {
-        'general_terms': [
-            'general-terms',  # Bucket name segment
-            'general_terms',  # Alternative format
-            'onel-prod-general-terms',  # Full bucket name (stack prefix)
-            'form_commonwealth-terms-and-conditions'  # Document filename pattern
-        ],
-        'it_terms_updated': [
-            'it-terms-updated',  # Bucket name segment
-            'it_terms_updated',  # Alternative format
-            'onel-prod-it-terms-updated',  # Full bucket name (stack prefix)
-            'Updated IT Terms'  # Document filename pattern
-        ],
-        'it_terms_old': [
-            'it-terms-old',  # Bucket name segment
-            'it_terms_old',  # Alternative format
-            'onel-prod-it-terms-old'  # Full bucket name (stack prefix)
-        ]
-    }
-    
-    # Filter by terms profile if specified
-    if not terms_profile:
-        logger.debug(f"TERMS_FILTER: No terms_profile provided, skipping filtering (terms_profile={terms_profile})")
-    
-    if terms_profile:
-        logger.info(f"TERMS_FILTER_START: Applying filter for terms_profile={terms_profile}, total_results={len(filtered_results)}")
-        
-        # Get allowed patterns for selected terms profile
-        allowed_patterns = terms_bucket_patterns.get(terms_profile, [])
-        
-        # Get excluded patterns (other terms buckets)
-        excluded_patterns = []
-        for profile, patterns in terms_bucket_patterns.items():
-            if profile != terms_profile:
-                excluded_patterns.extend(patterns)
-        
-        logger.info(f"TERMS_FILTER_INFO: Selected profile '{terms_profile}' allows patterns: {allowed_patterns}")
-        logger.info(f"TERMS_FILTER_INFO: Excluding patterns from other profiles: {excluded_patterns}")
-        
-        # Log document sources before filtering for debugging
-        if filtered_results:
-            source_buckets = {}
-            for r in filtered_results[:10]:  # Log first 10 for brevity
-                location = r.get('location', {})
-                s3_location = location.get('s3Location', {})
-                s3_uri = s3_location.get('uri', '')
-                source = r.get('source', '')
-                bucket_name = 'unknown'
-                if s3_uri:
-                    # Extract bucket name from S3 URI (s3://bucket-name/...)
-                    if 's3://' in s3_uri:
-                        bucket_name = s3_uri.split('/')[2] if len(s3_uri.split('/')) > 2 else 'unknown'
-                elif 'general-terms' in source.lower() or 'general_terms' in source.lower():
-                    bucket_name = 'general-terms'
-                elif 'it-terms-updated' in source.lower() or 'it_terms_updated' in source.lower():
-                    bucket_name = 'it-terms-updated'
-                elif 'it-terms-old' in source.lower() or 'it_terms_old' in source.lower():
-                    bucket_name = 'it-terms-old'
-                
-                source_buckets[bucket_name] = source_buckets.get(bucket_name, 0) + 1
-            
-            logger.info(f"TERMS_FILTER_INFO: Document sources before filtering (sample): {source_buckets}")
-        
-        # Filter out documents from non-selected terms buckets
-        # Use same priority-based matching as boost logic to avoid false exclusions
-        if excluded_patterns:
-            filtered_by_terms = []
-            excluded_count = 0
-            excluded_sources = {}
-            included_sources = {}
-            
-            for r in filtered_results:
-                location = r.get('location', {})
-                s3_location = location.get('s3Location', {})
-                s3_uri = s3_location.get('uri', '').lower()
-                s3_key = s3_location.get('key', '').lower()
-                
-                # Extract bucket name from S3 URI (format: s3://bucket-name/path/to/file.pdf)
-                bucket_name_from_uri = ''
-                if s3_uri and s3_uri.startswith('s3://'):
-                    try:
-                        bucket_name_from_uri = s3_uri.split('/')[2] if len(s3_uri.split('/')) > 2 else ''
-                    except:
-                        bucket_name_from_uri = ''
-                
-                # Log first few documents for debugging
-                if len(filtered_by_terms) < 3:
-                    logger.debug(f"TERMS_MATCH_DEBUG: Document - bucket_from_uri: '{bucket_name_from_uri}', s3_uri: '{s3_uri[:100] if s3_uri else 'N/A'}', s3_key: '{s3_key[:80] if s3_key else 'N/A'}'")
-                
-                # FIRST: Check if this document matches the ALLOWED patterns (selected terms bucket)
-                # If it matches allowed patterns, it should NEVER be excluded
-                matches_allowed = False
-                if bucket_name_from_uri:
-                    bucket_lower = bucket_name_from_uri.lower()
-                    for pattern in allowed_patterns:
-                        pattern_lower = pattern.lower()
-                        # For full bucket name patterns (starting with 'onel-prod-'), use exact match
-                        # For partial patterns (like 'it-terms-old'), use substring match
-                        if pattern_lower.startswith('onel-prod-'):
-                            if bucket_lower == pattern_lower:
-                                matches_allowed = True
-                                if len(filtered_by_terms) < 3:
-                                    logger.debug(f"TERMS_MATCH_DEBUG: Bucket '{bucket_name_from_uri}' EXACT MATCHED allowed pattern '{pattern}'")
-                                break
-                        else:
-                            if pattern_lower in bucket_lower:
-                                matches_allowed = True
-                                if len(filtered_by_terms) < 3:
-                                    logger.debug(f"TERMS_MATCH_DEBUG: Bucket '{bucket_name_from_uri}' SUBSTRING MATCHED allowed pattern '{pattern}'")
-                                break
-                    if not matches_allowed and len(filtered_by_terms) < 3:
-                        logger.debug(f"TERMS_MATCH_DEBUG: Bucket '{bucket_name_from_uri}' did not match any allowed patterns {allowed_patterns}")
-                
-                # Priority 2: Check S3 key path if bucket didn't match
-                if not matches_allowed and s3_key:
-                    matches_allowed = any(pattern.lower() in s3_key for pattern in allowed_patterns)
-                    if matches_allowed:
-                        logger.debug(f"TERMS_MATCH_DEBUG: S3 key '{s3_key[:80]}' MATCHED allowed patterns {allowed_patterns}")
-                
-                # Priority 3: Check specific filename patterns (only for exact matches)
-                if not matches_allowed:
-                    source = r.get('source', '').lower()
-                    filename_lower = os.path.basename(source) if source else ''
-                    specific_filename_patterns = [
-                        'form_commonwealth-terms-and-conditions',
-                        'updated it terms'
-                    ]
-                    for pattern in allowed_patterns:
-                        if pattern.lower() in specific_filename_patterns:
-                            if pattern.lower() in filename_lower:
-                                matches_allowed = True
-                                break
-                
-                # Only exclude if it doesn't match allowed patterns AND matches excluded patterns
-                is_excluded = False
-                if not matches_allowed:
-                    bucket_lower = bucket_name_from_uri.lower() if bucket_name_from_uri else ''
-                    # Priority 1: Check S3 bucket name (most reliable)
-                    if bucket_lower:
-                        for pattern in excluded_patterns:
-                            pattern_lower = pattern.lower()
-                            # For full bucket name patterns (starting with 'onel-prod-'), use exact match
-                            # For partial patterns (like 'it-terms-old'), use substring match
-                            if pattern_lower.startswith('onel-prod-'):
-                                if bucket_lower == pattern_lower:
-                                    is_excluded = True
-                                    break
-                            else:
-                                if pattern_lower in bucket_lower:
-                                    is_excluded = True
-                                    break
-                    
-                    # Priority 2: Check S3 key path if bucket didn't match
-                    if not is_excluded and s3_key:
-                        is_excluded = any(pattern.lower() in s3_key for pattern in excluded_patterns)
-                    
-                    # Priority 3: Check specific filename patterns (only for exact matches)
-                    if not is_excluded:
-                        source = r.get('source', '').lower()
-                        filename_lower = os.path.basename(source) if source else ''
-                        specific_filename_patterns = [
-                            'form_commonwealth-terms-and-conditions',
-                            'updated it terms'
-                        ]
-                        for pattern in excluded_patterns:
-                            if pattern.lower() in specific_filename_patterns:
-                                if pattern.lower() in filename_lower:
-                                    is_excluded = True
-                                    break
-                
-                if not is_excluded:
-                    filtered_by_terms.append(r)
-                    # Track included sources using bucket name
-                    bucket_key = 'unknown'
-                    if 'general-terms' in bucket_name_from_uri or 'general_terms' in bucket_name_from_uri:
-                        bucket_key = 'general-terms'
-                    elif 'it-terms-updated' in bucket_name_from_uri or 'it_terms_updated' in bucket_name_from_uri:
-                        bucket_key = 'it-terms-updated'
-                    elif 'it-terms-old' in bucket_name_from_uri or 'it_terms_old' in bucket_name_from_uri:
-                        bucket_key = 'it-terms-old'
-                    elif bucket_name_from_uri:
-                        bucket_key = bucket_name_from_uri  # Use actual bucket name if not a terms bucket
-                    included_sources[bucket_key] = included_sources.get(bucket_key, 0) + 1
-                else:
-                    excluded_count += 1
-                    # Track excluded sources using bucket name
-                    bucket_key = 'unknown'
-                    if 'general-terms' in bucket_name_from_uri or 'general_terms' in bucket_name_from_uri:
-                        bucket_key = 'general-terms'
-                    elif 'it-terms-updated' in bucket_name_from_uri or 'it_terms_updated' in bucket_name_from_uri:
-                        bucket_key = 'it-terms-updated'
-                    elif 'it-terms-old' in bucket_name_from_uri or 'it_terms_old' in bucket_name_from_uri:
-                        bucket_key = 'it-terms-old'
-                    excluded_sources[bucket_key] = excluded_sources.get(bucket_key, 0) + 1
-                    source = r.get('source', '')
-                    logger.debug(f"TERMS_FILTER_EXCLUDE: Excluding document - source: {source[:80]}, bucket: {bucket_name_from_uri}, s3_uri: {s3_uri[:80] if s3_uri else 'N/A'}")
-            
-            logger.info(f"TERMS_FILTER_RESULT: Excluded {excluded_count} documents from non-selected terms buckets")
-            logger.info(f"TERMS_FILTER_RESULT: Excluded sources breakdown: {excluded_sources}")
-            logger.info(f"TERMS_FILTER_RESULT: Included sources breakdown: {included_sources}")
-            logger.info(f"TERMS_FILTER_RESULT: After filtering: {len(filtered_by_terms)} documents remain (selected: {terms_profile})")
-            
-            filtered_results = filtered_by_terms
-        else:
-            logger.info(f"TERMS_FILTER_RESULT: No excluded patterns, keeping all {len(filtered_results)} documents")
-    
-    # Sort by score (descending), then prioritize selected terms documents, then by document name (ascending) for deterministic ordering
-    def sort_key(result: Dict) -> tuple:
+    # Filter by minimum relevance score and terms profile in one pass
+    kept_results = []
+    included_sources = defaultdict(int)
+    excluded_sources = defaultdict(int)
+    excluded_results = []
+    for result in results:
         score = result.get('score', 0)
-        # Extract filename from source for consistent sorting
-        source = result.get('source', '')
-        # Extract just the filename if source is a path
-        filename = os.path.basename(source) if source else ''
-        filename_lower = filename.lower()
-        
-        # Check if this document matches the selected terms profile
-        # Prioritize S3 bucket/path matching over filename to avoid false matches
-        # (e.g., "reference standard contract terms and conditions.pdf" should NOT match)
-        is_selected_terms = False
-        if terms_profile:
-            location = result.get('location', {})
-            s3_location = location.get('s3Location', {})
-            s3_uri = s3_location.get('uri', '').lower()
-            s3_key = s3_location.get('key', '').lower()
-            
-            # Extract bucket name from S3 URI (format: s3://bucket-name/path/to/file.pdf)
-            bucket_name_from_uri = ''
-            if s3_uri and s3_uri.startswith('s3://'):
-                try:
-                    # Extract bucket name (everything between s3:// and first /)
-                    bucket_name_from_uri = s3_uri.split('/')[2] if len(s3_uri.split('/')) > 2 else ''
-                except:
-                    bucket_name_from_uri = ''
-            
-            # Get allowed patterns for the selected terms profile
-            allowed_patterns = terms_bucket_patterns.get(terms_profile, [])
-            
-            # Priority 1: Check S3 bucket name (most reliable indicator)
-            # Bucket names like "onel-prod-general-terms" should match "general-terms" pattern
-            if bucket_name_from_uri:
-                bucket_lower = bucket_name_from_uri.lower()
-                bucket_match = False
-                for pattern in allowed_patterns:
-                    pattern_lower = pattern.lower()
-                    # For full bucket name patterns (starting with 'onel-prod-'), use exact match
-                    # For partial patterns (like 'it-terms-old'), use substring match
-                    if pattern_lower.startswith('onel-prod-'):
-                        if bucket_lower == pattern_lower:
-                            bucket_match = True
-                            break
-                    else:
-                        if pattern_lower in bucket_lower:
-                            bucket_match = True
-                            break
-                if bucket_match:
-                    is_selected_terms = True
-                    logger.debug(f"TERMS_MATCH: Matched via bucket name '{bucket_name_from_uri}' with pattern from {terms_profile}")
-            
-            # Priority 2: Check S3 key path (if bucket check didn't match)
-            # Paths like "general-terms/document.pdf" should match
-            if not is_selected_terms and s3_key:
-                key_match = any(pattern.lower() in s3_key for pattern in allowed_patterns)
-                if key_match:
-                    is_selected_terms = True
-                    logger.debug(f"TERMS_MATCH: Matched via S3 key path '{s3_key[:80]}' with pattern from {terms_profile}")
-            
-            # Priority 3: Check specific known filenames (only for exact matches)
-            # This is for documents like "form_commonwealth-terms-and-conditions.pdf"
-            if not is_selected_terms:
-                # Only check specific filename patterns, not generic "terms" patterns
-                specific_filename_patterns = [
-                    'form_commonwealth-terms-and-conditions',  # General terms specific file
-                    'updated it terms'  # IT terms updated specific file
-                ]
-                for pattern in allowed_patterns:
-                    if pattern.lower() in specific_filename_patterns:
-                        # Only match if the pattern appears as a complete word/phrase in the filename
-                        if pattern.lower() in filename_lower:
-                            is_selected_terms = True
-                            logger.debug(f"TERMS_MATCH: Matched via specific filename pattern '{pattern}' in '{filename_lower}'")
-                            break
-            
-            # Log if document was NOT matched (for debugging)
-            if not is_selected_terms and terms_profile:
-                logger.debug(f"TERMS_NO_MATCH: Document '{filename_lower[:80]}' from bucket '{bucket_name_from_uri}' did not match patterns for {terms_profile}")
+        if score < MIN_RELEVANCE_SCORE:
+            continue
         
-        # Boost score for selected terms documents to ensure they appear prominently
-        # Add a small boost (0.1) to selected terms documents so they rank higher
-        # This ensures selected terms docs appear even if other docs have slightly higher scores
-        boost_amount = 0.1 if is_selected_terms else 0.0
-        boosted_score = score + boost_amount
+        s3_location = result.get('location', {}).get('s3Location', {})
+        source = result.get('source', '')
+        decision, bucket_label = _classify_terms_source(
+            terms_profile,
+            s3_location.get('uri', '').lower(),
+            s3_location.get('key', '').lower(),
+            source.lower()
+        )
+        if decision == 'excluded':
+            excluded_sources[bucket_label] += 1
+            excluded_results.append(result)
+            continue
         
-        # Store boosted score in result for logging later
+        is_selected_terms = decision == 'selected'
+        included_sources[bucket_label] += 1
         result['_original_score'] = score
-        result['_boosted_score'] = boosted_score
+        result['_boosted_score'] = score + (TERMS_BOOST if is_selected_terms else 0.0)
         result['_is_selected_terms'] = is_selected_terms
-        
-        # Return tuple: (negative boosted score for descending, filename for deterministic ordering)
-        # The boost ensures selected terms docs come first unless other docs have significantly higher scores
-        return (-boosted_score, filename_lower)
-    
-    sorted_results = sorted(filtered_results, key=sort_key)
-    
-    # Log score boosting and document ranking for debugging
-    if terms_profile and sorted_results:
-        # Count boosted documents
-        boosted_count = sum(1 for r in sorted_results if r.get('_is_selected_terms', False))
-        non_boosted_count = len(sorted_results) - boosted_count
-        logger.info(f"SCORE_BOOST_SUMMARY: {boosted_count} documents boosted for selected profile '{terms_profile}' out of {len(sorted_results)} total documents")
-        logger.info(f"SCORE_BOOST_SUMMARY: {non_boosted_count} documents NOT boosted (may be from other sources or don't match selected profile)")
-        
-        # Log each boosted document
-        if boosted_count > 0:
-            logger.info(f"SCORE_BOOST_DETAILS: Documents that received boost for '{terms_profile}':")
-            for result in sorted_results:
-                if result.get('_is_selected_terms', False):
-                    original_score = result.get('_original_score', result.get('score', 0))
-                    boosted_score = result.get('_boosted_score', original_score)
-                    result_source = result.get('source', 'unknown')
-                    result_location = result.get('location', {})
-                    result_s3_uri = result_location.get('s3Location', {}).get('uri', '')
-                    boost_amount = boosted_score - original_score
-                    logger.info(f"SCORE_BOOST: '{result_source[:100]}' boosted from {original_score:.4f} to {boosted_score:.4f} (+{boost_amount:.4f}) (S3: {result_s3_uri[:80] if result_s3_uri else 'N/A'})")
-        
-        # Log top documents with their scores and ranking
-        top_n = min(15, len(sorted_results))
-        logger.info(f"DOCUMENT_RANKING: Top {top_n} documents after sorting (selected profile: {terms_profile}):")
-        for idx, result in enumerate(sorted_results[:top_n], 1):
-            result_source = result.get('source', 'unknown')
-            original_score = result.get('_original_score', result.get('score', 0))
-            boosted_score = result.get('_boosted_score', original_score)
-            is_selected = result.get('_is_selected_terms', False)
-            boost_indicator = "[BOOSTED]" if is_selected else "[NOT BOOSTED]"
-            result_location = result.get('location', {})
-            result_s3_uri = result_location.get('s3Location', {}).get('uri', '')
-            
-            # Extract bucket name from S3 URI for clarity
-            bucket_name = 'unknown'
-            if result_s3_uri:
-                try:
-                    # Extract bucket from s3://bucket-name/path
-                    bucket_name = result_s3_uri.split('/')[2] if '/' in result_s3_uri else result_s3_uri
-                except:
-                    bucket_name = 'parse_error'
-            
-            boost_indicator = "⭐ BOOSTED" if is_selected else ""
-            logger.info(f"  {idx}. Score: {original_score:.4f} → {boosted_score:.4f} {boost_indicator} | Source: {result_source[:50]} | Bucket: {bucket_name[:40]}")
-        
-        # Log high-scoring non-selected documents to understand why they rank high
-        high_scoring_others = [r for r in sorted_results[:top_n] 
-                              if not r.get('_is_selected_terms', False) and r.get('score', 0) > 0.7]
-        if high_scoring_others:
-            logger.info(f"HIGH_SCORE_ANALYSIS: {len(high_scoring_others)} non-selected documents with scores > 0.7:")
-            for result in high_scoring_others[:5]:  # Log top 5 high-scoring others
-                result_source = result.get('source', 'unknown')
-                result_score = result.get('score', 0)
-                result_location = result.get('location', {})
-                result_s3_uri = result_location.get('s3Location', {}).get('uri', '')
-                bucket_name = result_s3_uri.split('/')[2] if result_s3_uri and '/' in result_s3_uri else 'unknown'
-                logger.info(f"  - Score: {result_score:.4f} | Source: {result_source[:50]} | Bucket: {bucket_name[:40]}")
+        kept_results.append(result)
+    
+    # Sort by boosted score (descending), then by document name (ascending) for deterministic ordering;
+    # the boost puts selected terms documents first unless other documents score significantly higher
+    sorted_results = sorted(kept_results, key=lambda r: (-r['_boosted_score'], os.path.basename(r.get('source', '')).lower()))
+    
+    if terms_profile:
+        boosted_count = sum(1 for r in sorted_results if r['_is_selected_terms'])
+        logger.info(f"TERMS_FILTER_RESULT: profile={terms_profile}, kept={len(sorted_results)}, excluded={len(excluded_results)}, "
+                    f"boosted={boosted_count}, included_sources={dict(included_sources)}, excluded_sources={dict(excluded_sources)}")
+        if TERMS_DIAGNOSTICS_SAMPLE_EVERY and next(_terms_diagnostics_counter) % TERMS_DIAGNOSTICS_SAMPLE_EVERY == 0:
+            _log_terms_diagnostics(logging.INFO, terms_profile, sorted_results, excluded_results)
+        elif logger.isEnabledFor(logging.DEBUG):
+            _log_terms_diagnostics(logging.DEBUG, terms_profile, sorted_results, excluded_results)
     
     # Limit results for optimal performance
     return sorted_results[:min(max_results, OPTIMAL_RESULTS_PER_QUERY)]
 
+def _log_terms_diagnostics(level: int, terms_profile: str, sorted_results: List[Dict], excluded_results: List[Dict]):
+    """Log per-document terms filtering and ranking details of one retrieval."""
+    def bucket_of(result):
+        s3_uri = result.get('location', {}).get('s3Location', {}).get('uri', '')
+        return s3_uri.split('/')[2] if s3_uri.startswith('s3://') and len(s3_uri.split('/')) > 2 else 'unknown'
+    
+    allowed_patterns = TERMS_BUCKET_PATTERNS.get(terms_profile, [])
+    logger.log(level, f"TERMS_FILTER_INFO: Selected profile '{terms_profile}' allows patterns: {allowed_patterns}")
+    for result in excluded_results:
+        logger.log(level, f"TERMS_FILTER_EXCLUDE: Excluded document - source: {result.get('source', '')[:80]}, bucket: {bucket_of(result)}")
+    
+    # Log top documents with their scores and ranking
+    top_n = min(15, len(sorted_results))
+    logger.log(level, f"DOCUMENT_RANKING: Top {top_n} documents after sorting (selected profile: {terms_profile}):")
+    for idx, result in enumerate(sorted_results[:top_n], 1):
+        boost_indicator = "⭐ BOOSTED" if result['_is_selected_terms'] else ""
+        logger.log(level, f"  {idx}. Score: {result['_original_score']:.4f} → {result['_boosted_score']:.4f} {boost_indicator} | Source: {result.get('source', 'unknown')[:50]} | Bucket: {bucket_of(result)[:40]}")
+    
+    # Log high-scoring non-selected documents to understand why they rank high
+    high_scoring_others = [r for r in sorted_results[:top_n] if not r['_is_selected_terms'] and r['_original_score'] > 0.7]
+    if high_scoring_others:
+        logger.log(level, f"HIGH_SCORE_ANALYSIS: {len(high_scoring_others)} non-selected documents with scores > 0.7:")
+        for result in high_scoring_others[:5]:
+            logger.log(level, f"  - Score: {result['_original_score']:.4f} | Source: {result.get('source', 'unknown')[:50]} | Bucket: {bucket_of(result)[:40]}")
+
 def get_tool_definitions() -> List[Dict[str, Any]]:
     """Get tool definitions for Claude in Converse API format."""
     return [
@@ -693,7 +497,9 @@ def retrieve_from_knowledge_base(
     max_results: int = 50,
     knowledge_base_id: str = None,
     region: str = None,
-    terms_profile: str = None
+    terms_profile: str = None,
+    dedup_index: Optional[DedupIndex] = None,
+    dedup_owner: Any = None
 ) -> Dict[str, Any]:
     """
     Intelligently retrieve relevant documents from the knowledge base with optimization.
@@ -710,6 +516,10 @@ def retrieve_from_knowledge_base(
         max_results: Maximum number of results to return
         knowledge_base_id: Knowledge base ID from environment
         region: AWS region
+        terms_profile: Terms profile for relevance filtering
+        dedup_index: Deduplication scope shared with other retrievals (e.g. a query batch); a new
+            index is used for this retrieval alone when omitted
+        dedup_owner: Label of this retrieval in a shared dedup_index (e.g. query_id)
         
     Returns:
         Dictionary containing optimized retrieved documents and metadata
@@ -767,67 +577,78 @@ def retrieve_from_knowledge_base(
                 "results": []
             }
         
-        # Check query cache to avoid duplicate requests in same session
-        # Include knowledge_base_id in cache key to prevent cross-KB cache pollution
-        cache_key = f"{knowledge_base_id}:{_calculate_content_signature(query)}"
-        if cache_key in _query_cache:
-
-            cached_result = _query_cache[cache_key].copy()
-            cached_result["cached"] = True
-            logger.info(f"QUERY_CACHE_HIT: Using cached results for KB={knowledge_base_id}, query_hash={cache_key.split(':')[1]}")
-            return cached_result
-        
-        # Execute retrieval with retry logic
-        retrieval_result = _retrieve_with_retry()
-        
-        if not retrieval_result["success"]:
-            error_response = {
-                "success": False,
-                "error": retrieval_result["error"],
-                "query": query,
-                "results": [],
-                "retry_count": retrieval_result.get("retry_count", 0)
-            }
-            return error_response
-        
-        response = retrieval_result["response"]
-        retry_count = retrieval_result["retry_count"]
-        
-        # Process and optimize the results
-        raw_results = []
-        source_documents = set()
-        for result in response.get('retrievalResults', []):
-            content = result.get('content', {})
-            metadata = result.get('metadata', {})
-            location = result.get('location', {})
+        # Two-tier retrieval cache (in-process LRU, then S3) keyed by KB, terms profile, query,
+        # result count and KB ingestion version; it holds relevance-filtered results, so
+        # deduplication and chunking below still run for every call
+        retrieval_cache = get_retrieval_cache()
+        cache_key = retrieval_cache.build_key(knowledge_base_id, terms_profile, query, max_results) if retrieval_cache else None
+        cached_entry = retrieval_cache.get(cache_key) if cache_key else None
+        
+        if cached_entry:
+            logger.info(f"RETRIEVAL_CACHE: Hit for KB={knowledge_base_id}, query='{query[:100]}' ({cache_key})")
+            raw_results_count = cached_entry["raw_results_retrieved"]
+            filtered_results = cached_entry["results"]
+            retry_count = 0
+        else:
+            # Execute retrieval with retry logic
+            retrieval_result = _retrieve_with_retry()
             
-            # Extract source from multiple possible locations
-            source = _extract_source_from_result(metadata, location)
-            source_documents.add(source)
+            if not retrieval_result["success"]:
+                error_response = {
+                    "success": False,
+                    "error": retrieval_result["error"],
+                    "query": query,
+                    "results": [],
+                    "retry_count": retrieval_result.get("retry_count", 0)
+                }
+                return error_response
             
-            raw_results.append({
-                "text": content.get('text', ''),
-                "score": result.get('score', 0),
-                "source": source,
-                "metadata": metadata,
-                "location": location  # Include location to check S3 URI for bucket name
-            })
-        
-        # Enhanced logging: Track which reference documents were found
-        logger.info(f"KNOWLEDGE_BASE_QUERY: '{query[:100]}...' found {len(raw_results)} results from {len(source_documents)} source documents: {list(source_documents)}")
-        
-        # Apply intelligent filtering and prioritization
-        filtered_results = _filter_and_prioritize_results(raw_results, max_results, terms_profile=terms_profile)
+            response = retrieval_result["response"]
+            retry_count = retrieval_result["retry_count"]
+            
+            # Process and optimize the results
+            raw_results = []
+            source_documents = set()
+            for result in response.get('retrievalResults', []):
+                content = result.get('content', {})
+                metadata = result.get('metadata', {})
+                location = result.get('location', {})
+                
+                # Extract source from multiple possible locations
+                source = _extract_source_from_result(metadata, location)
+                source_documents.add(source)
+                
+                raw_results.append({
+                    "text": content.get('text', ''),
+                    "score": result.get('score', 0),
+                    "source": source,
+                    "metadata": metadata,
+                    "location": location  # Include location to check S3 URI for bucket name
+                })
+            
+            # Enhanced logging: Track which reference documents were found
+            logger.info(f"KNOWLEDGE_BASE_QUERY: '{query[:100]}...' found {len(raw_results)} results from {len(source_documents)} source documents: {list(source_documents)}")
+            
+            # Apply intelligent filtering and prioritization
+            raw_results_count = len(raw_results)
+            filtered_results = _filter_and_prioritize_results(raw_results, max_results, terms_profile=terms_profile)
+            if cache_key:
+                retrieval_cache.put(cache_key, raw_results_count, filtered_results)
         
         # Process results with chunking and deduplication
+        if dedup_index is None:
+            dedup_index = DedupIndex(DEDUPLICATION_THRESHOLD)
         optimized_results = []
-        duplicates_filtered = 0
+        duplicate_counts = {'exact': 0, 'near': 0, 'other_retrieval': 0}
         chunks_created = 0
         
         for result in filtered_results:
-            # Check for duplicate content
-            if _is_duplicate_content(result["text"]):
-                duplicates_filtered += 1
+            # Check for exact or near-duplicate content within the deduplication scope
+            duplicate = dedup_index.check_and_add(result["text"], dedup_owner)
+            if duplicate:
+                duplicate_counts[duplicate['kind']] += 1
+                if duplicate['owner'] != dedup_owner:
+                    duplicate_counts['other_retrieval'] += 1
                 continue
             
             # Apply intelligent chunking for large content
@@ -867,29 +688,27 @@ def retrieve_from_knowledge_base(
             "results_count": len(optimized_results),
             "results": optimized_results,
             "optimization_stats": {
-                "raw_results_retrieved": len(raw_results),
-                "filtered_by_relevance": len(raw_results) - len(filtered_results),
-                "duplicates_filtered": duplicates_filtered,
+                "raw_results_retrieved": raw_results_count,
+                "filtered_by_relevance": raw_results_count - len(filtered_results),
+                "duplicates_filtered": duplicate_counts['exact'] + duplicate_counts['near'],
+                "exact_duplicates": duplicate_counts['exact'],
+                "near_duplicates": duplicate_counts['near'],
+                "duplicates_of_other_retrievals": duplicate_counts['other_retrieval'],
                 "chunks_created": chunks_created,
                 "final_optimized_count": len(optimized_results),
                 "retry_count": retry_count,
                 "avg_relevance_score": sum(r.get('score', 0) for r in optimized_results) / len(optimized_results) if optimized_results else 0,
-                "cache_hit": False
+                "cache_hit": bool(cached_entry)
             },
             "performance_metrics": {
-                "query_hash": cache_key.split(':')[1],  # Extract just the query hash part
+                "query_hash": _calculate_content_signature(query),
                 "cache_key": cache_key,
                 "processing_successful": True,
-                "optimization_ratio": f"{len(optimized_results)}/{len(raw_results)}" if raw_results else "0/0"
+                "optimization_ratio": f"{len(optimized_results)}/{raw_results_count}" if raw_results_count else "0/0"
             }
         }
-        
-        # Cache the result for future use in this session (keyed by KB ID + query)
-        _query_cache[cache_key] = final_response.copy()
-        logger.info(f"QUERY_CACHE_STORE: Cached results for KB={knowledge_base_id}, query_hash={cache_key.split(':')[1]}")
-        
-
-
+        if cached_entry:
+            final_response["cached"] = True
         
         return final_response
         
@@ -911,9 +730,9 @@ def clear_knowledge_base_cache():
     Clear the session cache for knowledge base retrieval.
     Call this between document review sessions to ensure fresh retrievals.
     """
-    global _content_cache, _query_cache
-    _content_cache.clear()
-    _query_cache.clear()
+    retrieval_cache = get_retrieval_cache()
+    if retrieval_cache:
+        retrieval_cache.clear()
 
 
 def get_cache_statistics() -> Dict[str, Any]:
@@ -923,12 +742,13 @@ def get_cache_statistics() -> Dict[str, Any]:
     Returns:
         Dictionary containing cache usage statistics
     """
+    retrieval_cache = get_retrieval_cache()
+    retrieval_stats = retrieval_cache.statistics() if retrieval_cache else {}
     return {
-        "content_cache_size": len(_content_cache),
-        "query_cache_size": len(_query_cache),
+        "query_cache_size": retrieval_stats.get('local_entries', 0),
+        "retrieval_cache": retrieval_stats,
         "cache_memory_usage": {
-            "content_signatures": len(_content_cache),
-            "cached_queries": len(_query_cache)
+            "cached_queries": retrieval_stats.get('local_entries', 0)
         }
     }
 
@@ -938,7 +758,8 @@ def redline_document(
     document_s3_key: str,
     bucket_type: str = "user_documents",
     session_id: str = None,
-    user_id: str = None
+    user_id: str = None,
+    parsed_document: Optional['ParsedDocument'] = None
 ) -> Dict[str, Any]:
     """
     Complete redlining workflow: download document, extract content, apply redlining, upload result.
@@ -950,6 +771,8 @@ def redline_document(
         bucket_type: Type of source bucket (user_documents, knowledge, agent_processing)
         session_id: Session ID for organizing output files
         user_id: User ID for organizing output files
+        parsed_document: Optional parsed-document sidecar from split_document; used for matching
+            only if its content hash matches the downloaded DOCX
         
     Returns:
         Dictionary containing redlined document information and processing results
@@ -1059,7 +882,11 @@ def redline_document(
         
         # DOCX Processing - Original code path
         # Step 2: Download and load the DOCX document
-        doc = _download_and_load_document(agent_processing_bucket, agent_document_key)
+        doc, content_hash = _download_and_load_document(agent_processing_bucket, agent_document_key)
+        
+        if parsed_document is not None and parsed_document.content_hash != content_hash:
+            logger.warning("PARSED_DOCUMENT: Content hash does not match the downloaded document, ignoring sidecar")
+            parsed_document = None
         
         # Debug logging: Log document structure for troubleshooting
         logger.info(f"DOCUMENT_DEBUG: Loaded document with {len(doc.paragraphs)} paragraphs")
@@ -1095,7 +922,7 @@ def redline_document(
         # Step 4: Apply redlining with exact sentence matching
         logger.info(f"REDLINE_APPLY: Starting redlining - {len(redline_items)} conflicts, {len(doc.paragraphs)} paragraphs")
         
-        results = apply_exact_sentence_redlining(doc, redline_items)
+        results = apply_exact_sentence_redlining(doc, redline_items, parsed_document=parsed_document)
         logger.info(f"REDLINE_RESULTS: Matches found: {results['matches_found']}")
         logger.info(f"REDLINE_RESULTS: Failed matches: {len(results.get('failed_matches', []))}")
         logger.info(f"REDLINE_RESULTS: Success rate: {(results['matches_found']/len(redline_items)*100):.1f}%")
@@ -1194,57 +1021,32 @@ def parse_conflicts_for_redlining(analysis_data: str) -> List[Dict[str, str]]:
     explanation = ""
     
     try:
-        # Try to parse as JSON first (new format)
-        import json
-        import re
-        
-        # First, try to find JSON object pattern (new format with explanation and conflicts)
-        json_object_match = re.search(r'\{[\s\S]*"conflicts"[\s\S]*\}', analysis_data)
-        if json_object_match:
-            try:
-                json_str = json_object_match.group(0)
-                parsed_json = json.loads(json_str)
-                
-                # Check if it's the new structure with explanation and conflicts
-                if isinstance(parsed_json, dict) and "conflicts" in parsed_json:
-                    explanation = parsed_json.get("explanation", "")
-                    conflicts_json = parsed_json.get("conflicts", [])
-                    
-                    # Log the explanation
-                    if explanation:
-                        logger.info(f"PARSE_EXPLANATION: {explanation}")
-                    else:
-                        logger.info("PARSE_EXPLANATION: No explanation provided")
-                    
-                    if isinstance(conflicts_json, list):
-                        logger.info(f"PARSE_JSON: Found JSON object with explanation and {len(conflicts_json)} conflicts")
-                    else:
-                        logger.warning(f"PARSE_JSON: Expected conflicts to be a list, got {type(conflicts_json)}")
-                        conflicts_json = []
-                else:
-                    # Not the expected structure, fall through to array parsing
-                    conflicts_json = None
-            except json.JSONDecodeError as e:
-                logger.warning(f"PARSE_JSON_OBJECT_FAILED: Could not parse as JSON object, trying array format: {e}")
-                conflicts_json = None
-        else:
-            conflicts_json = None
-        
-        # If we didn't find the new structure, try to find JSON array pattern (backwards compatibility)
-        if conflicts_json is None:
-            json_match = re.search(r'\[[\s\S]*\]', analysis_data)
-            if json_match:
-                try:
-                    json_str = json_match.group(0)
-                    conflicts_json = json.loads(json_str)
-                    
-                    if isinstance(conflicts_json, list):
-                        logger.info(f"PARSE_JSON: Found JSON array with {len(conflicts_json)} conflicts (backwards compatibility mode)")
-                    else:
-                        conflicts_json = None
-                except json.JSONDecodeError as e:
-                    logger.warning(f"PARSE_JSON_ARRAY_FAILED: Could not parse as JSON array: {e}")
-                    conflicts_json = None
+        # Try to parse as JSON first: the outermost JSON value, preferring an object with conflicts (new format)
+        conflicts_json = None
+        parsed_json = extract_json(analysis_data, prefer_key="conflicts")
+        
+        # Check if it's the new structure with explanation and conflicts
+        if isinstance(parsed_json, dict) and "conflicts" in parsed_json:
+            explanation = parsed_json.get("explanation", "")
+            conflicts_json = parsed_json.get("conflicts", [])
+            
+            # Log the explanation
+            if explanation:
+                logger.info(f"PARSE_EXPLANATION: {explanation}")
+            else:
+                logger.info("PARSE_EXPLANATION: No explanation provided")
+            
+            if isinstance(conflicts_json, list):
+                logger.info(f"PARSE_JSON: Found JSON object with explanation and {len(conflicts_json)} conflicts")
+            else:
+                logger.warning(f"PARSE_JSON: Expected conflicts to be a list, got {type(conflicts_json)}")
+                conflicts_json = []
+        elif isinstance(parsed_json, list):
+            # JSON array format (backwards compatibility)
+            conflicts_json = parsed_json
+            logger.info(f"PARSE_JSON: Found JSON array with {len(conflicts_json)} conflicts (backwards compatibility mode)")
+        elif parsed_json is None:
+            logger.warning("PARSE_JSON_FAILED: No valid JSON object or array found")
         
         # Process conflicts if we found them
         if conflicts_json is not None and isinstance(conflicts_json, list):
@@ -1302,7 +1104,8 @@ def parse_conflicts_for_redlining(analysis_data: str) -> List[Dict[str, str]]:
                                     'source_doc': validated_conflict.source_doc,
                                     'clause_ref': validated_conflict.clause_ref,
                                     'summary': validated_conflict.summary,
-                                    'rationale': validated_conflict.rationale
+                                    'rationale': validated_conflict.rationale,
+                                    'anchor': validated_conflict.anchor
                                 })
                                 validated_count += 1
                                 
@@ -1360,7 +1163,8 @@ def parse_conflicts_for_redlining(analysis_data: str) -> List[Dict[str, str]]:
                                     'source_doc': str(source_doc),
                                     'clause_ref': str(clause_ref),
                                     'summary': str(summary),
-                                    'rationale': str(rationale)
+                                    'rationale': str(rationale),
+                                    'anchor': conflict.get('anchor')
                                 })
                     
                     if PYDANTIC_AVAILABLE and ConflictModel:
@@ -1738,112 +1542,1015 @@ def normalize_for_matching(text: str) -> str:
     return text
 
 
-def apply_exact_sentence_redlining(doc, redline_items: List[Dict[str, str]]) -> Dict[str, Any]:
+# Precompiled patterns for the offset-preserving normalization engine.
+# Together they reproduce the normalize_* helpers so both produce identical text.
+_QUOTE_REPLACEMENTS = [
+    ('\u201C', '"'), ('\u201D', '"'), ('\u201E', '"'), ('\u00AB', '"'), ('\u00BB', '"'),
+    ('\u2018', "'"), ('\u2019', "'"), ('\u201A', "'"), ('\u2039', "'"), ('\u203A', "'")
+]
+_ESCAPED_QUOTE_PATTERN = re.compile(r'\\(?:"|\'|u0022|u0027)')
+_ESCAPED_QUOTE_REPLACEMENTS = {'\\"': '"', "\\'": "'", '\\u0022': '"', '\\u0027': "'"}
+# Leading whitespace is left to the following collapse, which gives the same text and a much faster scan
+_SUBSECTION_MARKER_PATTERN = re.compile(r'\((?:[a-z]|[ivxlcdm]+|\d+)\)\.?\s*', re.IGNORECASE)
+# Whitespace runs that collapsing would change (a lone ' ' is already collapsed)
+_WHITESPACE_RUN_PATTERN = re.compile(r'\s{2,}|[^\S ]')
+_COMPOUND_HYPHEN_PATTERN = re.compile(r'(?<!\s)-\s+')
+_COMPOUND_DASH_PATTERN = re.compile(r'(?<!\s)[–—]\s+')
+# One group per known word split; the matching group selects the replacement
+_WORD_SPLIT_PATTERN = re.compile(
+    r'\b(?:(Hita)\s+chi|(loss)\s+es|(damage)\s+es|(expense)\s+es|(judgment)\s+s|(settlement)\s+s|'
+    r'(cost)\s+s|(fee)\s+s|(liabilit)\s+(?:(y)|(ies)))\b',
+    re.IGNORECASE
+)
+_WORD_SPLIT_REPLACEMENTS = {
+    1: 'Hitachi', 2: 'losses', 3: 'damages', 4: 'expenses', 5: 'judgments', 6: 'settlements',
+    7: 'costs', 8: 'fees', 10: 'liability', 11: 'liabilities'
+}
+
+
+def _offset_sub(pattern, replacement, text: str, offsets: array) -> Tuple[str, array]:
     """
-    Apply redlining to document with PRECISE matching.
+    Regex substitution that carries the offset map through the rewrite.
     
-    PRECISION APPROACH:
-    - Only redlines EXACT vendor_quote text (with normalization fallbacks)
-    - Handles multiple conflicts in the same paragraph
-    - Comments are anchored to the exact runs containing the text
-    - Duplicates detected by vendor_quote field only
-    - Normalizes: escaped quotes, quote types, whitespace
-    - Supports cross-paragraph matching for text split across paragraphs
+    Kept characters keep their original offsets; replacement characters map to
+    the original offset of the text they replace.
     
     Args:
-        doc: python-docx Document object
-        redline_items: List of conflict items with 'text' (vendor_quote) to highlight
+        pattern: Compiled regex pattern
+        replacement: Fixed replacement string or callable taking the match
+        text: Current text
+        offsets: Offset map for text (len(text) + 1 entries, last is the end sentinel)
         
     Returns:
-        Dictionary with redlining results
+        Tuple of (rewritten text, rewritten offset map)
     """
-    total_conflicts_input = len(redline_items)
-    logger.info(f"APPLY_START: Processing {total_conflicts_input} conflicts across {len(doc.paragraphs)} paragraphs and {len(doc.tables)} tables")
+    parts = []
+    new_offsets = array('I')
+    last_end = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if start > last_end:
+            parts.append(text[last_end:start])
+            new_offsets.extend(offsets[last_end:start])
+        replaced = replacement(match) if callable(replacement) else replacement
+        parts.append(replaced)
+        new_offsets.extend(array('I', [offsets[start]]) * len(replaced))
+        last_end = end
+    if last_end == 0 and not parts:
+        return text, offsets
+    parts.append(text[last_end:])
+    new_offsets.extend(offsets[last_end:])
+    return ''.join(parts), new_offsets
+
+
+def _offset_strip(text: str, offsets: array) -> Tuple[str, array]:
+    """Strip leading/trailing whitespace; a stripped tail moves the end sentinel to its start."""
+    start = len(text) - len(text.lstrip())
+    end = len(text.rstrip())
+    if start == 0 and end == len(text):
+        return text, offsets
+    if end <= start:
+        return '', array('I', [offsets[start]])
+    new_offsets = offsets[start:end]
+    new_offsets.append(offsets[end])
+    return text[start:end], new_offsets
+
+
+def _offset_lower(text: str, offsets: array) -> Tuple[str, array]:
+    """Lowercase text, keeping the offset map aligned when lowercasing changes length."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered, offsets
+    new_offsets = array('I')
+    for i, char in enumerate(text):
+        new_offsets.extend(array('I', [offsets[i]]) * len(char.lower()))
+    new_offsets.append(offsets[len(text)])
+    return lowered, new_offsets
+
+
+def normalize_with_offsets(text: str, for_matching: bool = False) -> Tuple[str, array]:
+    """
+    Normalize text and build its offset map back to the original in one engine.
     
-    try:
-        total_paragraphs = len(doc.paragraphs)
-        failed_matches = []
-        duplicates_skipped = 0
-        empty_skipped = 0
-        
-        # Document structure logging
-        logger.info(f"DOCUMENT_STRUCTURE: Total paragraphs: {total_paragraphs}")
-        
-        # Track seen vendor_quotes for duplicate detection (normalize for comparison)
-        seen_vendor_quotes = set()
+    Without for_matching the result equals
+    normalize_whitespace(normalize_subsection_markers(normalize_quotes(text))).
+    With for_matching it equals normalize_for_matching(text).
+    
+    offsets[i] is the original position of normalized character i, and
+    offsets[len(normalized)] is the original end position, so a normalized span
+    [start, end) maps back as (offsets[start], offsets[end]).
+    
+    Args:
+        text: Original text
+        for_matching: Also unescape quotes and normalize sentence-ending punctuation
         
-        def normalize_vendor_quote_for_dedup(text: str) -> str:
-            """Normalize vendor_quote for duplicate detection."""
-            if not text:
-                return ""
-            return normalize_for_matching(text).lower()
+    Returns:
+        Tuple of (normalized text, array('I') offset map)
+    """
+    offsets = array('I', range(len(text) + 1))
+    if not text:
+        return text, offsets
+    
+    if for_matching and '\\' in text:
+        text, offsets = _offset_sub(_ESCAPED_QUOTE_PATTERN, lambda m: _ESCAPED_QUOTE_REPLACEMENTS[m.group(0)], text, offsets)
+    
+    # Quote replacements are one-to-one so offsets are unchanged
+    if not text.isascii():
+        for curly, ascii_quote in _QUOTE_REPLACEMENTS:
+            text = text.replace(curly, ascii_quote)
+    
+    # Subsection markers, then collapse (normalize_subsection_markers)
+    if '(' in text:
+        text, offsets = _offset_sub(_SUBSECTION_MARKER_PATTERN, ' ', text, offsets)
+    text, offsets = _offset_sub(_WHITESPACE_RUN_PATTERN, ' ', text, offsets)
+    text, offsets = _offset_strip(text, offsets)
+    
+    # Hyphen/dash compounds, known word splits, then collapse (normalize_whitespace)
+    if '-' in text:
+        text, offsets = _offset_sub(_COMPOUND_HYPHEN_PATTERN, '-', text, offsets)
+    if '–' in text or '—' in text:
+        text, offsets = _offset_sub(_COMPOUND_DASH_PATTERN, lambda m: m.group(0)[0], text, offsets)
+    text, offsets = _offset_sub(_WORD_SPLIT_PATTERN, lambda m: _WORD_SPLIT_REPLACEMENTS[m.lastindex], text, offsets)
+    text, offsets = _offset_sub(_WHITESPACE_RUN_PATTERN, ' ', text, offsets)
+    text, offsets = _offset_strip(text, offsets)
+    
+    if for_matching and text and text[-1] == ';':
+        text = text[:-1] + '.'
+    
+    return text, offsets
+
+
+def _original_span(offsets: array, norm_start: int, norm_end: int) -> Tuple[int, int]:
+    """
+    Map a normalized span back to the original text with two index lookups.
+    
+    Args:
+        offsets: Offset map from normalize_with_offsets
+        norm_start: Start position in normalized text
+        norm_end: End position (exclusive) in normalized text
         
-        # PHASE 1: Pre-scan - find all matches for all conflicts
-        # This allows us to handle multiple conflicts per paragraph
-        paragraph_matches = {}  # para_idx -> list of (start_pos, end_pos, comment, vendor_quote, conflict_id)
-        cross_para_matches = []  # List of cross-paragraph matches to handle separately
-        table_cell_matches = []  # List of table cell matches to handle separately
+    Returns:
+        Tuple of (start, end) positions in the original text
+    """
+    last = len(offsets) - 1
+    return offsets[max(0, min(norm_start, last))], offsets[max(0, min(norm_end, last))]
+
+
+def _normalized_span_match(entry: Dict[str, Any], para_idx: int, tier: str, norm_start: int, norm_end: int, match_type: str) -> Dict[str, Any]:
+    """
+    Build a single-paragraph match result from a span in one of the entry's normalized tiers.
+    
+    Args:
+        entry: Indexed paragraph entry from DocumentMatchIndex
+        para_idx: Index of the paragraph
+        tier: Offset map key ('quote_ws', 'quote_ws_lower' or 'fully')
+        norm_start: Start position in the normalized text
+        norm_end: End position (exclusive) in the normalized text
+        match_type: Match type label
         
-        for redline_item in redline_items:
-            vendor_quote = redline_item.get('text', '').strip()
-            
-            if not vendor_quote:
-                logger.warning("SKIP: Empty vendor_quote")
-                empty_skipped += 1
-                continue
-            
-            # Check for duplicates based on vendor_quote only
-            normalized_quote = normalize_vendor_quote_for_dedup(vendor_quote)
-            if normalized_quote in seen_vendor_quotes:
-                logger.info(f"DUPLICATE_SKIP: vendor_quote already processed: '{vendor_quote[:50]}...'")
-                duplicates_skipped += 1
-                continue
-            
-            seen_vendor_quotes.add(normalized_quote)
-            
-            # Get conflict metadata
-            conflict_id = redline_item.get('id', redline_item.get('clarification_id', 'Unknown'))
-            serial_num = redline_item.get('serial_number', 'N/A')
-            comment = redline_item.get('comment', '')
-            
-            logger.info(f"SCANNING: Serial={serial_num}, ID={conflict_id}, vendor_quote='{vendor_quote[:80]}...'")
-            
-            # Find match in document using tiered strategy
-            match_result = _find_text_match(doc, vendor_quote)
-            
-            if match_result:
-                if match_result['type'] == 'single_para':
-                    para_idx = match_result['para_idx']
-                    if para_idx not in paragraph_matches:
-                        paragraph_matches[para_idx] = []
-                    paragraph_matches[para_idx].append({
-                        'start_pos': match_result['start_pos'],
-                        'end_pos': match_result['end_pos'],
-                        'comment': comment,
-                        'vendor_quote': vendor_quote,
-                        'conflict_id': conflict_id,
-                        'match_type': match_result['match_type']
-                    })
-                    logger.info(f"FOUND: {match_result['match_type']} match in paragraph {para_idx}")
-                elif match_result['type'] == 'cross_para':
-                    cross_para_matches.append({
-                        'paragraphs': match_result['paragraphs'],
-                        'comment': comment,
-                        'vendor_quote': vendor_quote,
-                        'conflict_id': conflict_id
-                    })
-                    logger.info(f"FOUND: Cross-paragraph match spanning paragraphs {match_result['paragraphs']}")
-                elif match_result['type'] == 'table_cell':
-                    table_cell_matches.append({
-                        'table_idx': match_result['table_idx'],
-                        'row_idx': match_result['row_idx'],
-                        'cell_idx': match_result['cell_idx'],
-                        'comment': comment,
-                        'vendor_quote': vendor_quote,
-                        'conflict_id': conflict_id,
-                        'match_type': match_result['match_type']
-                    })
-                    logger.info(f"FOUND: Table cell match in table {match_result['table_idx']}, row {match_result['row_idx']}, cell {match_result['cell_idx']}")
+    Returns:
+        Match result dict with original offsets and the normalized span
+    """
+    start_pos, end_pos = _original_span(entry['offset_maps'][tier], norm_start, norm_end)
+    return {
+        'type': 'single_para',
+        'para_idx': para_idx,
+        'start_pos': start_pos,
+        'end_pos': end_pos,
+        'match_type': match_type,
+        'normalized_tier': tier,
+        'normalized_span': (norm_start, norm_end)
+    }
+
+
+def _index_text_entry(text: str) -> Dict[str, Any]:
+    """
+    Normalize a paragraph or cell text at every matching tier.
+
+    Args:
+        text: Original paragraph or cell text
+
+    Returns:
+        Dict with the original text, each normalization tier and its offset map
+    """
+    if not text.strip():
+        return {'text': text, 'is_empty': True}
+
+    quote_ws_normalized, quote_ws_offsets = normalize_with_offsets(text)
+    quote_ws_lower, quote_ws_lower_offsets = _offset_lower(quote_ws_normalized, quote_ws_offsets)
+    if '\\' in text:
+        fully_normalized, fully_offsets = normalize_with_offsets(text, for_matching=True)
+    else:
+        # Without escapes, full normalization only differs by the trailing semicolon
+        fully_normalized, fully_offsets = quote_ws_normalized, quote_ws_offsets
+        if fully_normalized.endswith(';'):
+            fully_normalized = fully_normalized[:-1] + '.'
+    fully_normalized, fully_offsets = _offset_lower(fully_normalized, fully_offsets)
+
+    return {
+        'text': text,
+        'is_empty': False,
+        'quote_normalized': normalize_quotes(text),
+        'quote_ws_normalized': quote_ws_normalized,
+        'quote_ws_lower': quote_ws_lower,
+        'fully_normalized': fully_normalized,
+        'offset_maps': {
+            'quote_ws': quote_ws_offsets,
+            'quote_ws_lower': quote_ws_lower_offsets,
+            'fully': fully_offsets
+        }
+    }
+
+
+def _paragraph_element_text(p) -> str:
+    """Text of a <w:p> element, matching python-docx Paragraph.text (direct runs only)."""
+    return ''.join(r.text for r in p.r_lst)
+
+
+class TableGridCache:
+    """
+    Snapshot of every top-level table's layout grid, built once per document.
+
+    python-docx rebuilds the whole merged-cell grid each time row.cells is
+    read, which makes walking a large exception table quadratic. This reads
+    the <w:tbl> elements once and keeps, per grid slot, the cell text, its
+    paragraphs, row/column spans, the <w:tc> element handle and (optionally)
+    the normalized matching variants. Coordinates follow python-docx, so
+    doc.tables[t].rows[r].cells[c] and cell(t, r, c) refer to the same cell,
+    including the repeated slots of horizontally and vertically merged cells.
+    """
+
+    def __init__(self, doc, normalize: bool = True, parsed: Optional['ParsedDocument'] = None):
+        """
+        Build the grid for every table in the document body.
+
+        Args:
+            doc: python-docx Document object
+            normalize: Also compute the normalized matching variants of each non-empty cell
+            parsed: Parsed-document sidecar to take the normalized variants from
+        """
+        self.tables = []  # table_idx -> row_idx -> grid column -> cell entry
+        self.cells = []   # non-empty grid slots in document order
+
+        for table_idx, tbl in enumerate(doc.element.body.tbl_lst):
+            col_count = tbl.col_count
+            tc_entries = {}  # one shared base entry per <w:tc>, reused by every slot it covers
+            grid = []
+            for tc in tbl.iter_tcs():
+                for span_idx in range(tc.grid_span):
+                    if tc.vMerge == 'continue' and len(grid) >= col_count:
+                        base = grid[-col_count]
+                        if span_idx == 0:
+                            base['row_span'] += 1
+                    elif span_idx > 0:
+                        base = grid[-1]
+                    else:
+                        base = self._cell_base(tc, normalize, parsed)
+                        tc_entries[id(tc)] = base
+                    grid.append(base)
+
+            rows = []
+            if col_count:
+                for row_idx in range(len(tbl.tr_lst)):
+                    row = []
+                    for cell_idx, base in enumerate(grid[row_idx * col_count:(row_idx + 1) * col_count]):
+                        entry = dict(base, table_idx=table_idx, row_idx=row_idx, cell_idx=cell_idx)
+                        row.append(entry)
+                        if not entry['is_empty']:
+                            self.cells.append(entry)
+                    rows.append(row)
+            self.tables.append(rows)
+
+        logger.info(f"TABLE_GRID: Cached {len(self.tables)} tables with {len(self.cells)} non-empty cells")
+
+    @staticmethod
+    def _cell_base(tc, normalize: bool, parsed: Optional['ParsedDocument'] = None) -> Dict[str, Any]:
+        """Read one <w:tc> element into a cell entry without grid coordinates."""
+        paragraphs = [{'element': p, 'text': _paragraph_element_text(p)} for p in tc.p_lst]
+        text = '\n'.join(paragraph['text'] for paragraph in paragraphs).strip()
+        if not normalize:
+            base = {'text': text, 'is_empty': not text}
+        elif parsed is not None:
+            base = dict(parsed.text_entry(text))
+        else:
+            base = _index_text_entry(text)
+        base.update({
+            'element': tc,
+            'paragraphs': paragraphs,
+            'col_span': tc.grid_span,
+            'row_span': 1
+        })
+        return base
+
+    def cell(self, table_idx: int, row_idx: int, cell_idx: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the cell entry at python-docx coordinates.
+
+        Args:
+            table_idx: Index into doc.tables
+            row_idx: Index into table.rows
+            cell_idx: Index into row.cells
+
+        Returns:
+            Cell entry, or None if the coordinates are out of range
+        """
+        if table_idx < len(self.tables):
+            rows = self.tables[table_idx]
+            if row_idx < len(rows) and cell_idx < len(rows[row_idx]):
+                return rows[row_idx][cell_idx]
+        return None
+
+
+def _encode_offsets(offsets: array) -> List[List[int]]:
+    """Run-length encode an offset map as [first_offset, length] runs of consecutive offsets."""
+    runs = []
+    for offset in offsets:
+        if runs and runs[-1][0] + runs[-1][1] == offset:
+            runs[-1][1] += 1
+        else:
+            runs.append([offset, 1])
+    return runs
+
+
+def _decode_offsets(runs: List[List[int]]) -> array:
+    """Expand runs produced by _encode_offsets back into an offset map."""
+    offsets = array('I')
+    for first, length in runs:
+        offsets.extend(range(first, first + length))
+    return offsets
+
+
+def document_content_hash(document_bytes: bytes) -> str:
+    """SHA-256 hex digest identifying the exact DOCX file a parsed document was built from."""
+    return hashlib.sha256(document_bytes).hexdigest()
+
+
+class ParsedDocument:
+    """
+    Serializable text model of a vendor document.
+
+    Built once by split_document from the same python-docx parse used for
+    chunking and stored in S3 next to the chunks. Holds the body paragraph
+    texts, every table's grid (text and spans per python-docx cell slot),
+    the normalized matching variants of each distinct text and the content
+    hash of the source DOCX. The redline stage loads it instead of
+    renormalizing the document and only opens the DOCX to write redlines.
+    """
+
+    def __init__(self, content_hash: str, paragraphs: List[str], tables: List[List[List[Dict[str, Any]]]],
+                 entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Args:
+            content_hash: document_content_hash of the source DOCX
+            paragraphs: Body paragraph texts (doc.paragraphs order)
+            tables: table_idx -> row_idx -> cell_idx -> {'text', 'col_span', 'row_span'}
+            entries: Normalized _index_text_entry results keyed by original text
+        """
+        self.content_hash = content_hash
+        self.paragraphs = paragraphs
+        self.tables = tables
+        self.entries = entries if entries is not None else {}
+        self.entry_hits = 0
+        self.entry_misses = 0
+
+    @classmethod
+    def from_docx(cls, doc, content_hash: str) -> 'ParsedDocument':
+        """
+        Build the model from a loaded document.
+
+        Args:
+            doc: python-docx Document object
+            content_hash: document_content_hash of the bytes doc was loaded from
+
+        Returns:
+            ParsedDocument with every paragraph and cell normalized
+        """
+        paragraphs = [paragraph.text for paragraph in doc.paragraphs]
+        parsed = cls(content_hash, paragraphs, [])
+        for text in paragraphs:
+            parsed.text_entry(text)
+        grid = TableGridCache(doc, parsed=parsed)
+        parsed.tables = [
+            [[{'text': cell['text'], 'col_span': cell['col_span'], 'row_span': cell['row_span']} for cell in row] for row in rows]
+            for rows in grid.tables
+        ]
+        parsed.entry_hits = parsed.entry_misses = 0
+        return parsed
+
+    def text_entry(self, text: str) -> Dict[str, Any]:
+        """
+        Get the normalized matching entry for a paragraph or cell text.
+
+        Args:
+            text: Original paragraph or cell text
+
+        Returns:
+            Shared _index_text_entry result; callers must not mutate it
+        """
+        entry = self.entries.get(text)
+        if entry is None:
+            self.entry_misses += 1
+            entry = _index_text_entry(text)
+            self.entries[text] = entry
+        else:
+            self.entry_hits += 1
+        return entry
+
+    def to_json(self) -> str:
+        """Serialize to JSON; offset maps are run-length encoded and empty texts are left out."""
+        entries = []
+        for entry in self.entries.values():
+            if entry['is_empty']:
+                continue
+            serialized = {key: value for key, value in entry.items() if key != 'offset_maps'}
+            serialized['offset_maps'] = {tier: _encode_offsets(offsets) for tier, offsets in entry['offset_maps'].items()}
+            entries.append(serialized)
+        return json.dumps({
+            'version': PARSED_DOCUMENT_VERSION,
+            'content_hash': self.content_hash,
+            'paragraphs': self.paragraphs,
+            'tables': self.tables,
+            'entries': entries
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> 'ParsedDocument':
+        """
+        Load a model serialized by to_json.
+
+        Args:
+            data: JSON text
+
+        Returns:
+            ParsedDocument
+
+        Raises:
+            ValueError: If the model was written by an incompatible version
+        """
+        payload = json.loads(data)
+        if payload.get('version') != PARSED_DOCUMENT_VERSION:
+            raise ValueError(f"Unsupported parsed document version: {payload.get('version')}")
+        entries = {}
+        for entry in payload['entries']:
+            entry['offset_maps'] = {tier: _decode_offsets(runs) for tier, runs in entry['offset_maps'].items()}
+            entries[entry['text']] = entry
+        return cls(payload['content_hash'], payload['paragraphs'], payload['tables'], entries)
+
+
+def load_parsed_document(bucket: str, s3_key: str) -> Optional[ParsedDocument]:
+    """
+    Load a parsed-document sidecar from S3.
+
+    Args:
+        bucket: S3 bucket name
+        s3_key: S3 key written by split_document
+
+    Returns:
+        ParsedDocument, or None if it is missing or unreadable (callers fall back to parsing the DOCX)
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=s3_key)
+        parsed = ParsedDocument.from_json(response['Body'].read().decode('utf-8'))
+        logger.info(f"PARSED_DOCUMENT: Loaded {s3_key} ({len(parsed.paragraphs)} paragraphs, {len(parsed.tables)} tables, {len(parsed.entries)} normalized texts)")
+        return parsed
+    except Exception as e:
+        logger.warning(f"PARSED_DOCUMENT: Could not load {s3_key}, document will be renormalized: {e}")
+        return None
+
+
+class DocumentMatchIndex:
+    """
+    Normalized snapshot of a document's paragraphs and table cells.
+
+    Built once per apply_exact_sentence_redlining call so that every matching
+    tier reads precomputed text instead of walking the python-docx tree and
+    renormalizing each paragraph for every conflict.
+    """
+
+    def __init__(self, doc, parsed: Optional[ParsedDocument] = None):
+        """
+        Index every paragraph and non-empty table cell of the document.
+
+        Args:
+            doc: python-docx Document object
+            parsed: Parsed-document sidecar of the same file; its normalized texts are reused
+        """
+        if parsed is not None:
+            self.paragraphs = [parsed.text_entry(paragraph.text) for paragraph in doc.paragraphs]
+        else:
+            self.paragraphs = [_index_text_entry(paragraph.text) for paragraph in doc.paragraphs]
+        self.non_empty_paragraph_count = sum(1 for entry in self.paragraphs if not entry['is_empty'])
+
+        # Table grid read once; cells are in document order (matches doc.tables[t].rows[r].cells[c] coordinates)
+        self.tables = TableGridCache(doc, parsed=parsed)
+        self.cells = self.tables.cells
+
+        # Joined paragraph windows are normalized lazily and reused across quotes
+        self._window_cache = {}
+
+        # Automata over cell texts, compiled on first use by QuoteLocator
+        self.cell_automata = None
+
+        # Fuzzy n-gram index, built on first use by the partial/cross-paragraph tiers
+        self._fuzzy_index = None
+
+        logger.info(f"DOCUMENT_INDEX: Indexed {len(self.paragraphs)} paragraphs ({self.non_empty_paragraph_count} non-empty) and {len(self.cells)} table cells")
+        if parsed is not None:
+            logger.info(f"DOCUMENT_INDEX: Reused {parsed.entry_hits} normalized texts from parsed document, normalized {parsed.entry_misses}")
+
+    @property
+    def fuzzy_index(self) -> 'FuzzyQuoteIndex':
+        """Fuzzy n-gram index over the paragraphs, built on first access."""
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyQuoteIndex(self)
+        return self._fuzzy_index
+
+    def window(self, start_idx: int, window_size: int) -> Optional[Dict[str, Any]]:
+        """
+        Get consecutive paragraphs joined with spaces and normalized.
+
+        Args:
+            start_idx: Index of the first paragraph in the window
+            window_size: Number of consecutive paragraphs to join
+
+        Returns:
+            Dict with joined paragraph indices and normalized text, or None if the window is empty
+        """
+        cache_key = (start_idx, window_size)
+        if cache_key in self._window_cache:
+            return self._window_cache[cache_key]
+
+        joined_paras = []
+        joined_text = ""
+        for i in range(start_idx, start_idx + window_size):
+            entry = self.paragraphs[i]
+            if not entry['is_empty']:
+                joined_paras.append(i)
+                joined_text += entry['text'] + " "
+
+        window_entry = None
+        joined_text = joined_text.strip()
+        if joined_text:
+            joined_quote_ws, _ = normalize_with_offsets(joined_text)
+            joined_fully, _ = normalize_with_offsets(joined_text, for_matching=True)
+            window_entry = {
+                'paragraphs': joined_paras,
+                'quote_ws_normalized': joined_quote_ws,
+                'quote_ws_lower': joined_quote_ws.lower(),
+                'fully_normalized': joined_fully.lower()
+            }
+
+        self._window_cache[cache_key] = window_entry
+        return window_entry
+
+
+class _AhoCorasickAutomaton:
+    """
+    Aho-Corasick automaton that finds every occurrence of many patterns in one text pass.
+    """
+
+    def __init__(self, patterns: List[str]):
+        """
+        Compile the patterns into a goto/fail/output automaton.
+
+        Args:
+            patterns: Pattern strings; empty patterns are ignored
+        """
+        self.patterns = patterns
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # Breadth-first pass to compute failure links and merge outputs
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_first_occurrences(self, text: str) -> Dict[int, int]:
+        """
+        Scan text once and return the leftmost start position of every pattern found.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Dict mapping pattern id to its first start position in text
+        """
+        found = {}
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+        state = 0
+
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for pattern_id in output[state]:
+                    if pattern_id not in found:
+                        found[pattern_id] = pos - len(patterns[pattern_id]) + 1
+
+        return found
+
+
+class QuoteLocator:
+    """
+    Batch locator for all vendor quotes of a redline request.
+
+    Compiles the normalized quotes into Aho-Corasick automata and scans the
+    indexed document text once, instead of searching the whole document
+    separately for every quote.
+    """
+
+    def __init__(self, vendor_quotes: List[str]):
+        """
+        Normalize and compile the vendor quotes.
+
+        Args:
+            vendor_quotes: Vendor quote texts to locate
+        """
+        self.quote_forms = [_prepare_quote_forms(quote) for quote in vendor_quotes]
+        # Whitespace-normalized and fully normalized patterns (both lowercase) cover tiers 3-4
+        self._ws_automaton = _AhoCorasickAutomaton([forms['quote_ws_lower'] for forms in self.quote_forms])
+        self._fully_automaton = _AhoCorasickAutomaton([forms['fully_lower'] for forms in self.quote_forms])
+
+    def scan(self, doc_index: DocumentMatchIndex) -> List[List[Dict[str, Any]]]:
+        """
+        Scan every indexed paragraph and table cell once for all quotes.
+
+        Args:
+            doc_index: DocumentMatchIndex built from the python-docx Document
+
+        Returns:
+            For each quote, a list of hits with scope, coordinates and original offsets
+        """
+        hits = [[] for _ in self.quote_forms]
+
+        entries = [('table_cell', cell_pos, entry) for cell_pos, entry in enumerate(doc_index.cells)]
+        entries.extend(('paragraph', para_idx, entry) for para_idx, entry in enumerate(doc_index.paragraphs) if not entry['is_empty'])
+
+        for scope, entry_pos, entry in entries:
+            found = {}
+            for level, automaton, text_key in (('quote_ws_lower', self._ws_automaton, 'quote_ws_lower'),
+                                               ('fully', self._fully_automaton, 'fully_normalized')):
+                for quote_idx, norm_start in automaton.find_first_occurrences(entry[text_key]).items():
+                    if quote_idx in found:
+                        continue
+                    found[quote_idx] = True
+                    norm_end = norm_start + len(automaton.patterns[quote_idx])
+                    hit = {'scope': scope, 'level': level, 'norm_start': norm_start, 'norm_end': norm_end}
+                    if scope == 'table_cell':
+                        hit.update({'cell_pos': entry_pos, 'table_idx': entry['table_idx'],
+                                    'row_idx': entry['row_idx'], 'cell_idx': entry['cell_idx']})
+                    else:
+                        # Offsets are only meaningful for paragraphs (cells are redlined whole)
+                        start_pos, end_pos = _original_span(entry['offset_maps'][level], norm_start, norm_end)
+                        hit.update({'para_idx': entry_pos, 'start_pos': start_pos, 'end_pos': end_pos})
+                    hits[quote_idx].append(hit)
+
+        return hits
+
+    def locate(self, doc_index: DocumentMatchIndex) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve each quote to its first matching paragraph or table cell.
+
+        Hits are confirmed with the same tier checks as _find_text_match, so
+        results keep the usual match_type and position semantics. Quotes with
+        no confirmed hit are left out and fall back to the per-quote tiers.
+
+        Args:
+            doc_index: DocumentMatchIndex built from the python-docx Document
+
+        Returns:
+            Dict mapping vendor_quote to its match result dict
+        """
+        located = {}
+        all_hits = self.scan(doc_index)
+
+        # Cells whose normalized text is empty satisfy the bidirectional prefix tier for any long quote
+        empty_cells = [cell_pos for cell_pos, entry in enumerate(doc_index.cells)
+                       if not entry['quote_ws_normalized'] or not entry['fully_normalized']]
+
+        for quote_forms, hits in zip(self.quote_forms, all_hits):
+            candidate_cells = {hit['cell_pos'] for hit in hits if hit['scope'] == 'table_cell'}
+            candidate_paras = {hit['para_idx'] for hit in hits if hit['scope'] == 'paragraph'}
+
+            if len(quote_forms['vendor_quote']) > 50 and doc_index.cells:
+                candidate_cells.update(empty_cells)
+                candidate_cells.update(self._cells_within_quote(doc_index, quote_forms))
+
+            match = None
+            for cell_pos in sorted(candidate_cells):
+                match = _match_table_cell_entry(doc_index.cells[cell_pos], quote_forms)
+                if match:
+                    break
+            if not match:
+                for para_idx in sorted(candidate_paras):
+                    match = _match_paragraph_entry(doc_index, para_idx, quote_forms)
+                    if match:
+                        break
+
+            if match:
+                located[quote_forms['vendor_quote']] = match
+
+        logger.info(f"QUOTE_LOCATOR: Located {len(located)} of {len(self.quote_forms)} quotes in one document pass")
+        return located
+
+    @staticmethod
+    def _cells_within_quote(doc_index: DocumentMatchIndex, quote_forms: Dict[str, str]) -> List[int]:
+        """
+        Find table cells whose text is contained in (or a prefix of) a long quote.
+
+        Covers the reverse-direction table tiers (4b-4d) where the quote is longer
+        than the cell. The cell automaton is compiled once per index.
+
+        Args:
+            doc_index: DocumentMatchIndex built from the python-docx Document
+            quote_forms: Normalized quote forms from _prepare_quote_forms
+
+        Returns:
+            Positions of candidate cells in doc_index.cells
+        """
+        if doc_index.cell_automata is None:
+            doc_index.cell_automata = (
+                _AhoCorasickAutomaton([entry['quote_ws_normalized'] for entry in doc_index.cells]),
+                _AhoCorasickAutomaton([entry['fully_normalized'] for entry in doc_index.cells])
+            )
+        ws_automaton, fully_automaton = doc_index.cell_automata
+
+        cell_positions = list(ws_automaton.find_first_occurrences(quote_forms['quote_ws_normalized']))
+        cell_positions.extend(cell_pos for cell_pos, start in fully_automaton.find_first_occurrences(quote_forms['fully_lower']).items()
+                              if start == 0)
+        return cell_positions
+
+
+def _sampled_shingles(text: str) -> set:
+    """
+    Hash the character n-grams of text and keep a consistent sample of them.
+
+    Sampling by hash value (rather than position) keeps the same shingles for a
+    quote and for the document text containing it, so containment is preserved.
+
+    Args:
+        text: Normalized text
+
+    Returns:
+        Set of sampled shingle hashes
+    """
+    size = FUZZY_SHINGLE_SIZE
+    modulus = FUZZY_SAMPLE_MODULUS
+    # crc32 rather than hash(): str hashes are salted per process, which would change the sample between invocations
+    return {shingle_hash for shingle_hash in (zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1))
+            if shingle_hash % modulus == 0}
+
+
+class FuzzyQuoteIndex:
+    """
+    Hash-sampled character n-gram index over a document's paragraphs.
+
+    Each paragraph's fully normalized text is reduced to a hash-sampled set of
+    character shingles, stored in buckets (shingle hash -> paragraphs). A quote
+    only touches the buckets of its own shingles, so finding candidate spans
+    does not grow with document length. Spans are single paragraphs or runs of
+    consecutive non-empty paragraphs, scored by estimated containment of the
+    quote (shared shingles / quote shingles). Scores are estimates that ignore
+    shingle order; callers verify spans against the paragraph text.
+    """
+
+    def __init__(self, doc_index: DocumentMatchIndex):
+        """
+        Build the shingle buckets for every non-empty paragraph.
+
+        Args:
+            doc_index: DocumentMatchIndex built from the python-docx Document
+        """
+        self.paragraph_order = [para_idx for para_idx, entry in enumerate(doc_index.paragraphs) if not entry['is_empty']]
+        self._order_position = {para_idx: position for position, para_idx in enumerate(self.paragraph_order)}
+
+        buckets = defaultdict(list)
+        # Paragraphs too short to have any sampled shingle cannot break a span
+        self._sketched_paragraphs = set()
+        for para_idx in self.paragraph_order:
+            para_shingles = _sampled_shingles(doc_index.paragraphs[para_idx]['fully_normalized'])
+            if para_shingles:
+                self._sketched_paragraphs.add(para_idx)
+            for shingle_hash in para_shingles:
+                buckets[shingle_hash].append(para_idx)
+
+        # Drop shingles that appear almost everywhere; they carry no signal and have long buckets
+        max_bucket = max(50, int(len(self.paragraph_order) * FUZZY_STOP_SHINGLE_RATIO))
+        self.stop_shingles = {shingle_hash for shingle_hash, paras in buckets.items() if len(paras) > max_bucket}
+        self.buckets = {shingle_hash: paras for shingle_hash, paras in buckets.items() if shingle_hash not in self.stop_shingles}
+
+        logger.info(f"FUZZY_INDEX: {len(self.paragraph_order)} paragraphs, {len(self.buckets)} shingle buckets, {len(self.stop_shingles)} stop shingles")
+
+    def candidates(self, fully_lower: str, min_similarity: float = FUZZY_CANDIDATE_MIN_SIMILARITY,
+                   max_window: int = FUZZY_MAX_WINDOW) -> Optional[List[Dict[str, Any]]]:
+        """
+        Rank candidate paragraph spans for a quote.
+
+        Args:
+            fully_lower: Fully normalized, lowercased quote
+            min_similarity: Minimum estimated containment for a span to be returned
+            max_window: Maximum number of non-empty paragraphs in a span
+
+        Returns:
+            Spans as dicts with 'paragraphs' and 'score', best first; None if the
+            quote is too short to sketch reliably (callers should scan instead)
+        """
+        quote_shingles = _sampled_shingles(fully_lower) - self.stop_shingles
+        if len(quote_shingles) < FUZZY_MIN_QUOTE_SAMPLES:
+            return None
+
+        # Shingles shared with each paragraph, gathered from the quote's buckets only
+        shared = defaultdict(set)
+        for shingle_hash in quote_shingles:
+            for para_idx in self.buckets.get(shingle_hash, ()):
+                shared[para_idx].add(shingle_hash)
+
+        total = len(quote_shingles)
+        spans = []
+        for para_idx in shared:
+            # Grow a span forward from each paragraph that shares shingles with the quote
+            covered = set()
+            start_position = self._order_position[para_idx]
+            end_position = min(start_position + max_window, len(self.paragraph_order))
+            for position in range(start_position, end_position):
+                span_para = self.paragraph_order[position]
+                new_shingles = shared.get(span_para)
+                if not new_shingles:
+                    if span_para in self._sketched_paragraphs:
+                        break
+                    continue
+                covered |= new_shingles
+                score = len(covered) / total
+                if score >= min_similarity:
+                    spans.append({'paragraphs': self.paragraph_order[start_position:position + 1], 'score': score})
+                if len(covered) == total:
+                    break
+
+        spans.sort(key=lambda span: (-span['score'], len(span['paragraphs']), span['paragraphs'][0]))
+        return spans
+
+
+def apply_exact_sentence_redlining(doc, redline_items: List[Dict[str, str]], parsed_document: Optional[ParsedDocument] = None) -> Dict[str, Any]:
+    """
+    Apply redlining to document with PRECISE matching.
+    
+    PRECISION APPROACH:
+    - Only redlines EXACT vendor_quote text (with normalization fallbacks)
+    - Handles multiple conflicts in the same paragraph
+    - Comments are anchored to the exact runs containing the text
+    - Duplicates detected by vendor_quote field only
+    - Normalizes: escaped quotes, quote types, whitespace
+    - Supports cross-paragraph matching for text split across paragraphs
+    
+    Args:
+        doc: python-docx Document object
+        redline_items: List of conflict items with 'text' (vendor_quote) to highlight
+        parsed_document: Optional parsed-document sidecar of the same file (skips renormalizing)
+        
+    Returns:
+        Dictionary with redlining results
+    """
+    total_conflicts_input = len(redline_items)
+    logger.info(f"APPLY_START: Processing {total_conflicts_input} conflicts across {len(doc.paragraphs)} paragraphs and {len(doc.element.body.tbl_lst)} tables")
+    
+    try:
+        total_paragraphs = len(doc.paragraphs)
+        failed_matches = []
+        duplicates_skipped = 0
+        empty_skipped = 0
+        
+        # Document structure logging
+        logger.info(f"DOCUMENT_STRUCTURE: Total paragraphs: {total_paragraphs}")
+        
+        # Normalize every paragraph and table cell once for all conflicts
+        doc_index = DocumentMatchIndex(doc, parsed=parsed_document)
+
+        # Track seen vendor_quotes for duplicate detection (normalize for comparison)
+        seen_vendor_quotes = set()
+        
+        def normalize_vendor_quote_for_dedup(text: str) -> str:
+            """Normalize vendor_quote for duplicate detection."""
+            if not text:
+                return ""
+            return normalize_for_matching(text).lower()
+        
+        # PHASE 1: Pre-scan - find all matches for all conflicts
+        # This allows us to handle multiple conflicts per paragraph
+        paragraph_matches = {}  # para_idx -> list of (start_pos, end_pos, comment, vendor_quote, conflict_id)
+        cross_para_matches = []  # List of cross-paragraph matches to handle separately
+        table_cell_matches = []  # List of table cell matches to handle separately
+
+        # Conflicts anchored during identify_conflicts are applied by position without searching
+        anchored_matches = {}
+        for item in redline_items:
+            vendor_quote = item.get('text', '').strip()
+            if vendor_quote and item.get('anchor') and vendor_quote not in anchored_matches:
+                anchored_match = _match_from_anchor(doc_index, item['anchor'], _prepare_quote_forms(vendor_quote))
+                if anchored_match:
+                    anchored_matches[vendor_quote] = anchored_match
+        if anchored_matches:
+            logger.info(f"ANCHORED_MATCHES: {len(anchored_matches)} vendor quotes resolved from chunk anchors")
+        
+        # Locate the remaining vendor quotes in a single document pass; per-quote tiers only run for misses
+        unique_quotes = list(dict.fromkeys(
+            item.get('text', '').strip() for item in redline_items
+            if item.get('text', '').strip() and item.get('text', '').strip() not in anchored_matches
+        ))
+        located_matches = QuoteLocator(unique_quotes).locate(doc_index) if unique_quotes else {}
+
+        for redline_item in redline_items:
+            vendor_quote = redline_item.get('text', '').strip()
+            
+            if not vendor_quote:
+                logger.warning("SKIP: Empty vendor_quote")
+                empty_skipped += 1
+                continue
+            
+            # Check for duplicates based on vendor_quote only
+            normalized_quote = normalize_vendor_quote_for_dedup(vendor_quote)
+            if normalized_quote in seen_vendor_quotes:
+                logger.info(f"DUPLICATE_SKIP: vendor_quote already processed: '{vendor_quote[:50]}...'")
+                duplicates_skipped += 1
+                continue
+            
+            seen_vendor_quotes.add(normalized_quote)
+            
+            # Get conflict metadata
+            conflict_id = redline_item.get('id', redline_item.get('clarification_id', 'Unknown'))
+            serial_num = redline_item.get('serial_number', 'N/A')
+            comment = redline_item.get('comment', '')
+            
+            logger.info(f"SCANNING: Serial={serial_num}, ID={conflict_id}, vendor_quote='{vendor_quote[:80]}...'")
+            
+            # Find match in document using tiered strategy
+            match_result = anchored_matches.get(vendor_quote) or located_matches.get(vendor_quote)
+            if not match_result:
+                match_result = _find_text_match(doc_index, vendor_quote)
+            
+            if match_result:
+                if match_result['type'] == 'single_para':
+                    para_idx = match_result['para_idx']
+                    if para_idx not in paragraph_matches:
+                        paragraph_matches[para_idx] = []
+                    paragraph_matches[para_idx].append({
+                        'start_pos': match_result['start_pos'],
+                        'end_pos': match_result['end_pos'],
+                        'comment': comment,
+                        'vendor_quote': vendor_quote,
+                        'conflict_id': conflict_id,
+                        'match_type': match_result['match_type'],
+                        'normalized_tier': match_result.get('normalized_tier'),
+                        'normalized_span': match_result.get('normalized_span')
+                    })
+                    logger.info(f"FOUND: {match_result['match_type']} match in paragraph {para_idx}")
+                elif match_result['type'] == 'cross_para':
+                    cross_para_matches.append({
+                        'paragraphs': match_result['paragraphs'],
+                        'comment': comment,
+                        'vendor_quote': vendor_quote,
+                        'conflict_id': conflict_id
+                    })
+                    logger.info(f"FOUND: Cross-paragraph match spanning paragraphs {match_result['paragraphs']}")
+                elif match_result['type'] == 'table_cell':
+                    table_cell_matches.append({
+                        'table_idx': match_result['table_idx'],
+                        'row_idx': match_result['row_idx'],
+                        'cell_idx': match_result['cell_idx'],
+                        'comment': comment,
+                        'vendor_quote': vendor_quote,
+                        'conflict_id': conflict_id,
+                        'match_type': match_result['match_type']
+                    })
+                    logger.info(f"FOUND: Table cell match in table {match_result['table_idx']}, row {match_result['row_idx']}, cell {match_result['cell_idx']}")
             else:
                 failed_matches.append({
                     'text': vendor_quote,
@@ -1856,17 +2563,18 @@ def apply_exact_sentence_redlining(doc, redline_items: List[Dict[str, str]]) ->
         matches_found = 0
         paragraphs_with_redlines = []
         
+        # Run splits, formatting and comments are written straight into the document XML
+        writer = RedlineXmlWriter(doc)
+        doc_paragraphs = doc.paragraphs
+        
         for para_idx, matches in paragraph_matches.items():
-            paragraph = doc.paragraphs[para_idx]
+            paragraph = doc_paragraphs[para_idx]
             para_text = paragraph.text
             
-            # Sort matches by start position DESCENDING (process end to start to preserve positions)
-            matches.sort(key=lambda x: x['start_pos'], reverse=True)
-            
             logger.info(f"APPLYING: {len(matches)} redlines to paragraph {para_idx}")
             
             # Apply all redlines to this paragraph
-            success = _apply_multiple_redlines(paragraph, para_text, matches)
+            success = _apply_multiple_redlines(writer, paragraph, para_text, matches, doc_index.paragraphs[para_idx].get('offset_maps'))
             
             if success:
                 matches_found += len(matches)
@@ -1877,14 +2585,13 @@ def apply_exact_sentence_redlining(doc, redline_items: List[Dict[str, str]]) ->
             para_indices = cross_match['paragraphs']
             comment = cross_match['comment']
             
-            # Apply redline to each paragraph in the cross-paragraph match
+            # Redline the entire text of every paragraph in the cross-paragraph match under one comment
+            para_indices = [para_idx for para_idx in para_indices if para_idx < len(doc_paragraphs)]
+            if para_indices:
+                _apply_full_paragraph_redline(writer, [doc_paragraphs[para_idx] for para_idx in para_indices], comment)
             for para_idx in para_indices:
-                if para_idx < len(doc.paragraphs):
-                    paragraph = doc.paragraphs[para_idx]
-                    # Redline the entire paragraph text for cross-paragraph matches
-                    _apply_full_paragraph_redline(paragraph, comment)
-                    if para_idx not in paragraphs_with_redlines:
-                        paragraphs_with_redlines.append(para_idx)
+                if para_idx not in paragraphs_with_redlines:
+                    paragraphs_with_redlines.append(para_idx)
             
             matches_found += 1
             logger.info(f"CROSS_PARA_APPLIED: Redlined paragraphs {para_indices}")
@@ -1898,61 +2605,342 @@ def apply_exact_sentence_redlining(doc, redline_items: List[Dict[str, str]]) ->
             comment = table_match['comment']
             vendor_quote = table_match['vendor_quote']
             
-            if table_idx < len(doc.tables):
-                table = doc.tables[table_idx]
-                if row_idx < len(table.rows):
-                    row = table.rows[row_idx]
-                    if cell_idx < len(row.cells):
-                        cell = row.cells[cell_idx]
-                        success = _apply_table_cell_redline(cell, vendor_quote, comment)
-                        if success:
-                            matches_found += 1
-                            table_key = (table_idx, row_idx, cell_idx)
-                            if table_key not in tables_with_redlines:
-                                tables_with_redlines.append(table_key)
-                            logger.info(f"TABLE_CELL_APPLIED: Redlined table {table_idx}, row {row_idx}, cell {cell_idx}")
+            cell_entry = doc_index.tables.cell(table_idx, row_idx, cell_idx)
+            if cell_entry:
+                success = _apply_table_cell_redline(writer, cell_entry, vendor_quote, comment)
+                if success:
+                    matches_found += 1
+                    table_key = (table_idx, row_idx, cell_idx)
+                    if table_key not in tables_with_redlines:
+                        tables_with_redlines.append(table_key)
+                    logger.info(f"TABLE_CELL_APPLIED: Redlined table {table_idx}, row {row_idx}, cell {cell_idx}")
+        
+        logger.info(f"REDLINE_WRITER: {writer.comments_added} comments added across {writer.paragraphs_rewritten} paragraphs")
         
         # Log results
         if paragraphs_with_redlines:
             pages_affected = set(para_idx // 20 for para_idx in paragraphs_with_redlines)
             logger.info(f"PAGE_DISTRIBUTION: {len(pages_affected)} pages affected: {sorted(pages_affected)}")
         
-        total_conflicts_processed = total_conflicts_input - empty_skipped - duplicates_skipped
-        success_rate = (matches_found / total_conflicts_processed * 100) if total_conflicts_processed else 0
+        total_conflicts_processed = total_conflicts_input - empty_skipped - duplicates_skipped
+        success_rate = (matches_found / total_conflicts_processed * 100) if total_conflicts_processed else 0
+        
+        # Log comprehensive summary
+        logger.info(f"REDLINE_SUMMARY: Input={total_conflicts_input}, Processed={total_conflicts_processed}, Empty skipped={empty_skipped}, Duplicates skipped={duplicates_skipped}")
+        
+        if failed_matches:
+            logger.warning(f"REDLINING_INCOMPLETE: {len(failed_matches)} conflicts could not be matched")
+            for failed in failed_matches:
+                logger.warning(f"UNMATCHED: ID={failed.get('id', 'Unknown')} - '{failed.get('text', '')[:50]}...'")
+        else:
+            logger.info("REDLINING_SUCCESS: All conflicts successfully matched and redlined")
+        
+        logger.info(f"REDLINE_RESULTS: Total processed={total_conflicts_processed}, Matches={matches_found}, Failed={len(failed_matches)}, Success rate={success_rate:.1f}%")
+        
+        return {
+            "total_paragraphs": total_paragraphs,
+            "matches_found": matches_found,
+            "paragraphs_with_redlines": paragraphs_with_redlines,
+            "failed_matches": failed_matches,
+            "pages_affected": len(set(para_idx // 20 for para_idx in paragraphs_with_redlines)) if paragraphs_with_redlines else 0
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in redlining: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {
+            "total_paragraphs": 0,
+            "matches_found": 0,
+            "paragraphs_with_redlines": [],
+            "error": str(e)
+        }
+
+
+def _prepare_quote_forms(vendor_quote: str) -> Dict[str, str]:
+    """
+    Normalize a vendor_quote at every matching tier.
+    
+    Note: vendor_quote may already be normalized from parsing, so we normalize again (idempotent)
+    
+    Args:
+        vendor_quote: Text to find in document
+        
+    Returns:
+        Dict with the quote at each normalization tier
+    """
+    quote_normalized = normalize_quotes(normalize_escaped_quotes(vendor_quote))
+    quote_ws_normalized = normalize_whitespace(normalize_subsection_markers(quote_normalized))
+    fully_normalized = normalize_for_matching(vendor_quote)
+    return {
+        'vendor_quote': vendor_quote,
+        'quote_normalized': quote_normalized,
+        'quote_ws_normalized': quote_ws_normalized,
+        'quote_ws_lower': quote_ws_normalized.lower(),
+        'fully_normalized': fully_normalized,
+        'fully_lower': fully_normalized.lower()
+    }
+
+
+def _match_table_cell_entry(cell_entry: Dict[str, Any], quote_forms: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Check all table cell matching tiers (1-4d) against one indexed cell.
+    
+    Args:
+        cell_entry: Indexed table cell entry from DocumentMatchIndex
+        quote_forms: Normalized quote forms from _prepare_quote_forms
+        
+    Returns:
+        Match result dict or None if the cell does not match
+    """
+    vendor_quote = quote_forms['vendor_quote']
+    quote_ws_normalized = quote_forms['quote_ws_normalized']
+    fully_lower = quote_forms['fully_lower']
+    cell_quote_ws_normalized = cell_entry['quote_ws_normalized']
+    cell_fully_normalized = cell_entry['fully_normalized']
+    
+    match_type = None
+    tier = None
+    
+    # Check all matching tiers for table cells
+    if vendor_quote in cell_entry['text']:
+        tier, match_type = '1', 'exact'
+    elif quote_forms['quote_normalized'] in cell_entry['quote_normalized']:
+        tier, match_type = '2', 'quote_normalized'
+    elif quote_ws_normalized in cell_quote_ws_normalized:
+        tier, match_type = '3', 'quote_whitespace_normalized'
+    elif quote_forms['quote_ws_lower'] in cell_entry['quote_ws_lower']:
+        tier, match_type = '3b', 'quote_whitespace_normalized_case_insensitive'
+    elif fully_lower in cell_fully_normalized:
+        tier, match_type = '4', 'fully_normalized'
+    # TIER 4b: Check if vendor_quote is a prefix/substring of cell text (for table exceptions)
+    # This handles cases where Claude extracts partial text or text with formatting differences
+    elif len(vendor_quote) > 50:  # Only for reasonably long quotes
+        # Check if vendor quote is prefix of cell or cell is prefix of vendor quote (bidirectional)
+        if cell_quote_ws_normalized.startswith(quote_ws_normalized) or quote_ws_normalized.startswith(cell_quote_ws_normalized):
+            tier, match_type = '4b', 'prefix_substring'
+        elif cell_fully_normalized.startswith(fully_lower) or fully_lower.startswith(cell_fully_normalized):
+            tier, match_type = '4c', 'fully_normalized_prefix_substring'
+        # Also check if vendor quote appears as substring within cell (not just prefix)
+        elif cell_quote_ws_normalized in quote_ws_normalized:
+            tier, match_type = '4d', 'substring_within_cell'
+    
+    if not match_type:
+        return None
+    
+    table_idx = cell_entry['table_idx']
+    row_idx = cell_entry['row_idx']
+    cell_idx = cell_entry['cell_idx']
+    logger.info(f"MATCH_FOUND: TIER {tier} ({match_type}) in table {table_idx}, row {row_idx}, cell {cell_idx}")
+    return {
+        'type': 'table_cell',
+        'table_idx': table_idx,
+        'row_idx': row_idx,
+        'cell_idx': cell_idx,
+        'match_type': match_type
+    }
+
+
+def _match_paragraph_entry(doc_index: DocumentMatchIndex, para_idx: int, quote_forms: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Check paragraph matching tiers (1-4) against one indexed paragraph.
+    
+    Args:
+        doc_index: DocumentMatchIndex built from the python-docx Document
+        para_idx: Index of the paragraph to check
+        quote_forms: Normalized quote forms from _prepare_quote_forms
+        
+    Returns:
+        Match result dict or None if the paragraph does not match
+    """
+    entry = doc_index.paragraphs[para_idx]
+    if entry['is_empty']:
+        return None
+    
+    vendor_quote = quote_forms['vendor_quote']
+    quote_normalized = quote_forms['quote_normalized']
+    quote_ws_normalized = quote_forms['quote_ws_normalized']
+    para_text = entry['text']
+    
+    # TIER 1: Exact match
+    if vendor_quote in para_text:
+        start_pos = para_text.find(vendor_quote)
+        logger.info(f"MATCH_FOUND: TIER 1 (exact) in paragraph {para_idx} at position {start_pos}")
+        return {
+            'type': 'single_para',
+            'para_idx': para_idx,
+            'start_pos': start_pos,
+            'end_pos': start_pos + len(vendor_quote),
+            'match_type': 'exact'
+        }
+    
+    # TIER 2: Quote-normalized match (quotes only, preserve whitespace)
+    para_quote_normalized = entry['quote_normalized']
+    if quote_normalized in para_quote_normalized:
+        start_pos = para_quote_normalized.find(quote_normalized)
+        logger.info(f"MATCH_FOUND: TIER 2 (quote_normalized) in paragraph {para_idx} at position {start_pos}")
+        # Map back to original positions (approximate - quotes are same length)
+        return {
+            'type': 'single_para',
+            'para_idx': para_idx,
+            'start_pos': start_pos,
+            'end_pos': start_pos + len(vendor_quote),
+            'match_type': 'quote_normalized'
+        }
+    
+    # TIER 3: Quote + whitespace normalized match
+    para_quote_ws_normalized = entry['quote_ws_normalized']
+    if quote_ws_normalized in para_quote_ws_normalized:
+        # Find position in normalized text, then map back
+        norm_start = para_quote_ws_normalized.find(quote_ws_normalized)
+        logger.info(f"MATCH_FOUND: TIER 3 (quote_whitespace_normalized) in paragraph {para_idx} at normalized position {norm_start}")
+        # Map normalized position back to original position
+        return _normalized_span_match(entry, para_idx, 'quote_ws', norm_start, norm_start + len(quote_ws_normalized),
+                                      'quote_whitespace_normalized')
+    
+    # TIER 3b: Quote + whitespace normalized + case-insensitive match (for case differences)
+    norm_start = entry['quote_ws_lower'].find(quote_forms['quote_ws_lower'])
+    if norm_start >= 0:
+        logger.info(f"MATCH_FOUND: TIER 3b (quote_whitespace_normalized_case_insensitive) in paragraph {para_idx} at normalized position {norm_start}")
+        return _normalized_span_match(entry, para_idx, 'quote_ws_lower', norm_start, norm_start + len(quote_forms['quote_ws_lower']),
+                                      'quote_whitespace_normalized_case_insensitive')
+    
+    # TIER 4: Fully normalized + case-insensitive match
+    norm_start = entry['fully_normalized'].find(quote_forms['fully_lower'])
+    if norm_start >= 0:
+        logger.info(f"MATCH_FOUND: TIER 4 (fully_normalized) in paragraph {para_idx} at normalized position {norm_start}")
+        return _normalized_span_match(entry, para_idx, 'fully', norm_start, norm_start + len(quote_forms['fully_lower']),
+                                      'fully_normalized')
+    
+    return None
+
+
+def locate_quotes_in_chunk(chunk_text: str, quotes: List[str], start_char: int = 0, segments: Optional[List[Dict[str, int]]] = None) -> List[Dict[str, Any]]:
+    """
+    Anchor vendor quotes to the chunk text they were extracted from.
+    
+    Uses cheap local matching only (exact, quote/whitespace normalized, fully
+    normalized) against the text the model was given, and maps the hit back to
+    absolute offsets in the chunked document text and to the paragraph/cell
+    coordinates recorded by the chunker.
+    
+    Args:
+        chunk_text: Text of the chunk, as produced by _split_document_into_chunks
+        quotes: Vendor quotes to locate
+        start_char: Absolute offset of the chunk in the chunked document text
+        segments: Chunk segments with absolute start/end and para_idx or table_idx/row_idx/cell_idx
         
-        # Log comprehensive summary
-        logger.info(f"REDLINE_SUMMARY: Input={total_conflicts_input}, Processed={total_conflicts_processed}, Empty skipped={empty_skipped}, Duplicates skipped={duplicates_skipped}")
+    Returns:
+        One anchor dict per quote with found, match_type, start_char, end_char and locations
+    """
+    chunk_entry = _index_text_entry(chunk_text)
+    segments = segments or []
+    anchors = []
+    
+    for quote in quotes:
+        anchor = {'found': False, 'match_type': None, 'start_char': None, 'end_char': None, 'locations': []}
+        quote_text = normalize_escaped_quotes((quote or '').strip())
+        if not quote_text or chunk_entry['is_empty']:
+            anchors.append(anchor)
+            continue
         
-        if failed_matches:
-            logger.warning(f"REDLINING_INCOMPLETE: {len(failed_matches)} conflicts could not be matched")
-            for failed in failed_matches:
-                logger.warning(f"UNMATCHED: ID={failed.get('id', 'Unknown')} - '{failed.get('text', '')[:50]}...'")
+        quote_forms = _prepare_quote_forms(quote_text)
+        span = None
+        pos = chunk_text.find(quote_text)
+        if pos != -1:
+            span, match_type = (pos, pos + len(quote_text)), 'exact'
         else:
-            logger.info("REDLINING_SUCCESS: All conflicts successfully matched and redlined")
+            for tier, quote_key, match_type in (
+                ('quote_ws_lower', 'quote_ws_lower', 'quote_whitespace_normalized'),
+                ('fully', 'fully_lower', 'fully_normalized')
+            ):
+                needle = quote_forms[quote_key]
+                haystack = chunk_entry['quote_ws_lower'] if tier == 'quote_ws_lower' else chunk_entry['fully_normalized']
+                pos = haystack.find(needle) if needle else -1
+                if pos != -1:
+                    span = _original_span(chunk_entry['offset_maps'][tier], pos, pos + len(needle))
+                    break
+        
+        if span:
+            abs_start, abs_end = start_char + span[0], start_char + span[1]
+            anchor.update({'found': True, 'match_type': match_type, 'start_char': abs_start, 'end_char': abs_end})
+            for segment in segments:
+                if segment['end'] <= abs_start or segment['start'] >= abs_end:
+                    continue
+                location = {key: value for key, value in segment.items() if key not in ('start', 'end')}
+                location['start'] = max(abs_start, segment['start']) - segment['start']
+                location['end'] = min(abs_end, segment['end']) - segment['start']
+                anchor['locations'].append(location)
         
-        logger.info(f"REDLINE_RESULTS: Total processed={total_conflicts_processed}, Matches={matches_found}, Failed={len(failed_matches)}, Success rate={success_rate:.1f}%")
+        anchors.append(anchor)
+    
+    return anchors
+
+
+def _match_from_anchor(doc_index: DocumentMatchIndex, anchor: Optional[Dict[str, Any]], quote_forms: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Turn a conflict's chunk anchor into a match without searching the document.
+    
+    The anchored text is checked against the indexed document before use, so a
+    stale or partial anchor falls back to the tiered search.
+    
+    Args:
+        doc_index: Normalized document index
+        anchor: Anchor dict from locate_quotes_in_chunk
+        quote_forms: Normalized forms of the vendor_quote from _prepare_quote_forms
         
+    Returns:
+        Match dict in the same shape as _find_text_match, or None
+    """
+    if not anchor or not anchor.get('found') or not anchor.get('locations'):
+        return None
+    
+    locations = anchor['locations']
+    match_type = f"anchored_{anchor.get('match_type')}"
+    
+    if all('para_idx' in location for location in locations):
+        para_indices = [location['para_idx'] for location in locations]
+        if any(idx >= len(doc_index.paragraphs) or doc_index.paragraphs[idx]['is_empty'] for idx in para_indices):
+            return None
+        
+        # The anchored ranges, joined in order, must still read as the quote
+        anchored_parts = []
+        for location in locations:
+            para_text = doc_index.paragraphs[location['para_idx']]['text']
+            if location['end'] > len(para_text):
+                return None
+            anchored_parts.append(para_text[location['start']:location['end']])
+        if normalize_for_matching(' '.join(anchored_parts)).lower() != quote_forms['fully_lower']:
+            return None
+        if len(locations) > 1:
+            return {'type': 'cross_para', 'paragraphs': para_indices, 'match_type': match_type}
+        
+        location = locations[0]
         return {
-            "total_paragraphs": total_paragraphs,
-            "matches_found": matches_found,
-            "paragraphs_with_redlines": paragraphs_with_redlines,
-            "failed_matches": failed_matches,
-            "pages_affected": len(set(para_idx // 20 for para_idx in paragraphs_with_redlines)) if paragraphs_with_redlines else 0
+            'type': 'single_para',
+            'para_idx': location['para_idx'],
+            'start_pos': location['start'],
+            'end_pos': location['end'],
+            'match_type': match_type
         }
-        
-    except Exception as e:
-        logger.error(f"Error in redlining: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
+    
+    if len(locations) == 1 and 'table_idx' in locations[0]:
+        location = locations[0]
+        cell_entry = doc_index.tables.cell(location['table_idx'], location['row_idx'], location['cell_idx'])
+        if not cell_entry or cell_entry['is_empty'] or quote_forms['fully_lower'] not in cell_entry['fully_normalized']:
+            return None
         return {
-            "total_paragraphs": 0,
-            "matches_found": 0,
-            "paragraphs_with_redlines": [],
-            "error": str(e)
+            'type': 'table_cell',
+            'table_idx': location['table_idx'],
+            'row_idx': location['row_idx'],
+            'cell_idx': location['cell_idx'],
+            'match_type': match_type
         }
+    
+    return None
 
 
-def _find_text_match(doc, vendor_quote: str) -> Optional[Dict[str, Any]]:
+def _find_text_match(doc_index: DocumentMatchIndex, vendor_quote: str) -> Optional[Dict[str, Any]]:
     """
     Find vendor_quote text in document using tiered matching strategy.
     
@@ -1965,201 +2953,32 @@ def _find_text_match(doc, vendor_quote: str) -> Optional[Dict[str, Any]]:
     6. Table cell match (searches within table cells)
     
     Args:
-        doc: python-docx Document object
+        doc_index: DocumentMatchIndex built from the python-docx Document
         vendor_quote: Text to find in document
         
     Returns:
         Match result dict or None if not found
     """
-    # Prepare normalized versions
-    # Note: vendor_quote may already be normalized from parsing, so we normalize again (idempotent)
-    quote_normalized = normalize_quotes(normalize_escaped_quotes(vendor_quote))
-    quote_ws_normalized = normalize_whitespace(normalize_subsection_markers(quote_normalized))
-    fully_normalized = normalize_for_matching(vendor_quote)
+    quote_forms = _prepare_quote_forms(vendor_quote)
+    quote_ws_normalized = quote_forms['quote_ws_normalized']
+    fully_normalized = quote_forms['fully_normalized']
     
     # First, search through all tables (for table-formatted exception documents)
-    for table_idx, table in enumerate(doc.tables):
-        for row_idx, row in enumerate(table.rows):
-            for cell_idx, cell in enumerate(row.cells):
-                cell_text = cell.text.strip()
-                if not cell_text:
-                    continue
-                
-                # Normalize cell text for matching (same normalization as vendor_quote)
-                cell_quote_normalized = normalize_quotes(cell_text)
-                cell_quote_ws_normalized = normalize_whitespace(normalize_subsection_markers(cell_quote_normalized))
-                cell_fully_normalized = normalize_for_matching(cell_text).lower()
-                
-                # Check all matching tiers for table cells
-                if vendor_quote in cell_text:
-                    logger.info(f"MATCH_FOUND: TIER 1 (exact) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                    return {
-                        'type': 'table_cell',
-                        'table_idx': table_idx,
-                        'row_idx': row_idx,
-                        'cell_idx': cell_idx,
-                        'match_type': 'exact'
-                    }
-                
-                if quote_normalized in cell_quote_normalized:
-                    logger.info(f"MATCH_FOUND: TIER 2 (quote_normalized) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                    return {
-                        'type': 'table_cell',
-                        'table_idx': table_idx,
-                        'row_idx': row_idx,
-                        'cell_idx': cell_idx,
-                        'match_type': 'quote_normalized'
-                    }
-                
-                if quote_ws_normalized in cell_quote_ws_normalized:
-                    logger.info(f"MATCH_FOUND: TIER 3 (quote_whitespace_normalized) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                    return {
-                        'type': 'table_cell',
-                        'table_idx': table_idx,
-                        'row_idx': row_idx,
-                        'cell_idx': cell_idx,
-                        'match_type': 'quote_whitespace_normalized'
-                    }
-                
-                if quote_ws_normalized.lower() in cell_quote_ws_normalized.lower():
-                    logger.info(f"MATCH_FOUND: TIER 3b (quote_whitespace_normalized_case_insensitive) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                    return {
-                        'type': 'table_cell',
-                        'table_idx': table_idx,
-                        'row_idx': row_idx,
-                        'cell_idx': cell_idx,
-                        'match_type': 'quote_whitespace_normalized_case_insensitive'
-                    }
-                
-                if fully_normalized.lower() in cell_fully_normalized:
-                    logger.info(f"MATCH_FOUND: TIER 4 (fully_normalized) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                    return {
-                        'type': 'table_cell',
-                        'table_idx': table_idx,
-                        'row_idx': row_idx,
-                        'cell_idx': cell_idx,
-                        'match_type': 'fully_normalized'
-                    }
-                
-                # TIER 4b: Check if vendor_quote is a prefix/substring of cell text (for table exceptions)
-                # This handles cases where Claude extracts partial text or text with formatting differences
-                if len(vendor_quote) > 50:  # Only for reasonably long quotes
-                    # Check if vendor quote is prefix of cell or cell is prefix of vendor quote (bidirectional)
-                    if cell_quote_ws_normalized.startswith(quote_ws_normalized) or quote_ws_normalized.startswith(cell_quote_ws_normalized):
-                        logger.info(f"MATCH_FOUND: TIER 4b (prefix/substring) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                        return {
-                            'type': 'table_cell',
-                            'table_idx': table_idx,
-                            'row_idx': row_idx,
-                            'cell_idx': cell_idx,
-                            'match_type': 'prefix_substring'
-                        }
-                    elif cell_fully_normalized.startswith(fully_normalized.lower()) or fully_normalized.lower().startswith(cell_fully_normalized):
-                        logger.info(f"MATCH_FOUND: TIER 4c (fully_normalized prefix/substring) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                        return {
-                            'type': 'table_cell',
-                            'table_idx': table_idx,
-                            'row_idx': row_idx,
-                            'cell_idx': cell_idx,
-                            'match_type': 'fully_normalized_prefix_substring'
-                        }
-                    # Also check if vendor quote appears as substring within cell (not just prefix)
-                    elif quote_ws_normalized in cell_quote_ws_normalized or cell_quote_ws_normalized in quote_ws_normalized:
-                        logger.info(f"MATCH_FOUND: TIER 4d (substring within cell) in table {table_idx}, row {row_idx}, cell {cell_idx}")
-                        return {
-                            'type': 'table_cell',
-                            'table_idx': table_idx,
-                            'row_idx': row_idx,
-                            'cell_idx': cell_idx,
-                            'match_type': 'substring_within_cell'
-                        }
+    for cell_entry in doc_index.cells:
+        cell_match = _match_table_cell_entry(cell_entry, quote_forms)
+        if cell_match:
+            return cell_match
     
     # Search through all paragraphs (fallback if not found in tables)
-    paragraphs_checked = 0
-    for para_idx, paragraph in enumerate(doc.paragraphs):
-        para_text = paragraph.text
-        if not para_text.strip():
-            continue
-        
-        paragraphs_checked += 1
-        
-        # TIER 1: Exact match
-        if vendor_quote in para_text:
-            start_pos = para_text.find(vendor_quote)
-            logger.info(f"MATCH_FOUND: TIER 1 (exact) in paragraph {para_idx} at position {start_pos}")
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': start_pos + len(vendor_quote),
-                'match_type': 'exact'
-            }
-        
-        # TIER 2: Quote-normalized match (quotes only, preserve whitespace)
-        para_quote_normalized = normalize_quotes(para_text)
-        if quote_normalized in para_quote_normalized:
-            start_pos = para_quote_normalized.find(quote_normalized)
-            logger.info(f"MATCH_FOUND: TIER 2 (quote_normalized) in paragraph {para_idx} at position {start_pos}")
-            # Map back to original positions (approximate - quotes are same length)
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': start_pos + len(vendor_quote),
-                'match_type': 'quote_normalized'
-            }
-        
-        # TIER 3: Quote + whitespace normalized match
-        para_quotes_only = normalize_quotes(para_text)
-        para_quote_ws_normalized = normalize_whitespace(normalize_subsection_markers(para_quotes_only))
-        if quote_ws_normalized in para_quote_ws_normalized:
-            # Find position in normalized text, then map back
-            norm_start = para_quote_ws_normalized.find(quote_ws_normalized)
-            logger.info(f"MATCH_FOUND: TIER 3 (quote_whitespace_normalized) in paragraph {para_idx} at normalized position {norm_start}")
-            # Map normalized position back to original position
-            start_pos = _map_normalized_to_original_position(para_text, norm_start)
-            end_pos = _map_normalized_to_original_position(para_text, norm_start + len(quote_ws_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'quote_whitespace_normalized'
-            }
-        
-        # TIER 3b: Quote + whitespace normalized + case-insensitive match (for case differences)
-        if quote_ws_normalized.lower() in para_quote_ws_normalized.lower():
-            norm_start = para_quote_ws_normalized.lower().find(quote_ws_normalized.lower())
-            logger.info(f"MATCH_FOUND: TIER 3b (quote_whitespace_normalized_case_insensitive) in paragraph {para_idx} at normalized position {norm_start}")
-            start_pos = _map_normalized_to_original_position(para_text, norm_start)
-            end_pos = _map_normalized_to_original_position(para_text, norm_start + len(quote_ws_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'quote_whitespace_normalized_case_insensitive'
-            }
-        
-        # TIER 4: Fully normalized + case-insensitive match
-        para_fully_normalized = normalize_for_matching(para_text).lower()
-        if fully_normalized.lower() in para_fully_normalized:
-            norm_start = para_fully_normalized.find(fully_normalized.lower())
-            logger.info(f"MATCH_FOUND: TIER 4 (fully_normalized) in paragraph {para_idx} at normalized position {norm_start}")
-            start_pos = _map_normalized_to_original_position(para_text, norm_start)
-            end_pos = _map_normalized_to_original_position(para_text, norm_start + len(fully_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'fully_normalized'
-            }
+    for para_idx in range(len(doc_index.paragraphs)):
+        para_match = _match_paragraph_entry(doc_index, para_idx, quote_forms)
+        if para_match:
+            return para_match
     
     # TIER 5: Partial/truncated quote matching
     # If vendor quote appears to be truncated (ends mid-sentence or is suspiciously short),
     # or is very long (might span paragraphs), try to match it as a prefix/substring
-    partial_match = _find_partial_match(doc, vendor_quote, quote_ws_normalized, fully_normalized, force_substring_match=False)
+    partial_match = _find_partial_match(doc_index, vendor_quote, quote_ws_normalized, fully_normalized, force_substring_match=False)
     if partial_match:
         logger.info(f"MATCH_FOUND: TIER 5 (partial/truncated) in paragraph {partial_match.get('para_idx')}")
         return partial_match
@@ -2168,58 +2987,29 @@ def _find_text_match(doc, vendor_quote: str) -> Optional[Dict[str, Any]]:
     # If exact match failed but quote is long or we suspect formatting differences,
     # try substring matching as a last resort
     if len(vendor_quote) > 200:  # Only for reasonably long quotes to avoid false positives
-        substring_match = _find_partial_match(doc, vendor_quote, quote_ws_normalized, fully_normalized, force_substring_match=True)
+        substring_match = _find_partial_match(doc_index, vendor_quote, quote_ws_normalized, fully_normalized, force_substring_match=True)
         if substring_match:
             logger.info(f"MATCH_FOUND: TIER 5b (substring fallback) in paragraph {substring_match.get('para_idx')}")
             return substring_match
     
     # TIER 6: Cross-paragraph matching (enhanced for long quotes)
-    cross_match = _find_cross_paragraph_match(doc, vendor_quote, fully_normalized, quote_ws_normalized, fully_normalized)
+    cross_match = _find_cross_paragraph_match(doc_index, vendor_quote, fully_normalized, quote_ws_normalized, fully_normalized)
     if cross_match:
         logger.info(f"MATCH_FOUND: TIER 6 (cross_paragraph) across paragraphs {cross_match.get('paragraphs', [])}")
         return cross_match
     
+    # TIER 7: Fuzzy match (quote differs slightly from the document text, e.g. a changed word)
+    fuzzy_match = _find_fuzzy_match(doc_index, quote_forms['fully_lower'])
+    if fuzzy_match:
+        logger.info(f"MATCH_FOUND: TIER 7 (fuzzy, similarity={fuzzy_match['similarity']:.2f}) in paragraphs {fuzzy_match.get('paragraphs', [fuzzy_match.get('para_idx')])}")
+        return fuzzy_match
+    
     logger.warning(f"MATCH_FAILED: Could not find vendor_quote in document. vendor_quote='{vendor_quote[:200]}...'")
-    logger.warning(f"MATCH_FAILED: Checked {len([p for p in doc.paragraphs if p.text.strip()])} non-empty paragraphs")
+    logger.warning(f"MATCH_FAILED: Checked {doc_index.non_empty_paragraph_count} non-empty paragraphs")
     return None
 
 
-def _map_normalized_to_original_position(original_text: str, normalized_pos: int) -> int:
-    """
-    Map a position in normalized text back to approximate position in original text.
-    
-    This is an approximation since whitespace normalization changes positions.
-    
-    Args:
-        original_text: Original text before normalization
-        normalized_pos: Position in normalized text
-        
-    Returns:
-        Approximate position in original text
-    """
-    if normalized_pos <= 0:
-        return 0
-    
-    # Walk through original text, counting non-collapsed characters
-    normalized_count = 0
-    in_whitespace = False
-    
-    for i, char in enumerate(original_text):
-        if char in ' \t\n\r':
-            if not in_whitespace:
-                normalized_count += 1  # Collapsed whitespace counts as 1
-                in_whitespace = True
-        else:
-            normalized_count += 1
-            in_whitespace = False
-        
-        if normalized_count >= normalized_pos:
-            return i + 1
-    
-    return len(original_text)
-
-
-def _find_partial_match(doc, vendor_quote: str, quote_ws_normalized: str, fully_normalized: str, force_substring_match: bool = False) -> Optional[Dict[str, Any]]:
+def _find_partial_match(doc_index: DocumentMatchIndex, vendor_quote: str, quote_ws_normalized: str, fully_normalized: str, force_substring_match: bool = False) -> Optional[Dict[str, Any]]:
     """
     Find vendor_quote using partial/substring matching.
     
@@ -2230,7 +3020,7 @@ def _find_partial_match(doc, vendor_quote: str, quote_ws_normalized: str, fully_
     3. Long quotes that span multiple paragraphs
     
     Args:
-        doc: python-docx Document object
+        doc_index: DocumentMatchIndex built from the python-docx Document
         vendor_quote: Original vendor quote text
         quote_ws_normalized: Quote and whitespace normalized vendor quote
         fully_normalized: Fully normalized vendor quote
@@ -2259,111 +3049,78 @@ def _find_partial_match(doc, vendor_quote: str, quote_ws_normalized: str, fully_
     elif force_substring_match:
         logger.info(f"MATCH_PARTIAL_CHECK: forcing substring match attempt (exact match failed)")
     
+    quote_ws_lower = quote_ws_normalized.lower()
+    fully_lower = fully_normalized.lower()
+    
+    # Only paragraphs the fuzzy index ranks as likely to contain the quote need the checks below
+    spans = doc_index.fuzzy_index.candidates(fully_lower)
+    if spans is None:
+        para_indices = range(len(doc_index.paragraphs))
+    else:
+        para_indices = sorted({span['paragraphs'][0] for span in spans if len(span['paragraphs']) == 1})
+        logger.info(f"MATCH_PARTIAL_CHECK: fuzzy index narrowed search to {len(para_indices)} candidate paragraphs")
+    
     # Search through paragraphs for prefix match
-    for para_idx, paragraph in enumerate(doc.paragraphs):
-        para_text = paragraph.text
-        if not para_text.strip():
+    for para_idx in para_indices:
+        entry = doc_index.paragraphs[para_idx]
+        if entry['is_empty']:
             continue
         
-        # Normalize paragraph text
-        para_quotes_only = normalize_quotes(para_text)
-        para_quote_ws_normalized = normalize_whitespace(normalize_subsection_markers(para_quotes_only))
-        para_fully_normalized = normalize_for_matching(para_text).lower()
+        # Paragraph text is already normalized in the index
+        para_quote_ws_normalized = entry['quote_ws_normalized']
+        para_quote_ws_lower = entry['quote_ws_lower']
+        para_fully_normalized = entry['fully_normalized']
         
         # Check if vendor quote is a prefix of paragraph (after normalization)
         # Try multiple normalization levels
+        prefix_match = None
         if para_quote_ws_normalized.startswith(quote_ws_normalized):
             # Found prefix match - vendor quote is start of paragraph
             logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote is prefix of paragraph {para_idx} (quote_ws_normalized)")
-            start_pos = 0
-            # Map normalized length back to original position
-            end_pos = _map_normalized_to_original_position(para_text, len(quote_ws_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'partial_truncated',
-                'is_truncated': True
-            }
-        elif para_quote_ws_normalized.lower().startswith(quote_ws_normalized.lower()):
+            prefix_match = _normalized_span_match(entry, para_idx, 'quote_ws', 0, len(quote_ws_normalized), 'partial_truncated')
+        elif para_quote_ws_lower.startswith(quote_ws_lower):
             # Found prefix match with case-insensitive check
             logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote is prefix of paragraph {para_idx} (quote_ws_normalized_case_insensitive)")
-            start_pos = 0
-            end_pos = _map_normalized_to_original_position(para_text, len(quote_ws_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'partial_truncated_case_insensitive',
-                'is_truncated': True
-            }
-        elif para_fully_normalized.startswith(fully_normalized.lower()):
+            prefix_match = _normalized_span_match(entry, para_idx, 'quote_ws_lower', 0, len(quote_ws_lower), 'partial_truncated_case_insensitive')
+        elif para_fully_normalized.startswith(fully_lower):
             # Found prefix match with full normalization
             logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote is prefix of paragraph {para_idx} (fully_normalized)")
-            start_pos = 0
-            end_pos = _map_normalized_to_original_position(para_text, len(fully_normalized))
-            return {
-                'type': 'single_para',
-                'para_idx': para_idx,
-                'start_pos': start_pos,
-                'end_pos': end_pos,
-                'match_type': 'partial_truncated',
-                'is_truncated': True
-            }
+            prefix_match = _normalized_span_match(entry, para_idx, 'fully', 0, len(fully_lower), 'partial_truncated')
+        
+        if prefix_match:
+            prefix_match['is_truncated'] = True
+            return prefix_match
         
         # Check if vendor quote appears within paragraph (not just at start)
         # This handles cases where vendor quote is a substring (e.g., starts after " Conflicts. ")
         # Try multiple normalization levels - check this for ALL paragraphs, not just when not a prefix
+        substring_match = None
         if quote_ws_normalized in para_quote_ws_normalized:
             norm_start = para_quote_ws_normalized.find(quote_ws_normalized)
             logger.info(f"MATCH_PARTIAL_SUBSTRING_CHECK: paragraph {para_idx}, quote_ws_normalized found at position {norm_start}")
             # Only return if it's not already a prefix match (avoid duplicate)
             if norm_start > 0:
                 logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote found within paragraph {para_idx} at normalized position {norm_start} (quote_ws_normalized)")
-                start_pos = _map_normalized_to_original_position(para_text, norm_start)
-                end_pos = _map_normalized_to_original_position(para_text, norm_start + len(quote_ws_normalized))
-                return {
-                    'type': 'single_para',
-                    'para_idx': para_idx,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos,
-                    'match_type': 'partial_substring',
-                    'is_truncated': is_likely_truncated
-                }
-        elif quote_ws_normalized.lower() in para_quote_ws_normalized.lower():
+                substring_match = _normalized_span_match(entry, para_idx, 'quote_ws', norm_start, norm_start + len(quote_ws_normalized), 'partial_substring')
+        elif quote_ws_lower in para_quote_ws_lower:
             # Case-insensitive substring check
-            norm_start = para_quote_ws_normalized.lower().find(quote_ws_normalized.lower())
+            norm_start = para_quote_ws_lower.find(quote_ws_lower)
             if norm_start > 0:
                 logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote found within paragraph {para_idx} at normalized position {norm_start} (quote_ws_normalized_case_insensitive)")
-                start_pos = _map_normalized_to_original_position(para_text, norm_start)
-                end_pos = _map_normalized_to_original_position(para_text, norm_start + len(quote_ws_normalized))
-                return {
-                    'type': 'single_para',
-                    'para_idx': para_idx,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos,
-                    'match_type': 'partial_substring_case_insensitive',
-                    'is_truncated': is_likely_truncated
-                }
-        elif fully_normalized.lower() in para_fully_normalized:
-            norm_start = para_fully_normalized.find(fully_normalized.lower())
+                substring_match = _normalized_span_match(entry, para_idx, 'quote_ws_lower', norm_start, norm_start + len(quote_ws_lower), 'partial_substring_case_insensitive')
+        elif fully_lower in para_fully_normalized:
+            norm_start = para_fully_normalized.find(fully_lower)
             # Only return if it's not already a prefix match (avoid duplicate)
             if norm_start > 0:
                 logger.info(f"MATCH_PARTIAL_FOUND: vendor_quote found within paragraph {para_idx} at normalized position {norm_start} (fully_normalized)")
-                start_pos = _map_normalized_to_original_position(para_text, norm_start)
-                end_pos = _map_normalized_to_original_position(para_text, norm_start + len(fully_normalized))
-                return {
-                    'type': 'single_para',
-                    'para_idx': para_idx,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos,
-                    'match_type': 'partial_substring',
-                    'is_truncated': is_likely_truncated
-                }
+                substring_match = _normalized_span_match(entry, para_idx, 'fully', norm_start, norm_start + len(fully_lower), 'partial_substring')
+        
+        if substring_match:
+            substring_match['is_truncated'] = is_likely_truncated
+            return substring_match
+        
         # Log divergence details only when first 50 chars match but full quote doesn't (for debugging)
-        elif len(quote_ws_normalized) > 50 and quote_ws_normalized[:50] in para_quote_ws_normalized:
+        if quote_ws_lower not in para_quote_ws_lower and fully_lower not in para_fully_normalized and len(quote_ws_normalized) > 50 and quote_ws_normalized[:50] in para_quote_ws_normalized:
             pos50 = para_quote_ws_normalized.find(quote_ws_normalized[:50])
             if pos50 >= 0:
                 # Find where text diverges
@@ -2378,7 +3135,7 @@ def _find_partial_match(doc, vendor_quote: str, quote_ws_normalized: str, fully_
     return None
 
 
-def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, quote_ws_normalized: str = None, fully_normalized: str = None) -> Optional[Dict[str, Any]]:
+def _find_cross_paragraph_match(doc_index: DocumentMatchIndex, vendor_quote: str, normalized_quote: str, quote_ws_normalized: str = None, fully_normalized: str = None) -> Optional[Dict[str, Any]]:
     """
     Find vendor_quote that spans multiple paragraphs.
     
@@ -2386,14 +3143,17 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
     Enhanced for long quotes with better normalization handling.
     
     Args:
-        doc: python-docx Document object
+        doc_index: DocumentMatchIndex built from the python-docx Document
         vendor_quote: Original text to find
         normalized_quote: Normalized version of text
         
     Returns:
         Match result dict or None if not found
     """
-    paragraphs = doc.paragraphs
+    paragraph_count = len(doc_index.paragraphs)
+    normalized_lower = normalized_quote.lower()
+    quote_ws_lower = quote_ws_normalized.lower() if quote_ws_normalized else None
+    fully_lower = fully_normalized.lower() if fully_normalized else None
     
     # Determine window size based on quote length
     # Long quotes (>500 chars) might span more paragraphs
@@ -2407,28 +3167,35 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
     else:
         window_sizes = [2, 3, 4]  # Added 4 for medium quotes
     
+    # Candidate spans from the fuzzy index limit which windows can contain the quote
+    spans = doc_index.fuzzy_index.candidates(normalized_lower)
+    
     # Try joining consecutive paragraphs with different window sizes
     for window_size in window_sizes:
-        for start_idx in range(len(paragraphs) - window_size + 1):
-            # Join paragraphs with space
-            joined_paras = []
-            joined_text = ""
-            for i in range(window_size):
-                para_text = paragraphs[start_idx + i].text
-                if para_text.strip():
-                    joined_paras.append(start_idx + i)
-                    joined_text += para_text + " "
-            
-            if not joined_text.strip():
+        if spans is None:
+            start_indices = range(paragraph_count - window_size + 1)
+        else:
+            # A window covers a span when it starts at or before the span's first paragraph
+            # and ends at or after its last one
+            start_indices = sorted({
+                start_idx
+                for span in spans
+                for start_idx in range(max(0, span['paragraphs'][-1] - window_size + 1),
+                                       min(span['paragraphs'][0], paragraph_count - window_size) + 1)
+            })
+        
+        for start_idx in start_indices:
+            # Joined and normalized windows are cached in the index across quotes
+            window = doc_index.window(start_idx, window_size)
+            if not window:
                 continue
             
-            joined_text = joined_text.strip()
+            joined_paras = window['paragraphs']
             
             # Try multiple normalization levels for better matching
             # First try quote+whitespace normalized if available
             if quote_ws_normalized:
-                joined_quote_ws = normalize_whitespace(normalize_subsection_markers(normalize_quotes(joined_text)))
-                if quote_ws_normalized in joined_quote_ws:
+                if quote_ws_normalized in window['quote_ws_normalized']:
                     logger.info(f"CROSS_PARA_MATCH: Found (quote_ws_normalized) in paragraphs {joined_paras}")
                     return {
                         'type': 'cross_para',
@@ -2436,7 +3203,7 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
                         'match_type': 'cross_paragraph_quote_ws'
                     }
                 # Also try case-insensitive version
-                if quote_ws_normalized.lower() in joined_quote_ws.lower():
+                if quote_ws_lower in window['quote_ws_lower']:
                     logger.info(f"CROSS_PARA_MATCH: Found (quote_ws_normalized_case_insensitive) in paragraphs {joined_paras}")
                     return {
                         'type': 'cross_para',
@@ -2445,8 +3212,8 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
                     }
             
             # Try fully normalized
-            joined_normalized = normalize_for_matching(joined_text).lower()
-            if normalized_quote.lower() in joined_normalized:
+            joined_normalized = window['fully_normalized']
+            if normalized_lower in joined_normalized:
                 logger.info(f"CROSS_PARA_MATCH: Found (fully_normalized) in paragraphs {joined_paras}")
                 return {
                     'type': 'cross_para',
@@ -2455,8 +3222,8 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
                 }
             
             # Also try with fully_normalized if available
-            if fully_normalized:
-                if fully_normalized.lower() in joined_normalized:
+            if fully_lower:
+                if fully_lower in joined_normalized:
                     logger.info(f"CROSS_PARA_MATCH: Found (fully_normalized) in paragraphs {joined_paras}")
                     return {
                         'type': 'cross_para',
@@ -2467,76 +3234,381 @@ def _find_cross_paragraph_match(doc, vendor_quote: str, normalized_quote: str, q
     return None
 
 
-def _apply_multiple_redlines(paragraph, para_text: str, matches: List[Dict]) -> bool:
+def _align_quote(fully_lower: str, text: str) -> Optional[Tuple[int, int, float]]:
+    """
+    Align a quote with the range of text it most likely came from.
+    
+    Matching blocks shorter than a shingle are ignored, and blocks separated by more than
+    FUZZY_ALIGN_MAX_GAP document characters the quote does not account for form separate runs;
+    the run covering most of the quote is the aligned range. Blocks are in quote order, so
+    text that only shares the quote's words out of order does not align.
+    
+    Args:
+        fully_lower: Fully normalized, lowercased vendor quote
+        text: Fully normalized document text to align against
+        
+    Returns:
+        Tuple of (start, end, similarity) in text, or None if nothing aligns
+    """
+    matcher = difflib.SequenceMatcher(None, fully_lower, text, autojunk=False)
+    blocks = [block for block in matcher.get_matching_blocks() if block.size >= FUZZY_SHINGLE_SIZE]
+    if not blocks:
+        return None
+    
+    runs = [[blocks[0]]]
+    for previous, block in zip(blocks, blocks[1:]):
+        quote_gap = block.a - (previous.a + previous.size)
+        text_gap = block.b - (previous.b + previous.size)
+        if text_gap - quote_gap > FUZZY_ALIGN_MAX_GAP:
+            runs.append([])
+        runs[-1].append(block)
+    run = max(runs, key=lambda run_blocks: sum(block.size for block in run_blocks))
+    
+    start, end = run[0].b, run[-1].b + run[-1].size
+    similarity = difflib.SequenceMatcher(None, fully_lower, text[start:end], autojunk=False).ratio()
+    return start, end, similarity
+
+
+def _find_fuzzy_match(doc_index: DocumentMatchIndex, fully_lower: str, min_similarity: float = FUZZY_MATCH_MIN_SIMILARITY) -> Optional[Dict[str, Any]]:
+    """
+    Find the best fuzzy span for a quote that no exact tier could locate.
+    
+    Candidate spans from the fuzzy index are only estimates, so each is aligned against the
+    paragraph text and accepted when the aligned text is at least min_similarity similar to the
+    quote. A single-paragraph match covers only the aligned range. A cross-paragraph match is
+    redlined whole, so its alignment must run through its paragraphs in order and cover at
+    least FUZZY_EDGE_MIN_COVERAGE of each of them.
+    
+    Args:
+        doc_index: DocumentMatchIndex built from the python-docx Document
+        fully_lower: Fully normalized, lowercased vendor quote
+        min_similarity: Minimum similarity of the aligned document text to the quote
+        
+    Returns:
+        Match result dict (aligned single-paragraph range or cross-paragraph) or None if no span verifies
+    """
+    spans = doc_index.fuzzy_index.candidates(fully_lower, min_similarity=min_similarity)
+    if not spans:
+        return None
+    
+    best = None
+    for span in spans[:FUZZY_MATCH_MAX_SPANS]:
+        # Join the span's paragraphs in document order, remembering where each one starts
+        entries = [doc_index.paragraphs[para_idx] for para_idx in span['paragraphs']]
+        para_starts = []
+        joined = ''
+        for entry in entries:
+            para_starts.append(len(joined))
+            joined += entry['fully_normalized'] + ' '
+        
+        alignment = _align_quote(fully_lower, joined)
+        if not alignment or alignment[2] < min_similarity or (best and alignment[2] <= best['similarity']):
+            continue
+        start, end, similarity = alignment
+        
+        # Paragraphs the aligned range touches, with the share of each it covers
+        touched = []
+        for para_idx, entry, para_start in zip(span['paragraphs'], entries, para_starts):
+            para_end = para_start + len(entry['fully_normalized'])
+            overlap = min(end, para_end) - max(start, para_start)
+            if overlap > 0:
+                touched.append((para_idx, entry, para_start, overlap / max(1, para_end - para_start)))
+        
+        if len(touched) == 1:
+            para_idx, entry, para_start, _ = touched[0]
+            norm_start = max(0, start - para_start)
+            norm_end = min(len(entry['fully_normalized']), end - para_start)
+            best = dict(_normalized_span_match(entry, para_idx, 'fully', norm_start, norm_end, 'fuzzy'), similarity=similarity)
+        elif touched and all(coverage >= FUZZY_EDGE_MIN_COVERAGE for _, _, _, coverage in touched):
+            best = {
+                'type': 'cross_para',
+                'paragraphs': [para_idx for para_idx, _, _, _ in touched],
+                'match_type': 'cross_paragraph_fuzzy',
+                'similarity': similarity
+            }
+        else:
+            logger.info(f"FUZZY_REJECTED: Alignment in paragraphs {[para_idx for para_idx, _, _, _ in touched]} covers too little of them to redline whole")
+    
+    return best
+
+
+# Run content elements that render as a single character in Paragraph.text
+_RUN_CHAR_TAGS = {
+    qn('w:tab'): '\t',
+    qn('w:br'): '\n',
+    qn('w:cr'): '\n',
+    qn('w:noBreakHyphen'): '-',
+}
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_RPR = qn('w:rPr')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+class RedlineXmlWriter:
+    """
+    Redline writer that edits the document.xml and comments.xml trees directly.
+
+    Each paragraph's runs are split at every redline boundary in a single pass,
+    keeping the original run properties on every piece, and comments are
+    appended to the comments part with ids from a counter. python-docx's
+    run.add_comment re-reads every existing comment id per insertion and the
+    clear/add_run rebuild drops run formatting; this writer does neither.
+    The package is still saved once by _save_and_upload_document.
+    """
+
+    def __init__(self, doc, author: str = "One L", initials: str = "1L"):
+        """
+        Args:
+            doc: python-docx Document object
+            author: Comment author name
+            initials: Comment author initials
+        """
+        from datetime import datetime
+        self.doc = doc
+        self.author = author
+        self.initials = initials
+        self.date = datetime.now().replace(microsecond=0).isoformat()
+        self.comments_added = 0
+        self.paragraphs_rewritten = 0
+        self._comments = None
+        self._next_comment_id = 0
+
+    def _comments_element(self):
+        """Get the <w:comments> root, creating the comments part on first use."""
+        if self._comments is None:
+            self._comments = self.doc.part._comments_part.element
+            existing_ids = [int(c.get(qn('w:id'))) for c in self._comments if c.get(qn('w:id')) is not None]
+            self._next_comment_id = max(existing_ids) + 1 if existing_ids else 0
+        return self._comments
+
+    def add_comment(self, text: str) -> int:
+        """
+        Append a comment to the comments part.
+
+        Args:
+            text: Comment text
+
+        Returns:
+            Id of the new comment
+        """
+        comments = self._comments_element()
+        comment_id = self._next_comment_id
+        self._next_comment_id += 1
+
+        comment = OxmlElement('w:comment')
+        comment.set(qn('w:id'), str(comment_id))
+        comment.set(qn('w:author'), self.author)
+        comment.set(qn('w:date'), self.date)
+        comment.set(qn('w:initials'), self.initials)
+        comment_p = OxmlElement('w:p')
+        comment_r = OxmlElement('w:r')
+        comment_r.text = text  # CT_R setter maps \t and \n to w:tab and w:br
+        comment_p.append(comment_r)
+        comment.append(comment_p)
+        comments.append(comment)
+
+        self.comments_added += 1
+        return comment_id
+
+    def redline_spans(self, p, spans: List[Tuple[int, int, str]]) -> int:
+        """
+        Strike through and colour character spans of one paragraph and anchor their comments.
+
+        Spans may overlap; runs are split at every span boundary once, so
+        overlapping spans share pieces instead of duplicating text, and each
+        span keeps its own comment range.
+
+        Args:
+            p: <w:p> element (paragraph._p)
+            spans: (start, end, comment) tuples in Paragraph.text coordinates
+
+        Returns:
+            Number of spans that covered at least one run
+        """
+        spans = [(start, end, comment) for start, end, comment in spans if end > start]
+        if not spans:
+            return 0
+
+        cuts = sorted({pos for start, end, _ in spans for pos in (start, end)})
+        pieces = self._split_runs(p, cuts)
+
+        applied = 0
+        struck = set()
+        for start, end, comment in sorted(spans):
+            covered = [run for piece_start, piece_end, run in pieces
+                       if piece_end > piece_start and piece_start >= start and piece_end <= end]
+            if not covered:
+                continue
+            for run in covered:
+                if id(run) not in struck:
+                    struck.add(id(run))
+                    self._strike(run)
+            self._anchor_comment(covered[0], covered[-1], comment)
+            applied += 1
+
+        self.paragraphs_rewritten += 1
+        return applied
+
+    def redline_paragraphs(self, p_elements: List, comment: str) -> bool:
+        """
+        Strike through whole paragraphs under a single comment range.
+
+        Args:
+            p_elements: <w:p> elements in document order
+            comment: Comment spanning from the first to the last redlined run
+
+        Returns:
+            True if any text was redlined, False otherwise
+        """
+        covered = []
+        for p in p_elements:
+            runs = [run for start, end, run in self._split_runs(p, []) if end > start]
+            if not runs:
+                continue
+            for run in runs:
+                self._strike(run)
+            covered.extend(runs)
+            self.paragraphs_rewritten += 1
+
+        if not covered:
+            return False
+        self._anchor_comment(covered[0], covered[-1], comment)
+        return True
+
+    def _split_runs(self, p, cuts: List[int]) -> List[Tuple[int, int, Any]]:
+        """
+        Split the paragraph's direct runs at the given text positions.
+
+        Args:
+            p: <w:p> element
+            cuts: Sorted positions in Paragraph.text coordinates
+
+        Returns:
+            (start, end, <w:r>) for every direct run after splitting, in document order
+        """
+        pieces = []
+        pos = 0
+        for run in [child for child in p if child.tag == _W_R]:
+            atoms = []  # (child, start, text) for each content child, relative to the run
+            length = 0
+            for child in run:
+                if child.tag == _W_RPR:
+                    continue
+                if child.tag == _W_T:
+                    text = child.text or ''
+                else:
+                    text = _RUN_CHAR_TAGS.get(child.tag, '')
+                atoms.append((child, length, text))
+                length += len(text)
+
+            run_start, run_end = pos, pos + length
+            pos = run_end
+            inner = [cut - run_start for cut in cuts if run_start < cut < run_end]
+            if not inner:
+                pieces.append((run_start, run_end, run))
+                continue
+
+            bounds = [0] + inner + [length]
+            rPr = run.find(_W_RPR)
+            new_runs = []
+            for _ in range(len(bounds) - 1):
+                new_run = OxmlElement('w:r')
+                for name, value in run.attrib.items():
+                    new_run.set(name, value)
+                if rPr is not None:
+                    new_run.append(copy.deepcopy(rPr))
+                new_runs.append(new_run)
+
+            for child, start, text in atoms:
+                if child.tag == _W_T:
+                    for i in range(len(bounds) - 1):
+                        lo, hi = max(start, bounds[i]), min(start + len(text), bounds[i + 1])
+                        if hi > lo:
+                            t = OxmlElement('w:t')
+                            t.text = text[lo - start:hi - start]
+                            t.set(_XML_SPACE, 'preserve')
+                            new_runs[i].append(t)
+                else:
+                    # Non-text children stay with the piece that contains their position
+                    i = len(bounds) - 2
+                    while i > 0 and start < bounds[i]:
+                        i -= 1
+                    new_runs[i].append(child)
+
+            for i, new_run in enumerate(new_runs):
+                run.addprevious(new_run)
+                pieces.append((run_start + bounds[i], run_start + bounds[i + 1], new_run))
+            p.remove(run)
+
+        return pieces
+
+    @staticmethod
+    def _strike(run):
+        """Apply red strikethrough formatting to a <w:r> element."""
+        rPr = run.get_or_add_rPr()
+        rPr._remove_color()
+        rPr.get_or_add_color().val = RGBColor(255, 0, 0)
+        rPr._set_bool_val('strike', True)
+
+    def _anchor_comment(self, first_run, last_run, comment: str):
+        """Wrap first_run..last_run in a comment range followed by its reference run."""
+        if not comment or not comment.strip():
+            return
+        comment_id = str(self.add_comment(comment))
+
+        range_start = OxmlElement('w:commentRangeStart')
+        range_start.set(qn('w:id'), comment_id)
+        range_end = OxmlElement('w:commentRangeEnd')
+        range_end.set(qn('w:id'), comment_id)
+        reference_run = OxmlElement('w:r')
+        reference = OxmlElement('w:commentReference')
+        reference.set(qn('w:id'), comment_id)
+        reference_run.append(reference)
+
+        first_run.addprevious(range_start)
+        last_run.addnext(range_end)
+        range_end.addnext(reference_run)
+
+
+def _apply_multiple_redlines(writer: RedlineXmlWriter, paragraph, para_text: str, matches: List[Dict], offset_maps: Optional[Dict[str, array]] = None) -> bool:
     """
     Apply multiple redlines to a single paragraph.
     
-    Processes matches from end to start to preserve character positions.
+    All matches are resolved to original-text spans first and then written in
+    one pass over the paragraph's runs, so overlapping matches share the
+    struck-through text instead of duplicating it.
+    Matches found in a normalized tier carry their normalized span, which is
+    mapped back to the original text through the paragraph's offset map.
     
     Args:
+        writer: RedlineXmlWriter for the document
         paragraph: python-docx Paragraph object
         para_text: Original paragraph text
-        matches: List of match dicts sorted by start_pos descending
+        matches: List of match dicts
+        offset_maps: Offset maps per normalization tier from normalize_with_offsets
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Build list of text segments with formatting info
-        # Start with the full text, then split at each redline point
-        segments = []  # List of (text, is_redline, comment)
-        
-        current_pos = len(para_text)
-        
+        spans = []
         for match in matches:
             start_pos = match['start_pos']
             end_pos = match['end_pos']
-            comment = match['comment']
+            
+            normalized_span = match.get('normalized_span')
+            if normalized_span and offset_maps and match.get('normalized_tier') in offset_maps:
+                start_pos, end_pos = _original_span(offset_maps[match['normalized_tier']], *normalized_span)
             
             # Bounds checking
             start_pos = max(0, min(start_pos, len(para_text)))
             end_pos = max(start_pos, min(end_pos, len(para_text)))
-            
-            # Add text after this redline (if any)
-            if current_pos > end_pos:
-                after_text = para_text[end_pos:current_pos]
-                if after_text:
-                    segments.insert(0, {'text': after_text, 'is_redline': False, 'comment': None})
-            
-            # Add the redlined text
-            target_text = para_text[start_pos:end_pos]
-            if target_text:
-                segments.insert(0, {'text': target_text, 'is_redline': True, 'comment': comment})
-            
-            current_pos = start_pos
-        
-        # Add any remaining text at the beginning
-        if current_pos > 0:
-            before_text = para_text[:current_pos]
-            if before_text:
-                segments.insert(0, {'text': before_text, 'is_redline': False, 'comment': None})
+            spans.append((start_pos, end_pos, match['comment']))
         
-        # Clear existing runs
-        for run in paragraph.runs:
-            run.clear()
+        applied = writer.redline_spans(paragraph._p, spans)
         
-        # Rebuild paragraph with all segments
-        for segment in segments:
-            run = paragraph.add_run(segment['text'])
-            
-            if segment['is_redline']:
-                run.font.color.rgb = RGBColor(255, 0, 0)  # Red color
-                run.font.strike = True  # Strikethrough
-                
-                # Add comment if present
-                if segment['comment'] and segment['comment'].strip():
-                    try:
-                        run.add_comment(segment['comment'], author="One L", initials="1L")
-                        logger.info(f"COMMENT_ADDED: '{segment['comment'][:50]}...' on text '{segment['text'][:30]}...'")
-                    except Exception as comment_err:
-                        logger.warning(f"COMMENT_FAILED: {comment_err}")
-        
-        logger.info(f"MULTI_REDLINE_APPLIED: {len(matches)} redlines in paragraph")
+        logger.info(f"MULTI_REDLINE_APPLIED: {applied}/{len(matches)} redlines in paragraph")
         return True
         
     except Exception as e:
@@ -2546,47 +3618,33 @@ def _apply_multiple_redlines(paragraph, para_text: str, matches: List[Dict]) ->
         return False
 
 
-def _apply_full_paragraph_redline(paragraph, comment: str):
+def _apply_full_paragraph_redline(writer: RedlineXmlWriter, paragraphs: List, comment: str):
     """
-    Apply redline to entire paragraph (for cross-paragraph matches).
+    Apply redline to entire paragraphs (for cross-paragraph matches).
+    
+    The comment range spans from the first to the last redlined paragraph,
+    so the conflict gets one comment rather than one per paragraph.
     
     Args:
-        paragraph: python-docx Paragraph object
+        writer: RedlineXmlWriter for the document
+        paragraphs: python-docx Paragraph objects in document order
         comment: Comment to attach
     """
     try:
-        para_text = paragraph.text
-        if not para_text.strip():
-            return
-        
-        # Clear existing runs
-        for run in paragraph.runs:
-            run.clear()
-        
-        # Add redlined text
-        redline_run = paragraph.add_run(para_text)
-        redline_run.font.color.rgb = RGBColor(255, 0, 0)
-        redline_run.font.strike = True
-        
-        # Add comment (only to first paragraph in cross-para match)
-        if comment and comment.strip():
-            try:
-                redline_run.add_comment(comment, author="One L", initials="1L")
-            except Exception:
-                pass
-        
-        logger.info(f"FULL_PARA_REDLINE: Applied to '{para_text[:50]}...'")
+        if writer.redline_paragraphs([paragraph._p for paragraph in paragraphs], comment):
+            logger.info(f"FULL_PARA_REDLINE: Applied to {len(paragraphs)} paragraphs starting '{paragraphs[0].text[:50]}...'")
         
     except Exception as e:
         logger.error(f"Error applying full paragraph redline: {str(e)}")
 
 
-def _apply_table_cell_redline(cell, vendor_quote: str, comment: str) -> bool:
+def _apply_table_cell_redline(writer: RedlineXmlWriter, cell_entry: Dict[str, Any], vendor_quote: str, comment: str) -> bool:
     """
     Apply redlining to a table cell containing vendor exception text.
     
     Args:
-        cell: python-docx Table cell object
+        writer: RedlineXmlWriter for the document
+        cell_entry: Cell entry from TableGridCache
         vendor_quote: The vendor exception text to redline
         comment: Comment to attach
         
@@ -2595,7 +3653,7 @@ def _apply_table_cell_redline(cell, vendor_quote: str, comment: str) -> bool:
     """
     try:
         # Get all paragraphs in the cell
-        cell_paragraphs = cell.paragraphs
+        cell_paragraphs = cell_entry['paragraphs']
         if not cell_paragraphs:
             return False
         
@@ -2605,7 +3663,7 @@ def _apply_table_cell_redline(cell, vendor_quote: str, comment: str) -> bool:
         fully_normalized = normalize_for_matching(vendor_quote)
         
         for para in cell_paragraphs:
-            para_text = para.text
+            para_text = para['text']
             if not para_text.strip():
                 continue
             
@@ -2628,51 +3686,15 @@ def _apply_table_cell_redline(cell, vendor_quote: str, comment: str) -> bool:
             
             if found_match:
                 # Apply redlining to the entire paragraph (since cell text may be formatted)
-                # Clear existing runs
-                for run in para.runs:
-                    run.clear()
-                
-                # Add redlined text
-                redline_run = para.add_run(para_text)
-                redline_run.font.color.rgb = RGBColor(255, 0, 0)
-                redline_run.font.strike = True
-                
-                # Add comment
-                if comment and comment.strip():
-                    try:
-                        redline_run.add_comment(comment, author="One L", initials="1L")
-                        logger.info(f"TABLE_CELL_COMMENT: Added comment to cell")
-                    except Exception as comment_err:
-                        logger.warning(f"TABLE_CELL_COMMENT_FAILED: {comment_err}")
-                
+                writer.redline_paragraphs([para['element']], comment)
                 logger.info(f"TABLE_CELL_REDLINE: Applied {match_type} match to cell paragraph")
                 return True
         
         # If we didn't find an exact match, redline the entire cell content
         # This handles cases where the text might be split across paragraphs or formatted differently
-        if cell_paragraphs:
-            first_para = cell_paragraphs[0]
-            cell_text = cell.text.strip()
-            if cell_text:
-                # Clear all paragraphs
-                for para in cell_paragraphs:
-                    for run in para.runs:
-                        run.clear()
-                
-                # Add redlined text to first paragraph
-                redline_run = first_para.add_run(cell_text)
-                redline_run.font.color.rgb = RGBColor(255, 0, 0)
-                redline_run.font.strike = True
-                
-                # Add comment
-                if comment and comment.strip():
-                    try:
-                        redline_run.add_comment(comment, author="One L", initials="1L")
-                    except Exception:
-                        pass
-                
-                logger.info(f"TABLE_CELL_REDLINE: Applied to entire cell content")
-                return True
+        if not cell_entry['is_empty'] and writer.redline_paragraphs([para['element'] for para in cell_paragraphs], comment):
+            logger.info(f"TABLE_CELL_REDLINE: Applied to entire cell content")
+            return True
         
         return False
         
@@ -2737,7 +3759,7 @@ def _download_and_load_document(bucket: str, s3_key: str):
         s3_key: S3 key of the document
         
     Returns:
-        python-docx Document object
+        Tuple of (python-docx Document object, document_content_hash of the file)
     """
     
     try:
@@ -2751,7 +3773,7 @@ def _download_and_load_document(bucket: str, s3_key: str):
         doc = Document(io.BytesIO(document_content))
         
 
-        return doc
+        return doc, document_content_hash(document_content)
         
     except Exception as e:
         logger.error(f"Error downloading and loading document: {str(e)}")
@@ -4,7 +4,7 @@ import logging
 import os
 from datetime import datetime, timezone, timedelta
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, List
 from decimal import Decimal
 from botocore.exceptions import ClientError
 try:
@@ -1178,6 +1178,72 @@ def get_job_status(job_id: str, user_id: str) -> Dict[str, Any]:
             'error': str(e)
         }
 
+# Document size buckets (extracted characters) for per-document usage roll-ups
+DOCUMENT_SIZE_BUCKETS = [(25000, 'small'), (100000, 'medium'), (400000, 'large')]
+
+def get_document_size_bucket(document_chars: int) -> str:
+    """Map a document's extracted character count to a size bucket label"""
+    for limit, label in DOCUMENT_SIZE_BUCKETS:
+        if document_chars < limit:
+            return label
+    return 'very_large'
+
+def summarize_usage_metrics(analysis_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Roll up per-job token, latency and cost usage (recorded by the Step Functions stages)"""
+    def new_totals():
+        return {'documents': 0, 'input_tokens': 0, 'output_tokens': 0, 'cost_micro_usd': 0, 'wall_ms': 0}
+    
+    def finish(totals):
+        documents = totals['documents'] or 1
+        return {
+            'documents': totals['documents'],
+            'total_cost_usd': round(totals['cost_micro_usd'] / 1e6, 4),
+            'average_cost_usd': round(totals['cost_micro_usd'] / 1e6 / documents, 4),
+            'average_input_tokens': round(totals['input_tokens'] / documents),
+            'average_output_tokens': round(totals['output_tokens'] / documents),
+            'average_processing_seconds': round(totals['wall_ms'] / 1000 / documents, 1)
+        }
+    
+    overall = new_totals()
+    by_size = {}
+    by_stage = {}
+    for item in analysis_results:
+        if 'usage_cost_micro_usd' not in item:
+            continue
+        item = convert_decimals(item)
+        document_totals = {
+            'input_tokens': item.get('usage_input_tokens', 0),
+            'output_tokens': item.get('usage_output_tokens', 0),
+            'cost_micro_usd': item.get('usage_cost_micro_usd', 0),
+            'wall_ms': item.get('usage_wall_ms', 0)
+        }
+        size_totals = by_size.setdefault(get_document_size_bucket(item.get('document_chars', 0)), new_totals())
+        for totals in (overall, size_totals):
+            totals['documents'] += 1
+            for field, value in document_totals.items():
+                totals[field] += value
+        
+        # Each job counts once per stage, however many chunk invocations the stage had
+        stages_seen = set()
+        for key, value in item.items():
+            if not key.startswith('usage_stage_'):
+                continue
+            stage_field = key[len('usage_stage_'):]
+            field = next((field for field in ('input_tokens', 'output_tokens', 'cost_micro_usd', 'wall_ms') if stage_field.endswith(f'_{field}')), None)
+            if not field:
+                continue
+            stage = stage_field[:-len(field) - 1]
+            stage_totals = by_stage.setdefault(stage, new_totals())
+            if stage not in stages_seen:
+                stage_totals['documents'] += 1
+                stages_seen.add(stage)
+            stage_totals[field] += value
+    
+    summary = finish(overall)
+    summary['by_document_size'] = {bucket: finish(totals) for bucket, totals in by_size.items()}
+    summary['by_stage'] = {stage: finish(totals) for stage, totals in by_stage.items()}
+    return summary
+
 def get_admin_metrics() -> Dict[str, Any]:
     """Get system-wide metrics for admin dashboard"""
     try:
@@ -1406,7 +1472,8 @@ def get_admin_metrics() -> Dict[str, Any]:
                 'activity': {
                     'sessions_last_7_days': recent_sessions,
                     'analyses_last_7_days': recent_analyses
-                }
+                },
+                'usage': summarize_usage_metrics(all_analysis_results)
             }
         }
         
@@ -9,6 +9,24 @@ from aws_cdk import (
     aws_opensearchservice as opensearch,
     aws_dynamodb as dynamodb,
 )
+from constants import BEDROCK_ALTERNATE_MODEL_ID, STAGE_MODEL_ROUTES
+
+# Cross-region inference profile prefixes; the foundation model ID follows the prefix
+INFERENCE_PROFILE_PREFIXES = ("us.", "eu.", "apac.", "global.")
+
+
+def routed_model_resources() -> list[str]:
+    """Inference profile and foundation model ARNs of the models in STAGE_MODEL_ROUTES overrides."""
+    resources = []
+    for route in STAGE_MODEL_ROUTES.values():
+        for model_id in (route.get("model_id"), route.get("alternate_model_id")):
+            if not model_id:
+                continue
+            if model_id.startswith(INFERENCE_PROFILE_PREFIXES):
+                resources.append(f"arn:aws:bedrock:*:*:inference-profile/{model_id}")
+                model_id = model_id.split(".", 1)[1]
+            resources.append(f"arn:aws:bedrock:*::foundation-model/{model_id}")
+    return sorted(set(resources))
 
 
 class IAMRolesConstruct(Construct):
@@ -219,8 +237,12 @@ class IAMRolesConstruct(Construct):
                 resources=[
                     # Inference profile with account ID
                     f"arn:aws:bedrock:*:*:inference-profile/us.anthropic.claude-sonnet-4-20250514-v1:0",
+                    # Alternate inference profile used by the fallback policy (BEDROCK_ALTERNATE_MODEL_ID)
+                    f"arn:aws:bedrock:*:*:inference-profile/{BEDROCK_ALTERNATE_MODEL_ID}",
                     # Foundation model as fallback
-                    f"arn:aws:bedrock:*::foundation-model/anthropic.claude-sonnet-4-20250514-v1:0"
+                    f"arn:aws:bedrock:*::foundation-model/anthropic.claude-sonnet-4-20250514-v1:0",
+                    # Models that stages are routed to (STAGE_MODEL_ROUTES)
+                    *routed_model_resources()
                 ]
             )
         )
@@ -235,7 +257,9 @@ class IAMRolesConstruct(Construct):
                     "bedrock:Retrieve",
                     "bedrock:RetrieveAndGenerate", 
                     "bedrock:GetKnowledgeBase",
-                    "bedrock:ListKnowledgeBases"
+                    "bedrock:ListKnowledgeBases",
+                    "bedrock:ListDataSources",  # Knowledge base ingestion version for the response cache key
+                    "bedrock:ListIngestionJobs"
                 ],
                 resources=[
                     "arn:aws:bedrock:*:*:knowledge-base/*"
@@ -6,10 +6,14 @@ Handles both chunk and document structure analysis.
 import json
 import boto3
 import logging
-import os
+import time
 from agent_api.agent.prompts.structure_analysis_prompt import STRUCTURE_ANALYSIS_PROMPT
 from agent_api.agent.prompts.models import StructureAnalysisOutput
-from agent_api.agent.model import Model, _extract_json_only
+from agent_api.agent.model import Model, _extract_json_only, snapshot_usage, usage_since, get_stage_route, route_cache_model_id
+from agent_api.agent.response_cache import (
+    build_response_cache_key, get_cached_response, put_cached_response, get_kb_ingestion_version, response_cache_bucket
+)
+from agent_api.agent.eval_capture import eval_capture_bucket, capture_stage_call
 from pydantic import ValidationError
 
 logger = logging.getLogger()
@@ -63,9 +67,11 @@ This ensures the knowledge base retrieval finds the most relevant content from t
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import update_progress
+    from shared.progress_tracker import update_progress, increment_counters, record_stage_usage
 except ImportError:
     update_progress = None
+    increment_counters = None
+    record_stage_usage = None
 
 def lambda_handler(event, context):
     """
@@ -81,13 +87,17 @@ def lambda_handler(event, context):
             - total_chunks (optional)
             - start_char (optional)
             - end_char (optional)
+            - chunk_format (optional) - 'text' or 'docx' chunk payload, from split_document (default docx)
             - job_id, timestamp (for progress tracking)
             - terms_profile (optional, for query generation focus)
         
     Returns:
-        Dict with structure_s3_key, queries_count, has_results (always stores in S3)
+        Dict with structure_s3_key, queries_count, cache_hit, has_results (always stores in S3)
     """
     try:
+        started_at = time.time()
+        usage_start = snapshot_usage()
+        
         chunk_s3_key = event.get('chunk_s3_key')
         document_s3_key = event.get('document_s3_key')
         bucket_name = event.get('bucket_name')
@@ -97,6 +107,7 @@ def lambda_handler(event, context):
         total_chunks = event.get('total_chunks', 1)
         start_char = event.get('start_char', 0)
         end_char = event.get('end_char', 0)
+        chunk_format = event.get('chunk_format') or 'docx'
         terms_profile = event.get('terms_profile')  # Get terms profile for query generation
         
         # Determine which S3 key to use
@@ -116,75 +127,90 @@ def lambda_handler(event, context):
         # Create Model instance
         model = Model(knowledge_base_id, region)
         
-        # Document format - only DOCX supported
-        doc_format = 'docx'
-        filename = os.path.basename(s3_key)
-        sanitized_filename = model._sanitize_filename_for_converse(filename)
+        # Text chunks go to Bedrock as a text block; DOCX chunks and whole documents as a document block
+        payload_format = chunk_format if is_chunk else 'docx'
+        document_block = model._build_chunk_content_block(document_data, s3_key, payload_format)
         
         # Prepare context - always include chunk context if chunk_num/total_chunks provided
         # For single documents: chunk_num=0, total_chunks=1
         # Always pass chunk context when chunk_num and total_chunks are available
         if total_chunks is not None and total_chunks >= 1:
             if is_chunk and total_chunks > 1:
-                chunk_context = f"You are analyzing chunk {chunk_num + 1} of {total_chunks} (characters {start_char}-{end_char})"
+                chunk_context = f"You are analyzing chunk {chunk_num + 1} of {total_chunks} (characters {start_char}-{end_char})."
             else:
                 # Single document: chunk_num=0, total_chunks=1
-                chunk_context = f"You are analyzing document (chunk {chunk_num + 1} of {total_chunks})"
-            prompt_text = f"{chunk_context}. {STRUCTURE_ANALYSIS_PROMPT}"
+                chunk_context = f"You are analyzing document (chunk {chunk_num + 1} of {total_chunks})."
         else:
             # chunk_num/total_chunks not provided (backward compatibility)
-            prompt_text = STRUCTURE_ANALYSIS_PROMPT
+            chunk_context = ""
         
-        # Add terms profile context to focus query generation on selected terms profile
+        # Static instructions, then terms profile context (shared by every chunk of the job), form the cached system prefix
+        system_prompt = [STRUCTURE_ANALYSIS_PROMPT]
         if terms_profile:
-            terms_profile_context = _get_terms_profile_context(terms_profile)
-            prompt_text = f"{prompt_text}\n\n{terms_profile_context}"
+            system_prompt.append(_get_terms_profile_context(terms_profile))
         
-        # Prepare messages with document
+        # Prepare messages with chunk context and document
+        # Converse requires a text block next to a document block
         messages = [
             {
                 "role": "user",
                 "content": [
                     {
-                        "text": prompt_text
+                        "text": chunk_context or "Analyze the attached vendor document."
                     },
-                    {
-                        "document": {
-                            "format": doc_format,
-                            "name": sanitized_filename,
-                            "source": {
-                                "bytes": document_data
-                            }
-                        }
-                    }
+                    document_block
                 ]
             }
         ]
         
-        # Call Claude with structure analysis prompt
-        if is_chunk:
-            logger.info(f"Calling Claude for chunk {chunk_num + 1} structure analysis (terms_profile: {terms_profile})")
+        # Content-addressed response cache: a hit returns the stored validated output without calling Bedrock
+        # The key includes the stage's routed model, so changing the route never serves another model's answer
+        route = get_stage_route('analyze_structure')
+        cache_bucket = response_cache_bucket()
+        kb_version = get_kb_ingestion_version(knowledge_base_id) if cache_bucket else None
+        cache_key = None
+        cached_json = None
+        if kb_version:
+            cache_key = build_response_cache_key(
+                'analyze_structure',
+                [document_data, chunk_context.encode('utf-8')],
+                system_prompt,
+                StructureAnalysisOutput.model_json_schema(),
+                terms_profile,
+                route_cache_model_id(route),
+                kb_version
+            )
+            cached_json = get_cached_response(cache_bucket, cache_key)
+        
+        if cached_json:
+            logger.info(f"RESPONSE_CACHE: Hit for chunk {chunk_num + 1} structure analysis ({cache_key})")
+            response_data = json.loads(cached_json)
         else:
-            logger.info(f"Calling Claude for document structure analysis (terms_profile: {terms_profile})")
+            # Call Claude with structure analysis prompt
+            if is_chunk:
+                logger.info(f"Calling Claude for chunk {chunk_num + 1} structure analysis (terms_profile: {terms_profile})")
+            else:
+                logger.info(f"Calling Claude for document structure analysis (terms_profile: {terms_profile})")
         
-        response = model._call_claude_with_tools(messages)
+            call_started = time.time()
+            response = model._call_claude_with_tools(messages, system_prompt=system_prompt, stage='analyze_structure')
         
-        # Extract content
-        content = ""
-        if response.get("output", {}).get("message", {}).get("content"):
-            for content_block in response["output"]["message"]["content"]:
-                if content_block.get("text"):
-                    content += content_block["text"]
+            # Extract content
+            content = ""
+            if response.get("output", {}).get("message", {}).get("content"):
+                for content_block in response["output"]["message"]["content"]:
+                    if content_block.get("text"):
+                        content += content_block["text"]
         
-        if not content:
-            raise ValueError("Empty response from Claude - no content received")
+            if not content:
+                raise ValueError("Empty response from Claude - no content received")
         
-        # Extract JSON
-        response_json = _extract_json_only(content)
+            # Extract JSON
+            response_data = _extract_json_only(content)
         
         # Validate with Pydantic
         try:
-            validated_output = StructureAnalysisOutput.model_validate_json(response_json)
+            validated_output = StructureAnalysisOutput.model_validate(response_data)
             query_count = len(validated_output.queries)
             logger.info(f"QUERY_GENERATION: Pydantic validation successful: {query_count} queries generated")
             
@@ -223,6 +249,27 @@ def lambda_handler(event, context):
         timestamp = event.get('timestamp')
         session_id = event.get('session_id')
         user_id = event.get('user_id')
+        
+        # An answer from a fallback tier is neither cached nor captured under the route's model
+        served_by_route = model.answered_only_by(route['model_id'])
+        if not served_by_route:
+            logger.warning(f"STAGE_ROUTE: Chunk {chunk_num + 1} structure analysis answered by {model.answered_model_ids}, not route model {route['model_id']}; skipping response cache and eval capture")
+        
+        if cache_key:
+            if not cached_json and served_by_route:
+                put_cached_response(cache_bucket, cache_key, validated_output.model_dump_json(), job_id)
+            if increment_counters and job_id and timestamp:
+                increment_counters(job_id, timestamp, {'response_cache_hits' if cached_json else 'response_cache_misses': 1})
+        
+        # Keep fresh answers as offline evaluation cases for candidate model routes
+        capture_bucket = eval_capture_bucket()
+        if capture_bucket and not cached_json and served_by_route:
+            capture_stage_call(
+                capture_bucket, 'analyze_structure', f"{job_id or 'unknown'}_chunk_{chunk_num}",
+                messages, system_prompt, validated_output.model_dump(), route,
+                usage_since(usage_start), int((time.time() - call_started) * 1000)
+            )
+        
         if update_progress and job_id and timestamp:
             if is_chunk and total_chunks > 1:
                 update_progress(
@@ -239,6 +286,13 @@ def lambda_handler(event, context):
                     user_id=user_id
                 )
         
+        if record_stage_usage and job_id and timestamp:
+            record_stage_usage(
+                job_id, timestamp, 'analyze_structure', int((time.time() - started_at) * 1000),
+                chunk_num=chunk_num,
+                usage=dict(usage_since(usage_start), model_id=route['model_id'], served_by_route=served_by_route, cache_hit=bool(cached_json))
+            )
+        
         # CRITICAL: Always store result in S3 and return only S3 reference
         # Step Functions has 256KB limit - structure results can be large with many queries
         result_dict = validated_output.model_dump()
@@ -259,6 +313,7 @@ def lambda_handler(event, context):
             return {
                 'structure_s3_key': s3_key_result,
                 'queries_count': len(validated_output.queries),
+                'cache_hit': bool(cached_json),
                 'has_results': True
             }
         except Exception as s3_error:
@@ -1,14 +1,15 @@
 """
 Generate redline Lambda function.
-Wraps existing redline_document function, uses character positions from conflicts.
+Wraps existing redline_document function; conflicts anchored during identify_conflicts are applied by position.
 """
 
 import json
 import boto3
 import logging
 import os
+import time
 from agent_api.agent.prompts.models import RedlineOutput
-from agent_api.agent.tools import redline_document
+from agent_api.agent.tools import redline_document, load_parsed_document
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -17,22 +18,26 @@ s3_client = boto3.client('s3')
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import update_progress
+    from shared.progress_tracker import update_progress, record_stage_usage
 except ImportError:
     update_progress = None
+    record_stage_usage = None
 
 def lambda_handler(event, context):
     """
     Generate redlined document from conflicts.
     
     Args:
-        event: Lambda event with conflicts_result (from analyze step), document_s3_key, session_id, user_id
+        event: Lambda event with conflicts_result (from analyze step), document_s3_key, session_id, user_id,
+            optional parsed_document_s3_key (from split_document)
         context: Lambda context
         
     Returns:
         RedlineOutput with success, redlined_document_s3_key, error
     """
     try:
+        started_at = time.time()
+        
         # Get workflow context
         document_s3_key = event.get('document_s3_key')
         session_id = event.get('session_id')
@@ -88,6 +93,12 @@ def lambda_handler(event, context):
         # Get bucket_type from event (defaults to user_documents for backward compatibility)
         bucket_type = event.get('bucket_type', 'user_documents')
         
+        # Reuse the parsed document from split_document; the DOCX is then only opened to write redlines
+        parsed_document = None
+        parsed_document_s3_key = event.get('parsed_document_s3_key')
+        if parsed_document_s3_key and bucket_name:
+            parsed_document = load_parsed_document(bucket_name, parsed_document_s3_key)
+        
         # Call redline_document
         # CRITICAL: Function signature expects 'analysis_data', not 'analysis'
         logger.info(f"Generating redline for {len(conflicts_list)} conflicts, bucket_type={bucket_type}")
@@ -96,7 +107,8 @@ def lambda_handler(event, context):
             document_s3_key=document_s3_key,
             bucket_type=bucket_type,  # Use bucket_type from event, not hardcoded
             session_id=session_id,
-            user_id=user_id
+            user_id=user_id,
+            parsed_document=parsed_document
         )
         
         # Extract result
@@ -118,6 +130,11 @@ def lambda_handler(event, context):
                     session_id=session_id,
                     user_id=user_id
                 )
+            if record_stage_usage and job_id and timestamp:
+                record_stage_usage(
+                    job_id, timestamp, 'generate_redline', int((time.time() - started_at) * 1000),
+                    usage={'conflicts_count': len(conflicts_list), 'used_parsed_document': parsed_document is not None}
+                )
             
             # Return plain result (Step Functions merges via result_path)
             return output.model_dump()
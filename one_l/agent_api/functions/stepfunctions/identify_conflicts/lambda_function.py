@@ -8,9 +8,15 @@ import boto3
 import logging
 import os
 import io
+import time
 from agent_api.agent.prompts.conflict_detection_prompt import CONFLICT_DETECTION_PROMPT
-from agent_api.agent.prompts.models import ConflictDetectionOutput
-from agent_api.agent.model import Model, _extract_json_only
+from agent_api.agent.prompts.models import ConflictDetectionOutput, ConflictModel, QuoteAnchorModel
+from agent_api.agent.model import Model, _extract_json_only, STREAM_CONFLICT_DETECTION, snapshot_usage, usage_since, get_stage_route, route_cache_model_id
+from agent_api.agent.response_cache import (
+    build_response_cache_key, get_cached_response, put_cached_response, get_kb_ingestion_version, response_cache_bucket
+)
+from agent_api.agent.eval_capture import eval_capture_bucket, capture_stage_call
+from agent_api.agent.tools import locate_quotes_in_chunk
 from pydantic import ValidationError
 
 logger = logging.getLogger()
@@ -20,9 +26,59 @@ s3_client = boto3.client('s3')
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import update_progress
+    from shared.progress_tracker import update_progress, increment_counters, set_counters, record_stage_usage
 except ImportError:
     update_progress = None
+    increment_counters = None
+    set_counters = None
+    record_stage_usage = None
+
+# Streamed conflicts are checkpointed to the chunk's partial result in batches, not one write per conflict
+PARTIAL_FLUSH_EVERY_CONFLICTS = 5  # Write the partial result after this many new conflicts
+PARTIAL_FLUSH_INTERVAL_SECONDS = 10  # ...or when this long has passed since the last write
+
+def _store_partial_conflicts(bucket_name, s3_key, conflicts):
+    """
+    Overwrite the chunk's partial result with the conflicts streamed so far.
+    
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: Partial result key
+        conflicts: Validated conflict dictionaries in stream order
+    """
+    try:
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=s3_key,
+            Body=json.dumps({
+                'explanation': 'Partial result - conflicts streamed before the response completed',
+                'conflicts': conflicts,
+                'complete': False
+            }).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        logger.warning(f"CONFLICT_STREAM: Could not store partial result {s3_key}: {e}")
+
+def _load_partial_conflicts(bucket_name, s3_key):
+    """
+    Load the conflicts checkpointed by an earlier attempt at this chunk (e.g. one that timed out).
+    
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: Partial result key
+    
+    Returns:
+        List of conflict dictionaries, empty if there is no partial result
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+        return json.loads(response['Body'].read().decode('utf-8')).get('conflicts', [])
+    except s3_client.exceptions.NoSuchKey:
+        return []
+    except Exception as e:
+        logger.warning(f"CONFLICT_STREAM: Could not load partial result {s3_key}: {e}")
+        return []
 
 def lambda_handler(event, context):
     """
@@ -39,12 +95,18 @@ def lambda_handler(event, context):
             - total_chunks (optional)
             - start_char (optional)
             - end_char (optional)
+            - chunk_format (optional) - 'text' or 'docx' chunk payload, from split_document (default docx)
+            - chunk_layout_s3_key (optional) - chunk text and paragraph/cell layout from split_document
             - job_id, timestamp (for progress tracking)
+            - terms_profile (optional, part of the response cache key)
         
     Returns:
-        Dict with chunk_num, results_s3_key, conflicts_count, has_results (always stores in S3)
+        Dict with chunk_num, results_s3_key, conflicts_count, cache_hit, partial, has_results (always stores in S3)
     """
     try:
+        started_at = time.time()
+        usage_start = snapshot_usage()
+        
         chunk_s3_key = event.get('chunk_s3_key')
         document_s3_key = event.get('document_s3_key')
         bucket_name = event.get('bucket_name')
@@ -55,6 +117,13 @@ def lambda_handler(event, context):
         total_chunks = event.get('total_chunks', 1)
         start_char = event.get('start_char', 0)
         end_char = event.get('end_char', 0)
+        chunk_format = event.get('chunk_format') or 'docx'
+        chunk_layout_s3_key = event.get('chunk_layout_s3_key')
+        terms_profile = event.get('terms_profile')
+        job_id = event.get('job_id')
+        timestamp = event.get('timestamp')
+        session_id = event.get('session_id')
+        user_id = event.get('user_id')
         
         # Determine which S3 key to use
         s3_key = chunk_s3_key or document_s3_key
@@ -123,10 +192,9 @@ def lambda_handler(event, context):
         # Create Model instance
         model = Model(knowledge_base_id, region)
         
-        # Document format - only DOCX supported
-        doc_format = 'docx'
-        filename = os.path.basename(s3_key)
-        sanitized_filename = model._sanitize_filename_for_converse(filename)
+        # Text chunks go to Bedrock as a text block; DOCX chunks and whole documents as a document block
+        payload_format = chunk_format if is_chunk else 'docx'
+        document_block = model._build_chunk_content_block(document_data, s3_key, payload_format)
         
         # Format KB results as context
         kb_context = ""
@@ -178,58 +246,138 @@ def lambda_handler(event, context):
         # Always pass chunk context when chunk_num and total_chunks are available
         if total_chunks is not None and total_chunks >= 1:
             if is_chunk and total_chunks > 1:
-                chunk_context = f"You are analyzing chunk {chunk_num + 1} of {total_chunks} (characters {start_char}-{end_char})"
+                chunk_context = f"You are analyzing chunk {chunk_num + 1} of {total_chunks} (characters {start_char}-{end_char})."
             else:
                 # Single document: chunk_num=0, total_chunks=1
-                chunk_context = f"You are analyzing document (chunk {chunk_num + 1} of {total_chunks})"
-            prompt_text = f"{chunk_context}. {CONFLICT_DETECTION_PROMPT}{kb_context}"
+                chunk_context = f"You are analyzing document (chunk {chunk_num + 1} of {total_chunks})."
+            prompt_text = f"{chunk_context}{kb_context}"
         else:
             # chunk_num/total_chunks not provided (backward compatibility)
-            prompt_text = f"{CONFLICT_DETECTION_PROMPT}{kb_context}"
+            prompt_text = kb_context.strip()
         
-        # Prepare messages with document and KB context
+        # Static instructions form the cached system prefix; chunk and KB context follow in the user message
+        # Converse requires a text block next to a document block
         messages = [
             {
                 "role": "user",
                 "content": [
                     {
-                        "text": prompt_text
+                        "text": prompt_text or "Analyze the attached vendor document."
                     },
-                    {
-                        "document": {
-                            "format": doc_format,
-                            "name": sanitized_filename,
-                            "source": {
-                                "bytes": document_data
-                            }
-                        }
-                    }
+                    document_block
                 ]
             }
         ]
         
-        # Call Claude with conflict detection prompt
-        # Use _call_claude_without_tools since KB results are already pre-loaded in the prompt
-        if is_chunk:
-            logger.info(f"Calling Claude for chunk {chunk_num + 1} conflict detection (KB results pre-loaded in prompt)")
-        else:
-            logger.info("Calling Claude for document conflict detection (KB results pre-loaded in prompt)")
-        
-        response = model._call_claude_without_tools(messages)
+        # Content-addressed response cache: a hit returns the stored validated output without calling Bedrock
+        # The key includes the stage's routed model, so changing the route never serves another model's answer
+        route = get_stage_route('identify_conflicts')
+        cache_bucket = response_cache_bucket()
+        kb_version = get_kb_ingestion_version(knowledge_base_id) if cache_bucket else None
+        cache_key = None
+        cached_json = None
+        streamed_conflicts = []
+        partial_s3_key = None
+        flush_state = {'count': 0, 'at': time.time()}  # Conflicts in the last checkpoint and when it was written
+        partial_result = False
+        if kb_version:
+            cache_key = build_response_cache_key(
+                'identify_conflicts',
+                [document_data, prompt_text.encode('utf-8')],
+                [CONFLICT_DETECTION_PROMPT],
+                ConflictDetectionOutput.model_json_schema(),
+                terms_profile,
+                route_cache_model_id(route),
+                kb_version
+            )
+            cached_json = get_cached_response(cache_bucket, cache_key)
         
-        # Extract content
-        content = ""
-        if response.get("output", {}).get("message", {}).get("content"):
-            for content_block in response["output"]["message"]["content"]:
-                if content_block.get("text"):
-                    content += content_block["text"]
+        if cached_json:
+            logger.info(f"RESPONSE_CACHE: Hit for chunk {chunk_num + 1} conflict detection ({cache_key})")
+            response_data = json.loads(cached_json)
+        else:
+            # Call Claude with conflict detection prompt
+            # Use _call_claude_without_tools since KB results are already pre-loaded in the prompt
+            # Output is sized from the number of KB queries that returned results (roughly one per vendor section)
+            expected_conflicts = sum(1 for r in kb_results if isinstance(r, dict) and r.get('results_count', 0) > 0) or None
+            if is_chunk:
+                logger.info(f"Calling Claude for chunk {chunk_num + 1} conflict detection (KB results pre-loaded in prompt)")
+            else:
+                logger.info("Calling Claude for document conflict detection (KB results pre-loaded in prompt)")
         
-        # Extract JSON
-        response_json = _extract_json_only(content)
+            call_started = time.time()
+            if STREAM_CONFLICT_DETECTION:
+                # Checkpoint conflicts as they are parsed so a timeout keeps what was already found;
+                # the partial result is rewritten every few conflicts or seconds and deleted once the full result is stored.
+                # The key only depends on the job and chunk, so a Step Functions retry and merge_chunk_results find it
+                partial_s3_key = f"{session_id or 'unknown'}/chunk_results/{job_id}_chunk_{chunk_num}_partial.json"
+                previous_conflicts = _load_partial_conflicts(bucket_name, partial_s3_key)
+                if previous_conflicts:
+                    logger.info(f"CONFLICT_STREAM: Found {len(previous_conflicts)} conflicts checkpointed by an earlier attempt at chunk {chunk_num + 1}")
+                
+                def flush_streamed_conflicts():
+                    _store_partial_conflicts(bucket_name, partial_s3_key, streamed_conflicts)
+                    flush_state.update(count=len(streamed_conflicts), at=time.time())
+                    # SET per chunk, so a retried chunk replaces its count instead of adding to it
+                    if set_counters and job_id and timestamp:
+                        set_counters(job_id, timestamp, {f'conflicts_streamed_chunk_{chunk_num}': len(streamed_conflicts)})
+                
+                def persist_streamed_conflict(conflict):
+                    try:
+                        streamed_conflicts.append(ConflictModel.model_validate(conflict).model_dump())
+                    except ValidationError as e:
+                        logger.warning(f"CONFLICT_STREAM: Streamed conflict failed validation, skipping: {e.errors()}")
+                        return
+                    # Never replace an earlier attempt's checkpoint with a smaller one
+                    if len(streamed_conflicts) <= len(previous_conflicts):
+                        return
+                    if (len(streamed_conflicts) - flush_state['count'] >= PARTIAL_FLUSH_EVERY_CONFLICTS
+                            or time.time() - flush_state['at'] >= PARTIAL_FLUSH_INTERVAL_SECONDS):
+                        flush_streamed_conflicts()
+                
+                try:
+                    response = model._call_claude_streaming(messages, on_conflict=persist_streamed_conflict, system_prompt=[CONFLICT_DETECTION_PROMPT], stage='identify_conflicts', expected_items=expected_conflicts)
+                except Exception as e:
+                    if len(previous_conflicts) > len(streamed_conflicts):
+                        streamed_conflicts[:] = previous_conflicts
+                    if not streamed_conflicts:
+                        raise
+                    logger.error(f"CONFLICT_STREAM: Model call failed for chunk {chunk_num + 1}, keeping {len(streamed_conflicts)} streamed conflicts: {e}")
+                    response = None
+                if len(streamed_conflicts) != flush_state['count'] and set_counters and job_id and timestamp:
+                    set_counters(job_id, timestamp, {f'conflicts_streamed_chunk_{chunk_num}': len(streamed_conflicts)})
+            else:
+                response = model._call_claude_without_tools(messages, system_prompt=[CONFLICT_DETECTION_PROMPT], stage='identify_conflicts', expected_items=expected_conflicts)
         
+            if response is None:
+                partial_result = True
+                response_data = {
+                    'explanation': f'Partial result: the model call failed after {len(streamed_conflicts)} conflicts were streamed',
+                    'conflicts': streamed_conflicts
+                }
+            else:
+                # Extract content
+                content = ""
+                if response.get("output", {}).get("message", {}).get("content"):
+                    for content_block in response["output"]["message"]["content"]:
+                        if content_block.get("text"):
+                            content += content_block["text"]
+                
+                # Extract JSON
+                response_data = _extract_json_only(content)
+
+                # A truncated answer may yield fewer conflicts than were streamed; keep the streamed ones
+                if len(streamed_conflicts) > len(response_data.get('conflicts') or []):
+                    logger.warning(f"CONFLICT_STREAM: Final answer for chunk {chunk_num + 1} has fewer conflicts than the {len(streamed_conflicts)} streamed; using the streamed conflicts")
+                    partial_result = True
+                    response_data = {
+                        'explanation': response_data.get('explanation') or f'Partial result: {len(streamed_conflicts)} conflicts streamed before the answer ended',
+                        'conflicts': streamed_conflicts
+                    }
+
         # Validate with Pydantic
         try:
-            validated_output = ConflictDetectionOutput.model_validate_json(response_json)
+            validated_output = ConflictDetectionOutput.model_validate(response_data)
             total_conflicts = len(validated_output.conflicts)
             logger.info(f"CONFLICT_DETECTION_VALIDATION: Pydantic validation successful: {total_conflicts} conflicts detected")
             
@@ -316,14 +464,57 @@ def lambda_handler(event, context):
         except ValidationError as e:
             logger.error(f"CONFLICT_DETECTION_VALIDATION_ERROR: Pydantic validation failed: {e.errors()}")
             # Log the problematic JSON for debugging
-            logger.error(f"CONFLICT_DETECTION_JSON_ERROR: Problematic JSON (first 1000 chars): {response_json[:1000]}")
+            logger.error(f"CONFLICT_DETECTION_JSON_ERROR: Problematic JSON (first 1000 chars): {json.dumps(response_data, default=str)[:1000]}")
             raise ValueError(f"Invalid response structure: {e}")
         
+        # An answer from a fallback tier is neither cached nor captured under the route's model
+        served_by_route = model.answered_only_by(route['model_id'])
+        if not served_by_route:
+            logger.warning(f"STAGE_ROUTE: Chunk {chunk_num + 1} conflict detection answered by {model.answered_model_ids}, not route model {route['model_id']}; skipping response cache and eval capture")
+        
+        # Cache the validated output before chunk-specific anchors are attached
+        if cache_key and not cached_json and not partial_result and served_by_route:
+            put_cached_response(cache_bucket, cache_key, validated_output.model_dump_json(), event.get('job_id'))
+        
+        # Keep fresh, complete answers as offline evaluation cases for candidate model routes
+        capture_bucket = eval_capture_bucket()
+        if capture_bucket and not cached_json and not partial_result and served_by_route:
+            capture_stage_call(
+                capture_bucket, 'identify_conflicts', f"{job_id or 'unknown'}_chunk_{chunk_num}",
+                messages, [CONFLICT_DETECTION_PROMPT], validated_output.model_dump(), route,
+                usage_since(usage_start), int((time.time() - call_started) * 1000),
+                expected_items=expected_conflicts
+            )
+        
+        # Anchor each vendor_quote to its position in the chunk text so redlining can apply it directly
+        unanchored_count = 0
+        if chunk_layout_s3_key and validated_output.conflicts:
+            try:
+                if payload_format == 'text' and chunk_layout_s3_key == s3_key:
+                    # Text chunk payload is the layout itself
+                    chunk_layout = json.loads(document_data.decode('utf-8'))
+                else:
+                    layout_response = s3_client.get_object(Bucket=bucket_name, Key=chunk_layout_s3_key)
+                    chunk_layout = json.loads(layout_response['Body'].read().decode('utf-8'))
+                anchors = locate_quotes_in_chunk(
+                    chunk_layout.get('text', ''),
+                    [conflict.vendor_quote for conflict in validated_output.conflicts],
+                    start_char=chunk_layout.get('start_char', start_char),
+                    segments=chunk_layout.get('segments', [])
+                )
+                for conflict, anchor in zip(validated_output.conflicts, anchors):
+                    conflict.anchor = QuoteAnchorModel(**anchor)
+                    if not anchor['found']:
+                        unanchored_count += 1
+                        logger.warning(f"CONFLICT_QUOTE_UNANCHORED: conflict_id={conflict.clarification_id}, vendor_quote not found in chunk {chunk_num} text: '{conflict.vendor_quote[:100]}...'")
+                logger.info(f"CONFLICT_DETECTION_ANCHORS: {len(anchors) - unanchored_count}/{len(anchors)} vendor quotes anchored in chunk {chunk_num}")
+            except Exception as anchor_error:
+                # Anchors are an optimization; redlining still searches the document for unanchored quotes
+                logger.warning(f"CONFLICT_DETECTION_ANCHOR_FAILED: Could not anchor quotes for chunk {chunk_num}: {anchor_error}")
+        
         # Update progress
-        job_id = event.get('job_id')
-        timestamp = event.get('timestamp')
-        session_id = event.get('session_id')
-        user_id = event.get('user_id')
+        if cache_key and increment_counters and job_id and timestamp:
+            increment_counters(job_id, timestamp, {'response_cache_hits' if cached_json else 'response_cache_misses': 1})
         if update_progress and job_id and timestamp:
             if is_chunk and total_chunks > 1:
                 # Calculate progress based on chunk number
@@ -341,6 +532,13 @@ def lambda_handler(event, context):
                     user_id=user_id
                 )
         
+        if record_stage_usage and job_id and timestamp:
+            record_stage_usage(
+                job_id, timestamp, 'identify_conflicts', int((time.time() - started_at) * 1000),
+                chunk_num=chunk_num,
+                usage=dict(usage_since(usage_start), model_id=route['model_id'], served_by_route=served_by_route, cache_hit=bool(cached_json), partial=partial_result)
+            )
+        
         # CRITICAL: Always store result in S3 and return only S3 reference
         # Step Functions has 256KB limit - always store in S3, never return data directly
         result_dict = validated_output.model_dump()
@@ -348,7 +546,7 @@ def lambda_handler(event, context):
         result_size = len(result_json.encode('utf-8'))
         
         try:
-            s3_key_result = f"{event.get('session_id', 'unknown')}/chunk_results/{job_id}_chunk_{chunk_num}_analysis.json"
+            s3_key_result = f"{session_id or 'unknown'}/chunk_results/{job_id}_chunk_{chunk_num}_analysis.json"
             s3_client.put_object(
                 Bucket=bucket_name,
                 Key=s3_key_result,
@@ -358,11 +556,21 @@ def lambda_handler(event, context):
             
             logger.info(f"Stored chunk {chunk_num} analysis result ({result_size} bytes) in S3: {s3_key_result}")
             
+            # The stored result supersedes the streaming checkpoint (also one left by an earlier failed attempt)
+            if partial_s3_key:
+                try:
+                    s3_client.delete_object(Bucket=bucket_name, Key=partial_s3_key)
+                except Exception as delete_error:
+                    logger.warning(f"CONFLICT_STREAM: Could not delete partial result {partial_s3_key}: {delete_error}")
+            
             # Always return only S3 reference (never return data directly)
             return {
                 'chunk_num': chunk_num,
                 'results_s3_key': s3_key_result,
                 'conflicts_count': len(validated_output.conflicts),
+                'unanchored_count': unanchored_count,
+                'cache_hit': bool(cached_json),
+                'partial': partial_result,
                 'has_results': True
             }
         except Exception as s3_error:
@@ -57,6 +57,45 @@ WORKFLOW_STAGES = {
     'failed': {'progress': 0, 'label': 'Failed', 'description': 'An error occurred during processing.'}
 }
 
+# Usage totals added to the job record by progress_tracker.record_stage_usage (usage_<field>)
+USAGE_TOTAL_FIELDS = (
+    'model_calls', 'input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_write_input_tokens',
+    'thinking_tokens_estimate', 'bedrock_attempts', 'bedrock_retries', 'bedrock_latency_ms',
+    'bedrock_hedges', 'bedrock_hedge_wins', 'bedrock_hedges_skipped', 'bedrock_hedges_unaccounted', 'kb_retrievals', 'wall_ms'
+)
+# Per-stage totals added by record_stage_usage (usage_stage_<stage>_<field>)
+USAGE_STAGE_FIELDS = ('invocations', 'wall_ms', 'input_tokens', 'output_tokens', 'cost_micro_usd')
+
+
+def summarize_usage(item: dict) -> dict:
+    """
+    Summarize the job's recorded token, latency and cost usage.
+    
+    Args:
+        item: Job record from DynamoDB
+        
+    Returns:
+        Dict with job totals, estimated cost and per-stage totals
+    """
+    totals = {field: int(item.get(f'usage_{field}', 0)) for field in USAGE_TOTAL_FIELDS}
+    by_stage = {}
+    for key, value in item.items():
+        if not key.startswith('usage_stage_'):
+            continue
+        stage_field = key[len('usage_stage_'):]
+        field = next((field for field in USAGE_STAGE_FIELDS if stage_field.endswith(f'_{field}')), None)
+        if field:
+            stage_totals = by_stage.setdefault(stage_field[:-len(field) - 1], {name: 0 for name in USAGE_STAGE_FIELDS})
+            stage_totals[field] = int(value)
+    for stage_totals in by_stage.values():
+        stage_totals['estimated_cost_usd'] = round(stage_totals.pop('cost_micro_usd') / 1e6, 6)
+    
+    totals['estimated_cost_usd'] = round(int(item.get('usage_cost_micro_usd', 0)) / 1e6, 6)
+    totals['document_chars'] = int(item.get('document_chars', 0))
+    totals['by_stage'] = by_stage
+    return totals
+
+
 def decimal_default(obj):
     """JSON serializer for Decimal objects from DynamoDB."""
     if isinstance(obj, Decimal):
@@ -458,6 +497,15 @@ def lambda_handler(event, context):
             'document_s3_key': item.get('document_s3_key'),
             'chunks_processed': item.get('chunks_processed', 0),
             'total_chunks': item.get('total_chunks', 0),
+            # Conflicts checkpointed so far by streaming conflict detection (one count per chunk, set at each checkpoint)
+            'conflicts_found': sum(int(value) for key, value in item.items() if key.startswith('conflicts_streamed_chunk_')),
+            # Model response cache hits/misses across structure analysis and conflict detection
+            'response_cache': {
+                'hits': item.get('response_cache_hits', 0),
+                'misses': item.get('response_cache_misses', 0)
+            },
+            # Token, latency and cost usage recorded by each stage so far
+            'usage': summarize_usage(item),
             # Always include result and error fields (null if not applicable)
             'result': None,
             'error': error_message,
@@ -8,6 +8,7 @@ import json
 import boto3
 import logging
 import os
+import time
 from agent_api.agent.prompts.models import ConflictDetectionOutput, ConflictModel
 
 logger = logging.getLogger()
@@ -17,9 +18,34 @@ s3_client = boto3.client('s3')
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import update_progress
+    from shared.progress_tracker import update_progress, record_stage_usage
 except ImportError:
     update_progress = None
+    record_stage_usage = None
+
+def _load_partial_chunk_result(bucket_name, s3_key):
+    """
+    Load the conflicts a failed identify_conflicts invocation checkpointed while streaming.
+    
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: Partial result key written by identify_conflicts
+    
+    Returns:
+        ConflictDetectionOutput, or None if the chunk left no checkpoint
+    """
+    try:
+        s3_response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+        partial = json.loads(s3_response['Body'].read().decode('utf-8'))
+        return ConflictDetectionOutput(
+            explanation=partial.get('explanation') or 'Partial result',
+            conflicts=partial.get('conflicts', [])
+        )
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    except Exception as e:
+        logger.error(f"Failed to load partial chunk result {s3_key}: {e}")
+        return None
 
 def lambda_handler(event, context):
     """
@@ -33,8 +59,14 @@ def lambda_handler(event, context):
         Dict with conflicts_s3_key, conflicts_count, has_results (always stores in S3)
     """
     try:
+        started_at = time.time()
+        
         chunk_results = event.get('chunk_results', [])
         bucket_name = event.get('bucket_name') or os.environ.get('AGENT_PROCESSING_BUCKET')
+        job_id = event.get('job_id')
+        timestamp = event.get('timestamp')
+        session_id = event.get('session_id')
+        user_id = event.get('user_id')
         
         if not chunk_results:
             # Return empty result
@@ -48,6 +80,7 @@ def lambda_handler(event, context):
         all_conflicts = []
         explanations = []
         global_additional_counter = 0
+        failed_chunks = []  # Chunks whose conflict detection failed and left no checkpoint
         
         logger.info(f"Processing {len(chunk_results)} chunk results")
         
@@ -61,26 +94,38 @@ def lambda_handler(event, context):
                 
                 # Get analysis_result from chunk_result_data (from identify_conflicts step)
                 analysis_result = chunk_result_data.get('analysis_result')
-                if not isinstance(analysis_result, dict):
-                    logger.error(f"Invalid chunk result format for chunk {chunk_idx}: missing or invalid analysis_result")
-                    continue
+                if chunk_result_data.get('analysis_error') and not isinstance(analysis_result, dict):
+                    # identify_conflicts failed after its retries (e.g. a Lambda timeout);
+                    # use the conflicts it checkpointed while streaming, keyed by job and chunk
+                    chunk_num = chunk_result_data.get('chunk_num', chunk_idx)
+                    partial_s3_key = f"{session_id or 'unknown'}/chunk_results/{job_id}_chunk_{chunk_num}_partial.json"
+                    chunk_result = _load_partial_chunk_result(bucket_name, partial_s3_key)
+                    if chunk_result is None:
+                        logger.error(f"Chunk {chunk_num + 1} failed with no checkpointed conflicts: {chunk_result_data.get('analysis_error')}")
+                        failed_chunks.append(chunk_num)
+                        continue
+                    logger.warning(f"Chunk {chunk_num + 1} failed; using {len(chunk_result.conflicts)} conflicts checkpointed in {partial_s3_key}")
+                else:
+                    if not isinstance(analysis_result, dict):
+                        logger.error(f"Invalid chunk result format for chunk {chunk_idx}: missing or invalid analysis_result")
+                        continue
                 
-                results_s3_key = analysis_result.get('results_s3_key')
-                if not results_s3_key:
-                    logger.error(f"Invalid chunk result format for chunk {chunk_idx}: missing results_s3_key in analysis_result")
-                    continue
+                    results_s3_key = analysis_result.get('results_s3_key')
+                    if not results_s3_key:
+                        logger.error(f"Invalid chunk result format for chunk {chunk_idx}: missing results_s3_key in analysis_result")
+                        continue
                 
-                chunk_num = analysis_result.get('chunk_num', chunk_result_data.get('chunk_num', chunk_idx))
+                    chunk_num = analysis_result.get('chunk_num', chunk_result_data.get('chunk_num', chunk_idx))
                 
-                # Load chunk result from S3
-                try:
-                    s3_response = s3_client.get_object(Bucket=bucket_name, Key=results_s3_key)
-                    chunk_result_json = s3_response['Body'].read().decode('utf-8')
-                    chunk_result = ConflictDetectionOutput.model_validate_json(chunk_result_json)
-                    logger.info(f"Loaded chunk {chunk_num} result from S3: {results_s3_key}")
-                except Exception as e:
-                    logger.error(f"CRITICAL: Failed to load chunk {chunk_num} result from S3 {results_s3_key}: {e}")
-                    raise  # Fail fast - chunk results must be in S3
+                    # Load chunk result from S3
+                    try:
+                        s3_response = s3_client.get_object(Bucket=bucket_name, Key=results_s3_key)
+                        chunk_result_json = s3_response['Body'].read().decode('utf-8')
+                        chunk_result = ConflictDetectionOutput.model_validate_json(chunk_result_json)
+                        logger.info(f"Loaded chunk {chunk_num} result from S3: {results_s3_key}")
+                    except Exception as e:
+                        logger.error(f"CRITICAL: Failed to load chunk {chunk_num} result from S3 {results_s3_key}: {e}")
+                        raise  # Fail fast - chunk results must be in S3
                 
                 # Collect explanation
                 if chunk_result.explanation:
@@ -106,6 +151,9 @@ def lambda_handler(event, context):
                 logger.warning(f"Error processing chunk {chunk_num + 1}: {e}")
                 continue
         
+        if failed_chunks:
+            raise ValueError(f"Conflict detection failed for chunks {[n + 1 for n in failed_chunks]} and no conflicts were checkpointed")
+        
         # Deduplicate conflicts based on clarification_id and vendor_quote
         seen_conflicts = set()
         deduplicated_conflicts = []
@@ -134,11 +182,15 @@ def lambda_handler(event, context):
         
         logger.info(f"Merged {len(deduplicated_conflicts)} total conflicts from {len(chunk_results)} chunks")
         
+        # Conflicts carry their chunk anchors (absolute offsets + paragraph/cell coordinates) through to redlining;
+        # flag the ones whose quote could not be located so they are visible before the redline step
+        unanchored_conflicts = [c for c in deduplicated_conflicts if c.anchor is not None and not c.anchor.found]
+        anchored_count = sum(1 for c in deduplicated_conflicts if c.anchor is not None and c.anchor.found)
+        logger.info(f"MERGE_ANCHORS: anchored={anchored_count}, unanchored={len(unanchored_conflicts)}, without_anchor={len(deduplicated_conflicts) - anchored_count - len(unanchored_conflicts)}")
+        for conflict in unanchored_conflicts:
+            logger.warning(f"MERGE_UNANCHORED_QUOTE: conflict_id={conflict.clarification_id}, vendor_quote='{conflict.vendor_quote[:100]}...'")
+        
         # Update progress
-        job_id = event.get('job_id')
-        timestamp = event.get('timestamp')
-        session_id = event.get('session_id')
-        user_id = event.get('user_id')
         if update_progress and job_id and timestamp:
             update_progress(
                 job_id, timestamp, 'merging_results',
@@ -146,6 +198,11 @@ def lambda_handler(event, context):
                 session_id=session_id,
                 user_id=user_id
             )
+        if record_stage_usage and job_id and timestamp:
+            record_stage_usage(
+                job_id, timestamp, 'merge_chunk_results', int((time.time() - started_at) * 1000),
+                usage={'conflicts_count': len(deduplicated_conflicts)}
+            )
         
         # CRITICAL: Always store result in S3 and return only S3 reference
         # Step Functions has 256KB limit - merged conflicts can be large
@@ -167,6 +224,7 @@ def lambda_handler(event, context):
             return {
                 'conflicts_s3_key': s3_key_result,
                 'conflicts_count': len(deduplicated_conflicts),
+                'unanchored_count': len(unanchored_conflicts),
                 'has_results': True
             }
         except Exception as s3_error:
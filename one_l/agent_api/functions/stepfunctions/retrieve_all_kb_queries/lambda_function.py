@@ -1,22 +1,31 @@
 """
 Retrieve all KB queries Lambda function.
 Retrieves all queries in a single lambda using concurrent.futures.
-Stores all results in a single S3 file.
+Runs per chunk, or once per job when the workflow uses job-level retrieval; identical
+queries are retrieved once and their results stored in one S3 file per chunk.
 """
 
 import json
 import boto3
 import logging
 import os
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from agent_api.agent.prompts.models import KBQueryResult
 from agent_api.agent.tools import retrieve_from_knowledge_base
+from agent_api.agent.retrieval_cache import normalize_query
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 s3_client = boto3.client('s3')
 
+# Import progress tracker
+try:
+    from shared.progress_tracker import record_stage_usage
+except ImportError:
+    record_stage_usage = None
+
 def get_kb_id_by_name(name: str) -> str:
     """Resolve Knowledge Base ID from Name."""
     try:
@@ -67,6 +76,7 @@ def retrieve_single_query(query_data, knowledge_base_id, region, terms_profile=N
         results = []
         success = True
         error = None
+        duplicates_filtered = 0
         
         if isinstance(result, dict):
             if 'error' in result:
@@ -77,6 +87,11 @@ def retrieve_single_query(query_data, knowledge_base_id, region, terms_profile=N
                 results = result.get('results', [])
                 if not results and 'retrievalResults' in result:
                     results = result.get('retrievalResults', [])
+                # Each query deduplicates its own passages, so a passage shared with another query is kept for both
+                dedup_stats = result.get('optimization_stats', {})
+                duplicates_filtered = dedup_stats.get('duplicates_filtered', 0)
+                if duplicates_filtered:
+                    logger.info(f"KB_QUERY_DEDUP: query_id={query_id}, duplicates_filtered={duplicates_filtered}, exact={dedup_stats.get('exact_duplicates', 0)}, near={dedup_stats.get('near_duplicates', 0)}")
         elif isinstance(result, list):
             results = result
         
@@ -122,7 +137,9 @@ def retrieve_single_query(query_data, knowledge_base_id, region, terms_profile=N
             'results': results,
             'success': success,
             'error': error,
-            'results_count': results_count
+            'results_count': results_count,
+            'duplicates_filtered': duplicates_filtered,
+            'cache_hit': bool(isinstance(result, dict) and result.get('cached'))  # Served by the retrieval cache
         }
         
     except Exception as e:
@@ -136,40 +153,321 @@ def retrieve_single_query(query_data, knowledge_base_id, region, terms_profile=N
             'results_count': 0
         }
 
+# Major contract sections from Massachusetts Terms and Conditions document
+# A query for one of these sections whose results contain no Terms and Conditions document gets a fallback query
+MAJOR_SECTIONS = [
+    'INDEMNITY', 'INDEMNIFICATION', 'LIABILITY', 'LIMITATION', 'LIMITATIONS',
+    'TERMINATION', 'SUSPENSION', 'FORCE MAJEURE',
+    'PAYMENT', 'PAYMENTS', 'COMPENSATION', 'CONTRACTOR PAYMENTS',
+    'WARRANTY', 'WARRANTIES', 'NON-INFRINGEMENT',
+    'CONFIDENTIALITY', 'PRIVACY', 'DATA', 'PROTECTION',
+    'ASSIGNMENT', 'TRANSFER',
+    'NOTICE', 'NOTICES', 'WRITTEN NOTICE',
+    'SUBCONTRACTING', 'SUBCONTRACTOR',
+    'INSURANCE',
+    'RECORD', 'RETENTION', 'INSPECTION', 'AUDIT',
+    'RISK OF LOSS',
+    'WAIVER', 'WAIVERS',
+    'GOVERNING LAW', 'FORUM', 'JURISDICTION', 'MEDIATION', 'CHOICE OF LAW',
+    'SEVERABILITY', 'INTEGRATION', 'BOILERPLATE', 'CONFLICTS',
+    'AFFIRMATIVE ACTION', 'NON-DISCRIMINATION',
+    'PRESS RELEASE', 'MARKETING', 'PUBLICITY',
+    'AI USAGE', 'DISCLOSURE'
+]
+
+QUERY_CLUSTER_SIMILARITY = 0.8  # Token Jaccard at which two queries are retrieved as one
+QUERY_PLAN_MAX_LOGGED_CLUSTERS = 25  # Merged clusters logged (with members) and returned (as counts) in the stage output
+# Ignored when comparing queries: stop words and jurisdiction terms the structure prompt asks every query to include
+QUERY_IGNORED_TOKENS = frozenset([
+    'a', 'an', 'and', 'the', 'of', 'for', 'to', 'in', 'on', 'or', 'by', 'with', 'under', 'regarding',
+    'massachusetts', 'commonwealth', 'ma'
+])
+
+def _load_structure_queries(bucket_name, structure_s3_key):
+    """Load the queries array of one chunk's structure analysis from S3."""
+    try:
+        structure_response = s3_client.get_object(Bucket=bucket_name, Key=structure_s3_key)
+        structure_data = json.loads(structure_response['Body'].read().decode('utf-8'))
+        queries = structure_data.get('queries', [])
+        logger.info(f"Loaded structure results from S3: {structure_s3_key}, found {len(queries)} queries")
+        return queries
+    except Exception as e:
+        logger.error(f"CRITICAL: Failed to load structure results from S3 {structure_s3_key}: {e}")
+        raise  # Fail fast - structure results must be in S3
+
+def _query_tokens(query):
+    """Content tokens of a query: normalized words without stop words or the jurisdiction terms every query may carry."""
+    return frozenset(token for token in normalize_query(query).split() if token not in QUERY_IGNORED_TOKENS)
+
+def _plan_queries(chunk_queries):
+    """
+    Cluster near-duplicate queries across chunks so each cluster is retrieved once.
+    
+    Queries with the same result count join a cluster when the token Jaccard similarity of their
+    content tokens with the cluster's first query is at least QUERY_CLUSTER_SIMILARITY, so word
+    order and an added "Massachusetts Commonwealth" do not cause another retrieval. Candidate
+    clusters are found through an inverted token index instead of comparing every pair.
+    
+    Args:
+        chunk_queries: List of (chunk_num, query_data) in request order
+        
+    Returns:
+        List of clusters {'query': representative query_data, 'members': [(chunk_num, query_data), ...]};
+        the representative is the longest member query (the most specific wording)
+    """
+    clusters = []
+    token_index = {}  # (max_results, token) -> cluster indexes
+    for chunk_num, query_data in chunk_queries:
+        max_results = int(query_data.get('max_results') or 50)
+        tokens = _query_tokens(query_data.get('query', ''))
+        
+        match = None
+        candidates = sorted({idx for token in tokens for idx in token_index.get((max_results, token), ())})
+        for idx in candidates:
+            cluster_tokens = clusters[idx]['tokens']
+            if len(tokens & cluster_tokens) / len(tokens | cluster_tokens) >= QUERY_CLUSTER_SIMILARITY:
+                match = idx
+                break
+        if match is None and not tokens:
+            # Query with no content tokens: only merge with the identical query
+            match = next((idx for idx, cluster in enumerate(clusters) if not cluster['tokens'] and cluster['max_results'] == max_results
+                          and normalize_query(cluster['query'].get('query', '')) == normalize_query(query_data.get('query', ''))), None)
+        
+        if match is None:
+            clusters.append({'query': query_data, 'members': [], 'tokens': tokens, 'max_results': max_results})
+            match = len(clusters) - 1
+            for token in tokens:
+                token_index.setdefault((max_results, token), []).append(match)
+        cluster = clusters[match]
+        cluster['members'].append((chunk_num, query_data))
+        if len(query_data.get('query', '')) > len(cluster['query'].get('query', '')):
+            cluster['query'] = query_data
+    return clusters
+
+def _summarize_plan(plan):
+    """
+    Query plan for logs and the stage output: counts and the clusters that saved retrievals.
+    
+    Member lists grow with the number of chunks, so they are only logged; the stage output
+    (part of the Step Functions state) carries each cluster's member count.
+    """
+    queries_requested = sum(len(cluster['members']) for cluster in plan)
+    merged = [cluster for cluster in plan if len(cluster['members']) > 1]
+    for cluster in merged[:QUERY_PLAN_MAX_LOGGED_CLUSTERS]:
+        member_ids = [(chunk_num, query_data.get('query_id')) for chunk_num, query_data in cluster['members']]
+        member_sections = sorted({str(query_data.get('section')) for _, query_data in cluster['members']})
+        logger.info(f"KB_QUERY_CLUSTER: representative='{cluster['query'].get('query', '')[:100]}', members(chunk, query_id)={member_ids}, sections={member_sections}")
+    return {
+        'queries_requested': queries_requested,
+        'retrieval_calls': len(plan),
+        'saved_calls': queries_requested - len(plan),
+        'clusters': [
+            {
+                'representative': cluster['query'].get('query', '')[:200],
+                'member_count': len(cluster['members']),
+                'chunk_count': len({chunk_num for chunk_num, _ in cluster['members']})
+            }
+            for cluster in merged[:QUERY_PLAN_MAX_LOGGED_CLUSTERS]
+        ]
+    }
+
+def _run_queries(queries, knowledge_base_id, region, terms_profile):
+    """
+    Retrieve queries in parallel.
+    
+    Args:
+        queries: List of query_data dicts
+        knowledge_base_id: Knowledge Base ID
+        region: AWS region
+        terms_profile: Terms profile for filtering (None = no profile filtering)
+        
+    Returns:
+        List of KBQueryResult dicts in the order of queries
+    """
+    results = [None] * len(queries)
+    # Use max_workers=20 to match previous parallel map concurrency
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        future_to_index = {
+            executor.submit(retrieve_single_query, query_data, knowledge_base_id, region, terms_profile): idx
+            for idx, query_data in enumerate(queries)
+        }
+        
+        # Collect results as they complete
+        for future in as_completed(future_to_index):
+            idx = future_to_index[future]
+            query_data = queries[idx]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                logger.error(f"Exception retrieving query {query_data.get('query_id', 'unknown')}: {e}")
+                results[idx] = {
+                    'query_id': query_data.get('query_id', 0),
+                    'query': query_data.get('query', ''),
+                    'section': query_data.get('section'),  # Preserve section even on error
+                    'results': [],
+                    'success': False,
+                    'error': str(e),
+                    'results_count': 0
+                }
+    return results
+
+def _retrieve_planned(chunk_queries, knowledge_base_id, region, terms_profile):
+    """
+    Retrieve each query cluster once and map its result back to every chunk query in the cluster.
+    
+    Args:
+        chunk_queries: List of (chunk_num, query_data)
+        knowledge_base_id: Knowledge Base ID
+        region: AWS region
+        terms_profile: Terms profile for filtering
+        
+    Returns:
+        Tuple of ({chunk_num: [KBQueryResult dict, ...]}, query plan clusters)
+    """
+    plan = _plan_queries(chunk_queries)
+    unique_results = _run_queries([group['query'] for group in plan], knowledge_base_id, region, terms_profile)
+    
+    chunk_results = {}
+    for group, result in zip(plan, unique_results):
+        for chunk_num, query_data in group['members']:
+            member_result = dict(result)
+            query_id_raw = query_data.get('query_id')
+            member_result['query_id'] = int(query_id_raw) if query_id_raw is not None and str(query_id_raw).strip() else 0
+            member_result['query'] = query_data.get('query', '')
+            member_result['section'] = query_data.get('section')
+            if query_data is not group['query']:
+                member_result['shared_retrieval'] = True  # Result of a similar query retrieved for another chunk or query
+            chunk_results.setdefault(chunk_num, []).append(member_result)
+    return chunk_results, plan
+
+def _build_fallback_queries(all_results):
+    """Fallback queries for major sections whose results contain no Terms and Conditions document."""
+    fallback_queries = []
+    max_query_id = max([r.get('query_id', 0) for r in all_results], default=0)
+    
+    for result in all_results:
+        section = (result.get('section') or '').upper()
+        results = result.get('results', [])
+        
+        # Check if this is a major section query
+        is_major_section = any(keyword in section for keyword in MAJOR_SECTIONS)
+        
+        if is_major_section and results:
+            # Check if Terms and Conditions documents are in results
+            has_terms_doc = False
+            for r in results:
+                source = r.get('source', '') or r.get('metadata', {}).get('source', '')
+                if 'terms' in source.lower() or 'conditions' in source.lower():
+                    has_terms_doc = True
+                    break
+            
+            # If major section query has results but no Terms docs, add fallback
+            if not has_terms_doc:
+                max_query_id += 1
+                # Create fallback query specifically targeting Terms and Conditions
+                # Extract the main section keyword(s) from the section name
+                section_keywords = [kw for kw in MAJOR_SECTIONS if kw in section]
+                if not section_keywords:
+                    # Fallback: use first word of section if no keyword matches
+                    section_keywords = [section.split()[0]] if section else ['Terms']
+                
+                # Create focused fallback query targeting Terms and Conditions document
+                # Use more specific query format that matches how Terms docs are structured
+                section_name = (result.get('section') or '').replace('(Fallback)', '').strip()
+                fallback_query = f"{' '.join(section_keywords)} section Terms and Conditions Massachusetts Commonwealth IT Terms and Conditions document {section_name} requirements provisions"
+                
+                logger.info(f"KB_FALLBACK_QUERY: Adding fallback query {max_query_id} for section '{result.get('section')}' - original query had {len(results)} results but no Terms and Conditions documents")
+                
+                fallback_queries.append({
+                    'query_id': max_query_id,
+                    'query': fallback_query,
+                    'section': (result.get('section') or '') + ' (Fallback)',
+                    'is_fallback': True,
+                    'original_query_id': result.get('query_id')
+                })
+    return fallback_queries
+
+def _log_retrieval_summary(all_results, chunk_num):
+    """Log query effectiveness and document coverage for one chunk's results."""
+    total_results_count = sum(r.get('results_count', 0) for r in all_results)
+    queries_with_results = [r for r in all_results if r.get('results_count', 0) > 0]
+    queries_without_results = [r for r in all_results if r.get('results_count', 0) == 0]
+    
+    # Log comprehensive KB retrieval summary
+    query_success_rate = len(queries_with_results) / len(all_results) * 100 if all_results else 0
+    logger.info(f"KB_RETRIEVAL_SUMMARY: chunk={chunk_num}, total_queries={len(all_results)}, queries_with_results={len(queries_with_results)}, queries_without_results={len(queries_without_results)}, success_rate={query_success_rate:.1f}%, total_kb_results={total_results_count}")
+    
+    # Log all document types found across all queries
+    all_document_sources = set()
+    for r in queries_with_results:
+        for result in r.get('results', []):
+            if isinstance(result, dict):
+                source = result.get('source') or result.get('metadata', {}).get('source') or 'unknown'
+                all_document_sources.add(source)
+    
+    logger.info(f"KB_RETRIEVAL_DOCUMENTS: total_unique_documents={len(all_document_sources)}, documents={sorted(list(all_document_sources))[:10]}{'...' if len(all_document_sources) > 10 else ''}")
+    
+    # Log queries with no results for debugging
+    if queries_without_results:
+        logger.warning(f"KB_RETRIEVAL_NO_RESULTS: {len(queries_without_results)} queries returned no results:")
+        for q in queries_without_results[:10]:  # Log first 10 for brevity
+            logger.warning(f"KB_QUERY_NO_RESULTS_DETAIL: query_id={q.get('query_id')}, section='{q.get('section', 'N/A')}', query='{q.get('query', '')[:100]}...'")
+        if len(queries_without_results) > 10:
+            logger.warning(f"KB_QUERY_NO_RESULTS_DETAIL: ... and {len(queries_without_results) - 10} more queries with no results")
+    
+    # Warn if success rate is low
+    if query_success_rate < 50:
+        logger.warning(f"KB_RETRIEVAL_WARNING: Low success rate ({query_success_rate:.1f}%). Consider improving query generation to include more Massachusetts-specific terminology.")
+
 def lambda_handler(event, context):
     """
     Retrieve all KB queries and store results in S3.
     
+    Runs for one chunk (structure_s3_key, inside the per-chunk Map) or, with the job-level
+    retrieval workflow, for every chunk of the job at once (structure_results). In both cases
+    identical queries are retrieved once and their results mapped back to each asking query,
+    and results are stored per chunk for identify_conflicts.
+    
     Args:
         event: Lambda event with:
-            - structure_s3_key: S3 key with structure results (contains queries array)
+            - structure_s3_key: S3 key with structure results (contains queries array), for one chunk
+            - structure_results: Per-chunk AnalyzeStructure outputs, in chunk order, for the whole job
             - knowledge_base_id: Knowledge Base ID
             - region: AWS region
             - job_id: Job ID for S3 storage
             - session_id: Session ID for S3 storage
             - bucket_name: S3 bucket for storage
+            - chunk_num: Chunk number (single-chunk mode)
+            - timestamp: Job record sort key (for usage accounting)
         
     Returns:
-        Dict with results_s3_key, results_count, queries_count, success_count, failed_count
+        Dict with results_s3_key (single chunk) or results_s3_keys (job, in chunk order),
+        results_count, queries_count, retrieval_calls, query_plan, success_count, failed_count
     """
     try:
+        started_at = time.time()
+        
         structure_s3_key = event.get('structure_s3_key')
+        structure_results = event.get('structure_results')
         bucket_name = event.get('bucket_name') or os.environ.get('AGENT_PROCESSING_BUCKET')
         knowledge_base_id = event.get('knowledge_base_id') or os.environ.get('KNOWLEDGE_BASE_ID')
         
         # CRITICAL: Load structure results from S3 (analyze_structure stores in S3)
-        if not structure_s3_key or not bucket_name:
-            raise ValueError("structure_s3_key and bucket_name are required")
-        
-        try:
-            structure_response = s3_client.get_object(Bucket=bucket_name, Key=structure_s3_key)
-            structure_json = structure_response['Body'].read().decode('utf-8')
-            structure_data = json.loads(structure_json)
-            queries = structure_data.get('queries', [])
-            logger.info(f"Loaded structure results from S3: {structure_s3_key}, found {len(queries)} queries")
-        except Exception as e:
-            logger.error(f"CRITICAL: Failed to load structure results from S3 {structure_s3_key}: {e}")
-            raise  # Fail fast - structure results must be in S3
+        if not (structure_s3_key or structure_results) or not bucket_name:
+            raise ValueError("structure_s3_key (or structure_results) and bucket_name are required")
+        
+        if structure_results:
+            # Job-level retrieval: one entry per chunk, each holding that chunk's structure_result
+            chunk_nums = []
+            chunk_queries = []
+            for idx, chunk_state in enumerate(structure_results):
+                chunk_num = chunk_state.get('chunk_num', idx)
+                chunk_nums.append(chunk_num)
+                for query_data in _load_structure_queries(bucket_name, chunk_state['structure_result']['structure_s3_key']):
+                    chunk_queries.append((chunk_num, query_data))
+        else:
+            chunk_nums = [event.get('chunk_num', 0)]  # Get chunk number to avoid overwrites
+            chunk_queries = [(chunk_nums[0], query_data) for query_data in _load_structure_queries(bucket_name, structure_s3_key)]
         
         # Fallback to name lookup
         if (not knowledge_base_id or knowledge_base_id == "placeholder") and os.environ.get('KNOWLEDGE_BASE_NAME'):
@@ -178,212 +476,112 @@ def lambda_handler(event, context):
         region = event.get('region') or os.environ.get('REGION')
         job_id = event.get('job_id', 'unknown')
         session_id = event.get('session_id', 'unknown')
-        bucket_name = event.get('bucket_name') or os.environ.get('AGENT_PROCESSING_BUCKET')
-        chunk_num = event.get('chunk_num', 0)  # Get chunk number to avoid overwrites
         terms_profile = event.get('terms_profile')  # Get terms profile for filtering
         
-        if not queries:
+        if not chunk_queries:
             raise ValueError("queries array is required")
         
         if not knowledge_base_id or not region:
             raise ValueError("knowledge_base_id and region are required")
         
-        if not bucket_name:
-            raise ValueError("bucket_name is required for S3 storage")
-        
-        logger.info(f"KB_RETRIEVE_START: Retrieving {len(queries)} KB queries for job {job_id}, chunk {chunk_num}")
+        logger.info(f"KB_RETRIEVE_START: Retrieving {len(chunk_queries)} KB queries for job {job_id}, chunks {chunk_nums}")
         logger.info(f"KB_RETRIEVE_INFO: Terms profile being used for filtering: {terms_profile}")
         logger.info(f"KB_RETRIEVE_INFO: This terms_profile will filter out documents from other terms buckets and boost matching documents")
         
-        # Retrieve all queries in parallel using ThreadPoolExecutor
-        # Use max_workers=20 to match previous parallel map concurrency
-        all_results = []
-        success_count = 0
-        failed_count = 0
-        
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            # Submit all queries
-            future_to_query = {
-                executor.submit(retrieve_single_query, query_data, knowledge_base_id, region, terms_profile): query_data
-                for query_data in queries
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_query):
-                query_data = future_to_query[future]
-                try:
-                    result = future.result()
-                    all_results.append(result)
-                    if result.get('success'):
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                        logger.warning(f"Query {result.get('query_id')} failed: {result.get('error')}")
-                except Exception as e:
-                    failed_count += 1
-                    logger.error(f"Exception retrieving query {query_data.get('query_id', 'unknown')}: {e}")
-                    all_results.append({
-                        'query_id': query_data.get('query_id', 0),
-                        'query': query_data.get('query', ''),
-                        'section': query_data.get('section'),  # Preserve section even on error
-                        'results': [],
-                        'success': False,
-                        'error': str(e),
-                        'results_count': 0
-                    })
-        
-        # Sort results by query_id to maintain order
-        all_results.sort(key=lambda x: x.get('query_id', 0))
+        # Retrieve each cluster of near-duplicate queries once, then map results back to every chunk query
+        chunk_results, plan = _retrieve_planned(chunk_queries, knowledge_base_id, region, terms_profile)
         
         # POST-PROCESSING: Add fallback queries for major sections missing Terms and Conditions documents
-        # Major contract sections from Massachusetts Terms and Conditions document
-        major_sections = [
-            'INDEMNITY', 'INDEMNIFICATION', 'LIABILITY', 'LIMITATION', 'LIMITATIONS',
-            'TERMINATION', 'SUSPENSION', 'FORCE MAJEURE',
-            'PAYMENT', 'PAYMENTS', 'COMPENSATION', 'CONTRACTOR PAYMENTS',
-            'WARRANTY', 'WARRANTIES', 'NON-INFRINGEMENT',
-            'CONFIDENTIALITY', 'PRIVACY', 'DATA', 'PROTECTION',
-            'ASSIGNMENT', 'TRANSFER',
-            'NOTICE', 'NOTICES', 'WRITTEN NOTICE',
-            'SUBCONTRACTING', 'SUBCONTRACTOR',
-            'INSURANCE',
-            'RECORD', 'RETENTION', 'INSPECTION', 'AUDIT',
-            'RISK OF LOSS',
-            'WAIVER', 'WAIVERS',
-            'GOVERNING LAW', 'FORUM', 'JURISDICTION', 'MEDIATION', 'CHOICE OF LAW',
-            'SEVERABILITY', 'INTEGRATION', 'BOILERPLATE', 'CONFLICTS',
-            'AFFIRMATIVE ACTION', 'NON-DISCRIMINATION',
-            'PRESS RELEASE', 'MARKETING', 'PUBLICITY',
-            'AI USAGE', 'DISCLOSURE'
-        ]
         fallback_queries = []
-        max_query_id = max([r.get('query_id', 0) for r in all_results], default=0)
-        
-        for result in all_results:
-            section = result.get('section', '').upper()
-            results = result.get('results', [])
-            
-            # Check if this is a major section query
-            is_major_section = any(keyword in section for keyword in major_sections)
-            
-            if is_major_section and results:
-                # Check if Terms and Conditions documents are in results
-                has_terms_doc = False
-                for r in results:
-                    source = r.get('source', '') or r.get('metadata', {}).get('source', '')
-                    if 'terms' in source.lower() or 'conditions' in source.lower():
-                        has_terms_doc = True
-                        break
-                
-                # If major section query has results but no Terms docs, add fallback
-                if not has_terms_doc:
-                    max_query_id += 1
-                    # Create fallback query specifically targeting Terms and Conditions
-                    # Extract the main section keyword(s) from the section name
-                    section_keywords = [kw for kw in major_sections if kw in section]
-                    if not section_keywords:
-                        # Fallback: use first word of section if no keyword matches
-                        section_keywords = [section.split()[0]] if section else ['Terms']
-                    
-                    # Create focused fallback query targeting Terms and Conditions document
-                    # Use more specific query format that matches how Terms docs are structured
-                    section_name = result.get('section', '').replace('(Fallback)', '').strip()
-                    fallback_query = f"{' '.join(section_keywords)} section Terms and Conditions Massachusetts Commonwealth IT Terms and Conditions document {section_name} requirements provisions"
-                    
-                    logger.info(f"KB_FALLBACK_QUERY: Adding fallback query {max_query_id} for section '{result.get('section')}' - original query had {len(results)} results but no Terms and Conditions documents")
-                    
-                    fallback_queries.append({
-                        'query_id': max_query_id,
-                        'query': fallback_query,
-                        'section': result.get('section', '') + ' (Fallback)',
-                        'is_fallback': True,
-                        'original_query_id': result.get('query_id')
-                    })
+        for chunk_num in chunk_nums:
+            fallback_queries.extend((chunk_num, query_data) for query_data in _build_fallback_queries(chunk_results.get(chunk_num, [])))
         
         # Execute fallback queries if any were created
         if fallback_queries:
             logger.info(f"KB_FALLBACK_EXECUTION: Executing {len(fallback_queries)} fallback queries for Terms and Conditions documents")
-            with ThreadPoolExecutor(max_workers=20) as executor:
-                fallback_futures = {
-                    executor.submit(retrieve_single_query, query_data, knowledge_base_id, region): query_data
-                    for query_data in fallback_queries
-                }
-                
-                for future in as_completed(fallback_futures):
-                    query_data = fallback_futures[future]
-                    try:
-                        fallback_result = future.result()
-                        all_results.append(fallback_result)
-                        if fallback_result.get('success') and fallback_result.get('results_count', 0) > 0:
-                            logger.info(f"KB_FALLBACK_SUCCESS: Fallback query {fallback_result.get('query_id')} returned {fallback_result.get('results_count')} results")
-                        else:
-                            logger.warning(f"KB_FALLBACK_NO_RESULTS: Fallback query {fallback_result.get('query_id')} returned no results")
-                    except Exception as e:
-                        logger.error(f"KB_FALLBACK_ERROR: Exception executing fallback query {query_data.get('query_id', 'unknown')}: {e}")
-            
-            # Re-sort after adding fallback results
-            all_results.sort(key=lambda x: x.get('query_id', 0))
+            fallback_results, fallback_plan = _retrieve_planned(fallback_queries, knowledge_base_id, region, None)
+            plan = plan + fallback_plan
+            for chunk_num, results in fallback_results.items():
+                for fallback_result in results:
+                    if fallback_result.get('success') and fallback_result.get('results_count', 0) > 0:
+                        logger.info(f"KB_FALLBACK_SUCCESS: Fallback query {fallback_result.get('query_id')} returned {fallback_result.get('results_count')} results")
+                    else:
+                        logger.warning(f"KB_FALLBACK_NO_RESULTS: Fallback query {fallback_result.get('query_id')} returned no results")
+                chunk_results[chunk_num].extend(results)
+        
+        query_plan = _summarize_plan(plan)
+        retrieval_calls = query_plan['retrieval_calls']
+        logger.info(f"KB_QUERY_PLAN: {query_plan['queries_requested']} queries from {len(chunk_nums)} chunks, {retrieval_calls} retrievals ({query_plan['saved_calls']} saved)")
         
-        # Calculate total results count and analyze query effectiveness
-        total_results_count = sum(r.get('results_count', 0) for r in all_results)
-        queries_with_results = [r for r in all_results if r.get('results_count', 0) > 0]
-        queries_without_results = [r for r in all_results if r.get('results_count', 0) == 0]
-        
-        # Log comprehensive KB retrieval summary
-        query_success_rate = len(queries_with_results) / len(all_results) * 100 if all_results else 0
-        logger.info(f"KB_RETRIEVAL_SUMMARY: total_queries={len(all_results)}, queries_with_results={len(queries_with_results)}, queries_without_results={len(queries_without_results)}, success_rate={query_success_rate:.1f}%, total_kb_results={total_results_count}")
-        
-        # Log all document types found across all queries
-        all_document_sources = set()
-        for r in queries_with_results:
-            for result in r.get('results', []):
-                if isinstance(result, dict):
-                    source = result.get('source') or result.get('metadata', {}).get('source') or 'unknown'
-                    all_document_sources.add(source)
-        
-        logger.info(f"KB_RETRIEVAL_DOCUMENTS: total_unique_documents={len(all_document_sources)}, documents={sorted(list(all_document_sources))[:10]}{'...' if len(all_document_sources) > 10 else ''}")
-        
-        # Log queries with no results for debugging
-        if queries_without_results:
-            logger.warning(f"KB_RETRIEVAL_NO_RESULTS: {len(queries_without_results)} queries returned no results:")
-            for q in queries_without_results[:10]:  # Log first 10 for brevity
-                logger.warning(f"KB_QUERY_NO_RESULTS_DETAIL: query_id={q.get('query_id')}, section='{q.get('section', 'N/A')}', query='{q.get('query', '')[:100]}...'")
-            if len(queries_without_results) > 10:
-                logger.warning(f"KB_QUERY_NO_RESULTS_DETAIL: ... and {len(queries_without_results) - 10} more queries with no results")
-        
-        # Warn if success rate is low
-        if query_success_rate < 50:
-            logger.warning(f"KB_RETRIEVAL_WARNING: Low success rate ({query_success_rate:.1f}%). Consider improving query generation to include more Massachusetts-specific terminology.")
-        
-        # Store all results in S3 - include chunk_num to avoid overwrites when chunks run in parallel
-        s3_key = f"{session_id}/kb_results/{job_id}_chunk_{chunk_num}_all_queries.json"
-        results_json = json.dumps(all_results)
-        results_size = len(results_json.encode('utf-8'))
-        
-        try:
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=s3_key,
-                Body=results_json.encode('utf-8'),
-                ContentType='application/json'
+        # Store each chunk's results in S3 - include chunk_num to avoid overwrites when chunks run in parallel
+        results_s3_keys = []
+        total_results_count = 0
+        success_count = 0
+        failed_count = 0
+        for chunk_num in chunk_nums:
+            all_results = chunk_results.get(chunk_num, [])
+            # Sort results by query_id to maintain order
+            all_results.sort(key=lambda x: x.get('query_id', 0))
+            _log_retrieval_summary(all_results, chunk_num)
+            for result in all_results:
+                if result.get('success'):
+                    success_count += 1
+                else:
+                    failed_count += 1
+                    logger.warning(f"Query {result.get('query_id')} failed: {result.get('error')}")
+            
+            chunk_results_count = sum(r.get('results_count', 0) for r in all_results)
+            total_results_count += chunk_results_count
+            s3_key = f"{session_id}/kb_results/{job_id}_chunk_{chunk_num}_all_queries.json"
+            results_json = json.dumps(all_results)
+            results_size = len(results_json.encode('utf-8'))
+            
+            try:
+                s3_client.put_object(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    Body=results_json.encode('utf-8'),
+                    ContentType='application/json'
+                )
+                logger.info(f"Stored {len(all_results)} KB query results ({chunk_results_count} total results, {results_size} bytes) in S3: {s3_key}")
+            except Exception as s3_error:
+                logger.error(f"CRITICAL: Failed to store KB results in S3: {s3_error}")
+                raise  # Fail fast if S3 storage fails
+            results_s3_keys.append(s3_key)
+        
+        all_chunk_results = [r for results in chunk_results.values() for r in results]
+        timestamp = event.get('timestamp')
+        if record_stage_usage and job_id != 'unknown' and timestamp:
+            record_stage_usage(
+                job_id, timestamp, 'retrieve_all_kb_queries', int((time.time() - started_at) * 1000),
+                chunk_num=None if structure_results else chunk_nums[0],
+                usage={
+                    'kb_retrievals': retrieval_calls,
+                    'kb_queries_requested': query_plan['queries_requested'],
+                    'kb_results': total_results_count,
+                    'kb_failed_queries': failed_count,
+                    'kb_cache_hits': sum(1 for r in all_chunk_results if r.get('cache_hit') and not r.get('shared_retrieval')),
+                    'kb_duplicates_filtered': sum(r.get('duplicates_filtered', 0) for r in all_chunk_results if not r.get('shared_retrieval'))
+                }
             )
-            logger.info(f"Stored {len(all_results)} KB query results ({total_results_count} total results, {results_size} bytes) in S3: {s3_key}")
-        except Exception as s3_error:
-            logger.error(f"CRITICAL: Failed to store KB results in S3: {s3_error}")
-            raise  # Fail fast if S3 storage fails
         
         # CRITICAL: Only return S3 reference, never return actual data
         # Step Functions has 256KB limit - always store in S3 and return only reference
-        return {
-            'results_s3_key': s3_key,
+        response = {
             'results_count': total_results_count,
-            'queries_count': len(queries),
+            'queries_count': len(chunk_queries),
+            'retrieval_calls': retrieval_calls,
+            'query_plan': query_plan,
             'success_count': success_count,
             'failed_count': failed_count
             # DO NOT include 'queries' array - data is in S3 only
         }
+        if structure_results:
+            response['results_s3_keys'] = results_s3_keys  # Same order as structure_results (chunk order)
+        else:
+            response['results_s3_key'] = results_s3_keys[0]
+        return response
         
     except Exception as e:
         logger.error(f"Error in retrieve_all_kb_queries: {e}")
         raise
-
@@ -7,6 +7,7 @@ import json
 import boto3
 import logging
 import os
+import time
 from agent_api.agent.prompts.models import SaveResultsOutput
 from agent_api.agent.tools import save_analysis_to_dynamodb
 
@@ -17,9 +18,10 @@ s3_client = boto3.client('s3')
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import mark_completed
+    from shared.progress_tracker import mark_completed, record_stage_usage
 except ImportError:
     mark_completed = None
+    record_stage_usage = None
 
 def lambda_handler(event, context):
     """
@@ -33,6 +35,8 @@ def lambda_handler(event, context):
         SaveResultsOutput with success, analysis_id, error
     """
     try:
+        started_at = time.time()
+        
         # CRITICAL: Load conflicts from S3 if conflicts_s3_key provided (merge_chunk_results stores in S3)
         conflicts_s3_key = event.get('conflicts_s3_key')
         analysis_json = event.get('analysis_json')
@@ -103,7 +107,7 @@ def lambda_handler(event, context):
             document_s3_key=document_s3_key,
             analysis_data=analysis_data,
             bucket_type=bucket_type,
-            usage_data={},  # Step Functions workflow doesn't track usage data
+            usage_data={},  # Step Functions usage is recorded per stage on the job record (record_stage_usage)
             thinking="",
             citations=None,
             session_id=session_id,
@@ -126,6 +130,8 @@ def lambda_handler(event, context):
         # Mark job as completed
         job_id = event.get('job_id')
         timestamp = event.get('timestamp')
+        if record_stage_usage and job_id and timestamp:
+            record_stage_usage(job_id, timestamp, 'save_results', int((time.time() - started_at) * 1000))
         if mark_completed and job_id and timestamp:
             mark_completed(
                 job_id, timestamp,
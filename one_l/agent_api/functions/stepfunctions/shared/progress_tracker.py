@@ -17,6 +17,7 @@ from botocore.exceptions import ClientError
 logger = logging.getLogger()
 dynamodb = boto3.resource('dynamodb')
 lambda_client = boto3.client('lambda')
+s3_client = boto3.client('s3')
 
 
 # Workflow stages in order with their progress percentages
@@ -58,6 +59,35 @@ STAGES = {
     'failed': 0
 }
 
+# Per-job usage accounting: numeric record fields summed into usage_<field> on the job record
+USAGE_TOTAL_FIELDS = (
+    'model_calls', 'input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_write_input_tokens',
+    'thinking_tokens_estimate', 'bedrock_attempts', 'bedrock_retries', 'bedrock_latency_ms',
+    'bedrock_hedges', 'bedrock_hedge_wins', 'bedrock_hedges_skipped', 'bedrock_hedges_unaccounted', 'kb_retrievals', 'wall_ms'
+)
+# Per-stage totals summed into usage_stage_<stage>_<field> on the job record
+USAGE_STAGE_FIELDS = ('invocations', 'wall_ms', 'input_tokens', 'output_tokens', 'cost_micro_usd')
+# Individual usage records are kept in the agent processing bucket, not on the job record (400 KB item limit);
+# the bucket's lifecycle rule expires them after USAGE_RECORDS_TTL_DAYS
+USAGE_RECORDS_PREFIX = "usage_records"
+
+# Bedrock on-demand pricing (USD per million tokens), matched by model family in the model or inference profile ID;
+# more specific families come first. long_context applies to prompts above 200K tokens (1M-context tier).
+MODEL_PRICING_USD_PER_MILLION_TOKENS = (
+    ('claude-opus-4-5', {'input_tokens': 5.0, 'output_tokens': 25.0, 'cache_read_input_tokens': 0.50, 'cache_write_input_tokens': 6.25}),
+    ('claude-opus-4', {'input_tokens': 15.0, 'output_tokens': 75.0, 'cache_read_input_tokens': 1.50, 'cache_write_input_tokens': 18.75}),
+    ('claude-sonnet-4', {'input_tokens': 3.0, 'output_tokens': 15.0, 'cache_read_input_tokens': 0.30, 'cache_write_input_tokens': 3.75,
+                         'long_context': {'input_tokens': 6.0, 'output_tokens': 22.50, 'cache_read_input_tokens': 0.60, 'cache_write_input_tokens': 7.50}}),
+    ('claude-3-7-sonnet', {'input_tokens': 3.0, 'output_tokens': 15.0, 'cache_read_input_tokens': 0.30, 'cache_write_input_tokens': 3.75}),
+    ('claude-3-5-sonnet', {'input_tokens': 3.0, 'output_tokens': 15.0, 'cache_read_input_tokens': 0.30, 'cache_write_input_tokens': 3.75}),
+    ('claude-haiku-4-5', {'input_tokens': 1.0, 'output_tokens': 5.0, 'cache_read_input_tokens': 0.10, 'cache_write_input_tokens': 1.25}),
+    ('claude-3-5-haiku', {'input_tokens': 0.80, 'output_tokens': 4.0, 'cache_read_input_tokens': 0.08, 'cache_write_input_tokens': 1.0}),
+    ('claude-3-haiku', {'input_tokens': 0.25, 'output_tokens': 1.25, 'cache_read_input_tokens': 0.03, 'cache_write_input_tokens': 0.30})
+)
+# Models not in the table are priced as the default model (Claude Sonnet 4)
+DEFAULT_MODEL_PRICING_FAMILY = 'claude-sonnet-4'
+USAGE_TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_write_input_tokens')
+
 
 def _send_websocket_notification(job_id: str, session_id: Optional[str], 
                                   user_id: Optional[str], stage: str, 
@@ -200,6 +230,235 @@ def update_progress(job_id: str, timestamp: str, stage: str, message: str = None
         return False
 
 
+def increment_counters(job_id: str, timestamp: str, counters: Dict[str, int]) -> bool:
+    """
+    Atomically add to numeric counters on the job record.
+    
+    Safe to call from parallel chunk Lambdas (uses DynamoDB ADD).
+    
+    Args:
+        job_id: The job ID (analysis_id in DynamoDB)
+        timestamp: The timestamp (sort key in DynamoDB)
+        counters: Attribute name -> amount to add
+    
+    Returns:
+        True if update succeeded, False otherwise
+    """
+    try:
+        table_name = os.environ.get('ANALYSES_TABLE_NAME')
+        if not table_name or not counters:
+            return False
+        
+        table = dynamodb.Table(table_name)
+        
+        update_parts = []
+        expr_values = {}
+        for key, value in counters.items():
+            safe_key = key.replace('-', '_')
+            update_parts.append(f'{safe_key} :{safe_key}')
+            expr_values[f':{safe_key}'] = value
+        
+        table.update_item(
+            Key={
+                'analysis_id': job_id,
+                'timestamp': timestamp
+            },
+            UpdateExpression='ADD ' + ', '.join(update_parts),
+            ExpressionAttributeValues=expr_values
+        )
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to increment counters: {e}")
+        return False
+
+
+def set_counters(job_id: str, timestamp: str, counters: Dict[str, int]) -> bool:
+    """
+    Set numeric counters on the job record.
+
+    Use for per-chunk values that a retried chunk must replace rather than add to (uses DynamoDB SET).
+
+    Args:
+        job_id: The job ID (analysis_id in DynamoDB)
+        timestamp: The timestamp (sort key in DynamoDB)
+        counters: Attribute name -> value
+
+    Returns:
+        True if update succeeded, False otherwise
+    """
+    try:
+        table_name = os.environ.get('ANALYSES_TABLE_NAME')
+        if not table_name or not counters:
+            return False
+
+        table = dynamodb.Table(table_name)
+
+        update_parts = []
+        expr_values = {}
+        for key, value in counters.items():
+            safe_key = key.replace('-', '_')
+            update_parts.append(f'{safe_key} = :{safe_key}')
+            expr_values[f':{safe_key}'] = value
+
+        table.update_item(
+            Key={
+                'analysis_id': job_id,
+                'timestamp': timestamp
+            },
+            UpdateExpression='SET ' + ', '.join(update_parts),
+            ExpressionAttributeValues=expr_values
+        )
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to set counters: {e}")
+        return False
+
+
+def get_model_pricing(model_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Look up the per-million-token prices of a model.
+    
+    Args:
+        model_id: Bedrock model or inference profile ID (e.g. us.anthropic.claude-sonnet-4-20250514-v1:0)
+    
+    Returns:
+        Price per million tokens for each token field, plus long_context prices where the model has them
+    """
+    for family, prices in MODEL_PRICING_USD_PER_MILLION_TOKENS:
+        if model_id and family in model_id:
+            return prices
+    if model_id:
+        logger.warning(f"No pricing for model {model_id}, using {DEFAULT_MODEL_PRICING_FAMILY} prices")
+    return dict(MODEL_PRICING_USD_PER_MILLION_TOKENS)[DEFAULT_MODEL_PRICING_FAMILY]
+
+
+def _model_cost_usd_micro(model_id: Optional[str], tokens: Dict[str, Any]) -> float:
+    """Cost in micro-dollars of one model's token counts (long_context_<field> counts are part of <field>)."""
+    pricing = get_model_pricing(model_id)
+    long_context_pricing = pricing.get('long_context', pricing)
+    cost = 0.0
+    for field in USAGE_TOKEN_FIELDS:
+        long_context_tokens = tokens.get(f'long_context_{field}', 0)
+        cost += (tokens.get(field, 0) - long_context_tokens) * pricing[field]
+        cost += long_context_tokens * long_context_pricing[field]
+    return cost
+
+
+def estimate_cost_micro_usd(usage: Dict[str, Any]) -> int:
+    """
+    Estimate the Bedrock cost of a usage record.
+    
+    Tokens are priced per answering model (usage_by_model from model.usage_since), so fallback tiers
+    and stages routed to other models are priced correctly; otherwise all tokens are priced as model_id.
+    
+    Args:
+        usage: Usage record or totals with token fields, model_id and optionally usage_by_model
+    
+    Returns:
+        Cost in micro-dollars (integer, so it can be summed with DynamoDB ADD)
+    """
+    usage_by_model = usage.get('usage_by_model')
+    if usage_by_model:
+        return int(sum(_model_cost_usd_micro(model_id, tokens) for model_id, tokens in usage_by_model.items()))
+    return int(_model_cost_usd_micro(usage.get('model_id'), usage))
+
+
+def record_stage_usage(job_id: str, timestamp: str, stage: str, wall_ms: int,
+                       chunk_num: Optional[int] = None, usage: Optional[Dict[str, Any]] = None,
+                       attributes: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Add a stage usage record to the job's usage totals and store the record in S3.
+    
+    The job record only holds bounded totals (usage_<field> for the job and usage_stage_<stage>_<field>
+    per stage), so it does not grow with chunks or retries. Each record is stored under
+    usage_records/<job_id>/ in the agent processing bucket. Safe to call from parallel chunk Lambdas
+    (ADD in one update).
+    
+    Args:
+        job_id: The job ID (analysis_id in DynamoDB)
+        timestamp: The timestamp (sort key in DynamoDB)
+        stage: Workflow stage that produced the record
+        wall_ms: Wall time of the stage invocation in milliseconds
+        chunk_num: Chunk number for per-chunk stages
+        usage: Model/KB usage (from model.usage_since) plus stage-specific fields such as model_id
+        attributes: Job-level attributes to set (e.g. document_chars from split_document)
+    
+    Returns:
+        True if update succeeded, False otherwise
+    """
+    try:
+        table_name = os.environ.get('ANALYSES_TABLE_NAME')
+        if not table_name:
+            return False
+        
+        record = {'stage': stage, 'wall_ms': int(wall_ms), 'recorded_at': datetime.utcnow().isoformat()}
+        if chunk_num is not None:
+            record['chunk_num'] = chunk_num
+        for key, value in (usage or {}).items():
+            record[key] = int(value) if isinstance(value, float) else value
+        record['cost_micro_usd'] = estimate_cost_micro_usd(record)
+        
+        expr_values = {':cost': record['cost_micro_usd']}
+        add_parts = ['usage_cost_micro_usd :cost']
+        for field in USAGE_TOTAL_FIELDS:
+            if record.get(field):
+                add_parts.append(f'usage_{field} :{field}')
+                expr_values[f':{field}'] = record[field]
+        stage_key = stage.replace('-', '_')
+        stage_values = dict(record, invocations=1)
+        for field in USAGE_STAGE_FIELDS:
+            if stage_values.get(field):
+                add_parts.append(f'usage_stage_{stage_key}_{field} :stage_{field}')
+                expr_values[f':stage_{field}'] = stage_values[field]
+        
+        set_parts = []
+        for key, value in (attributes or {}).items():
+            safe_key = key.replace('-', '_')
+            set_parts.append(f'{safe_key} = :attr_{safe_key}')
+            expr_values[f':attr_{safe_key}'] = value
+        
+        update_expr = 'ADD ' + ', '.join(add_parts)
+        if set_parts:
+            update_expr = 'SET ' + ', '.join(set_parts) + ' ' + update_expr
+        
+        table = dynamodb.Table(table_name)
+        table.update_item(
+            Key={
+                'analysis_id': job_id,
+                'timestamp': timestamp
+            },
+            UpdateExpression=update_expr,
+            ExpressionAttributeValues=expr_values
+        )
+        logger.info(f"USAGE_RECORD: job={job_id}, {json.dumps(record, default=str)}")
+        _store_usage_record(job_id, record)
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to record stage usage: {e}")
+        return False
+
+
+def _store_usage_record(job_id: str, record: Dict[str, Any]) -> None:
+    """Store one usage record under usage_records/<job_id>/ in the agent processing bucket (best effort)."""
+    bucket_name = os.environ.get('AGENT_PROCESSING_BUCKET')
+    if not bucket_name:
+        return
+    chunk_part = f"_chunk_{record['chunk_num']}" if 'chunk_num' in record else ''
+    key = f"{USAGE_RECORDS_PREFIX}/{job_id}/{record['stage']}{chunk_part}_{record['recorded_at']}.json"
+    try:
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=key,
+            Body=json.dumps(record, default=str).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        logger.warning(f"Failed to store usage record {key}: {e}")
+
+
 def mark_completed(job_id: str, timestamp: str, result_data: dict = None,
                    session_id: Optional[str] = None, user_id: Optional[str] = None) -> bool:
     """
@@ -1,6 +1,7 @@
 """
 Split document Lambda function.
-Uses character-based _split_document_into_chunks and saves chunks to S3.
+Uses structure-aware, token-budgeted _split_document_into_chunks and saves chunks (plus their text layout) to S3.
+Also saves the parsed-document sidecar (texts, table grids, normalized variants, content hash) for the redline stage.
 """
 
 import json
@@ -8,7 +9,9 @@ import boto3
 import logging
 import os
 import io
+import time
 from agent_api.agent.model import _split_document_into_chunks
+from agent_api.agent.tools import ParsedDocument, document_content_hash
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -17,22 +20,25 @@ s3_client = boto3.client('s3')
 
 # Import progress tracker
 try:
-    from shared.progress_tracker import update_progress
+    from shared.progress_tracker import update_progress, record_stage_usage
 except ImportError:
     update_progress = None
+    record_stage_usage = None
 
 def lambda_handler(event, context):
     """
-    Split document into chunks using character-based chunking.
+    Split document into chunks at heading, section and table-row boundaries.
     
     Args:
-        event: Lambda event with document_s3_key, bucket_name, session_id (+ workflow context)
+        event: Lambda event with document_s3_key, bucket_name, session_id, optional target_chunk_count and chunk_format (+ workflow context)
         context: Lambda context
         
     Returns:
-        Workflow context + DocumentSplitOutput with chunk_count and chunks metadata
+        Workflow context + DocumentSplitOutput with chunk_count, chunks metadata and parsed_document_s3_key
     """
     try:
+        started_at = time.time()
+        
         # Extract workflow context (passed from initialize_job)
         job_id = event.get('job_id')
         timestamp = event.get('timestamp')
@@ -55,27 +61,68 @@ def lambda_handler(event, context):
         # Parse and chunk DOCX document
         from docx import Document
         doc = Document(io.BytesIO(document_data))
-        chunks = _split_document_into_chunks(doc=doc)
+        chunks = _split_document_into_chunks(
+            doc=doc,
+            target_chunk_count=event.get('target_chunk_count'),
+            payload_format=event.get('chunk_format')
+        )
+        
+        # Save the parsed document once so the redline stage does not renormalize the DOCX
+        # Keyed per job so another job in the same session cannot overwrite it before this job's redline stage
+        parsed_document_s3_key = f"{session_id}/parsed/{job_id}_document.json"
+        try:
+            parsed_document = ParsedDocument.from_docx(doc, document_content_hash(document_data))
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=parsed_document_s3_key,
+                Body=parsed_document.to_json().encode('utf-8'),
+                ContentType='application/json; charset=utf-8'
+            )
+            logger.info(f"Saved parsed document {parsed_document_s3_key} ({len(parsed_document.entries)} normalized texts)")
+        except Exception as e:
+            # Non-fatal: the redline stage falls back to normalizing the DOCX itself
+            logger.warning(f"Could not save parsed document for job {job_id}: {e}")
+            parsed_document_s3_key = None
         
         # Save chunks to S3
         chunk_s3_keys = []
         for chunk_info in chunks:
             chunk_num = chunk_info['chunk_num']
-            chunk_bytes = chunk_info['bytes']
+            chunk_format = chunk_info['format']
             
-            # Save chunk to S3
-            chunk_key = f"{session_id}/chunks/chunk_{chunk_num}.docx"
+            # Save chunk text and its paragraph/cell layout so conflicts can be anchored to positions.
+            # For text chunks this compact JSON is also the payload sent to Bedrock.
+            layout_key = f"{session_id}/chunks/chunk_{chunk_num}_layout.json"
             s3_client.put_object(
                 Bucket=bucket_name,
-                Key=chunk_key,
-                Body=chunk_bytes
+                Key=layout_key,
+                Body=json.dumps({
+                    'chunk_num': chunk_num,
+                    'start_char': chunk_info['start_char'],
+                    'end_char': chunk_info['end_char'],
+                    'text': chunk_info['text'],
+                    'segments': chunk_info['segments']
+                }).encode('utf-8'),
+                ContentType='application/json; charset=utf-8'
             )
             
+            chunk_key = layout_key
+            if chunk_format == 'docx':
+                # DOCX fallback: save the rendered chunk document
+                chunk_key = f"{session_id}/chunks/chunk_{chunk_num}.docx"
+                s3_client.put_object(
+                    Bucket=bucket_name,
+                    Key=chunk_key,
+                    Body=chunk_info['bytes']
+                )
+            
             chunk_s3_keys.append({
                 'chunk_num': chunk_num,
                 'start_char': chunk_info['start_char'],
                 'end_char': chunk_info['end_char'],
-                's3_key': chunk_key
+                's3_key': chunk_key,
+                'layout_s3_key': layout_key,
+                'format': chunk_format
             })
         
         logger.info(f"Split document into {len(chunk_s3_keys)} chunks for job {job_id}")
@@ -89,12 +136,23 @@ def lambda_handler(event, context):
                 user_id=user_id
             )
         
+        if record_stage_usage and job_id and timestamp:
+            record_stage_usage(
+                job_id, timestamp, 'split_document', int((time.time() - started_at) * 1000),
+                usage={'chunk_count': len(chunk_s3_keys)},
+                attributes={
+                    'document_chars': chunks[-1]['end_char'] if chunks else 0,
+                    'document_bytes': len(document_data)
+                }
+            )
+        
         # Return just split results - context is preserved via result_path merging
         # Step Functions will store this at $.split_result while keeping original context
         return {
             "chunk_count": len(chunk_s3_keys),
             "chunks": chunk_s3_keys,
-            "bucket_name": bucket_name  # Include bucket_name for downstream chunk processing
+            "bucket_name": bucket_name,  # Include bucket_name for downstream chunk processing
+            "parsed_document_s3_key": parsed_document_s3_key
         }
         
     except Exception as e:
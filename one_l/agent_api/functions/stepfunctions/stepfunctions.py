@@ -4,6 +4,7 @@ Creates all Lambda functions and Step Functions state machine.
 """
 
 import os
+import json
 from constructs import Construct
 from aws_cdk import (
     aws_lambda as _lambda,
@@ -18,6 +19,7 @@ from aws_cdk import (
     Stack,
     RemovalPolicy
 )
+from constants import STAGE_MODEL_ROUTES, EVAL_CAPTURE_ENABLED, JOB_LEVEL_KB_RETRIEVAL
 
 
 class StepFunctionsConstruct(Construct):
@@ -55,6 +57,9 @@ class StepFunctionsConstruct(Construct):
         # Store Lambda function references for later updates
         self.lambda_functions = []
         
+        # Shared Bedrock rate limiter buckets (one item per model ID)
+        self.create_rate_limiter_table()
+        
         # Create all Lambda functions
         self.create_lambda_functions()
         
@@ -65,6 +70,20 @@ class StepFunctionsConstruct(Construct):
         # This is used by API Gateway to return job_id immediately
         self.create_start_workflow_lambda()
     
+    def create_rate_limiter_table(self):
+        """Create DynamoDB table holding the token buckets used by agent/rate_limiter.py."""
+        
+        self.rate_limiter_table = dynamodb.Table(
+            self, "BedrockRateLimiterTable",
+            table_name=f"{self._stack_name}-bedrock-rate-limits",
+            partition_key=dynamodb.Attribute(
+                name="limiter_key",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+    
     def create_lambda_functions(self):
         """Create all Lambda functions for Step Functions workflow."""
         
@@ -75,6 +94,7 @@ class StepFunctionsConstruct(Construct):
             self.analysis_table,
             self.opensearch_collection
         )
+        self.rate_limiter_table.grant_read_write_data(role)
         
         # Common environment variables
         common_env = {
@@ -82,9 +102,13 @@ class StepFunctionsConstruct(Construct):
             "USER_DOCUMENTS_BUCKET": self.user_documents_bucket.bucket_name,
             "AGENT_PROCESSING_BUCKET": self.agent_processing_bucket.bucket_name,
             "ANALYSES_TABLE_NAME": self.analysis_table.table_name,
+            "RATE_LIMITER_TABLE_NAME": self.rate_limiter_table.table_name,
             "KNOWLEDGE_BASE_ID": self.knowledge_base_id,
             "REGION": Stack.of(self).region,
-            "LOG_LEVEL": "INFO"
+            "LOG_LEVEL": "INFO",
+            # Deploy-time model routing and evaluation capture settings (constants.py)
+            "STAGE_MODEL_ROUTES": json.dumps(STAGE_MODEL_ROUTES),
+            "EVAL_CAPTURE_ENABLED": "true" if EVAL_CAPTURE_ENABLED else "false"
         }
         
         # Create all Lambda functions
@@ -340,6 +364,7 @@ class StepFunctionsConstruct(Construct):
                 "total_chunks": sfn.JsonPath.number_at("$.total_chunks"),
                 "start_char": sfn.JsonPath.number_at("$.start_char"),
                 "end_char": sfn.JsonPath.number_at("$.end_char"),
+                "chunk_format": sfn.JsonPath.string_at("$.chunk_format"),  # text or docx chunk payload
                 "job_id": sfn.JsonPath.string_at("$.job_id"),
                 "session_id": sfn.JsonPath.string_at("$.session_id"),
                 "timestamp": sfn.JsonPath.string_at("$.timestamp"),
@@ -370,6 +395,7 @@ class StepFunctionsConstruct(Construct):
                 "session_id": sfn.JsonPath.string_at("$.session_id"),
                 "bucket_name": sfn.JsonPath.string_at("$.bucket_name"),
                 "chunk_num": sfn.JsonPath.number_at("$.chunk_num"),  # Pass chunk_num to avoid S3 overwrites
+                "timestamp": sfn.JsonPath.string_at("$.timestamp"),  # Job record key for usage accounting
                 "terms_profile": sfn.JsonPath.string_at("$.terms_profile")  # Pass terms_profile for filtering
             })
         )
@@ -400,6 +426,9 @@ class StepFunctionsConstruct(Construct):
                 "total_chunks": sfn.JsonPath.number_at("$.total_chunks"),
                 "start_char": sfn.JsonPath.number_at("$.start_char"),
                 "end_char": sfn.JsonPath.number_at("$.end_char"),
+                "chunk_format": sfn.JsonPath.string_at("$.chunk_format"),  # text or docx chunk payload
+                "chunk_layout_s3_key": sfn.JsonPath.string_at("$.chunk_layout_s3_key"),  # Chunk text + layout for anchoring quotes
+                "terms_profile": sfn.JsonPath.string_at("$.terms_profile"),  # Part of the response cache key
                 "job_id": sfn.JsonPath.string_at("$.job_id"),
                 "session_id": sfn.JsonPath.string_at("$.session_id"),
                 "timestamp": sfn.JsonPath.string_at("$.timestamp")
@@ -411,51 +440,129 @@ class StepFunctionsConstruct(Construct):
             max_attempts=2,
             backoff_rate=2.0
         )
-        # Note: No catch block here - errors handled at Map state level to avoid CDK recursion issues
-        
-        # Unified workflow: structure -> retrieve all queries -> identify conflicts
-        unified_workflow = analyze_structure.next(
-            retrieve_all_kb_queries.next(identify_conflicts)
-        )
-        
-        # Process all chunks in parallel using unified workflow
-        # Works for both single documents (1 chunk) and multiple chunks
-        # Use itemSelector to pass both chunk item AND parent context to each iteration
-        analyze_chunks_map = sfn.Map(
-            self, "AnalyzeChunksParallel",
-            items_path="$.split_result.chunks",  # Always has at least 1 chunk (even for single docs)
-            max_concurrency=10,
-            result_path="$.chunk_analyses",
-            item_selector={
-                # Chunk-specific data (from the iterated item)
-                "chunk_s3_key.$": "$$.Map.Item.Value.s3_key",
-                "chunk_num.$": "$$.Map.Item.Value.chunk_num",
-                "start_char.$": "$$.Map.Item.Value.start_char",
-                "end_char.$": "$$.Map.Item.Value.end_char",
-                # Context from parent state (preserved)
-                "bucket_name.$": "$.split_result.bucket_name",
-                "total_chunks.$": "$.split_result.chunk_count",
-                "job_id.$": "$.job_id",
-                "session_id.$": "$.session_id",
-                "user_id.$": "$.user_id",
-                "document_s3_key.$": "$.document_s3_key",
-                "terms_profile.$": "$.terms_profile",
-                "knowledge_base_id.$": "$.knowledge_base_id",
-                "region.$": "$.region",
-                "timestamp.$": "$.timestamp"
-            }
-        )
-        
-        # Set item processor first
-        analyze_chunks_map.item_processor(unified_workflow)
-        
-        # Add error handling at Map level (best practice per AWS docs)
-        # Errors from item processor will be caught here and handled by HandleError Lambda
-        analyze_chunks_map.add_catch(
-            handle_error_chain,
+        # A chunk that still fails after its retries (e.g. a Lambda timeout) ends its Map iteration with the error
+        # instead of failing the Map, so merge_chunk_results can use the conflicts it checkpointed while streaming
+        identify_conflicts_failed = sfn.Pass(self, "IdentifyConflictsFailed")
+        identify_conflicts.add_catch(
+            identify_conflicts_failed,
             errors=["States.ALL"],
-            result_path="$.error"
+            result_path="$.analysis_error"
         )
+
+        # Use itemSelector to pass both chunk item AND parent context to each iteration
+        chunk_item_selector = {
+            # Chunk-specific data (from the iterated item)
+            "chunk_s3_key.$": "$$.Map.Item.Value.s3_key",
+            "chunk_num.$": "$$.Map.Item.Value.chunk_num",
+            "start_char.$": "$$.Map.Item.Value.start_char",
+            "end_char.$": "$$.Map.Item.Value.end_char",
+            "chunk_layout_s3_key.$": "$$.Map.Item.Value.layout_s3_key",
+            "chunk_format.$": "$$.Map.Item.Value.format",
+            # Context from parent state (preserved)
+            "bucket_name.$": "$.split_result.bucket_name",
+            "total_chunks.$": "$.split_result.chunk_count",
+            "job_id.$": "$.job_id",
+            "session_id.$": "$.session_id",
+            "user_id.$": "$.user_id",
+            "document_s3_key.$": "$.document_s3_key",
+            "terms_profile.$": "$.terms_profile",
+            "knowledge_base_id.$": "$.knowledge_base_id",
+            "region.$": "$.region",
+            "timestamp.$": "$.timestamp"
+        }
+        
+        if JOB_LEVEL_KB_RETRIEVAL:
+            # Job-level retrieval: structure for every chunk -> one retrieval of the job's unique queries
+            # -> conflicts per chunk, each reading its own KB results file written by the retrieval stage
+            analyze_structure_map = sfn.Map(
+                self, "AnalyzeStructureParallel",
+                items_path="$.split_result.chunks",  # Always has at least 1 chunk (even for single docs)
+                max_concurrency=10,
+                result_path="$.structure_analyses",
+                item_selector=chunk_item_selector
+            )
+            analyze_structure_map.item_processor(analyze_structure)
+            analyze_structure_map.add_catch(
+                handle_error_chain,
+                errors=["States.ALL"],
+                result_path="$.error"
+            )
+            
+            # Same Lambda as the per-chunk stage, given every chunk's structure result
+            retrieve_job_kb_queries = tasks.LambdaInvoke(
+                self, "RetrieveJobKBQueries",
+                lambda_function=self.retrieve_all_kb_queries_fn,
+                payload_response_only=True,
+                result_path="$.kb_retrieval_result",
+                retry_on_service_exceptions=True,
+                payload=sfn.TaskInput.from_object({
+                    "structure_results": sfn.JsonPath.list_at("$.structure_analyses"),  # Per-chunk structure S3 references, in chunk order
+                    "knowledge_base_id": sfn.JsonPath.string_at("$.knowledge_base_id"),
+                    "region": sfn.JsonPath.string_at("$.region"),
+                    "job_id": sfn.JsonPath.string_at("$.job_id"),
+                    "session_id": sfn.JsonPath.string_at("$.session_id"),
+                    "bucket_name": sfn.JsonPath.string_at("$.split_result.bucket_name"),
+                    "timestamp": sfn.JsonPath.string_at("$.timestamp"),
+                    "terms_profile": sfn.JsonPath.string_at("$.terms_profile")
+                })
+            )
+            retrieve_job_kb_queries.add_retry(
+                errors=[sfn.Errors.TIMEOUT, sfn.Errors.TASKS_FAILED],
+                interval=Duration.seconds(2),
+                max_attempts=2,
+                backoff_rate=2.0
+            )
+            retrieve_job_kb_queries.add_catch(
+                handle_error_chain,
+                errors=["States.ALL"],
+                result_path="$.error"
+            )
+            
+            # Fan KB results back out: results_s3_keys is in the same order as split_result.chunks
+            identify_conflicts_map = sfn.Map(
+                self, "IdentifyConflictsParallel",
+                items_path="$.split_result.chunks",
+                max_concurrency=10,
+                result_path="$.chunk_analyses",
+                item_selector=dict(chunk_item_selector, kb_retrieval_result={
+                    "results_s3_key.$": "States.ArrayGetItem($.kb_retrieval_result.results_s3_keys, $$.Map.Item.Index)"
+                })
+            )
+            identify_conflicts_map.item_processor(identify_conflicts)
+            identify_conflicts_map.add_catch(
+                handle_error_chain,
+                errors=["States.ALL"],
+                result_path="$.error"
+            )
+            
+            analyze_chunks = analyze_structure_map.next(retrieve_job_kb_queries).next(identify_conflicts_map)
+        else:
+            # Unified workflow: structure -> retrieve all queries -> identify conflicts
+            unified_workflow = analyze_structure.next(
+                retrieve_all_kb_queries.next(identify_conflicts)
+            )
+            
+            # Process all chunks in parallel using unified workflow
+            # Works for both single documents (1 chunk) and multiple chunks
+            analyze_chunks_map = sfn.Map(
+                self, "AnalyzeChunksParallel",
+                items_path="$.split_result.chunks",  # Always has at least 1 chunk (even for single docs)
+                max_concurrency=10,
+                result_path="$.chunk_analyses",
+                item_selector=chunk_item_selector
+            )
+            
+            # Set item processor first
+            analyze_chunks_map.item_processor(unified_workflow)
+            
+            # Add error handling at Map level (best practice per AWS docs)
+            # Errors from item processor will be caught here and handled by HandleError Lambda
+            analyze_chunks_map.add_catch(
+                handle_error_chain,
+                errors=["States.ALL"],
+                result_path="$.error"
+            )
+            analyze_chunks = analyze_chunks_map
         
         # Merge chunk results - loads individual chunk results from S3
         merge_chunk_results = tasks.LambdaInvoke(
@@ -499,6 +606,7 @@ class StepFunctionsConstruct(Construct):
                 "conflicts_result": sfn.JsonPath.object_at("$.conflicts_result"),  # Fallback support
                 "document_s3_key": sfn.JsonPath.string_at("$.document_s3_key"),
                 "bucket_name": sfn.JsonPath.string_at("$.split_result.bucket_name"),  # For loading conflicts from S3
+                "parsed_document_s3_key": sfn.JsonPath.string_at("$.split_result.parsed_document_s3_key"),  # Parsed-document sidecar from split
                 "bucket_type": sfn.JsonPath.string_at("$.bucket_type"),  # Pass bucket_type for correct S3 bucket lookup
                 "session_id": sfn.JsonPath.string_at("$.session_id"),
                 "user_id": sfn.JsonPath.string_at("$.user_id"),
@@ -542,7 +650,7 @@ class StepFunctionsConstruct(Construct):
         )
         
         # Define workflow - always uses Map state (works for both single and multiple chunks)
-        processing_path = analyze_chunks_map.next(merge_chunk_results)
+        processing_path = analyze_chunks.next(merge_chunk_results)
         
         # Add error handling to individual states (not chains)
         # All catch blocks use handle_error_chain to ensure cleanup runs after errors
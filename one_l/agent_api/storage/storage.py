@@ -8,9 +8,11 @@ from aws_cdk import (
     aws_s3 as s3,
     aws_dynamodb as dynamodb,
     RemovalPolicy,
+    Duration,
     Stack,
     CfnOutput
 )
+from constants import RESPONSE_CACHE_TTL_DAYS, RETRIEVAL_CACHE_TTL_DAYS, EVAL_CAPTURE_TTL_DAYS, USAGE_RECORDS_TTL_DAYS
 
 
 class StorageConstruct(Construct):
@@ -172,6 +174,36 @@ class StorageConstruct(Construct):
                     max_age=3000,  # Add max_age for CORS preflight caching
                 )
             ],
+            lifecycle_rules=[
+                # Cached model responses (agent/response_cache.py) expire after the cache TTL
+                s3.LifecycleRule(
+                    id="ExpireResponseCache",
+                    prefix="response_cache/",
+                    expiration=Duration.days(RESPONSE_CACHE_TTL_DAYS),
+                    noncurrent_version_expiration=Duration.days(1)
+                ),
+                # Cached knowledge base retrievals (agent/retrieval_cache.py) expire after the cache TTL
+                s3.LifecycleRule(
+                    id="ExpireRetrievalCache",
+                    prefix="retrieval_cache/",
+                    expiration=Duration.days(RETRIEVAL_CACHE_TTL_DAYS),
+                    noncurrent_version_expiration=Duration.days(1)
+                ),
+                # Recorded chunk inputs/outputs for model route evaluation (agent/eval_capture.py)
+                s3.LifecycleRule(
+                    id="ExpireEvalCaptures",
+                    prefix="eval_captures/",
+                    expiration=Duration.days(EVAL_CAPTURE_TTL_DAYS),
+                    noncurrent_version_expiration=Duration.days(1)
+                ),
+                # Per-call stage usage records (stepfunctions/shared/progress_tracker.py); job totals stay on the job record
+                s3.LifecycleRule(
+                    id="ExpireUsageRecords",
+                    prefix="usage_records/",
+                    expiration=Duration.days(USAGE_RECORDS_TTL_DAYS),
+                    noncurrent_version_expiration=Duration.days(1)
+                )
+            ],
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
         )
     
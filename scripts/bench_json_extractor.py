@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark and pathological-input checks for agent/json_extractor.py.
+Builds model-style responses of several hundred KB (JSON wrapped in prose, braces and
+escaped quotes inside strings, stray brackets, truncated or deeply nested input),
+checks that extract_json() returns the expected value for each (the complete conflicts of a
+truncated answer, never a nested fragment of it) and reports its run time
+next to the previous regex + brace-counting approach. Time per KB should stay flat as
+inputs grow; the legacy approach is only run on the smaller sizes because it is quadratic
+on several of these inputs.
+
+Usage:
+    python scripts/bench_json_extractor.py [--sizes 50,200,800] [--repeat 3]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import importlib.util
+
+# Load the module directly: the agent package creates AWS clients on import
+EXTRACTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'one_l', 'agent_api', 'agent', 'json_extractor.py')
+_spec = importlib.util.spec_from_file_location('json_extractor', os.path.abspath(EXTRACTOR_PATH))
+json_extractor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(json_extractor)
+
+LEGACY_MAX_KB = 50  # Larger inputs take minutes with the legacy approach
+LEGACY_SKIP = {'conflicts_word_without_json'}  # The legacy non-greedy regex backtracks for many minutes even at 50 KB
+
+
+def legacy_extract(content):
+    """Previous model.py approach: non-greedy regex, then brace counting, each candidate re-parsed."""
+    match = re.search(r'\{[\s\S]*?"conflicts"[\s\S]*?\}', content)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+            if isinstance(parsed, dict) and "conflicts" in parsed:
+                return parsed
+        except json.JSONDecodeError:
+            pass
+    start = content.find('{')
+    if start != -1:
+        depth = 0
+        for i in range(start, len(content)):
+            if content[i] == '{':
+                depth += 1
+            elif content[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return json.loads(content[start:i + 1])
+                    except json.JSONDecodeError:
+                        break
+    match = re.search(r'\[[\s\S]*?\]', content)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def conflict(idx, quote_chars):
+    """One conflict as the model returns it, with braces, brackets and escaped quotes in its strings."""
+    return {
+        "clarification_id": f"Additional-{idx}",
+        "vendor_quote": ("Vendor shall {not} be liable [see \"Exhibit B\"] for \\ damages; " * (quote_chars // 60 + 1))[:quote_chars],
+        "summary": "Vendor limits liability below the required {cap}.",
+        "source_doc": "Commonwealth IT Terms and Conditions",
+        "clause_ref": "Section 11",
+        "conflict_type": "modifies",
+        "rationale": "Conflicts with the \"Limitation of Liability\" clause [11(a)]."
+    }
+
+
+def conflicts_response(size_kb):
+    """Conflict-detection response of about size_kb KB."""
+    conflicts = []
+    payload = {"explanation": "Reviewed all {sections}.", "conflicts": conflicts}
+    while len(json.dumps(payload)) < size_kb * 1024:
+        conflicts.append(conflict(len(conflicts) + 1, 400))
+    return payload
+
+
+def truncated_conflicts_response(payload):
+    """Response cut off inside a conflict, and the object with the conflicts completed before the cut."""
+    complete = len(payload['conflicts']) // 2
+    text = json.dumps(dict(payload, conflicts=payload['conflicts'][:complete + 1]), indent=2)
+    text = text[:text.rindex('"vendor_quote"') + 20]
+    return text, dict(payload, conflicts=payload['conflicts'][:complete])
+
+
+def truncated_structure_response(size_kb):
+    """Structure-analysis response cut off inside chunk_structure: has no conflicts, so nothing is returned."""
+    structure = {
+        "queries": [{"query": f"Limitation of liability cap for section {idx}", "section": f"Section {idx}"} for idx in range(30)],
+        "chunk_structure": {
+            "sections": [f"Section {idx}" for idx in range(size_kb * 20)],
+            "vendor_exceptions": [conflict(idx, 200) for idx in range(size_kb)],
+            "character_range": "characters 0-100000"
+        }
+    }
+    text = json.dumps(structure)
+    return text[:text.rindex('"vendor_quote"') + 20]
+
+
+def cases(size_kb):
+    """(name, text, expected value) for one input size."""
+    payload = conflicts_response(size_kb)
+    body = json.dumps(payload, indent=2)
+    n = size_kb * 1024
+    return [
+        ('plain_json', body, payload),
+        ('prose_and_fence', "Here is my analysis {draft}:\n```json\n" + body + "\n```\nLet me know if you'd like [changes].", payload),
+        ('stray_open_brace_before', "Note: the vendor uses { in headings. " + body, payload),
+        ('unbalanced_quote_before', 'The vendor wrote "terms\n' + body, payload),
+        ('bare_array', "Conflicts:\n" + json.dumps(payload['conflicts']), payload['conflicts']),
+        ('invalid_outer_valid_inner', '{"note": oops, "result": ' + body + '}', payload),
+        ('truncated_conflicts',) + truncated_conflicts_response(payload),  # Complete conflicts before the cut
+        ('truncated_structure', truncated_structure_response(size_kb), None),  # Never a nested fragment
+        ('truncated_after_prose', "Draft {\n" + truncated_conflicts_response(payload)[0], truncated_conflicts_response(payload)[1]),
+        ('open_braces', '{' * n, None),
+        ('open_brackets_then_json', '[' * (n // 2) + body, payload),
+        ('deep_nesting', '[' * 5000 + ']' * 5000 + body, payload),
+        ('many_small_objects', '{"a": 1} ' * (n // 9) + body, payload),
+        ('conflicts_word_without_json', ('{"conflicts" ' * (n // 14)), None),
+    ]
+
+
+def run(fn, text, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='50,200,800', help='Comma-separated response sizes in KB')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (best time is reported)')
+    args = parser.parse_args()
+
+    extract = lambda text: json_extractor.extract_json(text, prefer_key='conflicts')  # noqa: E731
+    failures = 0
+    print(f"{'case':<30} {'size_kb':>8} {'extract_ms':>11} {'us/KB':>8} {'legacy_ms':>10} {'legacy_ok':>10}")
+    for size_kb in [int(size) for size in args.sizes.split(',')]:
+        for name, text, expected in cases(size_kb):
+            result, elapsed = run(extract, text, args.repeat)
+            if result != expected:
+                failures += 1
+                print(f"FAIL {name} ({size_kb} KB): got {type(result).__name__} {str(result)[:80]}")
+            legacy_ms = legacy_ok = '-'
+            if size_kb <= LEGACY_MAX_KB and name not in LEGACY_SKIP:
+                legacy_result, legacy_elapsed = run(legacy_extract, text, 1)
+                legacy_ms = f"{legacy_elapsed * 1000:.1f}"
+                legacy_ok = 'yes' if legacy_result == expected else 'no'
+            text_kb = len(text) / 1024
+            print(f"{name:<30} {text_kb:>8.0f} {elapsed * 1000:>11.1f} {elapsed * 1e6 / text_kb:>8.1f} {legacy_ms:>10} {legacy_ok:>10}")
+
+    print("All cases passed" if not failures else f"{failures} cases failed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
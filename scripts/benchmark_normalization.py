@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for redline text normalization.
+Compares the normalize_* helpers plus per-call position walking against the
+single-pass offset-preserving engine (normalize_with_offsets) in agent/tools.py.
+
+Usage:
+    python scripts/benchmark_normalization.py [contract.docx ...] [--repeat N]
+
+Without a .docx argument a built-in sample of contract clauses is used.
+"""
+import os
+import sys
+import time
+import argparse
+
+ONE_L_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'one_l')
+sys.path.insert(0, os.path.abspath(ONE_L_DIR))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')  # tools.py creates boto3 clients at import
+
+from agent_api.agent import tools  # noqa: E402
+
+SAMPLE_CLAUSES = [
+    "(a) Contractor shall indemnify, defend and hold harmless the Commonwealth, its agencies, officers and employees "
+    "from and against any and all claims, loss es, damage es, liabilit y, costs and expense es, including reasonable "
+    "attorneys’ fees, arising out of or relating to the negligent acts or omissions of Contractor.",
+    "(ii) IN NO EVENT SHALL HITA CHI BE LIABLE FOR ANY INDIRECT, INCIDENTAL, CONSEQUENTIAL, SPECIAL OR PUNITIVE "
+    "DAMAGES, INCLUDING LOST PROFITS, REGARDLESS OF THE FORM OF ACTION.\tThe total liabilit ies of Vendor shall not "
+    "exceed the fee s paid in the twelve (12) months preceding the claim;",
+    "Vendor disclaims all warranties, express or implied, including NON- INFRINGEMENT, merchantability and fitness "
+    "for a particular purpose. “Confidential Information” shall not include information that is publicly "
+    "available —  through no fault of the receiving party.",
+    "Termination for convenience: Either party may terminate this Agreement upon thirty (30) days’ written "
+    "notice.\n\nAll settlement s and judgment s shall be subject to the prior written approval of the Commonwealth.",
+]
+
+
+def _legacy_map_position(original_text: str, normalized_pos: int) -> int:
+    """Position walk formerly used to map normalized positions back to the original text."""
+    if normalized_pos <= 0:
+        return 0
+    normalized_count = 0
+    in_whitespace = False
+    for i, char in enumerate(original_text):
+        if char in ' \t\n\r':
+            if not in_whitespace:
+                normalized_count += 1
+                in_whitespace = True
+        else:
+            normalized_count += 1
+            in_whitespace = False
+        if normalized_count >= normalized_pos:
+            return i + 1
+    return len(original_text)
+
+
+def load_texts(paths):
+    """Load paragraph and table cell texts from .docx files, or return the built-in sample."""
+    if not paths:
+        return SAMPLE_CLAUSES * 100
+    texts = []
+    for path in paths:
+        doc = tools.Document(path)
+        texts.extend(p.text for p in doc.paragraphs if p.text.strip())
+        for table in doc.tables:
+            for row in table.rows:
+                texts.extend(cell.text for cell in row.cells if cell.text.strip())
+    return texts
+
+
+def bench_legacy(texts):
+    """normalize_* helpers per tier, then position walks for a span in each text."""
+    for text in texts:
+        quote_ws = tools.normalize_whitespace(tools.normalize_subsection_markers(tools.normalize_quotes(text)))
+        tools.normalize_for_matching(text).lower()
+        mid = len(quote_ws) // 2
+        _legacy_map_position(text, mid)
+        _legacy_map_position(text, len(quote_ws))
+
+
+def bench_engine(texts):
+    """normalize_with_offsets per tier, then O(1) span lookups."""
+    for text in texts:
+        quote_ws, offsets = tools.normalize_with_offsets(text)
+        tools.normalize_with_offsets(text, for_matching=True)
+        tools._original_span(offsets, len(quote_ws) // 2, len(quote_ws))
+
+
+def check_equivalence(texts):
+    """Confirm the engine produces exactly the same normalized text as the helpers."""
+    mismatches = 0
+    for text in texts:
+        expected_ws = tools.normalize_whitespace(tools.normalize_subsection_markers(tools.normalize_quotes(text)))
+        expected_full = tools.normalize_for_matching(text)
+        if tools.normalize_with_offsets(text)[0] != expected_ws:
+            mismatches += 1
+        elif tools.normalize_with_offsets(text, for_matching=True)[0] != expected_full:
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('docx', nargs='*', help='Contract .docx files to use as input text')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best time is reported)')
+    args = parser.parse_args()
+
+    texts = load_texts(args.docx)
+    total_chars = sum(len(t) for t in texts)
+    print(f"Input: {len(texts)} paragraphs/cells, {total_chars} characters")
+
+    mismatches = check_equivalence(texts)
+    print(f"Equivalence: {len(texts) - mismatches}/{len(texts)} texts normalize identically")
+
+    results = {}
+    for name, func in (('normalize_* + position walk', bench_legacy), ('normalize_with_offsets', bench_engine)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func(texts)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+        print(f"{name:32s} {best * 1000:9.2f} ms  ({total_chars / best / 1e6:6.2f} M chars/s)")
+
+    legacy, engine = results['normalize_* + position walk'], results['normalize_with_offsets']
+    print(f"Speedup: {legacy / engine:.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
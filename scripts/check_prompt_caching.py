@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Offline check of Bedrock prompt-cache request building.
+Replaces the Bedrock runtime client in agent/model.py with a local stub, runs the
+analyze_structure and identify_conflicts request shapes for several chunks and
+reports the system blocks, cache points and the cache read/write usage recorded
+by the model layer. No AWS credentials or network access are needed.
+
+Usage:
+    python scripts/check_prompt_caching.py [--chunks N] [--terms-profile PROFILE]
+"""
+import os
+import sys
+import argparse
+
+ONE_L_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'one_l')
+sys.path.insert(0, os.path.abspath(ONE_L_DIR))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')  # agent modules create boto3 clients at import
+
+from agent_api.agent import model as model_module  # noqa: E402
+from agent_api.agent.rate_limiter import InMemoryRateLimiter, set_rate_limiter  # noqa: E402
+from agent_api.agent.prompts.conflict_detection_prompt import CONFLICT_DETECTION_PROMPT  # noqa: E402
+from agent_api.agent.prompts.structure_analysis_prompt import STRUCTURE_ANALYSIS_PROMPT  # noqa: E402
+
+
+class StubBedrockClient:
+    """
+    Minimal stand-in for the bedrock-runtime client.
+
+    Records every converse request and simulates the prompt cache: the
+    prefix up to each cache point is written on first use and read on later
+    requests with an identical prefix. Token counts are estimated from
+    characters with the model layer's CHARS_PER_TOKEN.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self._cached_prefixes = set()
+
+    def converse(self, **params):
+        self.requests.append(params)
+        prefix = [repr(params.get('toolConfig'))]
+        cache_read = cache_write = uncached_chars = 0
+        for block in params.get('system', []):
+            if 'cachePoint' in block:
+                key = tuple(prefix)
+                prefix_tokens = sum(len(part) for part in prefix) // model_module.CHARS_PER_TOKEN
+                if key in self._cached_prefixes:
+                    cache_read = prefix_tokens
+                else:
+                    cache_write = prefix_tokens - cache_read
+                    self._cached_prefixes.add(key)
+                uncached_chars = 0
+            else:
+                prefix.append(block['text'])
+                uncached_chars += len(block['text'])
+        for message in params['messages']:
+            for block in message['content']:
+                uncached_chars += len(block.get('text', ''))
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': '{}'}]}},
+            'stopReason': 'end_turn',
+            'usage': {
+                'inputTokens': uncached_chars // model_module.CHARS_PER_TOKEN,
+                'outputTokens': 1,
+                'cacheReadInputTokens': cache_read,
+                'cacheWriteInputTokens': cache_write
+            }
+        }
+
+
+def chunk_messages(chunk_num, total_chunks):
+    """User message as built by the step functions for one text chunk."""
+    return [{
+        'role': 'user',
+        'content': [
+            {'text': f"You are analyzing chunk {chunk_num + 1} of {total_chunks}."},
+            {'text': f"<vendor_document name=\"chunk{chunk_num}\">\nSection {chunk_num}. " + "Vendor terms. " * 400 + "\n</vendor_document>"}
+        ]
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=5, help='Chunks per stage')
+    parser.add_argument('--terms-profile', default='general_terms', help='Terms profile text layered after the structure prompt')
+    args = parser.parse_args()
+
+    stub = StubBedrockClient()
+    model_module.bedrock_client = stub
+    set_rate_limiter(InMemoryRateLimiter(requests_per_minute=0, tokens_per_minute=0))  # No throttling offline
+    model = model_module.Model.__new__(model_module.Model)
+    model.tools = model_module.get_tool_definitions()
+    model.knowledge_base_id = None
+    model.region = os.environ['AWS_DEFAULT_REGION']
+    model.answered_model_ids = []
+
+    terms_context = f"### TERMS PROFILE CONTEXT\nSelected Profile: {args.terms_profile}"
+    for chunk_num in range(args.chunks):
+        model._call_claude_with_tools(chunk_messages(chunk_num, args.chunks), system_prompt=[STRUCTURE_ANALYSIS_PROMPT, terms_context])
+    for chunk_num in range(args.chunks):
+        model._call_claude_without_tools(chunk_messages(chunk_num, args.chunks), system_prompt=[CONFLICT_DETECTION_PROMPT])
+
+    failures = 0
+    for idx, request in enumerate(stub.requests):
+        system = request.get('system', [])
+        cache_points = sum(1 for block in system if 'cachePoint' in block)
+        if not system or 'cachePoint' not in system[-1]:
+            failures += 1
+            print(f"request {idx}: system prompt does not end with a cache point")
+        if any('cachePoint' in block for message in request['messages'] for block in message['content']):
+            failures += 1
+            print(f"request {idx}: cache point inside per-chunk messages")
+        print(f"request {idx}: {len(system) - cache_points} system layers, {cache_points} cache points, tools={'toolConfig' in request}")
+
+    stats = model_module.get_prompt_cache_statistics()
+    print(f"Usage: input={stats['input_tokens']} cache_read={stats['cache_read_input_tokens']} "
+          f"cache_write={stats['cache_write_input_tokens']} hit_rate={stats['cache_hit_rate'] * 100:.1f}%")
+    if stats['cache_read_input_tokens'] == 0:
+        failures += 1
+        print("No cache reads: prefix differs between chunks")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of per-stage model routes against captured production calls.
+Cases are the eval_captures/ objects written by analyze_structure and identify_conflicts
+when EVAL_CAPTURE_ENABLED is set (copy them locally, e.g. with `aws s3 sync`). Each case is
+replayed through every candidate route and the answers are compared with the recorded
+baseline answer: queries by token overlap, conflicts by vendor_quote overlap and type.
+Latency and token usage are reported next to the agreement so quality can be traded
+against cost and speed before a route is changed in STAGE_MODEL_ROUTES.
+
+Modes:
+    live      Send each case to Bedrock with the candidate route (needs AWS credentials)
+    stub      Replace Bedrock with a stub that echoes the baseline (checks the harness and request shapes)
+    recorded  Score outputs saved by an earlier run with --save-outputs
+
+Candidates file: {"name": {"stage": {route fields}}}, e.g.
+    {"haiku_structure": {"analyze_structure": {"model_id": "us.anthropic.claude-haiku-4-5-20251001-v1:0", "thinking": false}}}
+
+Usage:
+    python scripts/eval_stage_routes.py CAPTURE_DIR --candidates routes.json [--mode live|stub|recorded]
+        [--outputs DIR] [--save-outputs] [--knowledge-base-id ID]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+ONE_L_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'one_l')
+sys.path.insert(0, os.path.abspath(ONE_L_DIR))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')  # agent modules create boto3 clients at import
+
+from agent_api.agent import model as model_module  # noqa: E402
+from agent_api.agent.eval_capture import load_eval_case  # noqa: E402
+from agent_api.agent.rate_limiter import InMemoryRateLimiter, set_rate_limiter  # noqa: E402
+from agent_api.agent.prompts.models import StructureAnalysisOutput, ConflictDetectionOutput  # noqa: E402
+
+STAGE_OUTPUT_MODELS = {
+    'analyze_structure': StructureAnalysisOutput,
+    'identify_conflicts': ConflictDetectionOutput
+}
+QUERY_MATCH_THRESHOLD = 0.5  # Token Jaccard at which a candidate query covers a baseline query
+QUOTE_MATCH_THRESHOLD = 0.6  # Token Jaccard at which two vendor_quotes are the same conflict
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class StubBedrockClient:
+    """
+    Stand-in for the bedrock-runtime client that answers every case with its baseline output.
+
+    Records the model ID and thinking setting of each request so the route wiring can be
+    checked without AWS access.
+    """
+
+    def __init__(self):
+        self.answer = '{}'
+        self.requests = []
+
+    def converse(self, **params):
+        thinking = (params.get('additionalModelRequestFields') or {}).get('thinking', {}).get('type') == 'enabled'
+        self.requests.append({'model_id': params['modelId'], 'thinking': thinking, 'max_tokens': params['inferenceConfig']['maxTokens']})
+        chars = sum(len(block.get('text', '')) for message in params['messages'] for block in message['content'])
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': self.answer}]}},
+            'stopReason': 'end_turn',
+            'usage': {'inputTokens': chars // model_module.CHARS_PER_TOKEN, 'outputTokens': len(self.answer) // model_module.CHARS_PER_TOKEN}
+        }
+
+
+def tokens(text):
+    return set(_TOKEN_PATTERN.findall((text or '').lower()))
+
+
+def jaccard(a, b):
+    a, b = tokens(a), tokens(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def compare_queries(baseline, candidate):
+    """Recall of baseline queries (best token-Jaccard match), mean best similarity and query count ratio."""
+    base_queries = [q['query'] for q in baseline.get('queries', [])]
+    cand_queries = [q['query'] for q in candidate.get('queries', [])]
+    if not base_queries:
+        return {'recall': 1.0, 'similarity': 1.0, 'count_ratio': 1.0}
+    best = [max((jaccard(bq, cq) for cq in cand_queries), default=0.0) for bq in base_queries]
+    return {
+        'recall': sum(1 for score in best if score >= QUERY_MATCH_THRESHOLD) / len(best),
+        'similarity': sum(best) / len(best),
+        'count_ratio': len(cand_queries) / len(base_queries)
+    }
+
+
+def compare_conflicts(baseline, candidate):
+    """Precision, recall and F1 of candidate conflicts matched to baseline ones by vendor_quote, and type agreement."""
+    base_conflicts = baseline.get('conflicts', [])
+    cand_conflicts = candidate.get('conflicts', [])
+    unmatched = list(range(len(cand_conflicts)))
+    matched = same_type = 0
+    for base in base_conflicts:
+        scored = [(jaccard(base['vendor_quote'], cand_conflicts[idx]['vendor_quote']), idx) for idx in unmatched]
+        score, idx = max(scored, default=(0.0, None))
+        if idx is not None and score >= QUOTE_MATCH_THRESHOLD:
+            unmatched.remove(idx)
+            matched += 1
+            same_type += base['conflict_type'] == cand_conflicts[idx]['conflict_type']
+    precision = matched / len(cand_conflicts) if cand_conflicts else (1.0 if not base_conflicts else 0.0)
+    recall = matched / len(base_conflicts) if base_conflicts else 1.0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': (2 * precision * recall / (precision + recall)) if precision + recall else 0.0,
+        'type_agreement': same_type / matched if matched else 1.0
+    }
+
+
+STAGE_COMPARATORS = {
+    'analyze_structure': compare_queries,
+    'identify_conflicts': compare_conflicts
+}
+
+
+def load_cases(capture_dir):
+    """Load every captured case under capture_dir (any layout; one JSON object per file)."""
+    cases = []
+    for root, _, files in os.walk(capture_dir):
+        for name in sorted(files):
+            if name.endswith('.json'):
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    cases.append(load_eval_case(f.read()))
+    return cases
+
+
+def run_case(model, case, route):
+    """Replay one case with a route; returns {'output', 'latency_ms', 'usage', 'error'}."""
+    stage = case['stage']
+    model_module.STAGE_MODEL_ROUTES = {stage: route}
+    usage_start = model_module.snapshot_usage()
+    model.answered_model_ids = []
+    started = time.time()
+    try:
+        if stage == 'analyze_structure':
+            response = model._call_claude_with_tools(case['messages'], system_prompt=case['system_prompt'], stage=stage, expected_items=case.get('expected_items'))
+        else:
+            response = model._call_claude_without_tools(case['messages'], system_prompt=case['system_prompt'], stage=stage, expected_items=case.get('expected_items'))
+        content = ''.join(block.get('text', '') for block in response.get('output', {}).get('message', {}).get('content', []))
+        output = STAGE_OUTPUT_MODELS[stage].model_validate(model_module._extract_json_only(content)).model_dump()
+        error = None
+        if not model.answered_only_by(route['model_id']):
+            # A tier fallback answered; its output says nothing about the candidate route
+            output, error = None, f"answered by fallback model(s) {model.answered_model_ids}"
+    except Exception as e:
+        output, error = None, f"{type(e).__name__}: {str(e)[:200]}"
+    return {
+        'output': output,
+        'latency_ms': int((time.time() - started) * 1000),
+        'usage': model_module.usage_since(usage_start),
+        'error': error
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0
+
+
+def report(name, stage, results):
+    """Print one candidate/stage row: latency, tokens, failures and mean agreement metrics."""
+    latencies = [r['latency_ms'] for r in results]
+    scores = [r['scores'] for r in results if r.get('scores')]
+    metrics = {key: sum(s[key] for s in scores) / len(scores) for key in scores[0]} if scores else {}
+    failures = sum(1 for r in results if r['output'] is None)
+    input_tokens = sum(r['usage'].get('input_tokens', 0) for r in results)
+    output_tokens = sum(r['usage'].get('output_tokens', 0) for r in results)
+    metric_text = ' '.join(f"{key}={value:.3f}" for key, value in metrics.items())
+    print(f"{name:<24} {stage:<20} cases={len(results)} failed={failures} "
+          f"latency_ms mean={sum(latencies) / len(latencies):.0f} p50={percentile(latencies, 0.5)} p95={percentile(latencies, 0.95)} "
+          f"input_tokens={input_tokens} output_tokens={output_tokens} {metric_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture_dir', help='Local copy of eval_captures/')
+    parser.add_argument('--candidates', required=True, help='JSON file of candidate routes: {"name": {"stage": {route fields}}}')
+    parser.add_argument('--mode', choices=['live', 'stub', 'recorded'], default='stub')
+    parser.add_argument('--outputs', default='eval_outputs', help='Directory of candidate outputs (written by --save-outputs, read by recorded mode)')
+    parser.add_argument('--save-outputs', action='store_true', help='Save each candidate output for later recorded runs')
+    parser.add_argument('--knowledge-base-id', default=None, help='Knowledge base for analyze_structure tool calls in live mode')
+    args = parser.parse_args()
+
+    with open(args.candidates, encoding='utf-8') as f:
+        candidates = json.load(f)
+    cases = load_cases(args.capture_dir)
+    if not cases:
+        print(f"No cases found in {args.capture_dir}")
+        return 1
+
+    stub = None
+    if args.mode == 'stub':
+        stub = StubBedrockClient()
+        model_module.bedrock_client = stub
+    set_rate_limiter(InMemoryRateLimiter(requests_per_minute=0, tokens_per_minute=0))  # Calls are sequential here
+    model_module.constants.STAGE_MODEL_ROUTES = {}  # Only the candidate route applies during a replay
+    model = model_module.Model.__new__(model_module.Model)
+    model.tools = model_module.get_tool_definitions()
+    model.knowledge_base_id = args.knowledge_base_id
+    model.region = os.environ['AWS_DEFAULT_REGION']
+    model.answered_model_ids = []
+
+    failures = 0
+    for stage in sorted({case['stage'] for case in cases}):
+        report('(baseline)', stage, [dict(case['baseline'], scores=None) for case in cases if case['stage'] == stage])
+    for name, stage_routes in candidates.items():
+        for stage, route_overrides in stage_routes.items():
+            stage_cases = [case for case in cases if case['stage'] == stage]
+            if not stage_cases:
+                print(f"{name:<24} {stage:<20} no captured cases")
+                continue
+            route = dict(model_module.DEFAULT_STAGE_ROUTE, **route_overrides)
+            results = []
+            for case in stage_cases:
+                output_path = os.path.join(args.outputs, name, stage, f"{case['case_id']}.json")
+                if args.mode == 'recorded':
+                    with open(output_path, encoding='utf-8') as f:
+                        result = json.load(f)
+                else:
+                    if stub:
+                        stub.answer = json.dumps(case['baseline']['output'])
+                    result = run_case(model, case, route)
+                    if stub and stub.requests[-1]['model_id'] != route['model_id']:
+                        failures += 1
+                        print(f"{case['case_id']}: sent to {stub.requests[-1]['model_id']}, route is {route['model_id']}")
+                    if stub and stub.requests[-1]['thinking'] != bool(route['thinking']):
+                        failures += 1
+                        print(f"{case['case_id']}: thinking={stub.requests[-1]['thinking']}, route has thinking={route['thinking']}")
+                    if args.save_outputs:
+                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                        with open(output_path, 'w', encoding='utf-8') as f:
+                            json.dump(result, f)
+                if result['output'] is not None:
+                    result['scores'] = STAGE_COMPARATORS[stage](case['baseline']['output'], result['output'])
+                elif result.get('error'):
+                    print(f"{name} {case['case_id']}: {result['error']}")
+                results.append(result)
+            report(name, stage, results)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())